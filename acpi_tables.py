@@ -0,0 +1,646 @@
+import os
+import mmap
+import pickle
+import struct
+import hashlib
+
+# ACPI 表头（36 字节，小端序）
+TABLE_HEADER = struct.Struct('<4sIBB6s8sI4sI')
+SYSTEM_TABLES_DIR = '/sys/firmware/acpi/tables'
+AML_TABLES = (b'DSDT', b'SSDT')
+INDEX_VERSION = 2           # 磁盘索引格式版本，解析规则或索引结构变化时递增
+MAX_PATTERN = 32            # 生成补丁时 Find 数据的最大长度
+
+# 命名空间对象类型
+SCOPE, DEVICE, PROCESSOR, POWER_RESOURCE, THERMAL_ZONE = 'scope', 'device', 'processor', 'power_resource', 'thermal_zone'
+METHOD, NAME, EXTERNAL, ALIAS, REGION, FIELD, MUTEX, EVENT = (
+    'method', 'name', 'external', 'alias', 'region', 'field', 'mutex', 'event'
+)
+CONTAINERS = (SCOPE, DEVICE, PROCESSOR, POWER_RESOURCE, THERMAL_ZONE)
+
+# 表达式操作码的参数：t 为 TermArg（包括 Target），b/w/d 为定长整数
+EXPRESSION_ARGS = {
+    0x70: 'tt', 0x71: 't', 0x72: 'ttt', 0x73: 'ttt', 0x74: 'ttt', 0x75: 't', 0x76: 't',
+    0x77: 'ttt', 0x78: 'tttt', 0x79: 'ttt', 0x7A: 'ttt', 0x7B: 'ttt', 0x7C: 'ttt', 0x7D: 'ttt',
+    0x7E: 'ttt', 0x7F: 'ttt', 0x80: 'tt', 0x81: 'tt', 0x82: 'tt', 0x83: 't', 0x84: 'ttt',
+    0x85: 'ttt', 0x86: 'tt', 0x87: 't', 0x88: 'ttt', 0x89: 'tbtbtt', 0x8E: 't', 0x90: 'tt',
+    0x91: 'tt', 0x92: 't', 0x93: 'tt', 0x94: 'tt', 0x95: 'tt', 0x96: 'tt', 0x97: 'tt',
+    0x98: 'tt', 0x99: 'tt', 0x9C: 'ttt', 0x9D: 'tt', 0x9E: 'tttt', 0x9F: '', 0xA3: '',
+    0xA4: 't', 0xA5: '', 0xCC: ''
+}
+EXT_EXPRESSION_ARGS = {
+    0x12: 'tt', 0x1F: 'tttttt', 0x20: 'tt', 0x21: 't', 0x22: 't', 0x23: 'tw', 0x24: 't',
+    0x25: 'tt', 0x26: 't', 0x27: 't', 0x28: 'tt', 0x29: 'tt', 0x2A: 't', 0x30: '', 0x31: '',
+    0x32: 'bdt', 0x33: ''
+}
+INTEGER_PREFIXES = {0x0A: 1, 0x0B: 2, 0x0C: 4, 0x0E: 8}
+LEAD_NAME_CHARS = set(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+NAME_START = LEAD_NAME_CHARS | {0x5C, 0x5E, 0x2E, 0x2F}
+
+
+class AmlError(Exception):
+    """AML 字节码格式错误"""
+
+
+def decode_eisa_id(value):
+    """把 EisaId() 压缩后的 32 位整数还原为 "PNP0C09" 形式"""
+    value = struct.unpack('>I', struct.pack('<I', value & 0xFFFFFFFF))[0]
+    letters = [((value >> shift) & 0x1F) + 0x40 for shift in (26, 21, 16)]
+    if not all(0x41 <= c <= 0x5A for c in letters):
+        return None
+    return ''.join(map(chr, letters)) + f'{value & 0xFFFF:04X}'
+
+
+def join_path(segments):
+    return '\\' + '.'.join(segments)
+
+
+def split_path(path):
+    path = path.lstrip('\\')
+    return [s.ljust(4, '_') for s in path.split('.')] if path else []
+
+
+class AcpiTable:
+    """一张 ACPI 表：表头字段与数据（文件表使用内存映射，只有访问到的页才会读入）"""
+
+    def __init__(self, data, source=None):
+        if len(data) < TABLE_HEADER.size:
+            raise AmlError("ACPI 表过短")
+        (signature, length, revision, checksum, oem_id, oem_table_id,
+         oem_revision, creator_id, creator_revision) = TABLE_HEADER.unpack_from(data)
+        if length < TABLE_HEADER.size or length > len(data):
+            raise AmlError("ACPI 表长度无效")
+        self.data = data
+        self.length = length
+        self.source = source
+        self.signature = signature.decode('ascii', 'replace')
+        self.revision = revision
+        self.oem_id = oem_id.decode('ascii', 'replace').rstrip('\0 ')
+        self.oem_table_id = oem_table_id.decode('ascii', 'replace').rstrip('\0 ')
+        self.oem_revision = oem_revision
+        self.creator_id = creator_id.decode('ascii', 'replace').rstrip('\0 ')
+        self.creator_revision = creator_revision
+        self.sha256 = hashlib.sha256(memoryview(data)[:length]).hexdigest()
+        self._checksum_ok = None
+
+    @property
+    def checksum_ok(self):
+        if self._checksum_ok is None:
+            self._checksum_ok = sum(self.data[:self.length]) & 0xFF == 0
+        return self._checksum_ok
+
+    def read(self, offset, length):
+        return bytes(self.data[offset:min(offset + length, self.length)])
+
+    def count(self, pattern, limit=2):
+        """统计 pattern 在表中出现的次数（最多数到 limit）"""
+        found = 0
+        pos = self.data.find(pattern, 0, self.length)
+        while pos >= 0 and found < limit:
+            found += 1
+            pos = self.data.find(pattern, pos + 1, self.length)
+        return found
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    @property
+    def is_aml(self):
+        return self.signature.encode() in AML_TABLES
+
+    def to_dict(self):
+        return {
+            'signature': self.signature,
+            'length': self.length,
+            'revision': self.revision,
+            'oem_id': self.oem_id,
+            'oem_table_id': self.oem_table_id,
+            'oem_revision': self.oem_revision,
+            'checksum_ok': self.checksum_ok,
+            'source': self.source,
+            'sha256': self.sha256
+        }
+
+
+def read_table(path):
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # 空文件或 sysfs 等不支持映射的文件直接读取
+            data = f.read()
+    return AcpiTable(data, source=path)
+
+
+def load_tables(path=None):
+    """读取 ACPI 表：path 为单个表文件或目录（如 OpenCore/ACPI 导出的 .aml），
+    为空时读取本机固件的表（Linux 需要 root 权限）"""
+    path = path or SYSTEM_TABLES_DIR
+    if os.path.isfile(path):
+        return [read_table(path)]
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"找不到 ACPI 表: {path}")
+    tables = []
+    for dirpath, _, filenames in os.walk(path):
+        for name in sorted(filenames):
+            full = os.path.join(dirpath, name)
+            try:
+                tables.append(read_table(full))
+            except (OSError, AmlError) as e:
+                print(f"跳过无法读取的 ACPI 表 {full}: {str(e)}")
+    # DSDT 排在最前，SSDT 按文件名顺序
+    tables.sort(key=lambda t: (t.signature != 'DSDT', t.source or ''))
+    return tables
+
+
+def tables_hash(tables):
+    """一组 DSDT/SSDT 内容的摘要，用于缓存键"""
+    digest = hashlib.sha256()
+    for table in tables:
+        if table.is_aml:
+            digest.update(table.sha256.encode())
+    return digest.hexdigest()
+
+
+class AmlParser:
+    """遍历 AML 字节码，收集命名空间中的对象定义（作用域、设备、方法、名称等）及其字节偏移；
+    方法体不展开，只记录位置和参数个数"""
+
+    def __init__(self, data, table=None, start=TABLE_HEADER.size):
+        self.data = data
+        self.table = table
+        self.start = start
+        self.objects = []
+        self.method_args = {}   # 完整路径 -> 参数个数，用于判断表达式中的方法调用
+        self.errors = []
+
+    # ---- 基本编码 ----
+
+    def pkg_length(self, pos):
+        """解析 PkgLength，返回 (长度, 长度字段之后的位置)；长度从 PkgLength 自身开始计算"""
+        lead = self.data[pos]
+        count = lead >> 6
+        if count == 0:
+            return lead & 0x3F, pos + 1
+        length = lead & 0x0F
+        for i in range(count):
+            length |= self.data[pos + 1 + i] << (4 + 8 * i)
+        return length, pos + 1 + count
+
+    def name_string(self, pos, scope):
+        """解析 NameString，返回 (段列表, 是否为单段相对名称, 新位置)"""
+        data = self.data
+        segments = None
+        if data[pos] == 0x5C:
+            segments = []
+            pos += 1
+        else:
+            up = 0
+            while data[pos] == 0x5E:
+                up += 1
+                pos += 1
+            if up:
+                if up > len(scope):
+                    raise AmlError("名称路径超出根作用域")
+                segments = list(scope[:len(scope) - up])
+        prefix = data[pos]
+        if prefix == 0x00:
+            count, pos = 0, pos + 1
+        elif prefix == 0x2E:
+            count, pos = 2, pos + 1
+        elif prefix == 0x2F:
+            count, pos = data[pos + 1], pos + 2
+        elif prefix in LEAD_NAME_CHARS:
+            count = 1
+        else:
+            raise AmlError(f"无效的名称字符: {prefix:#x}")
+        names = []
+        for _ in range(count):
+            seg = data[pos:pos + 4]
+            if len(seg) < 4:
+                raise AmlError("名称被截断")
+            names.append(seg.decode('ascii', 'replace'))
+            pos += 4
+        relative = segments is None
+        if relative:
+            segments = list(scope) + names
+        else:
+            segments += names
+        return segments, relative and count == 1, pos
+
+    # ---- 表达式 ----
+
+    def term_arg(self, pos, scope):
+        """跳过一个 TermArg，返回 (常量值或 None, 新位置)"""
+        data = self.data
+        op = data[pos]
+        if op in (0x00, 0x01):
+            return op, pos + 1
+        if op == 0xFF:
+            return 0xFFFFFFFFFFFFFFFF, pos + 1
+        if op in INTEGER_PREFIXES:
+            size = INTEGER_PREFIXES[op]
+            return int.from_bytes(data[pos + 1:pos + 1 + size], 'little'), pos + 1 + size
+        if op == 0x0D:
+            end = data.find(b'\0', pos + 1)
+            if end < 0:
+                raise AmlError("字符串未结束")
+            return data[pos + 1:end].decode('ascii', 'replace'), end + 1
+        if op in (0x11, 0x12, 0x13):
+            length, _ = self.pkg_length(pos + 1)
+            return None, pos + 1 + length
+        if 0x60 <= op <= 0x6E:
+            return None, pos + 1
+        if op == 0x5B:
+            ext = data[pos + 1]
+            if ext not in EXT_EXPRESSION_ARGS:
+                raise AmlError(f"不支持的扩展操作码: 0x5b{ext:02x}")
+            return None, self._args(pos + 2, EXT_EXPRESSION_ARGS[ext], scope)
+        if op in EXPRESSION_ARGS:
+            return None, self._args(pos + 1, EXPRESSION_ARGS[op], scope)
+        if op in NAME_START:
+            segments, _, pos = self.name_string(pos, scope)
+            # 方法调用：按 ACPI 的向上查找规则确定参数个数
+            for _ in range(self._lookup_args(segments, scope)):
+                _, pos = self.term_arg(pos, scope)
+            return None, pos
+        raise AmlError(f"不支持的操作码: {op:#x}")
+
+    def _args(self, pos, spec, scope):
+        for kind in spec:
+            if kind == 't':
+                _, pos = self.term_arg(pos, scope)
+            else:
+                pos += {'b': 1, 'w': 2, 'd': 4}[kind]
+        return pos
+
+    def _lookup_args(self, segments, scope):
+        key = join_path(segments)
+        if key in self.method_args:
+            return self.method_args[key]
+        name = segments[-1]
+        for depth in range(len(scope), -1, -1):
+            candidate = join_path(list(scope[:depth]) + [name])
+            if candidate in self.method_args:
+                return self.method_args[candidate]
+        return 0
+
+    # ---- 定义 ----
+
+    def parse(self, end=None):
+        self.term_list(self.start, end or len(self.data), [])
+        return self.objects
+
+    def _add(self, kind, segments, offset, length, name_end, **extra):
+        # name_offset 为对象最后一个 NameSeg 的位置，重命名补丁从这里开始匹配
+        obj = dict(path=join_path(segments), type=kind, offset=offset, length=length,
+                   name_offset=name_end - 4, **extra)
+        if self.table is not None:
+            obj['table'] = self.table
+        self.objects.append(obj)
+        return obj
+
+    def term_list(self, pos, end, scope):
+        while pos < end:
+            try:
+                pos = self.term(pos, end, scope)
+            except (AmlError, IndexError, ValueError) as e:
+                # 无法识别的语句：放弃当前容器的剩余部分，外层容器不受影响
+                self.errors.append({'offset': pos, 'scope': join_path(scope), 'error': str(e) or '数据被截断'})
+                return
+
+    def _container(self, kind, pos, op_size, fixed, scope):
+        length, body = self.pkg_length(pos + op_size)
+        end = pos + op_size + length
+        segments, _, body = self.name_string(body, scope)
+        self._add(kind, segments, pos, end - pos, body)
+        self.term_list(body + fixed, end, segments)
+        return end
+
+    def term(self, pos, end, scope):
+        data = self.data
+        op = data[pos]
+        if op == 0x10:
+            return self._container(SCOPE, pos, 1, 0, scope)
+        if op == 0x5B:
+            ext = data[pos + 1]
+            if ext == 0x82:
+                return self._container(DEVICE, pos, 2, 0, scope)
+            if ext == 0x83:
+                return self._container(PROCESSOR, pos, 2, 6, scope)
+            if ext == 0x84:
+                return self._container(POWER_RESOURCE, pos, 2, 3, scope)
+            if ext == 0x85:
+                return self._container(THERMAL_ZONE, pos, 2, 0, scope)
+            if ext == 0x80:
+                segments, _, name_end = self.name_string(pos + 2, scope)
+                space = data[name_end]
+                offset, after = self.term_arg(name_end + 1, scope)
+                size, after = self.term_arg(after, scope)
+                self._add(REGION, segments, pos, after - pos, name_end,
+                          space=space, region_offset=offset, region_length=size)
+                return after
+            if ext in (0x81, 0x86, 0x87):
+                return self._field(pos, ext, scope)
+            if ext == 0x01:
+                segments, _, after = self.name_string(pos + 2, scope)
+                self._add(MUTEX, segments, pos, after + 1 - pos, after)
+                return after + 1
+            if ext == 0x02:
+                segments, _, after = self.name_string(pos + 2, scope)
+                self._add(EVENT, segments, pos, after - pos, after)
+                return after
+            if ext == 0x13:
+                after = self._args(pos + 2, 'ttt', scope)
+                segments, _, after = self.name_string(after, scope)
+                self._add(FIELD, segments, pos, after - pos, after)
+                return after
+        if op == 0x14:
+            length, body = self.pkg_length(pos + 1)
+            method_end = pos + 1 + length
+            segments, _, body = self.name_string(body, scope)
+            flags = data[body]
+            self.method_args[join_path(segments)] = flags & 0x07
+            self._add(METHOD, segments, pos, method_end - pos, body, args=flags & 0x07,
+                      serialized=bool(flags & 0x08), body=body + 1)
+            return method_end
+        if op == 0x08:
+            segments, _, name_end = self.name_string(pos + 1, scope)
+            value, after = self.term_arg(name_end, scope)
+            self._add(NAME, segments, pos, after - pos, name_end, value=value)
+            return after
+        if op == 0x15:
+            segments, _, after = self.name_string(pos + 1, scope)
+            object_type, args = data[after], data[after + 1]
+            if object_type == 0x08:
+                self.method_args.setdefault(join_path(segments), args)
+            self._add(EXTERNAL, segments, pos, after + 2 - pos, after, object_type=object_type, args=args)
+            return after + 2
+        if op == 0x06:
+            source, _, after = self.name_string(pos + 1, scope)
+            segments, _, after = self.name_string(after, scope)
+            self._add(ALIAS, segments, pos, after - pos, after, target=join_path(source))
+            return after
+        if op in (0x8A, 0x8B, 0x8C, 0x8D, 0x8F):
+            after = self._args(pos + 1, 'tt', scope)
+            segments, _, after = self.name_string(after, scope)
+            self._add(FIELD, segments, pos, after - pos, after)
+            return after
+        if op in (0xA0, 0xA2):
+            # If / While：条件之后的语句属于当前作用域
+            length, body = self.pkg_length(pos + 1)
+            block_end = pos + 1 + length
+            _, body = self.term_arg(body, scope)
+            self.term_list(body, block_end, scope)
+            return block_end
+        if op == 0xA1:
+            length, body = self.pkg_length(pos + 1)
+            self.term_list(body, pos + 1 + length, scope)
+            return pos + 1 + length
+        # 其他语句（Store、Notify 等）不定义对象，直接跳过
+        _, after = self.term_arg(pos, scope)
+        return after
+
+    def _field(self, pos, ext, scope):
+        length, body = self.pkg_length(pos + 2)
+        end = pos + 2 + length
+        _, _, body = self.name_string(body, scope)
+        if ext in (0x86, 0x87):
+            _, _, body = self.name_string(body, scope)
+        if ext == 0x87:
+            _, body = self.term_arg(body, scope)
+        body += 1   # FieldFlags
+        data = self.data
+        while body < end:
+            lead = data[body]
+            if lead == 0x00:
+                _, body = self.pkg_length(body + 1)
+            elif lead == 0x01:
+                body += 3
+            elif lead == 0x03:
+                body += 4
+            elif lead == 0x02:
+                if data[body + 1] == 0x11:
+                    length, _ = self.pkg_length(body + 2)
+                    body += 2 + length
+                else:
+                    _, _, body = self.name_string(body + 1, scope)
+            else:
+                name = data[body:body + 4].decode('ascii', 'replace')
+                start = body
+                _, body = self.pkg_length(body + 4)
+                self._add(FIELD, list(scope) + [name], start, body - start, start + 4)
+        return end
+
+
+class AcpiNamespace:
+    """多张表合并后的命名空间索引：按路径、_ADR、_HID 查找设备，按名称搜索对象；
+    整个索引按表内容的 SHA-256 缓存到 cache_dir，内容不变时下次启动直接读取而不再解析"""
+
+    # 写入磁盘缓存的属性
+    INDEX_FIELDS = ('objects', 'errors', 'by_path', 'paths', 'children', 'adr', 'hid', 'cid')
+
+    def __init__(self, tables, cache_dir=None):
+        self.tables = [t for t in tables if t.is_aml]
+        self.cache_dir = cache_dir
+        self.cached = False     # 是否命中磁盘索引
+        self.objects = []
+        self.errors = []
+        self.by_path = {}
+        self.paths = {}         # 路径 -> 所有同名对象（Scope 可以在多张表中重复出现）
+        self.children = {}      # 父路径 -> 子对象路径
+        self.adr = {}           # 设备路径 -> _ADR
+        self.hid = {}           # 设备路径 -> _HID（字符串）
+        self.cid = {}
+        self.reference_cache = {}
+        self.search_keys = None
+        if not self._load_cache():
+            self._parse()
+            self._index()
+            self._save_cache()
+
+    def _cache_path(self):
+        if not self.cache_dir:
+            return None
+        return os.path.join(str(self.cache_dir), f'{self.hash}.idx')
+
+    def _load_cache(self):
+        path = self._cache_path()
+        if not path:
+            return False
+        try:
+            with open(path, 'rb') as f:
+                cached = pickle.load(f)
+            if cached.get('version') != INDEX_VERSION:
+                return False
+            for field in self.INDEX_FIELDS:
+                setattr(self, field, cached[field])
+            self.cached = True
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"ACPI 索引缓存损坏，重新解析: {str(e)}")
+            return False
+
+    def _save_cache(self):
+        path = self._cache_path()
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            state = {field: getattr(self, field) for field in self.INDEX_FIELDS}
+            state['version'] = INDEX_VERSION
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"保存 ACPI 索引缓存失败: {str(e)}")
+
+    def _parse(self):
+        method_args = {}
+        for index, table in enumerate(self.tables):
+            parser = AmlParser(table.data, table=index)
+            parser.method_args = method_args
+            self.objects.extend(parser.parse(table.length))
+            self.errors.extend(dict(e, table=table.signature) for e in parser.errors)
+
+    @property
+    def hash(self):
+        return tables_hash(self.tables)
+
+    def _index(self):
+        for obj in self.objects:
+            self.paths.setdefault(obj['path'], []).append(obj)
+            parent = obj['path'].rpartition('.')[0] or '\\'
+            if obj['path'] not in self.by_path and obj['path'] != '\\':
+                self.children.setdefault(parent, []).append(obj['path'])
+            # External 声明和重新打开对象的 Scope 不覆盖真正的定义
+            if obj['type'] in (EXTERNAL, SCOPE) and obj['path'] in self.by_path:
+                continue
+            self.by_path[obj['path']] = obj
+            if obj['type'] != NAME:
+                continue
+            _, _, name = obj['path'].rpartition('.')
+            value = obj['value']
+            if name == '_ADR' and isinstance(value, int):
+                self.adr[parent] = value
+            elif name in ('_HID', '_CID'):
+                if isinstance(value, int):
+                    value = decode_eisa_id(value)
+                if isinstance(value, str):
+                    (self.hid if name == '_HID' else self.cid)[parent] = value
+
+    def close(self):
+        for table in self.tables:
+            table.close()
+
+    def get(self, path):
+        return self.by_path.get(path)
+
+    def devices(self):
+        return [obj for obj in self.by_path.values() if obj['type'] in (DEVICE, PROCESSOR)]
+
+    def find_by_adr(self, adr, parent=None):
+        """按 _ADR 查找设备，parent 限定所在的父设备路径"""
+        return sorted(path for path, value in self.adr.items()
+                      if value == adr and (parent is None or path.rpartition('.')[0] == parent))
+
+    def find_by_hid(self, hid):
+        hid = hid.upper()
+        return sorted(path for path in set(self.hid) | set(self.cid)
+                      if self.hid.get(path, '').upper() == hid or self.cid.get(path, '').upper() == hid)
+
+    def processors(self):
+        """CPU 对象：旧式 Processor 定义或 _HID 为 ACPI0007 的设备，按定义顺序"""
+        paths = [obj['path'] for obj in self.objects if obj['type'] == PROCESSOR]
+        if not paths:
+            hids = set(self.find_by_hid('ACPI0007'))
+            paths = [obj['path'] for obj in self.objects if obj['type'] == DEVICE and obj['path'] in hids]
+        return list(dict.fromkeys(paths))
+
+    def describe(self, obj):
+        """对象的摘要（用于接口返回）"""
+        info = {k: v for k, v in obj.items() if k != 'table'}
+        info['table'] = self.tables[obj['table']].signature
+        info['oem_table_id'] = self.tables[obj['table']].oem_table_id
+        path = obj['path']
+        if obj['type'] in (DEVICE, PROCESSOR):
+            info['hid'] = self.hid.get(path)
+            info['cid'] = self.cid.get(path)
+            info['adr'] = self.adr.get(path)
+        return info
+
+    def search(self, query='', types=None, limit=200):
+        """按路径片段、_HID/_CID 搜索对象；路径比较时忽略 NameSeg 的填充下划线"""
+        query = query.strip().upper().lstrip('\\')
+        if self.search_keys is None:
+            # 路径和去掉填充下划线的路径合并为一个搜索键，首次搜索时建立
+            self.search_keys = [
+                (path, path.upper() + '\n' + '.'.join(s.rstrip('_') for s in path.lstrip('\\').split('.')).upper(),
+                 ((self.hid.get(path) or '').upper(), (self.cid.get(path) or '').upper()))
+                for path in self.by_path
+            ]
+        results = []
+        for path, key, ids in self.search_keys:
+            obj = self.by_path[path]
+            if types and obj['type'] not in types:
+                continue
+            if query and query not in key and query not in ids:
+                continue
+            results.append(self.describe(obj))
+            if len(results) >= limit:
+                break
+        return results
+
+    def references(self, name):
+        """列出方法体中引用了某个 NameSeg 的方法；方法体在建立索引时没有展开，这里按需扫描并缓存"""
+        seg = name.strip().lstrip('\\').split('.')[-1].upper().ljust(4, '_').encode('ascii')
+        if seg in self.reference_cache:
+            return self.reference_cache[seg]
+        found = []
+        for obj in self.objects:
+            if obj['type'] != METHOD:
+                continue
+            table = self.tables[obj['table']]
+            if table.data.find(seg, obj['body'], obj['offset'] + obj['length']) >= 0:
+                found.append(obj['path'])
+        self.reference_cache[seg] = found
+        return found
+
+    def patch_target(self, path, new_name=None):
+        """为重命名对象生成 OpenCore ACPI Patch：Find 从对象的 NameSeg 开始向后延伸到在表中唯一"""
+        obj = self.by_path.get(path)
+        if obj is None or obj['type'] == EXTERNAL:
+            raise ValueError(f"找不到对象: {path}")
+        table = self.tables[obj['table']]
+        start = obj['name_offset']
+        seg = table.read(start, 4)
+        new_seg = (new_name or 'X' + seg.decode('ascii')[1:]).upper().ljust(4, '_').encode('ascii')
+        if len(new_seg) != 4:
+            raise ValueError("新名称必须是 4 个字符")
+        end = min(start + MAX_PATTERN, table.length)
+        pattern = seg
+        for length in range(4, end - start + 1):
+            pattern = table.read(start, length)
+            if table.count(pattern) == 1:
+                break
+        return {
+            'path': path,
+            'table': table.signature,
+            'oem_table_id': table.oem_table_id,
+            'offset': start,
+            'find': pattern.hex().upper(),
+            'replace': (new_seg + pattern[4:]).hex().upper(),
+            'count': table.count(pattern, limit=100),
+            'unique': table.count(pattern) == 1
+        }
+
+    def raw(self, path, limit=256):
+        """对象的原始字节（十六进制）"""
+        obj = self.by_path.get(path)
+        if obj is None:
+            raise ValueError(f"找不到对象: {path}")
+        return self.tables[obj['table']].read(obj['offset'], min(obj['length'], limit)).hex().upper()
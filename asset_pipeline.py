@@ -0,0 +1,233 @@
+import io
+import os
+import re
+import hashlib
+import mimetypes
+import posixpath
+import threading
+from static_cache import CachedAsset
+
+# 带内容哈希的文件名内容不会变化，可以永久缓存
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+HASH_LENGTH = 10
+TEXT_EXTENSIONS = ('.css', '.js')
+FONT_FLAVORS = {'.woff2': 'woff2', '.woff': 'woff', '.ttf': None, '.otf': None}
+
+ICON_NAME = re.compile(r'\bfa-[a-z0-9]+(?:-[a-z0-9]+)*')
+ICON_RULE = re.compile(r'([^{}]+)\{content:"\\([0-9a-fA-F]+)"\}')
+ICON_SELECTOR = re.compile(r'\.(fa-[a-z0-9-]+):before')
+FONT_FACE = re.compile(r'@font-face\{([^}]*)\}')
+FONT_SRC = re.compile(r'src:([^;}]*)')
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+STATIC_REF = re.compile(r'(?<=[\'"(])/static/([\w./-]+)')
+
+
+def used_icons(sources):
+    """从页面和脚本源码中收集用到的 Font Awesome 图标类名"""
+    icons = set()
+    for source in sources:
+        icons.update(ICON_NAME.findall(source))
+    return icons
+
+
+def subset_icon_rules(css, icons):
+    """删除未使用的图标规则，返回 (新CSS, 保留图标的码位集合)；没有图标规则时码位为 None"""
+    codepoints = set()
+    found = False
+
+    def keep(match):
+        nonlocal found
+        selectors = [s.strip() for s in match.group(1).split(',')]
+        names = [ICON_SELECTOR.fullmatch(s) for s in selectors]
+        if not all(names):
+            return match.group(0)
+        found = True
+        kept = [s for s, name in zip(selectors, names) if name.group(1) in icons]
+        if not kept:
+            return ''
+        codepoints.add(int(match.group(2), 16))
+        return ','.join(kept) + '{content:"\\' + match.group(2) + '"}'
+
+    css = ICON_RULE.sub(keep, css)
+    return css, (codepoints if found else None)
+
+
+def split_url(url):
+    """去掉 url 中的查询参数和锚点，返回 (路径, 后缀)"""
+    index = min([i for i in (url.find('?'), url.find('#')) if i >= 0], default=len(url))
+    return url[:index], url[index:]
+
+
+def subset_font(data, codepoints, flavor):
+    """用 fontTools（可选依赖）把字体裁剪到给定码位，不可用或失败时返回原数据"""
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        return data
+    try:
+        options = subset.Options()
+        options.flavor = flavor
+        options.layout_features = ['*']
+        options.notdef_outline = True
+        options.drop_tables += ['FFTM']
+        font = TTFont(io.BytesIO(data))
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(font)
+        output = io.BytesIO()
+        font.flavor = flavor
+        font.save(output)
+        return output.getvalue()
+    except Exception as e:
+        print(f"裁剪字体失败，使用完整字体: {str(e)}")
+        return data
+
+
+class AssetPipeline:
+    """为 static 目录生成带内容哈希的文件名清单：
+    CSS/JS 中对其他静态文件的引用改写为带哈希的地址，Font Awesome 只保留页面用到的图标"""
+
+    def __init__(self, root, prefix='/static/'):
+        self.root = os.path.realpath(root)
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.manifest = {}   # 逻辑路径 -> 带哈希路径
+        self.assets = {}     # 带哈希路径 -> CachedAsset
+
+    def build(self, sources=()):
+        """扫描并处理所有静态文件；sources 为引用静态文件的页面源码，用于统计图标"""
+        files = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                logical = os.path.relpath(path, self.root).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    files[logical] = f.read()
+
+        scripts = [data.decode('utf-8', 'ignore') for path, data in files.items() if path.endswith('.js')]
+        icons = used_icons(list(sources) + scripts)
+
+        # 先裁剪图标 CSS，记下每个字体文件需要保留的码位
+        contents = dict(files)
+        font_codepoints = {}
+        for path, data in files.items():
+            if not path.endswith('.css'):
+                continue
+            css, codepoints = subset_icon_rules(data.decode('utf-8'), icons)
+            contents[path] = css.encode('utf-8')
+            if codepoints is None:
+                continue
+            for block in FONT_FACE.findall(css):
+                for _, url in CSS_URL.findall(block):
+                    target = self._resolve(path, split_url(url)[0])
+                    if target in files:
+                        font_codepoints.setdefault(target, set()).update(codepoints)
+
+        for path, codepoints in font_codepoints.items():
+            ext = posixpath.splitext(path)[1].lower()
+            if ext in FONT_FLAVORS:
+                contents[path] = subset_font(contents[path], codepoints, FONT_FLAVORS[ext])
+
+        manifest = {}
+        assets = {}
+        pending = set()
+
+        def fingerprint(path):
+            if path in manifest:
+                return manifest[path]
+            if path in pending:
+                # 循环引用时保留原地址
+                return path
+            pending.add(path)
+            data = contents[path]
+            if path.endswith(TEXT_EXTENSIONS):
+                text = data.decode('utf-8')
+                if path.endswith('.css'):
+                    text = self._rewrite_css(path, text, contents, fingerprint)
+                text = self._rewrite_refs(text, contents, fingerprint)
+                data = text.encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+            base, ext = posixpath.splitext(path)
+            hashed = f'{base}.{digest}{ext}'
+            mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            manifest[path] = hashed
+            assets[hashed] = CachedAsset(data, mimetype, IMMUTABLE_CACHE)
+            pending.discard(path)
+            return hashed
+
+        for path in sorted(contents):
+            fingerprint(path)
+
+        with self.lock:
+            self.manifest = manifest
+            self.assets = assets
+        return manifest
+
+    def _resolve(self, base, url):
+        """把 CSS 中的相对地址解析为 static 下的逻辑路径"""
+        if url.startswith(self.prefix):
+            return url[len(self.prefix):]
+        if '://' in url or url.startswith(('/', 'data:')):
+            return None
+        return posixpath.normpath(posixpath.join(posixpath.dirname(base), url))
+
+    def _rewrite_css(self, path, css, contents, fingerprint):
+        """改写 url() 引用；@font-face 中指向不存在文件的格式直接删除"""
+        def rewrite_src(match):
+            entries = []
+            for entry in match.group(1).split(','):
+                url = CSS_URL.search(entry)
+                if url:
+                    target = self._resolve(path, split_url(url.group(2))[0])
+                    if target is not None and target not in contents:
+                        continue
+                entries.append(entry)
+            return 'src:' + ','.join(entries) if entries else ''
+
+        def rewrite_face(match):
+            block = FONT_SRC.sub(rewrite_src, match.group(1))
+            block = re.sub(r';{2,}', ';', block).strip(';')
+            if 'url(' not in block:
+                return ''
+            return '@font-face{' + block + '}'
+
+        def rewrite_url(match):
+            url_path, suffix = split_url(match.group(2))
+            target = self._resolve(path, url_path)
+            if target not in contents:
+                return match.group(0)
+            return f'url({self.prefix}{fingerprint(target)}{suffix})'
+
+        css = FONT_FACE.sub(rewrite_face, css)
+        return CSS_URL.sub(rewrite_url, css)
+
+    def _rewrite_refs(self, text, contents, fingerprint):
+        """改写 '/static/...' 形式的绝对引用"""
+        def rewrite(match):
+            target = match.group(1)
+            if target not in contents:
+                return match.group(0)
+            return self.prefix + fingerprint(target)
+        return STATIC_REF.sub(rewrite, text)
+
+    def rewrite(self, html):
+        """把页面中的静态文件引用改写为带哈希的地址"""
+        with self.lock:
+            manifest = self.manifest
+
+        def rewrite(match):
+            hashed = manifest.get(match.group(1))
+            return self.prefix + hashed if hashed else match.group(0)
+        return STATIC_REF.sub(rewrite, html)
+
+    def get(self, filename):
+        with self.lock:
+            return self.assets.get(filename)
+
+    def warm(self):
+        """预先压缩所有带哈希的文件"""
+        with self.lock:
+            assets = list(self.assets.values())
+        for asset in assets:
+            asset.compress()
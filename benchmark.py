@@ -0,0 +1,365 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import platform
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import click
+
+# 基准测试：通过 Flask 测试客户端调用接口，下载部分连接本地的 Range 测试服务器，结果以 JSON 输出便于对比
+BLOCK_SIZE = 1024 * 1024           # 测试文件由同一个 1MB 数据块重复组成，不占用磁盘
+WRITE_PIECE = 256 * 1024
+DEFAULT_REQUESTS = 2000
+DEFAULT_DOWNLOAD_SIZE = 2 * 1024 ** 3
+DEFAULT_CONNECTIONS = (1, 2, 4, 8)
+DEFAULT_PREF_WRITES = 200
+REGRESSION_THRESHOLD = 0.10        # 对比时变化超过 10% 才标记
+
+
+def percentile(values, fraction):
+    """已排序列表的分位数（最近秩法）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def latency_stats(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3)
+    }
+
+
+# ---- 本地 Range 测试服务器 ----
+
+class SyntheticFile:
+    """指定大小的虚拟文件：内容为固定数据块的重复，可按任意偏移读取"""
+
+    def __init__(self, size, seed=b'SimpleToolkit'):
+        self.size = size
+        block = bytearray()
+        counter = 0
+        while len(block) < BLOCK_SIZE:
+            block += hashlib.sha256(seed + counter.to_bytes(8, 'little')).digest()
+            counter += 1
+        # 多留一个数据块，任意偏移都能切出连续的一段
+        self.block = memoryview(bytes(block[:BLOCK_SIZE]) * 2)
+        self.etag = hashlib.sha1(seed + str(size).encode()).hexdigest()
+
+    def pieces(self, start, end):
+        """产出 [start, end] 区间（含 end）的数据"""
+        position = start
+        while position <= end:
+            offset = position % BLOCK_SIZE
+            length = min(WRITE_PIECE, end - position + 1)
+            yield self.block[offset:offset + length]
+            position += length
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        synthetic = self.server.files.get(self.path.split('?')[0])
+        if synthetic is None:
+            self.send_error(404)
+            return
+        start, end = 0, synthetic.size - 1
+        status = 200
+        header = self.headers.get('Range')
+        if header and header.startswith('bytes='):
+            first, _, last = header[6:].split(',')[0].partition('-')
+            if first:
+                start = int(first)
+                end = min(int(last), synthetic.size - 1) if last else synthetic.size - 1
+            else:
+                start = max(0, synthetic.size - int(last))
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{synthetic.size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', f'"{synthetic.etag}"')
+        self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{synthetic.size}')
+        self.end_headers()
+        if not send_body:
+            return
+        try:
+            for piece in synthetic.pieces(start, end):
+                self.wfile.write(piece)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class RangeServer(ThreadingHTTPServer):
+    """在 127.0.0.1 随机端口上提供支持 Range/ETag 的虚拟大文件"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), RangeRequestHandler)
+        self.files = {}
+        self.thread = None
+
+    def add_file(self, name, size):
+        self.files['/' + name] = SyntheticFile(size)
+        return f'http://127.0.0.1:{self.server_address[1]}/{name}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# ---- 各项测试 ----
+
+def bench_endpoint(client, method, path, count, warmup=20, **kwargs):
+    """逐个发送请求，统计吞吐量与延迟分布"""
+    for _ in range(warmup):
+        client.open(path, method=method, **kwargs)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        response.get_data()
+        latencies.append(time.perf_counter() - t0)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} 返回 {response.status_code}")
+    return latency_stats(latencies, time.perf_counter() - started)
+
+
+def bench_api(gui, count):
+    client = gui.app.test_client()
+    gzip_headers = {'Accept-Encoding': 'gzip, deflate, br'}
+    cases = [
+        ('get_preferences', 'GET', '/api/preferences', {}),
+        ('save_preferences', 'POST', '/api/preferences', {'json': {'animationsEnabled': True, 'themeMode': 'dark'}}),
+        ('home', 'GET', '/', {'headers': gzip_headers}),
+        ('static_files', 'GET', '/static/scripts.js', {'headers': gzip_headers}),
+        ('static_files_304', 'GET', '/static/scripts.js', {'headers': {'If-None-Match': '*'}}),
+    ]
+    results = {}
+    for name, method, path, kwargs in cases:
+        results[name] = bench_endpoint(client, method, path, count, **kwargs)
+        click.echo(f"  {name:<18} {results[name]['rps']:>9} req/s  "
+                   f"p50 {results[name]['p50_ms']} ms  p99 {results[name]['p99_ms']} ms")
+    return results
+
+
+def bench_downloads(size, connection_counts, workdir):
+    """用下载调度器从本地测试服务器分段下载，统计各连接数下的吞吐量"""
+    from download_handle import DownloadHandler
+    server = RangeServer()
+    server.start()
+    url = server.add_file('synthetic.dmg', size)
+    results = []
+    try:
+        for connections in connection_counts:
+            handler = DownloadHandler()
+            save_path = os.path.join(workdir, f'synthetic-{connections}.dmg')
+            started = time.perf_counter()
+            download_id = handler.start_download(url, save_path, connections=connections)
+            while True:
+                download = handler.get_download(download_id)
+                if download['status'] not in ('queued', 'downloading'):
+                    break
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - started
+            if download['status'] != 'completed':
+                raise RuntimeError(f"下载失败: {download.get('error')}")
+            mb_per_sec = size / elapsed / 1024 ** 2
+            results.append({
+                'connections': connections,
+                'bytes': size,
+                'seconds': round(elapsed, 3),
+                'mb_per_sec': round(mb_per_sec, 1),
+                'mb_per_sec_per_connection': round(mb_per_sec / connections, 1)
+            })
+            click.echo(f"  {connections:>2} 个连接  {mb_per_sec:8.1f} MB/s  ({elapsed:.2f} s)")
+            os.remove(save_path)
+    finally:
+        server.stop()
+    return results
+
+
+def bench_preferences(gui, writes, workdir):
+    """偏好设置：内存修改速率、延迟合并写盘后的实际写入次数，以及每次都立即写盘的速率"""
+    from preferences_store import PreferencesStore
+    store = PreferencesStore(Path(workdir) / 'bench_preferences.json',
+                             gui.validate_preferences, gui.default_preferences)
+    store.load()
+    store.flush()
+
+    started = time.perf_counter()
+    for i in range(writes):
+        with store.edit() as prefs:
+            prefs['downloadRateLimit'] = i
+    edit_elapsed = time.perf_counter() - started
+    store.flush()
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(writes):
+        t0 = time.perf_counter()
+        with store.edit() as prefs:
+            prefs['downloadRateLimit'] = i
+        store.flush()
+        latencies.append(time.perf_counter() - t0)
+    flush_stats = latency_stats(latencies, time.perf_counter() - started)
+
+    results = {
+        'edits_per_sec': round(writes / edit_elapsed, 1) if edit_elapsed else 0.0,
+        'flushed_writes': flush_stats
+    }
+    click.echo(f"  修改 {results['edits_per_sec']} 次/s，立即写盘 {flush_stats['rps']} 次/s  "
+               f"p50 {flush_stats['p50_ms']} ms  p99 {flush_stats['p99_ms']} ms")
+    return results
+
+
+# ---- 结果对比 ----
+
+def flatten(results, prefix=''):
+    """把结果展开为 {路径: 数值}，下载结果按连接数展开"""
+    values = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            values.update(flatten(value, f'{prefix}{key}.'))
+    elif isinstance(results, list):
+        for item in results:
+            if isinstance(item, dict) and 'connections' in item:
+                values.update(flatten(item, f"{prefix}{item['connections']}."))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        values[prefix.rstrip('.')] = results
+    return values
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """列出变化超过阈值的指标；延迟和耗时越低越好，其余越高越好"""
+    old = flatten(baseline.get('results', {}))
+    new = flatten(current.get('results', {}))
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        if key.endswith(('.requests', '.bytes', '.connections')) or not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key]
+        lower_is_better = key.endswith(('_ms', '.seconds'))
+        worse = change > 0 if lower_is_better else change < 0
+        if abs(change) >= threshold:
+            rows.append((key, old[key], new[key], change, worse))
+    return rows
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def parse_size(text):
+    """解析 512M、2G 这类大小"""
+    text = str(text).strip().upper()
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+@click.command()
+@click.option('--requests', 'request_count', type=int, default=DEFAULT_REQUESTS, help='每个接口的请求次数')
+@click.option('--download-size', default=str(DEFAULT_DOWNLOAD_SIZE), help='测试文件大小，如 512M、2G')
+@click.option('--connections', default=','.join(map(str, DEFAULT_CONNECTIONS)), help='逗号分隔的分段连接数')
+@click.option('--pref-writes', type=int, default=DEFAULT_PREF_WRITES, help='偏好设置写入次数')
+@click.option('--skip', multiple=True, type=click.Choice(['api', 'download', 'preferences']), help='跳过的测试')
+@click.option('--output', type=click.Path(dir_okay=False), help='把结果写入 JSON 文件')
+@click.option('--compare', 'baseline_path', type=click.Path(exists=True, dir_okay=False), help='与之前的结果文件对比')
+@click.option('--threshold', type=float, default=REGRESSION_THRESHOLD, help='对比时视为变化的比例，变差时退出码为 1')
+def main(request_count, download_size, connections, pref_writes, skip, output, baseline_path, threshold):
+    """运行接口、下载与偏好设置读写的基准测试"""
+    workdir = tempfile.mkdtemp(prefix='simpletoolkit-bench-')
+    try:
+        import gui_toolkit as gui
+        # 偏好设置写到临时目录，不影响真实配置
+        from preferences_store import PreferencesStore
+        gui.preferences_store = PreferencesStore(Path(workdir) / 'preferences.json',
+                                                 gui.validate_preferences, gui.default_preferences)
+
+        results = {}
+        if 'api' not in skip:
+            click.echo("接口:")
+            results['api'] = bench_api(gui, request_count)
+        if 'download' not in skip:
+            click.echo(f"下载（{parse_size(download_size) / 1024 ** 3:.2f} GiB）:")
+            counts = [int(c) for c in connections.split(',') if c.strip()]
+            results['download'] = bench_downloads(parse_size(download_size), counts, workdir)
+        if 'preferences' not in skip:
+            click.echo("偏好设置:")
+            results['preferences'] = bench_preferences(gui, pref_writes, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'version': 1,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'revision': git_revision(),
+        'app_version': gui.APP_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        click.echo(f"结果已写入 {output}")
+    else:
+        click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, threshold)
+        click.echo(f"与 {baseline_path}（{baseline.get('revision') or '未知版本'}）对比:")
+        if not rows:
+            click.echo(f"  所有指标变化均小于 {threshold:.0%}")
+        for key, old, new, change, worse in rows:
+            click.echo(f"  {'变差' if worse else '改善'}  {key}: {old} -> {new} ({change:+.1%})")
+        if any(worse for *_, worse in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
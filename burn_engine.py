@@ -0,0 +1,445 @@
+import os
+import mmap
+import stat
+import time
+import uuid
+import queue
+import hashlib
+import threading
+import metrics
+from udif import UdifSource, is_udif
+
+BUFFER_SIZE = 8 * 1024 * 1024      # 每次读写的大小，必须是 ALIGNMENT 的整数倍
+BUFFER_COUNT = 3                   # 缓冲区数量：读线程填充的同时写线程写出上一块
+ALIGNMENT = 4096                   # O_DIRECT 要求的内存地址/偏移/长度对齐
+WIPE_SIZE = 1024 * 1024            # 格式化时清零设备首尾各 1MB（分区表和备份 GPT）
+PROGRESS_INTERVAL = 0.5
+IMAGE_EXTENSIONS = ('.dmg', '.iso', '.img')
+
+O_DIRECT = getattr(os, 'O_DIRECT', 0)
+O_BINARY = getattr(os, 'O_BINARY', 0)
+
+
+class BurnCancelled(Exception):
+    """烧录被用户取消"""
+
+
+class BurnVerifyFailed(Exception):
+    """回读校验与写入时计算的哈希不一致"""
+
+
+def is_block_device(path):
+    if path.startswith('\\\\.\\'):
+        return True
+    try:
+        return stat.S_ISBLK(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def set_direct(fd, enabled):
+    """切换文件描述符的 O_DIRECT 标志（仅 Linux）"""
+    import fcntl
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    flags = flags | O_DIRECT if enabled else flags & ~O_DIRECT
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags)
+
+
+def drop_cache(fd):
+    """丢弃页缓存，保证回读的是设备上的数据"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+def write_all(fd, view):
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+class FileSource:
+    """从本地镜像文件读取"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+        self.file = None
+
+    def open(self):
+        self.file = open(self.path, 'rb', buffering=0)
+        self.size = os.fstat(self.file.fileno()).st_size
+
+    def readinto(self, view):
+        return self.file.readinto(view)
+
+    def finish(self):
+        return True, None
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+class BurnJob:
+    def __init__(self, source, target, verify=True, direct=True, wipe=False, stream=None, tee_path=None):
+        self.id = f"burn-{uuid.uuid4().hex[:12]}"
+        self.source = source
+        self.stream = stream
+        self.tee_path = tee_path
+        self.integrity = None
+        self.target = target
+        self.verify = verify
+        self.direct = direct and bool(O_DIRECT)
+        self.wipe = wipe
+        self.total_size = 0
+        self.written = 0
+        self.verified = 0
+        self.sha256 = None
+        self.status = 'queued'   # queued / writing / verifying / completed / cancelled / error
+        self.error = None
+        self.speed = 0
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._last_notify = 0.0
+        self._last_time = time.time()
+        self._last_bytes = 0
+
+    def to_dict(self):
+        done = self.verified if self.status == 'verifying' else self.written
+        progress = done / self.total_size * 100 if self.total_size else 0
+        return {
+            'id': self.id,
+            'source': self.source,
+            'target': self.target,
+            'status': self.status,
+            'progress': round(progress, 2),
+            'total_size': self.total_size,
+            'written': self.written,
+            'verified': self.verified,
+            'speed': self.speed,
+            'direct': self.direct,
+            'verify': self.verify,
+            'sha256': self.sha256,
+            'integrity': self.integrity,
+            'tee_path': self.tee_path,
+            'error': self.error
+        }
+
+
+class BurnEngine:
+    """把 .dmg/.iso/.img 镜像（本地文件或下载流）按原始数据写入块设备或文件：
+    读线程和写线程通过一组对齐的缓冲区交替工作，写入时计算 SHA-256，
+    写完后从目标回读一次与之比较"""
+
+    def __init__(self, on_progress=None, buffer_size=BUFFER_SIZE, buffer_count=BUFFER_COUNT):
+        if buffer_size % ALIGNMENT:
+            raise ValueError("缓冲区大小必须是对齐单位的整数倍")
+        self.on_progress = on_progress
+        self.buffer_size = buffer_size
+        self.buffer_count = max(2, buffer_count)
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.active_targets = set()
+
+    def start(self, source, target, verify=True, direct=True, wipe=False):
+        """校验参数并在后台线程开始烧录，返回任务 ID"""
+        source = os.path.abspath(source)
+        if not source.lower().endswith(IMAGE_EXTENSIONS):
+            raise ValueError("仅支持 .dmg、.iso、.img 格式的镜像")
+        if not os.path.isfile(source):
+            raise FileNotFoundError(f"镜像文件不存在: {source}")
+        if not is_block_device(target):
+            target = os.path.abspath(target)
+            if os.path.exists(target) and os.path.samefile(source, target):
+                raise ValueError("目标不能是镜像文件本身")
+        # UDIF 镜像（.dmg）先解压为原始磁盘数据再写入，写入 .img 文件即为格式转换
+        stream = UdifSource(source) if is_udif(source) else None
+        return self._submit(BurnJob(source, target, verify, direct, wipe, stream=stream))
+
+    def start_stream(self, stream, target, verify=True, direct=True, wipe=False, tee_path=None):
+        """边下载边烧录：stream 为提供 open/readinto/finish/close 的顺序数据流，
+        tee_path 不为空时同时把数据保存到该文件"""
+        if not is_block_device(target):
+            target = os.path.abspath(target)
+        if tee_path:
+            tee_path = os.path.abspath(tee_path)
+            if tee_path == target:
+                raise ValueError("镜像保存路径不能与烧录目标相同")
+        job = BurnJob(stream.url, target, verify, direct, wipe, stream=stream, tee_path=tee_path)
+        # 取消烧录时同时中断下载
+        stream.cancel_event = job.cancel_event
+        return self._submit(job)
+
+    def _submit(self, job):
+        target = job.target
+        with self.lock:
+            if target in self.active_targets:
+                raise RuntimeError("该设备正在烧录中")
+            self.active_targets.add(target)
+            self.jobs[job.id] = job
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+        return job.id
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if not job:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def list(self):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def _run(self, job):
+        job.started_at = time.time()
+        try:
+            digest = self._write(job)
+            job.sha256 = digest.hex()
+            if job.verify:
+                job.status = 'verifying'
+                self._notify(job, force=True)
+                self._verify(job, digest)
+            job.status = 'completed'
+        except BurnCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            print(f"烧录失败: {str(e)}")
+            job.status = 'error'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self.lock:
+                self.active_targets.discard(job.target)
+            self._notify(job, force=True)
+
+    def _open_target(self, job):
+        """打开目标；O_DIRECT 不被支持（如 tmpfs）时退回普通写入"""
+        device = is_block_device(job.target)
+        flags = os.O_WRONLY | O_BINARY
+        if not device:
+            flags |= os.O_CREAT | os.O_TRUNC
+        if job.direct:
+            try:
+                return os.open(job.target, flags | O_DIRECT, 0o644), device
+            except OSError:
+                job.direct = False
+        return os.open(job.target, flags, 0o644), device
+
+    def _wipe(self, fd, device_size):
+        """清零设备首尾，去掉旧的分区表和备份 GPT 头"""
+        zeros = mmap.mmap(-1, WIPE_SIZE)
+        try:
+            for offset in sorted({0, max(0, device_size - WIPE_SIZE)}):
+                os.lseek(fd, offset, os.SEEK_SET)
+                write_all(fd, memoryview(zeros)[:min(WIPE_SIZE, device_size - offset)])
+            os.fsync(fd)
+            os.lseek(fd, 0, os.SEEK_SET)
+        finally:
+            zeros.close()
+
+    def _write(self, job):
+        """写入镜像，返回写入数据的 SHA-256 摘要"""
+        source = job.stream or FileSource(job.source)
+        job.status = 'writing'
+        self._notify(job, force=True)
+
+        # mmap 分配的内存按页对齐，满足 O_DIRECT 的要求
+        buffers = [mmap.mmap(-1, self.buffer_size) for _ in range(self.buffer_count)]
+        free = queue.Queue()
+        filled = queue.Queue()
+        for buf in buffers:
+            free.put(buf)
+        sha = hashlib.sha256()
+        stop = threading.Event()
+        tee = None
+        reader = threading.Thread(target=self._reader, args=(job, source, stop, free, filled, sha), daemon=True)
+
+        fd = None
+        success = False
+        try:
+            source.open()
+            job.total_size = source.size
+            fd, device = self._open_target(job)
+            if device:
+                device_size = os.lseek(fd, 0, os.SEEK_END)
+                os.lseek(fd, 0, os.SEEK_SET)
+                if device_size and job.total_size > device_size:
+                    raise ValueError("目标设备容量不足")
+                if job.wipe and device_size:
+                    self._wipe(fd, device_size)
+            if job.tee_path:
+                tee = open(job.tee_path, 'wb')
+
+            reader.start()
+            # 写线程：等待读线程、写入目标、写副本、进度回调分别计时（开发者模式）
+            watch = metrics.Stopwatch('burn')
+            while True:
+                item = filled.get()
+                if job.cancel_event.is_set():
+                    raise BurnCancelled()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                buf, length = item
+                watch.lap('read_wait')
+                view = memoryview(buf)[:length]
+                if job.direct and length % ALIGNMENT:
+                    # 最后一块不足对齐单位，关闭 O_DIRECT 写出剩余部分
+                    set_direct(fd, False)
+                write_all(fd, view)
+                watch.lap('write', length)
+                if tee:
+                    # 边烧录边保存一份镜像副本，下次可直接从文件烧录
+                    tee.write(view)
+                    watch.lap('tee', length)
+                view.release()
+                job.written += length
+                free.put(buf)
+                self._notify(job)
+                watch.lap('notify')
+            if job.total_size and job.written != job.total_size:
+                raise IOError("镜像数据不完整")
+            job.total_size = job.written
+            os.fsync(fd)
+            watch.lap('fsync')
+            success = True
+            return sha.digest()
+        finally:
+            if reader.is_alive():
+                # 写入出错时让读线程从 free.get() 中退出
+                stop.set()
+                free.put(None)
+                reader.join()
+            source.close()
+            if fd is not None:
+                os.close(fd)
+            if tee:
+                tee.close()
+                if not success:
+                    self._remove(job.tee_path)
+            for buf in buffers:
+                try:
+                    buf.close()
+                except BufferError:
+                    # 出错时可能仍有视图引用缓冲区，交给垃圾回收释放
+                    pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _reader(self, job, source, stop, free, filled, sha):
+        """读线程：把镜像读入空闲缓冲区并计算哈希，写线程同时写出上一块"""
+        watch = metrics.Stopwatch('burn')
+        try:
+            while not stop.is_set() and not job.cancel_event.is_set():
+                buf = free.get()
+                if buf is None:
+                    return
+                watch.lap('write_wait')
+                view = memoryview(buf)
+                length = 0
+                while length < self.buffer_size:
+                    n = source.readinto(view[length:])
+                    if not n:
+                        break
+                    length += n
+                watch.lap('read', length)
+                if length:
+                    sha.update(view[:length])
+                    watch.lap('hash', length)
+                view.release()
+                if length:
+                    filled.put((buf, length))
+                if length < self.buffer_size:
+                    break
+            # 数据全部读完后检查来源自带的校验（如镜像列表提供的哈希）
+            ok, message = source.finish()
+            job.integrity = message
+            if not ok:
+                raise BurnVerifyFailed(message)
+            filled.put(None)
+        except Exception as e:
+            filled.put(e)
+
+    def _verify(self, job, digest):
+        """从目标回读刚写入的数据并与写入时的哈希比较"""
+        flags = os.O_RDONLY | O_BINARY
+        direct = False
+        fd = None
+        if O_DIRECT:
+            try:
+                fd = os.open(job.target, flags | O_DIRECT)
+                direct = True
+            except OSError:
+                fd = None
+        if fd is None:
+            fd = os.open(job.target, flags)
+            drop_cache(fd)
+
+        buf = mmap.mmap(-1, self.buffer_size)
+        sha = hashlib.sha256()
+        watch = metrics.Stopwatch('burn')
+        try:
+            remaining = job.total_size
+            while remaining:
+                if job.cancel_event.is_set():
+                    raise BurnCancelled()
+                want = min(self.buffer_size, remaining)
+                if direct:
+                    # O_DIRECT 读取长度也要对齐，多读的部分不参与计算
+                    want = min(self.buffer_size, -(-want // ALIGNMENT) * ALIGNMENT)
+                if hasattr(os, 'readv'):
+                    n = os.readv(fd, [memoryview(buf)[:want]])
+                else:
+                    data = os.read(fd, want)
+                    n = len(data)
+                    buf[:n] = data
+                if not n:
+                    raise BurnVerifyFailed("回读数据不完整")
+                used = min(n, remaining)
+                watch.lap('verify_read', used)
+                sha.update(memoryview(buf)[:used])
+                watch.lap('verify_hash', used)
+                remaining -= used
+                job.verified += used
+                self._notify(job)
+        finally:
+            os.close(fd)
+            buf.close()
+        if sha.digest() != digest:
+            raise BurnVerifyFailed("回读校验失败，目标设备上的数据与镜像不一致")
+
+    def _notify(self, job, force=False):
+        """节流地计算速度并回调进度"""
+        now = time.time()
+        if not force and now - job._last_notify < PROGRESS_INTERVAL:
+            return
+        done = job.verified if job.status == 'verifying' else job.written
+        elapsed = now - job._last_time
+        if elapsed > 0 and done >= job._last_bytes:
+            job.speed = (done - job._last_bytes) / elapsed
+        job._last_notify = now
+        job._last_time = now
+        job._last_bytes = done
+        if not self.on_progress:
+            return
+        try:
+            self.on_progress(job.to_dict())
+        except Exception as e:
+            print(f"推送烧录进度失败: {str(e)}")
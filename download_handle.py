@@ -0,0 +1,1318 @@
+import os
+import json
+import bisect
+import hashlib
+import time
+import uuid
+import threading
+from pathlib import Path
+import requests
+import http_client
+import metrics
+from integrity import (ChunklistVerifier, Sha256Verifier, ChunkMismatch,
+                       VerificationFailed, parse_chunklist)
+
+# 镜像列表接口
+DMG_LIST_URL = 'https://stapi.simplehac.cn/dmgList'
+
+# 下载参数
+CHUNK_SIZE = 1024 * 1024             # 每次读取/写入 1MB
+DEFAULT_CONNECTIONS = 4              # 默认分段连接数
+MAX_CONNECTIONS = 16                 # 单个任务允许的最大连接数
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024   # 每个分段至少 8MB，过小的文件不值得分段
+SEGMENT_RETRIES = 3                  # 单个分段失败后的重试次数
+PROGRESS_INTERVAL = 0.5              # 向前端推送进度的最小间隔（秒）
+JOURNAL_INTERVAL = 2.0               # 写入下载日志的最小间隔（秒）
+JOURNAL_SUFFIX = '.stdownload'       # 下载日志文件后缀，与目标文件放在同一目录
+DEFAULT_MAX_CONCURRENT = 2           # 同时进行的下载任务数
+MAX_CONCURRENT_LIMIT = 8
+# 连接池每主机的连接数：所有任务的分段连接同时进行时也不用等待空闲连接，另留几个给探测、chunklist 和数据流
+POOL_SIZE = MAX_CONCURRENT_LIMIT * MAX_CONNECTIONS + 8
+CATALOG_TTL = 600                    # 镜像列表缓存的新鲜期（秒），过期后先返回旧数据再后台刷新
+SHUTDOWN_TIMEOUT = 5.0               # 退出时等待进行中的下载写好日志的最长时间（秒）
+STALL_TIMEOUT = 8.0                  # 有其它镜像时，分段多久没有收到数据视为卡住并换用其它镜像（秒）
+SWITCH_WINDOW = 10.0                 # 每隔多久比较一次分段速度与其它镜像的预期速度（秒）
+SWITCH_FACTOR = 2.0                  # 其它镜像的预期速度超过当前速度的倍数时切换
+CATALOG_MIRROR_FIELDS = ('mirrors', 'mirrorUrls', 'downloadUrls')
+
+
+def format_speed(bytes_per_sec):
+    """格式化下载速度"""
+    for unit in ('B/s', 'KB/s', 'MB/s'):
+        if bytes_per_sec < 1024:
+            return f"{bytes_per_sec:.1f} {unit}"
+        bytes_per_sec /= 1024
+    return f"{bytes_per_sec:.1f} GB/s"
+
+
+def format_eta(seconds):
+    """格式化剩余时间"""
+    if seconds is None or seconds < 0:
+        return '--'
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def catalog_mirrors(item):
+    """镜像列表条目的所有下载地址：downloadUrl 在前，其后是 mirrors 等字段中的镜像"""
+    urls = [item.get('downloadUrl')]
+    for field in CATALOG_MIRROR_FIELDS:
+        value = item.get(field)
+        if isinstance(value, list):
+            urls.extend(value)
+    seen = set()
+    result = []
+    for url in urls:
+        if isinstance(url, str) and url.startswith(('http://', 'https://')) and url not in seen:
+            seen.add(url)
+            result.append(url)
+    return result
+
+
+class Segment:
+    """文件中的一个字节区间 [start, end]，offset 为下一个待写入的位置"""
+
+    def __init__(self, start, end, offset=None):
+        self.start = start
+        self.end = end
+        self.offset = start if offset is None else offset
+        self.url = None     # 本分段当前使用的镜像地址
+
+    @property
+    def done(self):
+        return self.offset > self.end
+
+    @property
+    def remaining(self):
+        return max(0, self.end - self.offset + 1)
+
+
+def write_json_atomic(path, data):
+    """先写临时文件再 os.replace，避免中途崩溃留下半个文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class TokenBucket:
+    """全局令牌桶限速，rate 为每秒字节数，0 表示不限速"""
+
+    def __init__(self, rate=0):
+        self.lock = threading.Lock()
+        self.rate = 0
+        self.capacity = 0
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = max(0, int(rate or 0))
+            # 桶容量为一秒的流量，允许短时突发
+            self.capacity = self.rate
+            self.tokens = min(self.tokens, self.capacity)
+            self.last = time.monotonic()
+
+    def consume(self, amount, cancel_event=None):
+        """取走 amount 个令牌，不足时先透支再等待补足"""
+        with self.lock:
+            if self.rate <= 0:
+                return
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            if cancel_event:
+                cancel_event.wait(wait)
+            else:
+                time.sleep(wait)
+
+
+class DownloadTask:
+    """单个下载任务的运行状态"""
+
+    def __init__(self, url, save_path, connections=DEFAULT_CONNECTIONS, task_id=None, priority=0):
+        self.id = task_id or f"dl-{uuid.uuid4().hex[:12]}"
+        self.url = url
+        # 可用的镜像地址（含 url），开始下载前按测速结果排序；source_url 为实际探测文件信息的地址
+        self.mirrors = [url]
+        self.source_url = url
+        self.save_path = save_path
+        self.filename = os.path.basename(save_path)
+        self.connections = connections
+        self.total_size = 0
+        self.downloaded = 0
+        self.segments = []
+        self.segmented = False
+        self.etag = None
+        self.last_modified = None
+        self.accepts_ranges = False
+        # 目录中提供的校验信息：整文件 SHA-256 和/或 Apple chunklist 地址
+        self.checksum = None
+        self.chunklist_url = None
+        self.verifier = None
+        # 镜像列表中的条目 ID，用于在本地镜像库中查找同一镜像
+        self.catalog_id = None
+        self.reused = None          # 从镜像库取出时使用的方式（hardlink/reflink/copy）
+        self.status = 'queued'
+        self.priority = priority
+        self.seq = 0
+        self.error = None
+        self.discard = False
+        self.pausing = False
+        self.speed = 0.0
+        self.start_time = time.time()
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self._last_notify = 0.0
+        self._last_bytes = 0
+        self._last_time = self.start_time
+        self._last_journal = 0.0
+
+    @property
+    def journal_path(self):
+        return self.save_path + JOURNAL_SUFFIX
+
+    @property
+    def resumable(self):
+        if self.status == 'paused':
+            return True
+        return self.accepts_ranges and bool(self.segments) and self.status in ('cancelled', 'error')
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.downloaded += count
+
+    def verification(self):
+        """当前校验状态，没有可用校验信息时为 None"""
+        if self.verifier:
+            return self.verifier.progress()
+        if self.checksum or self.chunklist_url:
+            return {'method': None, 'status': 'pending', 'checked': 0, 'message': None}
+        return None
+
+    def to_dict(self):
+        """生成前端 updateDownloadItem 使用的数据"""
+        progress = (self.downloaded / self.total_size * 100) if self.total_size else 0
+        eta = None
+        if self.speed > 0 and self.total_size:
+            eta = (self.total_size - self.downloaded) / self.speed
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'path': self.save_path,
+            'url': self.url,
+            'source_url': self.source_url,
+            'status': self.status,
+            'progress': round(progress, 2),
+            'speed': format_speed(self.speed),
+            'eta': format_eta(eta) if self.status == 'downloading' else '--',
+            'downloaded': self.downloaded,
+            'total_size': self.total_size,
+            'connections': self.connections if self.segmented else 1,
+            'priority': self.priority,
+            'resumable': self.resumable,
+            'verification': self.verification(),
+            'reused': self.reused,
+            'error': self.error
+        }
+
+    def to_journal(self):
+        """生成下载日志内容：URL、校验头、总大小以及各分段的完成位置"""
+        return {
+            'id': self.id,
+            'url': self.url,
+            'mirrors': self.mirrors,
+            'source_url': self.source_url,
+            'save_path': self.save_path,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'total_size': self.total_size,
+            'connections': self.connections,
+            'priority': self.priority,
+            'checksum': self.checksum,
+            'chunklist_url': self.chunklist_url,
+            'catalog_id': self.catalog_id,
+            'segments': [[seg.start, seg.end, seg.offset] for seg in self.segments],
+            'updated': time.time()
+        }
+
+    @classmethod
+    def from_journal(cls, journal):
+        task = cls(journal['url'], journal['save_path'],
+                   journal.get('connections', DEFAULT_CONNECTIONS), task_id=journal.get('id'),
+                   priority=int(journal.get('priority') or 0))
+        task.mirrors = journal.get('mirrors') or [task.url]
+        task.source_url = journal.get('source_url') or task.url
+        task.etag = journal.get('etag')
+        task.last_modified = journal.get('last_modified')
+        task.checksum = journal.get('checksum')
+        task.chunklist_url = journal.get('chunklist_url')
+        task.catalog_id = journal.get('catalog_id')
+        task.total_size = int(journal.get('total_size') or 0)
+        task.segments = [Segment(int(s), int(e), int(o)) for s, e, o in journal.get('segments', [])]
+        task.downloaded = sum(seg.offset - seg.start for seg in task.segments)
+        return task
+
+
+class DownloadCancelled(Exception):
+    """下载被用户取消"""
+
+
+class MirrorSwitch(Exception):
+    """分段改用更快的镜像继续下载"""
+
+
+class DownloadHandler:
+    """镜像下载处理：获取镜像列表、调度/取消/暂停/续传下载并向前端推送进度"""
+
+    def __init__(self, on_progress=None, journal_index=None, max_concurrent=DEFAULT_MAX_CONCURRENT, rate_limit=0,
+                 catalog_cache=None, catalog_ttl=CATALOG_TTL, library=None, mirrors=None):
+        self.on_progress = on_progress
+        # 镜像测速与排序（mirrors.MirrorManager），任务有多个下载地址时使用
+        self.mirrors = mirrors
+        # 本地镜像库（image_library.ImageLibrary）：已有的镜像直接取出，下载完成的镜像加入其中
+        self.library = library
+        self.downloads = {}
+        self.lock = threading.Lock()
+        # 镜像列表缓存：内存中一份，同时持久化到 catalog_cache 文件供离线使用
+        self.catalog_cache_path = Path(catalog_cache) if catalog_cache else None
+        self.catalog_ttl = catalog_ttl
+        self.catalog = None
+        self.catalog_loaded = False
+        self.catalog_lock = threading.Lock()
+        self.catalog_refreshing = False
+        # 调度：等待队列按 (优先级降序, 入队顺序) 出队，running 中最多 max_concurrent 个
+        self.queue = []
+        self.running = set()
+        self.max_concurrent = DEFAULT_MAX_CONCURRENT
+        self._seq = 0
+        self.rate_limiter = TokenBucket()
+        self.configure(max_concurrent=max_concurrent, rate_limit=rate_limit)
+        http_client.configure(max_per_host=POOL_SIZE)
+        # 记录所有未完成下载的日志路径，供启动时恢复
+        self.journal_index = Path(journal_index) if journal_index else None
+        self.index_lock = threading.Lock()
+
+    def get_dmg_list(self, force=False):
+        """获取DMG镜像列表：新鲜期内直接返回缓存，过期后先返回旧数据并在后台刷新；
+        force=True 时同步向服务器发起条件请求"""
+        cache = self._load_catalog()
+        if cache is None or force:
+            return self._refresh_catalog()
+        stale = time.time() - cache['fetched_at'] >= self.catalog_ttl
+        if stale:
+            self._revalidate_catalog()
+        return self._catalog_result(cache, stale=stale)
+
+    # ---- 镜像列表缓存 ----
+
+    @staticmethod
+    def _catalog_result(cache, stale=False, message=None):
+        result = {
+            'status': 'success',
+            'data': [dict(item, mirrors=catalog_mirrors(item)) if isinstance(item, dict) else item
+                     for item in cache['data']],
+            'etag': cache['etag'],
+            'fetched_at': cache['fetched_at'],
+            'stale': stale
+        }
+        if message:
+            result['message'] = message
+        return result
+
+    def _load_catalog(self):
+        with self.catalog_lock:
+            if not self.catalog_loaded:
+                self.catalog_loaded = True
+                if self.catalog_cache_path and self.catalog_cache_path.exists():
+                    try:
+                        with open(self.catalog_cache_path, 'r', encoding='utf-8') as f:
+                            cache = json.load(f)
+                        if isinstance(cache.get('data'), list) and cache.get('etag'):
+                            cache['fetched_at'] = float(cache.get('fetched_at') or 0)
+                            self.catalog = cache
+                    except Exception as e:
+                        print(f"读取镜像列表缓存失败: {str(e)}")
+            return self.catalog
+
+    def _refresh_catalog(self):
+        """向服务器发起条件请求；失败时有缓存则返回旧数据"""
+        cache = self._load_catalog()
+        headers = {}
+        if cache:
+            if cache.get('upstream_etag'):
+                headers['If-None-Match'] = cache['upstream_etag']
+            if cache.get('upstream_last_modified'):
+                headers['If-Modified-Since'] = cache['upstream_last_modified']
+        try:
+            response = http_client.get(DMG_LIST_URL, headers=headers)
+            if response.status_code == 304 and cache:
+                cache = dict(cache, fetched_at=time.time())
+            else:
+                response.raise_for_status()
+                data = response.json()
+                if isinstance(data, dict):
+                    data = data.get('data', [])
+                if not isinstance(data, list):
+                    raise ValueError("镜像列表格式无效")
+                body = json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+                cache = {
+                    'data': data,
+                    'etag': hashlib.sha1(body).hexdigest(),
+                    'upstream_etag': response.headers.get('ETag'),
+                    'upstream_last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.time()
+                }
+            self._store_catalog(cache)
+            return self._catalog_result(cache)
+        except Exception as e:
+            print(f"获取镜像列表失败: {str(e)}")
+            if cache:
+                return self._catalog_result(cache, stale=True, message=f'使用缓存的镜像列表: {str(e)}')
+            return {'status': 'error', 'message': f'获取镜像列表失败: {str(e)}'}
+
+    def _store_catalog(self, cache):
+        with self.catalog_lock:
+            self.catalog = cache
+        if not self.catalog_cache_path:
+            return
+        try:
+            self.catalog_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.catalog_cache_path, cache)
+        except Exception as e:
+            print(f"保存镜像列表缓存失败: {str(e)}")
+
+    def _revalidate_catalog(self):
+        """后台刷新镜像列表，同一时间只有一个刷新线程"""
+        with self.catalog_lock:
+            if self.catalog_refreshing:
+                return
+            self.catalog_refreshing = True
+
+        def worker():
+            try:
+                self._refresh_catalog()
+            finally:
+                with self.catalog_lock:
+                    self.catalog_refreshing = False
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def configure(self, max_concurrent=None, rate_limit=None):
+        """更新最大并发数与全局限速（字节/秒，0 为不限速）"""
+        if max_concurrent is not None:
+            try:
+                max_concurrent = int(max_concurrent)
+            except (TypeError, ValueError):
+                max_concurrent = DEFAULT_MAX_CONCURRENT
+            self.max_concurrent = max(1, min(max_concurrent, MAX_CONCURRENT_LIMIT))
+        if rate_limit is not None:
+            try:
+                self.rate_limiter.set_rate(int(rate_limit))
+            except (TypeError, ValueError):
+                self.rate_limiter.set_rate(0)
+        self._schedule()
+
+    def start_download(self, url, save_path, connections=None, priority=0,
+                       checksum=None, chunklist_url=None, catalog_id=None, mirrors=None):
+        """加入下载队列，返回下载ID；connections 为分段连接数，1 表示单连接；
+        checksum（SHA-256）或 chunklist_url 用于下载过程中的完整性校验；
+        镜像库中已有同一镜像（按 checksum 或 catalog_id 匹配）时直接取出，不再下载；
+        mirrors 为同一文件的其它下载地址，开始时测速选择最快的，分段卡住或明显变慢时换用其它镜像"""
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            raise ValueError(f"只支持 http/https 下载地址: {url}")
+        try:
+            connections = int(connections or DEFAULT_CONNECTIONS)
+        except (TypeError, ValueError):
+            connections = DEFAULT_CONNECTIONS
+        connections = max(1, min(connections, MAX_CONNECTIONS))
+
+        try:
+            Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            print(f"创建下载目录失败: {str(e)}")
+            return None
+
+        # 同一路径上残留的旧日志已失效
+        self._remove_journal(save_path + JOURNAL_SUFFIX)
+
+        task = DownloadTask(url, save_path, connections, priority=self._to_int(priority))
+        task.checksum = checksum or None
+        task.chunklist_url = chunklist_url or None
+        task.catalog_id = catalog_id or None
+        task.mirrors = catalog_mirrors({'downloadUrl': url, 'mirrors': list(mirrors or [])})
+        entry = self._library_lookup(task)
+        if entry:
+            self._reuse(task, entry)
+        else:
+            self._enqueue(task)
+        return task.id
+
+    def resume_download(self, download_id=None, save_path=None):
+        """根据下载ID或目标路径继续未完成的下载，返回下载ID；已在进行或已完成的下载直接返回其ID"""
+        task = None
+        with self.lock:
+            if download_id:
+                task = self.downloads.get(download_id)
+            elif save_path:
+                task = next((t for t in self.downloads.values() if t.save_path == save_path), None)
+        if task and task.status in ('downloading', 'queued', 'completed'):
+            return task.id
+
+        path = task.journal_path if task else (save_path or '') + JOURNAL_SUFFIX
+        journal = self._load_journal(path)
+        if journal:
+            task = DownloadTask.from_journal(journal)
+        elif task:
+            # 没有日志（例如服务器不支持 Range），只能从头开始
+            old_task = task
+            task = DownloadTask(old_task.url, old_task.save_path, old_task.connections,
+                                task_id=old_task.id, priority=old_task.priority)
+            task.checksum = old_task.checksum
+            task.chunklist_url = old_task.chunklist_url
+            task.catalog_id = old_task.catalog_id
+            task.mirrors = old_task.mirrors
+        else:
+            return None
+
+        self._enqueue(task)
+        return task.id
+
+    def cancel_download(self, download_id, discard=False):
+        """取消下载；默认保留已下载部分和日志以便续传，discard=True 时删除"""
+        with self.lock:
+            task = self.downloads.get(download_id)
+            if task and task.status == 'queued':
+                self.queue.remove(task)
+                task.status = 'cancelled'
+            elif task and task.status == 'paused':
+                # 已暂停的任务不在运行，日志照常保留
+                task.status = 'cancelled'
+        if not task:
+            return False
+        if task.status != 'downloading':
+            if discard:
+                self._discard(task)
+            self._notify(task, force=True)
+            return task.status == 'cancelled' or discard
+        task.discard = discard
+        task.pausing = False
+        task.cancel_event.set()
+        return True
+
+    def pause_download(self, download_id):
+        """暂停下载：排队中的任务移出队列，进行中的任务停止并保留日志"""
+        with self.lock:
+            task = self.downloads.get(download_id)
+            if not task or task.status not in ('queued', 'downloading'):
+                return False
+            if task.status == 'queued':
+                self.queue.remove(task)
+                task.status = 'paused'
+            else:
+                task.pausing = True
+                task.cancel_event.set()
+        self._notify(task, force=True)
+        return True
+
+    def reorder_downloads(self, order=None, download_id=None, priority=None):
+        """调整等待队列：order 为下载ID列表，同优先级内按给定顺序排在前面；也可单独修改某任务的优先级"""
+        with self.lock:
+            if download_id is not None and priority is not None:
+                task = self.downloads.get(download_id)
+                if not task:
+                    return False
+                task.priority = self._to_int(priority)
+            if order:
+                queued = {t.id: t for t in self.queue}
+                listed = [queued[i] for i in order if i in queued]
+                rest = [t for t in self.queue if t not in listed]
+                for seq, task in enumerate(listed + rest):
+                    task.seq = seq
+                self._seq = len(self.queue)
+            self.queue.sort(key=lambda t: (-t.priority, t.seq))
+        self._schedule()
+        return True
+
+    def list_downloads(self):
+        """返回所有下载任务，等待中的任务附带队列位置"""
+        with self.lock:
+            positions = {t.id: i for i, t in enumerate(self.queue)}
+            items = []
+            for task in self.downloads.values():
+                item = task.to_dict()
+                item['queue_position'] = positions.get(task.id)
+                items.append(item)
+        order = {'downloading': 0, 'queued': 1, 'paused': 2}
+        items.sort(key=lambda d: (order.get(d['status'], 3),
+                                  d['queue_position'] if d['queue_position'] is not None else 0))
+        return {
+            'downloads': items,
+            'max_concurrent': self.max_concurrent,
+            'rate_limit': self.rate_limiter.rate
+        }
+
+    def recover_downloads(self):
+        """启动时恢复上次未完成的下载，返回恢复的下载ID列表"""
+        recovered = []
+        for journal_path in self._index_load():
+            journal = self._load_journal(journal_path)
+            if not journal:
+                self._index_remove(journal_path)
+                continue
+            download_id = self.resume_download(save_path=journal['save_path'])
+            if download_id:
+                recovered.append(download_id)
+        return recovered
+
+    def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """退出前暂停所有进行中的下载并等待它们写好日志，下次启动时由 recover_downloads 续传"""
+        with self.lock:
+            self.queue.clear()
+            active = [self.downloads[i] for i in self.running if i in self.downloads]
+            for task in active:
+                task.pausing = True
+                task.cancel_event.set()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                if not self.running:
+                    break
+            time.sleep(0.05)
+        # 超时仍未退出的任务直接写入当前进度
+        for task in active:
+            if task.status == 'downloading':
+                self._save_journal(task, force=True)
+        if self.mirrors:
+            self.mirrors.flush()
+
+    def get_download(self, download_id):
+        with self.lock:
+            task = self.downloads.get(download_id)
+        return task.to_dict() if task else None
+
+    def open_stream(self, url, checksum=None, chunklist_url=None):
+        """创建顺序读取的下载流（边下载边烧录），共享全局限速"""
+        return DownloadStream(self, url, checksum=checksum, chunklist_url=chunklist_url)
+
+    # ---- 下载流程 ----
+
+    @staticmethod
+    def _to_int(value, default=0):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def _enqueue(self, task):
+        with self.lock:
+            self.downloads[task.id] = task
+            task.status = 'queued'
+            task.seq = self._seq
+            self._seq += 1
+            self.queue.append(task)
+            self.queue.sort(key=lambda t: (-t.priority, t.seq))
+        self._notify(task, force=True)
+        self._schedule()
+
+    def _schedule(self):
+        """在并发上限内从队列取出任务开始下载"""
+        started = []
+        with self.lock:
+            while self.queue and len(self.running) < self.max_concurrent:
+                task = self.queue.pop(0)
+                task.status = 'downloading'
+                self.running.add(task.id)
+                started.append(task)
+        for task in started:
+            t = threading.Thread(target=self._run, args=(task,), daemon=True)
+            t.start()
+
+    def _run(self, task):
+        try:
+            self._execute(task)
+        finally:
+            with self.lock:
+                self.running.discard(task.id)
+            self._schedule()
+
+    def _execute(self, task):
+        try:
+            previous_source = task.source_url
+            total_size, accepts_ranges, etag, last_modified = self._probe_mirrors(task)
+            task.accepts_ranges = accepts_ranges and bool(total_size)
+
+            # 续传前确认远程文件未变化、本地文件仍然完整（不同镜像的 ETag 不可比较，只比较大小）
+            same_source = task.source_url == previous_source
+            if task.segments and not self._can_resume(task, total_size, etag, last_modified, same_source):
+                print(f"远程文件已变化或本地文件缺失，重新下载: {task.save_path}")
+                task.segments = []
+                task.downloaded = 0
+            task.total_size = total_size
+            task.etag = etag
+            task.last_modified = last_modified
+            self._setup_verifier(task)
+
+            if task.accepts_ranges:
+                if not task.segments:
+                    self._plan_segments(task)
+                    self._preallocate(task.save_path, task.total_size)
+                self._save_journal(task, force=True)
+                self._download_segmented(task)
+            else:
+                task.segments = []
+                self._download_single(task)
+
+            if task.verifier:
+                passed, message = task.verifier.finish(task.save_path, task.segments)
+                if not passed:
+                    raise VerificationFailed(message)
+            task.status = 'completed'
+            self._remove_journal(task.journal_path)
+            self._library_add(task)
+        except VerificationFailed as e:
+            # 数据已全部写完但校验失败，续传无意义，需要重新下载
+            print(f"下载校验失败 [{task.id}]: {str(e)}")
+            task.status = 'error'
+            task.error = str(e)
+            task.segments = []
+            self._remove_journal(task.journal_path)
+        except DownloadCancelled:
+            task.status = 'paused' if task.pausing and not task.discard else 'cancelled'
+            # 不支持 Range 的下载无法续传，直接清理
+            if task.discard or not task.accepts_ranges:
+                self._discard(task)
+            else:
+                self._save_journal(task, force=True)
+        except Exception as e:
+            print(f"下载失败 [{task.id}]: {str(e)}")
+            task.status = 'error'
+            task.error = str(e)
+            self._save_journal(task, force=True)
+        self._notify(task, force=True)
+
+    def _probe_mirrors(self, task):
+        """按测速结果排序镜像，依次探测直到成功，记录使用的地址"""
+        if self.mirrors and len(task.mirrors) > 1:
+            task.mirrors = self.mirrors.rank(task.mirrors) or task.mirrors
+        error = None
+        for url in task.mirrors:
+            try:
+                result = self._probe(url)
+            except Exception as e:
+                error = e
+                if self.mirrors and len(task.mirrors) > 1:
+                    print(f"镜像不可用，尝试下一个: {url}: {str(e)}")
+                    self.mirrors.record_failure(url)
+                continue
+            task.source_url = url
+            return result
+        if error is None:
+            raise ValueError(f"没有可用的 http/https 下载地址: {task.url}")
+        raise error
+
+    def _probe(self, url):
+        """探测文件大小、是否支持 Range 请求以及 ETag/Last-Modified"""
+        headers = {'Range': 'bytes=0-0'}
+        with http_client.get(url, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if response.status_code == 206:
+                content_range = response.headers.get('Content-Range', '')
+                total = content_range.rsplit('/', 1)[-1]
+                if total.isdigit():
+                    return int(total), True, etag, last_modified
+                return 0, False, etag, last_modified
+            # 服务器忽略了 Range 头，按整文件处理
+            length = response.headers.get('Content-Length', '')
+            return (int(length) if length.isdigit() else 0), False, etag, last_modified
+
+    @staticmethod
+    def _can_resume(task, total_size, etag, last_modified, same_source=True):
+        if not total_size or total_size != task.total_size:
+            return False
+        if same_source and task.etag and etag and task.etag != etag:
+            return False
+        if same_source and task.last_modified and last_modified and task.last_modified != last_modified:
+            return False
+        try:
+            return os.path.getsize(task.save_path) == total_size
+        except OSError:
+            return False
+
+    def _setup_verifier(self, task):
+        """根据目录提供的信息选择校验方式：支持 Range 时优先 chunklist（可逐块重下），否则 SHA-256"""
+        task.verifier = None
+        chunklist = None
+        if task.chunklist_url and task.total_size:
+            try:
+                chunklist = ChunklistVerifier(self._fetch_chunklist(task.chunklist_url))
+                if chunklist.total_size != task.total_size:
+                    print("chunklist 与文件大小不符，忽略")
+                    chunklist = None
+            except Exception as e:
+                print(f"获取 chunklist 失败: {str(e)}")
+        if task.checksum and (chunklist is None or not task.accepts_ranges):
+            task.verifier = Sha256Verifier(task.checksum)
+        else:
+            task.verifier = chunklist
+
+        # 续传时已完成的块需要与校验方式对齐
+        if task.verifier and task.segments and not task.verifier.prepare(task.segments):
+            task.verifier = Sha256Verifier(task.checksum) if task.checksum else None
+        task.downloaded = sum(seg.offset - seg.start for seg in task.segments)
+
+    @staticmethod
+    def _fetch_chunklist(url):
+        response = http_client.get(url)
+        response.raise_for_status()
+        return parse_chunklist(response.content)
+
+    @staticmethod
+    def _plan_segments(task):
+        """按连接数切分字节区间；文件太小时只用一个分段；有 chunklist 时分段边界对齐到块起点"""
+        count = min(task.connections, max(1, task.total_size // MIN_SEGMENT_SIZE))
+        seg_size = task.total_size // count
+        boundaries = task.verifier.boundaries() if task.verifier else None
+        starts = [0]
+        for i in range(1, count):
+            target = i * seg_size
+            if boundaries:
+                index = bisect.bisect_left(boundaries, target)
+                if index >= len(boundaries):
+                    break
+                target = boundaries[index]
+            if target > starts[-1]:
+                starts.append(target)
+        ends = [start - 1 for start in starts[1:]] + [task.total_size - 1]
+        task.segments = [Segment(start, end) for start, end in zip(starts, ends)]
+
+    def _record_write(self, task, segment, data):
+        """数据写入后推进分段位置，同时在写入路径上更新校验和下载计数"""
+        before = segment.offset
+        try:
+            if task.verifier:
+                task.verifier.update(segment, data)
+            else:
+                segment.offset += len(data)
+        finally:
+            task.add_bytes(segment.offset - before)
+
+    def _download_single(self, task):
+        """单连接顺序下载（服务器不支持 Range，无法续传）"""
+        task.segmented = False
+        task.downloaded = 0
+        # 分别统计连接、等待网络数据、写盘、校验、限速和进度回调的耗时（开发者模式）
+        watch = metrics.Stopwatch('download')
+        with http_client.get(task.source_url, stream=True) as response:
+            response.raise_for_status()
+            watch.lap('connect')
+            if not task.total_size:
+                length = response.headers.get('Content-Length', '')
+                task.total_size = int(length) if length.isdigit() else 0
+            stream = Segment(0, task.total_size - 1 if task.total_size else 2 ** 63)
+            with self._create_target(task.save_path) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    watch.lap('network', len(chunk))
+                    if task.cancel_event.is_set():
+                        raise DownloadCancelled()
+                    if chunk:
+                        f.write(chunk)
+                        watch.lap('disk', len(chunk))
+                        try:
+                            self._record_write(task, stream, chunk)
+                        except ChunkMismatch as e:
+                            # 单连接无法回退重下
+                            raise VerificationFailed(str(e))
+                        watch.lap('verify', len(chunk))
+                        self.rate_limiter.consume(len(chunk), task.cancel_event)
+                        watch.lap('throttle')
+                        self._notify(task)
+                        watch.lap('notify')
+
+    def _download_segmented(self, task):
+        """分段下载：各分段在预分配的文件中并行写入各自的字节区间"""
+        task.segmented = len(task.segments) > 1
+        task.connections = len(task.segments)
+
+        errors = []
+        workers = []
+        for segment in task.segments:
+            if segment.done:
+                continue
+            segment.url = task.source_url
+            t = threading.Thread(target=self._segment_worker,
+                                 args=(task, segment, errors), daemon=True)
+            t.start()
+            workers.append(t)
+        for t in workers:
+            while t.is_alive():
+                t.join(timeout=PROGRESS_INTERVAL)
+                if task.verifier:
+                    task.verifier.catch_up(task.save_path, task.segments)
+                self._notify(task)
+                self._save_journal(task)
+
+        if errors:
+            raise errors[0]
+        if task.cancel_event.is_set():
+            raise DownloadCancelled()
+
+    def _segment_worker(self, task, segment, errors):
+        attempts = 0
+        while not segment.done:
+            if task.cancel_event.is_set():
+                return
+            try:
+                self._fetch_segment(task, segment)
+            except DownloadCancelled:
+                return
+            except MirrorSwitch:
+                continue
+            except Exception as e:
+                attempts += 1
+                # 有多个镜像时每个镜像都有 SEGMENT_RETRIES 次机会
+                if attempts > SEGMENT_RETRIES * len(task.mirrors):
+                    errors.append(e)
+                    # 让其它分段尽快结束
+                    task.cancel_event.set()
+                    return
+                if self._switch_mirror(task, segment):
+                    print(f"分段下载失败，换用镜像 {segment.url}: {str(e)}")
+                    continue
+                # 等待期间取消或暂停时立即结束
+                if task.cancel_event.wait(min(2 ** attempts, 10)):
+                    return
+
+    def _fetch_segment(self, task, segment):
+        """下载一个分段中尚未完成的部分，失败后可从 offset 继续"""
+        url = segment.url or task.source_url
+        headers = {'Range': f'bytes={segment.offset}-{segment.end}'}
+        # 远程文件变化时服务器会返回完整内容而不是 206（ETag 只对探测过的地址有效）
+        if url == task.source_url and (task.etag or task.last_modified):
+            headers['If-Range'] = task.etag or task.last_modified
+        watch = metrics.Stopwatch('download')
+        # 有其它镜像时：读取超时缩短为 STALL_TIMEOUT，卡住的分段尽快换用其它镜像；
+        # 同时统计本分段的网络速度（不含写盘和限速等待），明显慢于其它镜像时切换
+        compare = self.mirrors is not None and len(task.mirrors) > 1
+        timeout = (http_client.DEFAULT_TIMEOUT[0], STALL_TIMEOUT) if compare else None
+        window_bytes = 0
+        window_network = 0.0
+        with http_client.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise IOError("服务器未返回分段内容")
+            watch.lap('connect')
+            window_started = time.monotonic()
+            try:
+                # 无缓冲写入，保证日志记录的位置之前的数据都已交给系统
+                with open(task.save_path, 'r+b', buffering=0) as f:
+                    f.seek(segment.offset)
+                    waited = time.perf_counter()
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        window_network += time.perf_counter() - waited
+                        watch.lap('network', len(chunk))
+                        if task.cancel_event.is_set():
+                            raise DownloadCancelled()
+                        if not chunk:
+                            continue
+                        # 防止服务器返回超出区间的数据
+                        chunk = chunk[:segment.remaining]
+                        f.write(chunk)
+                        watch.lap('disk', len(chunk))
+                        self._record_write(task, segment, chunk)
+                        watch.lap('verify', len(chunk))
+                        self.rate_limiter.consume(len(chunk), task.cancel_event)
+                        watch.lap('throttle')
+                        window_bytes += len(chunk)
+                        if segment.done:
+                            break
+                        now = time.monotonic()
+                        if compare and now - window_started >= SWITCH_WINDOW:
+                            self._compare_mirror(task, segment, url, window_bytes, window_network)
+                            window_bytes = 0
+                            window_network = 0.0
+                            window_started = now
+                        waited = time.perf_counter()
+            finally:
+                if compare and window_bytes:
+                    self.mirrors.record(url, window_bytes, window_network)
+
+    # ---- 镜像切换 ----
+
+    def _compare_mirror(self, task, segment, url, size, seconds):
+        """记录本分段的实际速度；其它镜像的预期速度明显更快时切换过去"""
+        self.mirrors.record(url, size, seconds)
+        rate = size / max(seconds, 1e-6)
+        better = self.mirrors.best(task.mirrors, exclude={url})
+        if better and self.mirrors.expected_rate(better) > rate * SWITCH_FACTOR:
+            print(f"分段速度 {format_speed(rate)}，换用更快的镜像: {better}")
+            segment.url = better
+            raise MirrorSwitch()
+
+    def _switch_mirror(self, task, segment):
+        """分段请求失败或卡住（读取超时）：降低当前镜像的评分并换用其它镜像，没有其它镜像时返回 False"""
+        if self.mirrors is None or len(task.mirrors) < 2:
+            return False
+        current = segment.url or task.source_url
+        self.mirrors.record_failure(current)
+        better = self.mirrors.best(task.mirrors, exclude={current})
+        if not better:
+            return False
+        segment.url = better
+        return True
+
+    @staticmethod
+    def _create_target(path):
+        """删除目标路径上的旧文件再新建：旧文件可能与镜像库共用数据（硬链接），不能原地截断"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return open(path, 'wb')
+
+    @classmethod
+    def _preallocate(cls, path, size):
+        """预分配目标文件，使各分段可以直接写入对应偏移"""
+        with cls._create_target(path) as f:
+            if size:
+                f.truncate(size)
+
+    @staticmethod
+    def _remove_partial(path):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            print(f"删除未完成的下载文件失败: {str(e)}")
+
+    def _discard(self, task):
+        self._remove_partial(task.save_path)
+        self._remove_journal(task.journal_path)
+        task.segments = []
+
+    # ---- 本地镜像库 ----
+
+    def _library_lookup(self, task):
+        if not self.library or not self.library.enabled:
+            return None
+        try:
+            return self.library.lookup(checksum=task.checksum, catalog_id=task.catalog_id)
+        except Exception as e:
+            print(f"查询镜像库失败: {str(e)}")
+            return None
+
+    def _reuse(self, task, entry):
+        """从镜像库取出镜像（不占用下载并发名额）；失败时改为正常下载"""
+        task.status = 'downloading'
+        task.total_size = entry['size']
+        with self.lock:
+            self.downloads[task.id] = task
+        self._notify(task, force=True)
+
+        def worker():
+            try:
+                task.reused = self.library.checkout(entry, task.save_path)
+            except Exception as e:
+                print(f"从镜像库取出失败，改为下载: {str(e)}")
+                self._enqueue(task)
+                return
+            task.downloaded = task.total_size
+            task.status = 'completed'
+            self._notify(task, force=True)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _library_add(self, task):
+        """下载完成后加入镜像库；已按整文件 SHA-256 校验通过时直接使用该哈希"""
+        if not self.library or not self.library.enabled:
+            return
+        verified = task.checksum if isinstance(task.verifier, Sha256Verifier) else None
+        self.library.add_async(task.save_path, sha256=verified, catalog_id=task.catalog_id,
+                               url=task.url, filename=task.filename)
+
+    # ---- 下载日志 ----
+
+    def _save_journal(self, task, force=False):
+        """节流地写入下载日志。下载过程中不刷盘（fsync 会把整个文件的脏页一起写出），
+        进程被杀时数据仍在系统缓存中；暂停、取消、出错等 force 写入时先把已下载的数据刷到磁盘"""
+        if not task.accepts_ranges or not task.segments:
+            return
+        now = time.time()
+        if not force and now - task._last_journal < JOURNAL_INTERVAL:
+            return
+        task._last_journal = now
+        journal = task.to_journal()
+        try:
+            if force and task.downloaded:
+                fd = os.open(task.save_path, os.O_RDWR)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            write_json_atomic(task.journal_path, journal)
+            self._index_add(task.journal_path)
+        except Exception as e:
+            print(f"写入下载日志失败: {str(e)}")
+
+    @staticmethod
+    def _load_journal(journal_path):
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                journal = json.load(f)
+            if not isinstance(journal, dict) or not journal.get('url') or not journal.get('save_path'):
+                raise ValueError("下载日志格式无效")
+            return journal
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"读取下载日志失败: {str(e)}")
+            return None
+
+    def _remove_journal(self, journal_path):
+        self._remove_partial(journal_path)
+        self._index_remove(journal_path)
+
+    def _index_load(self):
+        if not self.journal_index:
+            return []
+        try:
+            with open(self.journal_index, 'r', encoding='utf-8') as f:
+                paths = json.load(f)
+            return [p for p in paths if isinstance(p, str)] if isinstance(paths, list) else []
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"读取未完成下载列表失败: {str(e)}")
+            return []
+
+    def _index_update(self, journal_path, present):
+        if not self.journal_index:
+            return
+        with self.index_lock:
+            paths = self._index_load()
+            if present == (journal_path in paths):
+                return
+            if present:
+                paths.append(journal_path)
+            else:
+                paths.remove(journal_path)
+            try:
+                self.journal_index.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(self.journal_index, paths)
+            except Exception as e:
+                print(f"更新未完成下载列表失败: {str(e)}")
+
+    def _index_add(self, journal_path):
+        self._index_update(journal_path, True)
+
+    def _index_remove(self, journal_path):
+        self._index_update(journal_path, False)
+
+    def _notify(self, task, force=False):
+        """节流地向前端推送下载进度"""
+        now = time.time()
+        if not force and now - task._last_notify < PROGRESS_INTERVAL:
+            return
+        elapsed = now - task._last_time
+        if elapsed > 0:
+            task.speed = (task.downloaded - task._last_bytes) / elapsed
+        task._last_notify = now
+        task._last_time = now
+        task._last_bytes = task.downloaded
+        if not self.on_progress:
+            return
+        try:
+            self.on_progress(task.to_dict())
+        except Exception as e:
+            print(f"推送下载进度失败: {str(e)}")
+
+
+class DownloadStream:
+    """顺序读取的下载流，数据不落盘直接交给调用方（如烧录引擎）：
+    连接中断时用 Range 从当前位置重连，数据经过全局限速并在读取路径上校验"""
+
+    def __init__(self, handler, url, checksum=None, chunklist_url=None):
+        self.handler = handler
+        self.url = url
+        self.checksum = checksum
+        self.chunklist_url = chunklist_url
+        self.cancel_event = threading.Event()
+        self.size = 0
+        self.accepts_ranges = False
+        self.etag = None
+        self.last_modified = None
+        self.position = None
+        self.verifier = None
+        self.response = None
+        self.chunks = None
+        self.pending = memoryview(b'')
+        self.retries = 0
+        self.eof = False
+
+    def open(self):
+        """探测文件信息并选择校验方式；顺序读取无法重下单个块，chunklist 不符时直接失败"""
+        self.size, self.accepts_ranges, self.etag, self.last_modified = self.handler._probe(self.url)
+        self.position = Segment(0, self.size - 1 if self.size else 2 ** 63)
+        if self.chunklist_url and self.size:
+            try:
+                chunklist = ChunklistVerifier(self.handler._fetch_chunklist(self.chunklist_url))
+                if chunklist.total_size == self.size:
+                    self.verifier = chunklist
+                else:
+                    print("chunklist 与文件大小不符，忽略")
+            except Exception as e:
+                print(f"获取 chunklist 失败: {str(e)}")
+        if self.verifier is None and self.checksum:
+            self.verifier = Sha256Verifier(self.checksum)
+
+    def _connect(self):
+        headers = {}
+        if self.position.offset:
+            headers['Range'] = f'bytes={self.position.offset}-'
+            if self.etag or self.last_modified:
+                headers['If-Range'] = self.etag or self.last_modified
+        self.response = http_client.get(self.url, headers=headers, stream=True)
+        self.response.raise_for_status()
+        if self.position.offset and self.response.status_code != 206:
+            raise IOError("服务器未返回分段内容")
+        self.chunks = self.response.iter_content(chunk_size=CHUNK_SIZE)
+
+    def _next_chunk(self):
+        """返回下一块数据，数据结束时返回空串；中断后在重试次数内自动重连"""
+        while True:
+            if self.cancel_event.is_set():
+                raise DownloadCancelled()
+            # 读完后不再重连（调用方可能在最后一块不满时继续读取）
+            if self.eof:
+                return b''
+            try:
+                if self.chunks is None:
+                    self._connect()
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    self.close()
+                    if self.size and self.position.offset < self.size:
+                        raise IOError("连接提前结束")
+                    self.eof = True
+                    return b''
+                if chunk:
+                    self.retries = 0
+                    return chunk
+            except (IOError, requests.exceptions.RequestException) as e:
+                self.close()
+                self.retries += 1
+                if not self.accepts_ranges or self.retries > SEGMENT_RETRIES:
+                    raise
+                print(f"下载流中断，从 {self.position.offset} 处重连: {str(e)}")
+                self.cancel_event.wait(min(2 ** self.retries, 10))
+
+    def readinto(self, view):
+        filled = 0
+        while filled < len(view):
+            if not self.pending:
+                chunk = self._next_chunk()
+                if not chunk:
+                    break
+                chunk = chunk[:self.position.remaining]
+                self.pending = memoryview(chunk)
+                try:
+                    if self.verifier:
+                        self.verifier.update(self.position, chunk)
+                    else:
+                        self.position.offset += len(chunk)
+                except ChunkMismatch as e:
+                    # 之前的数据可能已写入目标，无法回退重下
+                    raise VerificationFailed(str(e))
+                self.handler.rate_limiter.consume(len(chunk), self.cancel_event)
+            n = min(len(view) - filled, len(self.pending))
+            view[filled:filled + n] = self.pending[:n]
+            self.pending = self.pending[n:]
+            filled += n
+        return filled
+
+    def finish(self):
+        """数据读完后返回 (是否通过, 说明)"""
+        if self.size and self.position.offset != self.size:
+            return False, '下载数据不完整'
+        if not self.verifier:
+            return True, None
+        return self.verifier.finish(None, [self.position])
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+        self.response = None
+        self.chunks = None
+
+
+class DownloadManager:
+    """与下载相关的窗口操作（保存路径选择）"""
+
+    def __init__(self, window):
+        self.window = window
+
+    def select_save_path(self, filename=""):
+        """弹出保存对话框，返回用户选择的路径"""
+        import webview
+        try:
+            downloads_dir = str(Path.home() / "Downloads")
+            os.makedirs(downloads_dir, exist_ok=True)
+
+            safe_name = "".join(c for c in filename if c.isalnum() or c in (' ', '.', '_', '-'))
+            safe_name = safe_name[:255]
+
+            result = self.window.create_file_dialog(
+                webview.SAVE_DIALOG,
+                directory=downloads_dir,
+                save_filename=safe_name,
+                file_types=("DMG文件 (*.dmg)", "所有文件 (*.*)")
+            )
+            if isinstance(result, (list, tuple)):
+                return result[0] if result else None
+            return result
+        except Exception as e:
+            print(f"选择保存路径出错: {str(e)}")
+            return None
+
+    def select_open_path(self, file_types=("所有文件 (*.*)",)):
+        """弹出打开文件对话框，返回用户选择的路径"""
+        import webview
+        try:
+            result = self.window.create_file_dialog(
+                webview.OPEN_DIALOG,
+                directory=str(Path.home()),
+                file_types=tuple(file_types)
+            )
+            if isinstance(result, (list, tuple)):
+                return result[0] if result else None
+            return result
+        except Exception as e:
+            print(f"选择文件出错: {str(e)}")
+            return None
+
+    def select_folder(self):
+        """弹出选择文件夹对话框，返回用户选择的路径"""
+        import webview
+        try:
+            result = self.window.create_file_dialog(
+                webview.FOLDER_DIALOG,
+                directory=str(Path.home())
+            )
+            if isinstance(result, (list, tuple)):
+                return result[0] if result else None
+            return result
+        except Exception as e:
+            print(f"选择文件夹出错: {str(e)}")
+            return None
@@ -0,0 +1,1008 @@
+import os
+import re
+import html
+import time
+import base64
+import shutil
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+
+# 打开 EFI 文件夹时依次查找的配置文件位置
+CONFIG_CANDIDATES = ('EFI/OC/config.plist', 'OC/config.plist', 'config.plist')
+BACKUP_KEEP = 20            # 每个配置文件保留的备份数量
+ISSUE_LIMIT = 200           # 校验结果最多返回的条数
+SEARCH_LIMIT = 200
+
+# plist 值类型
+DICT, ARRAY, STRING, DATA, INTEGER, REAL, BOOL, DATE = (
+    'dict', 'array', 'string', 'data', 'integer', 'real', 'bool', 'date'
+)
+CONTAINERS = (DICT, ARRAY)
+ANY = 'any'
+
+# 一次匹配整个标量元素（键、字符串、数字等），其余为注释、处理指令/DOCTYPE 与单个标签：
+# group(1)/(2) 为标量元素名和内容，group(3) 为结束标签的 '/'，group(4) 为标签名，group(5) 为自闭合的 '/'
+TOKEN = re.compile(r'<(?:(key|string|data|date|integer|real)>([^<]*)</\1>|!--.*?-->|[?!][^>]*>'
+                   r'|(/?)([A-Za-z]+)[^>]*?(/?)>)', re.S)
+COMMENT = re.compile(r'<!--.*?-->', re.S)
+DATE_FORMAT = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+LABEL_KEYS = ('Comment', 'BundlePath', 'Path', 'Name', 'Identifier')
+
+
+class PlistError(Exception):
+    """plist 格式错误或编辑操作无效"""
+
+
+# ---- OpenCore 配置结构 ----
+# 叶子为值类型，dict 列出已知的键（'*' 匹配任意键），[规则] 为数组元素的规则，元组表示几种写法都可以。
+# 只列出了键的字典会对未知的键给出警告（多半是拼写错误）；只写 DICT 的字典不检查其中的键
+
+def _entry(**keys):
+    return dict({'Comment': STRING, 'Enabled': BOOL}, **keys)
+
+
+KERNEL_RANGE = {'Arch': STRING, 'MaxKernel': STRING, 'MinKernel': STRING}
+BINARY_PATCH = {'Count': INTEGER, 'Find': DATA, 'Limit': INTEGER, 'Mask': DATA,
+                'Replace': DATA, 'ReplaceMask': DATA, 'Skip': INTEGER}
+
+OPENCORE_SCHEMA = {
+    'ACPI': {
+        'Add': [_entry(Path=STRING)],
+        'Delete': [_entry(All=BOOL, OemTableId=DATA, TableLength=INTEGER, TableSignature=DATA)],
+        'Patch': [_entry(Base=STRING, BaseSkip=INTEGER, OemTableId=DATA, TableLength=INTEGER,
+                         TableSignature=DATA, **BINARY_PATCH)],
+        'Quirks': dict.fromkeys(('FadtEnableReset', 'NormalizeHeaders', 'RebaseRegions', 'ResetHwSig',
+                                 'ResetLogoStatus', 'SyncTableIds'), BOOL)
+    },
+    'Booter': {
+        'MmioWhitelist': [_entry(Address=INTEGER)],
+        'Patch': [_entry(Arch=STRING, Identifier=STRING, **BINARY_PATCH)],
+        'Quirks': dict(dict.fromkeys((
+            'AllowRelocationBlock', 'AvoidRuntimeDefrag', 'ClearTaskSwitchBit', 'DevirtualiseMmio',
+            'DisableSingleUser', 'DisableVariableWrite', 'DiscardHibernateMap', 'EnableSafeModeSlide',
+            'EnableWriteUnprotector', 'FixupAppleEfiImages', 'ForceBooterSignature', 'ForceExitBootServices',
+            'ProtectMemoryRegions', 'ProtectSecureBoot', 'ProtectUefiServices', 'ProvideCustomSlide',
+            'RebuildAppleMemoryMap', 'SetupVirtualMap', 'SignalAppleOS', 'SyncRuntimePermissions'), BOOL),
+            ProvideMaxSlide=INTEGER, ResizeAppleGpuBars=INTEGER)
+    },
+    'DeviceProperties': {
+        'Add': {'*': {'*': ANY}},
+        'Delete': {'*': [STRING]}
+    },
+    'Kernel': {
+        'Add': [_entry(BundlePath=STRING, ExecutablePath=STRING, PlistPath=STRING, **KERNEL_RANGE)],
+        'Block': [_entry(Identifier=STRING, Strategy=STRING, **KERNEL_RANGE)],
+        'Emulate': {'Cpuid1Data': DATA, 'Cpuid1Mask': DATA, 'DummyPowerManagement': BOOL,
+                    'MaxKernel': STRING, 'MinKernel': STRING},
+        'Force': [_entry(BundlePath=STRING, ExecutablePath=STRING, Identifier=STRING, PlistPath=STRING,
+                         **KERNEL_RANGE)],
+        'Patch': [_entry(Base=STRING, Identifier=STRING, **KERNEL_RANGE, **BINARY_PATCH)],
+        'Quirks': dict(dict.fromkeys((
+            'AppleCpuPmCfgLock', 'AppleXcpmCfgLock', 'AppleXcpmExtraMsrs', 'AppleXcpmForceBoost',
+            'CustomPciSerialDevice', 'CustomSMBIOSGuid', 'DisableIoMapper', 'DisableIoMapperMapping',
+            'DisableLinkeditJettison', 'DisableRtcChecksum', 'ExtendBTFeatureFlags', 'ExternalDiskIcons',
+            'ForceAquantiaEthernet', 'ForceSecureBootScheme', 'IncreasePciBarSize', 'LapicKernelPanic',
+            'LegacyCommpage', 'PanicNoKextDump', 'PowerTimeoutKernelPanic', 'ProvideCurrentCpuInfo',
+            'ThirdPartyDrives', 'XhciPortLimit'), BOOL),
+            SetApfsTrimTimeout=INTEGER),
+        'Scheme': {'CustomKernel': BOOL, 'FuzzyMatch': BOOL, 'KernelArch': STRING, 'KernelCache': STRING}
+    },
+    'Misc': {
+        'BlessOverride': [STRING],
+        'Boot': {'ConsoleAttributes': INTEGER, 'HibernateMode': STRING, 'HibernateSkipsPicker': BOOL,
+                 'HideAuxiliary': BOOL, 'InstanceIdentifier': STRING, 'LauncherOption': STRING,
+                 'LauncherPath': STRING, 'PickerAttributes': INTEGER, 'PickerAudioAssist': BOOL,
+                 'PickerMode': STRING, 'PickerVariant': STRING, 'PollAppleHotKeys': BOOL,
+                 'ShowPicker': BOOL, 'TakeoffDelay': INTEGER, 'Timeout': INTEGER},
+        'Debug': {'AppleDebug': BOOL, 'ApplePanic': BOOL, 'DisableWatchDog': BOOL, 'DisplayDelay': INTEGER,
+                  'DisplayLevel': INTEGER, 'LogModules': STRING, 'SysReport': BOOL, 'Target': INTEGER},
+        'Entries': [_entry(Arguments=STRING, Auxiliary=BOOL, Flavour=STRING, Name=STRING, Path=STRING,
+                           TextMode=BOOL)],
+        'Security': {'AllowSetDefault': BOOL, 'ApECID': INTEGER, 'AuthRestart': BOOL,
+                     'BlacklistAppleUpdate': BOOL, 'DmgLoading': STRING, 'EnablePassword': BOOL,
+                     'ExposeSensitiveData': INTEGER, 'HaltLevel': INTEGER, 'PasswordHash': DATA,
+                     'PasswordSalt': DATA, 'ScanPolicy': INTEGER, 'SecureBootModel': STRING,
+                     'Vault': STRING},
+        'Serial': DICT,
+        'Tools': [_entry(Arguments=STRING, Auxiliary=BOOL, Flavour=STRING, FullNvramAccess=BOOL,
+                         Name=STRING, Path=STRING, RealPath=BOOL, TextMode=BOOL)]
+    },
+    'NVRAM': {
+        'Add': {'*': {'*': ANY}},
+        'Delete': {'*': [STRING]},
+        'LegacyOverwrite': BOOL,
+        'LegacySchema': {'*': [STRING]},
+        'WriteFlash': BOOL
+    },
+    'PlatformInfo': {
+        'Automatic': BOOL,
+        'CustomMemory': BOOL,
+        'DataHub': DICT,
+        'Generic': {'AdviseFeatures': BOOL, 'MaxBIOSVersion': BOOL, 'MLB': STRING, 'ProcessorType': INTEGER,
+                    'ROM': DATA, 'SpoofVendor': BOOL, 'SystemMemoryStatus': STRING,
+                    'SystemProductName': STRING, 'SystemSerialNumber': STRING, 'SystemUUID': STRING},
+        'Memory': DICT,
+        'PlatformNVRAM': DICT,
+        'SMBIOS': DICT,
+        'UpdateDataHub': BOOL,
+        'UpdateNVRAM': BOOL,
+        'UpdateSMBIOS': BOOL,
+        'UpdateSMBIOSMode': STRING,
+        'UseRawUuidEncoding': BOOL
+    },
+    'UEFI': {
+        'APFS': {'EnableJumpstart': BOOL, 'GlobalConnect': BOOL, 'HideVerbose': BOOL,
+                 'JumpstartHotPlug': BOOL, 'MinDate': INTEGER, 'MinVersion': INTEGER},
+        'AppleInput': DICT,
+        'Audio': DICT,
+        'ConnectDrivers': BOOL,
+        # 0.7.3 之前驱动列表的元素是路径字符串
+        'Drivers': [(STRING, {'Arguments': STRING, 'Comment': STRING, 'Enabled': BOOL,
+                              'LoadEarly': BOOL, 'Path': STRING})],
+        'Input': DICT,
+        'Output': DICT,
+        'ProtocolOverrides': DICT,
+        'Quirks': DICT,
+        'ReservedMemory': [_entry(Address=INTEGER, Size=INTEGER, Type=STRING)]
+    }
+}
+REQUIRED_SECTIONS = ('ACPI', 'Booter', 'DeviceProperties', 'Kernel', 'Misc', 'NVRAM', 'PlatformInfo', 'UEFI')
+
+
+class Rule:
+    """编译后的结构规则：kinds 为允许的类型（空集合表示任意类型）"""
+
+    __slots__ = ('kinds', 'keys', 'wildcard', 'item', 'required')
+
+    def __init__(self):
+        self.kinds = set()
+        self.keys = {}
+        self.wildcard = None
+        self.item = None
+        self.required = ()
+
+    def child(self, segment):
+        if isinstance(segment, int):
+            return self.item
+        # OpenCore 忽略以 # 开头的键，常用来临时注释掉条目
+        if segment.startswith('#'):
+            return None
+        return self.keys.get(segment, self.wildcard)
+
+
+def compile_schema(spec):
+    rule = Rule()
+    for option in (spec if isinstance(spec, tuple) else (spec,)):
+        if isinstance(option, dict):
+            rule.kinds.add(DICT)
+            for key, value in option.items():
+                if key == '*':
+                    rule.wildcard = compile_schema(value)
+                else:
+                    rule.keys[key] = compile_schema(value)
+        elif isinstance(option, list):
+            rule.kinds.add(ARRAY)
+            rule.item = compile_schema(option[0]) if option else None
+        elif option != ANY:
+            rule.kinds.add(option)
+    return rule
+
+
+@lru_cache(maxsize=1)
+def compiled_schema():
+    """结构规则只编译一次，之后的校验直接按路径查找"""
+    rule = compile_schema(OPENCORE_SCHEMA)
+    rule.required = REQUIRED_SECTIONS
+    return rule
+
+
+def rule_for(path):
+    rule = compiled_schema()
+    for segment in path:
+        if rule is None:
+            return None
+        rule = rule.child(segment)
+    return rule
+
+
+# ---- 路径 ----
+# 路径段之间用 / 分隔；DeviceProperties 等键本身含有 /，按 JSON Pointer 的写法转义为 ~1（~ 转义为 ~0）
+
+def join_path(segments):
+    return '/'.join(str(s).replace('~', '~0').replace('/', '~1') for s in segments)
+
+
+def split_path(path):
+    if isinstance(path, (list, tuple)):
+        return list(path)
+    path = (path or '').strip('/')
+    return [s.replace('~1', '/').replace('~0', '~') for s in path.split('/')] if path else []
+
+
+# ---- 节点与值转换 ----
+
+class Node:
+    """plist 中的一个值；start/end 为元素在原文中的位置，key_start 为字典中对应 <key> 的起始位置。
+    本次会话中新建的节点没有原文位置"""
+
+    __slots__ = ('kind', 'value', 'depth', 'start', 'end', 'key_start')
+
+    def __init__(self, kind, value, depth, start=None, end=None, key_start=None):
+        self.kind = kind
+        self.value = value
+        self.depth = depth
+        self.start = start
+        self.end = end
+        self.key_start = key_start
+
+
+def parse_integer(text):
+    text = text.strip()
+    if text.lower().startswith(('0x', '-0x')):
+        return int(text, 16)
+    return int(text)
+
+
+def coerce(value, kind):
+    """把页面提交的值转换为给定的 plist 类型，data 使用十六进制字符串"""
+    try:
+        if kind == STRING:
+            if isinstance(value, (dict, list)) or value is None:
+                raise ValueError
+            return value if isinstance(value, str) else str(value)
+        if kind == BOOL:
+            if isinstance(value, bool):
+                return value
+            text = str(value).strip().lower()
+            if text in ('true', 'yes', '1'):
+                return True
+            if text in ('false', 'no', '0'):
+                return False
+            raise ValueError
+        if kind == INTEGER:
+            if isinstance(value, bool):
+                raise ValueError
+            if isinstance(value, float):
+                if not value.is_integer():
+                    raise ValueError
+                value = int(value)
+            number = value if isinstance(value, int) else parse_integer(str(value))
+            if not -2 ** 63 <= number < 2 ** 64:
+                raise ValueError
+            return number
+        if kind == REAL:
+            if isinstance(value, bool):
+                raise ValueError
+            return float(value)
+        if kind == DATA:
+            if isinstance(value, (bytes, bytearray)):
+                return bytes(value)
+            text = re.sub(r'[\s<>]', '', str(value))
+            if text[:2].lower() == '0x':
+                text = text[2:]
+            return bytes.fromhex(text)
+        if kind == DATE:
+            if not isinstance(value, str) or not DATE_FORMAT.match(value):
+                raise ValueError
+            return value
+    except (TypeError, ValueError, OverflowError):
+        pass
+    raise PlistError(f"无法把 {value!r} 转换为 {kind}")
+
+
+def infer_kind(value):
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, int):
+        return INTEGER
+    if isinstance(value, float):
+        return REAL
+    if isinstance(value, str):
+        return STRING
+    if isinstance(value, dict):
+        return DICT
+    if isinstance(value, list):
+        return ARRAY
+    raise PlistError(f"不支持的值: {value!r}")
+
+
+def build_node(value, depth, kind=None, rule=None):
+    """由页面提交的值建立新节点；未指定类型时按结构规则推断（如 Find 为 data），没有规则时按 JSON 类型"""
+    if kind is None and rule is not None and len(rule.kinds) == 1:
+        kind = next(iter(rule.kinds))
+    if kind is None:
+        kind = infer_kind(value)
+    if kind == DICT:
+        if not isinstance(value, dict):
+            raise PlistError(f"{value!r} 不是字典")
+        node = Node(DICT, {}, depth)
+        for key, item in value.items():
+            node.value[str(key)] = build_node(item, depth + 1, rule=rule.child(str(key)) if rule else None)
+        return node
+    if kind == ARRAY:
+        if not isinstance(value, list):
+            raise PlistError(f"{value!r} 不是数组")
+        item_rule = rule.item if rule else None
+        return Node(ARRAY, [build_node(item, depth + 1, rule=item_rule) for item in value], depth)
+    if kind not in (STRING, DATA, INTEGER, REAL, BOOL, DATE):
+        raise PlistError(f"未知的类型: {kind}")
+    return Node(kind, coerce(value, kind), depth)
+
+
+def clone(node, depth):
+    """复制节点并去掉原文位置（移动到其它层级时缩进不同，需要重新生成）"""
+    if node.kind == DICT:
+        value = {key: clone(child, depth + 1) for key, child in node.value.items()}
+    elif node.kind == ARRAY:
+        value = [clone(child, depth + 1) for child in node.value]
+    else:
+        value = node.value
+    return Node(node.kind, value, depth)
+
+
+def json_value(node):
+    if node.kind == DATA:
+        return node.value.hex().upper()
+    return node.value
+
+
+def to_python(node):
+    """节点转为 Python 对象（data 为 bytes），用于比较和导出"""
+    if node.kind == DICT:
+        return {key: to_python(child) for key, child in node.value.items()}
+    if node.kind == ARRAY:
+        return [to_python(child) for child in node.value]
+    return node.value
+
+
+def _escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def render_scalar(node):
+    kind = node.kind
+    if kind == BOOL:
+        return '<true/>' if node.value else '<false/>'
+    if kind == DATA:
+        return f"<data>{base64.b64encode(node.value).decode('ascii')}</data>"
+    if kind in (INTEGER, REAL):
+        return f"<{kind}>{node.value!r}</{kind}>"
+    return f"<{kind}>{_escape(node.value)}</{kind}>"
+
+
+# ---- 解析 ----
+
+def parse_plist(source):
+    """单遍扫描 XML plist，建立带原文位置的节点树；返回 (根节点, 节点数, 警告)"""
+    root = None
+    stack = []       # [容器节点, 待用的键, 键的起始位置]
+    warnings = []
+    count = 0
+    tokens = TOKEN.finditer(source)
+
+    def fail(pos, message):
+        raise PlistError(f"第 {source.count(chr(10), 0, pos) + 1} 行: {message}")
+
+    for match in tokens:
+        scalar, text, closing, name, empty = match.groups()
+        start = match.start()
+        if scalar is None:
+            if name is None or name == 'plist':
+                continue
+            if closing:
+                if name not in CONTAINERS or not stack or stack[-1][0].kind != name:
+                    fail(start, f"意外的 </{name}>")
+                container, key, _key_start = stack.pop()
+                if key is not None:
+                    fail(start, f"键 {key} 缺少值")
+                container.end = match.end()
+                continue
+            if empty or name in CONTAINERS:
+                text = ''
+            else:
+                # 带属性或内容中有注释等少见写法，跳过注释读到对应的结束标签为止
+                close = next(tokens, None)
+                while close is not None and close.group(1) is None and close.group(4) is None:
+                    close = next(tokens, None)
+                if close is None or not close.group(3) or close.group(4) != name:
+                    fail(start, f"<{name}> 没有正确结束")
+                text = COMMENT.sub('', source[match.end():close.start()])
+                match = close
+            scalar = name
+        end = match.end()
+
+        if scalar == 'key':
+            if not stack or stack[-1][0].kind != DICT or stack[-1][1] is not None:
+                fail(start, "意外的 <key>")
+            stack[-1][1] = html.unescape(text) if '&' in text else text
+            stack[-1][2] = start
+            continue
+
+        depth = len(stack)
+        if scalar == STRING:
+            node = Node(STRING, html.unescape(text) if '&' in text else text, depth, start, end)
+        elif scalar in CONTAINERS:
+            node = Node(scalar, {} if scalar == DICT else [], depth, start, end if empty else None)
+        elif scalar in ('true', 'false'):
+            node = Node(BOOL, scalar == 'true', depth, start, end)
+        elif scalar in (DATA, INTEGER, REAL, DATE):
+            try:
+                if scalar == DATA:
+                    value = base64.b64decode(''.join(text.split()))
+                elif scalar == INTEGER:
+                    value = parse_integer(text)
+                elif scalar == REAL:
+                    value = float(text)
+                else:
+                    value = text.strip()
+            except ValueError:
+                fail(start, f"无效的 <{scalar}> 值: {text.strip()[:40]}")
+            node = Node(scalar, value, depth, start, end)
+        else:
+            fail(start, f"不支持的元素 <{scalar}>")
+        count += 1
+
+        if not stack:
+            if root is not None:
+                fail(start, "存在多个根元素")
+            root = node
+        else:
+            frame = stack[-1]
+            container = frame[0]
+            if container.kind == DICT:
+                if frame[1] is None:
+                    fail(start, f"<{scalar}> 前缺少 <key>")
+                if frame[1] in container.value:
+                    warnings.append(f"第 {source.count(chr(10), 0, start) + 1} 行: 重复的键 {frame[1]}，以最后一个为准")
+                    del container.value[frame[1]]
+                node.key_start = frame[2]
+                container.value[frame[1]] = node
+                frame[1] = None
+            else:
+                container.value.append(node)
+        if node.end is None:
+            stack.append([node, None, None])
+
+    if stack:
+        fail(len(source), f"<{stack[-1][0].kind}> 没有结束")
+    if root is None:
+        raise PlistError("文件中没有 plist 数据")
+    return root, count, warnings
+
+
+def detect_layout(source):
+    """沿用文件原有的换行符和缩进"""
+    newline = '\r\n' if '\r\n' in source[:4096] else '\n'
+    match = re.search(r'\n([ \t]+)<', source)
+    return newline, match.group(1) if match else '\t'
+
+
+def write_atomic(path, data):
+    """先写临时文件再 os.replace，避免中途断电留下半个配置文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def find_config(path):
+    """path 为 config.plist 或 EFI 文件夹（也可以是 OC 文件夹或 EFI 分区根目录）"""
+    if not path:
+        raise PlistError("请选择 config.plist 或 EFI 文件夹")
+    path = Path(path)
+    if path.is_file():
+        return path
+    if path.is_dir():
+        for candidate in CONFIG_CANDIDATES:
+            if (path / candidate).is_file():
+                return path / candidate
+            if path.name.upper() == 'EFI' and (path.parent / candidate).is_file():
+                return path.parent / candidate
+    raise PlistError(f"找不到 config.plist: {path}")
+
+
+def backup_file(path, backup_dir):
+    """把配置文件复制到备份目录（文件名带时间），只保留最近 BACKUP_KEEP 份"""
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    stem, suffix = Path(path).stem, Path(path).suffix
+    target = backup_dir / f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}{suffix}"
+    shutil.copy2(path, target)
+    backups = sorted(backup_dir.glob(f"{stem}-*{suffix}"))
+    for old in backups[:-BACKUP_KEEP]:
+        try:
+            old.unlink()
+        except OSError as e:
+            print(f"删除旧的EFI备份失败: {str(e)}")
+    return str(target)
+
+
+# ---- 文档 ----
+
+class PlistDocument:
+    """打开的 config.plist：解析一次后按路径查找和修改节点。
+    修改只在节点树上进行并记下改动的节点，保存时原文中未改动的部分原样复制，
+    只重新生成改动的节点（增删条目时只重新生成所在的字典/数组，其余条目仍取原文）"""
+
+    def __init__(self, path):
+        started = time.time()
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.stat = self._stat()
+        try:
+            self.source = data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise PlistError("config.plist 不是 UTF-8 编码")
+        self.bom = data.startswith(b'\xef\xbb\xbf')
+        self.root, self.count, self.warnings = parse_plist(self.source)
+        self.newline, self.indent = detect_layout(self.source)
+        self.dirty = set()           # 需要重新生成的节点（都有原文位置）
+        self.revision = 0
+        self.saved_revision = 0
+        self.backup = None
+        self._anchors = self._anchor_starts = None
+        self.issues = validate(self.root, ())
+        self.parse_time = time.time() - started
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return (st.st_size, st.st_mtime_ns)
+
+    @property
+    def modified(self):
+        return self.revision != self.saved_revision
+
+    @property
+    def changed_on_disk(self):
+        try:
+            return self._stat() != self.stat
+        except OSError:
+            return True
+
+    # ---- 查找 ----
+
+    def resolve(self, path):
+        """返回 (节点, 规范化路径)；数组下标转换为整数"""
+        node = self.root
+        canonical = []
+        for segment in split_path(path):
+            if node.kind == DICT:
+                segment = str(segment)
+                if segment not in node.value:
+                    raise PlistError(f"找不到键: {join_path(canonical + [segment])}")
+                node = node.value[segment]
+            elif node.kind == ARRAY:
+                segment = self._index(node, segment, canonical)
+                node = node.value[segment]
+            else:
+                raise PlistError(f"{join_path(canonical)} 不是字典或数组")
+            canonical.append(segment)
+        return node, tuple(canonical)
+
+    @staticmethod
+    def _index(node, segment, canonical, allow_end=False):
+        try:
+            index = len(node.value) if allow_end and segment == '-' else int(segment)
+        except (TypeError, ValueError):
+            raise PlistError(f"{join_path(canonical)} 是数组，路径应为下标")
+        limit = len(node.value) + (1 if allow_end else 0)
+        if not 0 <= index < limit:
+            raise PlistError(f"下标超出范围: {join_path(canonical + [segment])}")
+        return index
+
+    def describe(self, path=''):
+        """节点的类型和值；字典/数组列出直接子节点（子容器只给出元素个数）"""
+        node, canonical = self.resolve(path)
+        result = {
+            'path': join_path(canonical),
+            'crumbs': [{'name': str(segment), 'path': join_path(canonical[:i + 1])}
+                       for i, segment in enumerate(canonical)],
+            'type': node.kind
+        }
+        if node.kind not in CONTAINERS:
+            result['value'] = json_value(node)
+            return result
+        items = node.value.items() if node.kind == DICT else enumerate(node.value)
+        children = []
+        for key, child in items:
+            item = {'key': key, 'path': join_path(canonical + (key,)), 'type': child.kind}
+            if child.kind in CONTAINERS:
+                item['count'] = len(child.value)
+                label = self._label(child)
+                if label:
+                    item['label'] = label
+            else:
+                item['value'] = json_value(child)
+            children.append(item)
+        result['children'] = children
+        return result
+
+    @staticmethod
+    def _label(node):
+        # 数组中的条目（ACPI/Kext/驱动等）用 Comment、路径等字段作为标题
+        if node.kind != DICT:
+            return None
+        for key in LABEL_KEYS:
+            child = node.value.get(key)
+            if child is not None and child.kind == STRING and child.value:
+                return child.value
+        return None
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """按键名或字符串值查找（不区分大小写）"""
+        query = (query or '').strip().lower()
+        if not query:
+            return []
+        results = []
+        pending = [(self.root, ())]
+        while pending and len(results) < limit:
+            node, path = pending.pop()
+            matched = bool(path) and isinstance(path[-1], str) and query in path[-1].lower()
+            if node.kind in CONTAINERS:
+                items = node.value.items() if node.kind == DICT else enumerate(node.value)
+                pending.extend((child, path + (key,)) for key, child in reversed(list(items)))
+            elif node.kind == STRING and query in node.value.lower():
+                matched = True
+            if not matched:
+                continue
+            item = {'path': join_path(path), 'parent': join_path(path[:-1]), 'type': node.kind}
+            if node.kind not in CONTAINERS:
+                item['value'] = json_value(node)
+            results.append(item)
+        return results
+
+    # ---- 修改 ----
+
+    def apply(self, patches):
+        """按顺序执行补丁（op 为 replace/add/remove/move，与 JSON Patch 相同），全部成功才生效；
+        返回受影响的路径和这些路径下新的校验结果"""
+        if not isinstance(patches, list) or not patches:
+            raise PlistError("补丁必须是非空列表")
+        undo = []
+        dirty = set(self.dirty)
+        touched = []
+        written = []
+        try:
+            for i, patch in enumerate(patches):
+                if not isinstance(patch, dict):
+                    raise PlistError(f"第 {i + 1} 个补丁无效")
+                try:
+                    path, target = self._apply_one(patch, undo)
+                except PlistError as e:
+                    raise PlistError(f"第 {i + 1} 个补丁: {str(e)}")
+                touched.append(path)
+                if target is not None:
+                    written.append(join_path(target))
+            issues = self._revalidate(touched)
+            # 只拒绝写入的值本身类型不符，文件中原有的问题不影响其它修改
+            errors = [issue for issue in issues if issue['severity'] == 'error' and any(
+                issue['path'] == p or issue['path'].startswith(p + '/') for p in written)]
+            if errors:
+                raise PlistError(f"{errors[0]['path']}: {errors[0]['message']}")
+        except Exception:
+            for action in reversed(undo):
+                action()
+            self.dirty = dirty
+            raise
+        self.issues = issues
+        self.revision += 1
+        return [join_path(path) for path in touched]
+
+    def _apply_one(self, patch, undo):
+        """执行一个补丁，返回 (需要重新校验的路径, 写入的节点路径)"""
+        op = patch.get('op', 'replace')
+        segments = split_path(patch.get('path'))
+        if op == 'replace':
+            if not segments:
+                raise PlistError("不能替换根节点")
+            container, key, canonical = self._locate(segments)
+            old = container.value[key]
+            rule = rule_for(canonical + (key,))
+            kind = patch.get('type')
+            # 结构规则确定了类型时按规则转换（可以修正原来写错的类型），否则保持原类型
+            if kind is None and not (rule and len(rule.kinds) == 1) and old.kind not in CONTAINERS:
+                kind = old.kind
+            node = build_node(patch.get('value'), old.depth, kind, rule)
+            self._replace(container, key, old, node, undo)
+            return canonical + (key,), canonical + (key,)
+        if op == 'add':
+            if not segments:
+                raise PlistError("不能替换根节点")
+            container, key, canonical = self._locate(segments, adding=True)
+            node = build_node(patch.get('value'), container.depth + 1, patch.get('type'),
+                              rule_for(canonical + (key if container.kind == DICT else 0,)))
+            if container.kind == DICT and key in container.value:
+                # 与 JSON Patch 一致：add 到已有的键即替换
+                self._replace(container, key, container.value[key], node, undo)
+                return canonical + (key,), canonical + (key,)
+            self._insert(container, key, node, undo)
+            return canonical, canonical + (key,)
+        if op == 'remove':
+            if not segments:
+                raise PlistError("不能删除根节点")
+            container, key, canonical = self._locate(segments)
+            self._remove(container, key, undo)
+            return canonical, None
+        if op == 'move':
+            source = split_path(patch.get('from'))
+            if not source:
+                raise PlistError("move 需要 from")
+            if segments[:len(source)] == source:
+                raise PlistError("不能移动到自身内部")
+            from_container, from_key, from_path = self._locate(source)
+            node = self._remove(from_container, from_key, undo)
+            container, key, canonical = self._locate(segments, adding=True)
+            if container.kind == DICT and key in container.value:
+                raise PlistError(f"键已存在: {join_path(canonical + (key,))}")
+            if node.depth != container.depth + 1:
+                moved = clone(node, container.depth + 1)
+            else:
+                # 同一层级内移动沿用原文，但原来的 <key> 不再适用
+                moved = Node(node.kind, node.value, node.depth, node.start, node.end)
+                if node in self.dirty:
+                    self.dirty.add(moved)
+            self._insert(container, key, moved, undo)
+            return tuple(os.path.commonprefix([from_path, canonical])), canonical + (key,)
+        raise PlistError(f"不支持的操作: {op}")
+
+    def _locate(self, segments, adding=False):
+        """返回 (所在容器, 键或下标, 容器路径)"""
+        container, canonical = self.resolve(segments[:-1])
+        key = segments[-1]
+        if container.kind == DICT:
+            key = str(key)
+            if not adding and key not in container.value:
+                raise PlistError(f"找不到键: {join_path(canonical + (key,))}")
+        elif container.kind == ARRAY:
+            key = self._index(container, key, list(canonical), allow_end=adding)
+        else:
+            raise PlistError(f"{join_path(canonical)} 不是字典或数组")
+        return container, key, canonical
+
+    def _touch(self, node):
+        # 没有原文位置的节点在某个已标记的容器里，随容器一起生成
+        if node.start is not None:
+            self.dirty.add(node)
+
+    def _replace(self, container, key, old, node, undo):
+        node.start, node.end, node.key_start = old.start, old.end, old.key_start
+        container.value[key] = node
+        self.dirty.discard(old)
+        self._touch(node)
+
+        def restore():
+            container.value[key] = old
+        undo.append(restore)
+
+    def _insert(self, container, key, node, undo):
+        if container.kind == DICT:
+            container.value[key] = node
+            undo.append(lambda: container.value.pop(key))
+        else:
+            container.value.insert(key, node)
+            undo.append(lambda: container.value.pop(key))
+        self._touch(container)
+
+    def _remove(self, container, key, undo):
+        if container.kind == DICT:
+            # 记下原位置，撤销时按原顺序放回
+            keys = list(container.value)
+            node = container.value.pop(key)
+
+            def restore():
+                items = list(container.value.items())
+                items.insert(keys.index(key), (key, node))
+                container.value.clear()
+                container.value.update(items)
+            undo.append(restore)
+        else:
+            node = container.value.pop(key)
+            undo.append(lambda: container.value.insert(key, node))
+        self._touch(container)
+        return node
+
+    # ---- 校验 ----
+
+    def _revalidate(self, touched):
+        """只重新校验受影响的子树，其余路径沿用之前的结果"""
+        prefixes = []
+        for path in sorted(set(touched), key=len):
+            if not any(path[:len(p)] == p for p in prefixes):
+                prefixes.append(path)
+        strings = [join_path(p) for p in prefixes]
+        issues = [issue for issue in self.issues
+                  if not any(s == '' or issue['path'] == s or issue['path'].startswith(s + '/') for s in strings)]
+        for path in prefixes:
+            node, canonical = self.resolve(list(path))
+            issues.extend(validate(node, canonical))
+        return issues
+
+    # ---- 保存 ----
+
+    def render(self):
+        anchors = sorted(self.dirty, key=lambda node: (node.start, -node.end))
+        self._anchors = anchors
+        self._anchor_starts = [node.start for node in anchors]
+        try:
+            return self._text(0, len(self.source))
+        finally:
+            self._anchors = self._anchor_starts = None
+
+    def _text(self, start, end):
+        """原文 [start, end) 中改动过的节点替换为重新生成的内容"""
+        parts = []
+        cursor = start
+        i = bisect_left(self._anchor_starts, start)
+        while i < len(self._anchors):
+            node = self._anchors[i]
+            if node.start >= end:
+                break
+            # 已被外层改动节点覆盖的跳过
+            if node.start >= cursor:
+                parts.append(self.source[cursor:node.start])
+                parts.append(self._render(node))
+                cursor = node.end
+            i += 1
+        parts.append(self.source[cursor:end])
+        return ''.join(parts)
+
+    def _render(self, node):
+        if node.kind not in CONTAINERS:
+            return render_scalar(node)
+        if not node.value:
+            return f"<{node.kind}/>"
+        inner = self.newline + self.indent * (node.depth + 1)
+        parts = [f"<{node.kind}>"]
+        items = node.value.items() if node.kind == DICT else ((None, child) for child in node.value)
+        for key, child in items:
+            parts.append(inner)
+            if key is not None:
+                if child.key_start is not None:
+                    parts.append(self._text(child.key_start, child.end))
+                    continue
+                parts.append(f"<key>{_escape(key)}</key>{inner}")
+            parts.append(self._text(child.start, child.end) if child.start is not None else self._render(child))
+        parts.append(f"{self.newline}{self.indent * node.depth}</{node.kind}>")
+        return ''.join(parts)
+
+    def save(self, backup_dir=None):
+        """写回文件：先检查文件是否被其它程序改过，首次保存前备份原文件，再原子替换"""
+        if self.changed_on_disk:
+            raise PlistError("文件已被其它程序修改，请重新打开")
+        started = time.time()
+        text = self.render()
+        data = text.encode('utf-8')
+        if self.bom:
+            data = b'\xef\xbb\xbf' + data
+        if backup_dir and self.backup is None:
+            self.backup = backup_file(self.path, backup_dir)
+        write_atomic(self.path, data)
+        self.stat = self._stat()
+        self.saved_revision = self.revision
+        return {
+            'path': self.path,
+            'size': len(data),
+            'backup': self.backup,
+            'elapsed': round(time.time() - started, 4)
+        }
+
+    def summary(self):
+        errors = sum(1 for issue in self.issues if issue['severity'] == 'error')
+        return {
+            'path': self.path,
+            'size': self.stat[0],
+            'nodes': self.count,
+            'sections': list(self.root.value) if self.root.kind == DICT else [],
+            'parse_time': round(self.parse_time, 4),
+            'warnings': self.warnings[:20],
+            'issues': self.issues[:ISSUE_LIMIT],
+            'issue_count': len(self.issues),
+            'error_count': errors,
+            'modified': self.modified
+        }
+
+
+def validate(node, path):
+    """按 OpenCore 配置结构检查 node 及其子节点：类型不符为错误，缺少分区或未知的键为警告"""
+    path = tuple(path)
+    issues = []
+    rule = compiled_schema()
+    for i, segment in enumerate(path):
+        if rule is None:
+            break
+        # 节点本身的键是否已知也随该节点一起检查
+        rule = _child_rule(rule, segment, path[:i + 1], issues if i == len(path) - 1 else None)
+    _check(node, rule, path, issues)
+    return issues
+
+
+def _child_rule(rule, key, path, issues):
+    child_rule = rule.child(key)
+    if child_rule is None and issues is not None and rule.keys and isinstance(key, str) and not key.startswith('#'):
+        issues.append({'path': join_path(path), 'severity': 'warning', 'message': "未知的键，请检查拼写"})
+    return child_rule
+
+
+def _check(node, rule, path, issues):
+    if rule is None:
+        return
+    if rule.kinds and node.kind not in rule.kinds:
+        issues.append({'path': join_path(path), 'severity': 'error',
+                       'message': f"类型应为 {'/'.join(sorted(rule.kinds))}，实际为 {node.kind}"})
+        return
+    if node.kind == DICT:
+        for key in rule.required:
+            if key not in node.value:
+                issues.append({'path': join_path(path), 'severity': 'warning', 'message': f"缺少 {key}"})
+        for key, child in node.value.items():
+            _check(child, _child_rule(rule, key, path + (key,), issues), path + (key,), issues)
+    elif node.kind == ARRAY and rule.item is not None:
+        for i, child in enumerate(node.value):
+            _check(child, rule.item, path + (i,), issues)
+
+
+class EfiConfigService:
+    """EFI编辑器后端：打开的配置常驻内存，文件未变化时重新打开直接复用，不再解析"""
+
+    def __init__(self, backup_dir=None):
+        self.backup_dir = backup_dir
+        self.lock = threading.Lock()
+        self.document = None
+
+    def configure(self, backup_dir=None):
+        self.backup_dir = backup_dir or None
+
+    def open(self, path, reload=False):
+        config = find_config(path)
+        with self.lock:
+            document = self.document
+            reuse = (not reload and document is not None
+                     and os.path.realpath(document.path) == os.path.realpath(config)
+                     and not document.changed_on_disk)
+        if not reuse:
+            document = PlistDocument(config)
+            with self.lock:
+                self.document = document
+        return dict(document.summary(), cached=reuse)
+
+    def current(self):
+        with self.lock:
+            document = self.document
+        if document is None:
+            raise PlistError("请先打开 config.plist")
+        return document
+
+    def node(self, path=''):
+        document = self.current()
+        with self.lock:
+            return document.describe(path)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        document = self.current()
+        with self.lock:
+            return document.search(query, limit)
+
+    def patch(self, patches, save=False):
+        document = self.current()
+        with self.lock:
+            changed = document.apply(patches)
+            result = {
+                'changed': changed,
+                'issues': document.issues[:ISSUE_LIMIT],
+                'issue_count': len(document.issues),
+                'modified': document.modified
+            }
+            if save:
+                result['saved'] = document.save(self.backup_dir)
+                result['modified'] = document.modified
+        return result
+
+    def save(self):
+        document = self.current()
+        with self.lock:
+            return document.save(self.backup_dir)
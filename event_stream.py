@@ -0,0 +1,130 @@
+import json
+import time
+import threading
+import metrics
+
+FLUSH_INTERVAL = 0.25      # 每个订阅者两次推送之间的最小间隔（秒）
+KEEPALIVE_INTERVAL = 15.0  # 没有事件时发送注释行保持连接
+RETRY_MS = 2000            # 连接断开后浏览器重连的等待时间
+
+
+class EventBus:
+    """后台任务（下载、烧录、USB 端口扫描等）的进度通道：同一 channel/key 只保留最新状态，
+    每个 SSE 订阅者按最小间隔批量取出上次推送之后变化的条目，并且只发送变化的字段"""
+
+    def __init__(self, interval=FLUSH_INTERVAL, keepalive=KEEPALIVE_INTERVAL):
+        self.interval = interval
+        self.keepalive = keepalive
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.latest = {}   # (channel, key) -> (seq, payload, 发布时间, 是否为最终状态)
+        self.resets = {}   # channel -> 最近一次清空该 channel 时的 seq
+        self.cursors = {}  # 订阅者 -> 已推送到的 seq
+        self.closed = False
+
+    def publish(self, channel, key, payload, reset=False, final=False):
+        """更新 channel/key 的最新状态；reset 为真时先丢弃该 channel 的其它条目（如完整映射替换增量）；
+        final 为真表示条目不会再变化（如下载完成），推送给所有订阅者后从 latest 中删除"""
+        with self.cond:
+            if self.closed:
+                return
+            self.seq += 1
+            if reset:
+                for item in [item for item in self.latest if item[0] == channel]:
+                    del self.latest[item]
+                self.resets[channel] = self.seq
+            self.latest[(channel, key)] = (self.seq, payload, time.monotonic(), final)
+            self._prune()
+            self.cond.notify_all()
+        metrics.add('events_published_total', channel=channel)
+
+    def _prune(self):
+        # 调用方持有 cond；已结束的任务不会再更新，所有订阅者都推送过之后不必保留（没有订阅者时立即删除）
+        done = min(self.cursors.values(), default=self.seq)
+        for item in [item for item, (seq, _, _, final) in self.latest.items() if final and seq <= done]:
+            del self.latest[item]
+
+    def close(self):
+        """结束所有订阅者的事件流"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _changes(self, since):
+        with self.cond:
+            resets = {channel for channel, seq in self.resets.items() if seq > since}
+            items = sorted((seq, channel, key, payload, published, final)
+                           for (channel, key), (seq, payload, published, final) in self.latest.items() if seq > since)
+            return self.seq, resets, items
+
+    def _advance(self, cursor, seq):
+        with self.cond:
+            self.cursors[cursor] = seq
+            self._prune()
+
+    def stream(self):
+        """SSE 生成器：连接建立时先发送全部当前状态，之后只发送增量"""
+        cursor = object()
+        with self.cond:
+            self.cursors[cursor] = 0
+        try:
+            yield from self._stream(cursor)
+        finally:
+            with self.cond:
+                del self.cursors[cursor]
+                self._prune()
+
+    def _stream(self, cursor):
+        last = 0
+        sent = {}          # (channel, key) -> 上次发送给该订阅者的完整状态
+        flushed = 0.0
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.closed or self.seq > last, timeout=self.keepalive)
+                if self.closed:
+                    return
+                idle = self.seq == last
+            if idle:
+                yield ": keepalive\n\n"
+                continue
+            # 限制推送频率，等待期间到达的更新会被合并
+            delay = self.interval - (time.monotonic() - flushed)
+            if delay > 0:
+                time.sleep(delay)
+            # 首次推送的是连接前已有的状态，不计入推送延迟
+            initial = last == 0
+            last, resets, items = self._changes(last)
+            flushed = time.monotonic()
+
+            batches = {}
+            oldest = {}    # channel -> 本批中最早的发布时间，用于统计推送延迟
+            for channel in resets:
+                batches[channel] = []
+                for item in [item for item in sent if item[0] == channel]:
+                    del sent[item]
+            for _seq, channel, key, payload, published, final in items:
+                oldest[channel] = min(oldest.get(channel, published), published)
+                # 最终状态之后不会再有增量，不必再记住
+                previous = sent.pop((channel, key), None) if final else sent.get((channel, key))
+                if not final:
+                    sent[(channel, key)] = payload
+                if isinstance(previous, dict) and isinstance(payload, dict):
+                    delta = {name: value for name, value in payload.items() if previous.get(name) != value}
+                    if not delta:
+                        continue
+                else:
+                    delta = payload
+                batches.setdefault(channel, []).append({'key': key, 'data': delta})
+            for channel, entries in batches.items():
+                if channel in resets:
+                    entries = [{'reset': True}] + entries
+                if entries:
+                    message = f"event: {channel}\ndata: {json.dumps(entries, ensure_ascii=False)}\n\n"
+                    if metrics.is_enabled():
+                        metrics.add('events_sent_total', channel=channel)
+                        metrics.add('events_sent_bytes_total', len(message.encode('utf-8')), channel=channel)
+                        if channel in oldest and not initial:
+                            metrics.observe('events_delivery_seconds', time.monotonic() - oldest[channel], channel=channel)
+                    yield message
+            self._advance(cursor, last)
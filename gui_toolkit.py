@@ -1,18 +1,34 @@
-import webview
-import os
 import sys
-from flask import Flask, render_template_string, send_from_directory, jsonify, request
+from startup import StartupProfiler, LazyService
+# --profile-startup：在导入其它模块之前开始计时，启动完成后打印导入与各阶段耗时
+startup_profiler = StartupProfiler('--profile-startup' in sys.argv)
+startup_profiler.install()
+import os
+from flask import Flask, Response, render_template_string, jsonify, request, abort, g
 import json
+import time
+import click
+import threading
+import multiprocessing
 from pathlib import Path
 from flask_cors import CORS
-import requests
-from download_handle import DownloadManager
-from download_handle import DownloadHandler
+from preferences_store import PreferencesStore
+from static_cache import CachedAsset, StaticCache
+from asset_pipeline import AssetPipeline
+from event_stream import EventBus
+import metrics
+from local_server import LocalServer, HOST as SERVER_HOST, DEFAULT_WORKERS as SERVER_WORKERS
+# webview、requests 以及下载、烧录、硬件、USB、ACPI 等模块较重，
+# 由下方的 LazyService 在首次使用时才导入，窗口不必等它们加载完
 
-app = Flask(__name__)
+# 客户端版本号，页面显示和更新检查都以此为准
+APP_VERSION = '1.0.1'
+
+# 静态文件由下方的 static_files 路由从内存缓存提供
+app = Flask(__name__, static_folder=None)
 CORS(app, resources={
     r"/checkUpdate": {
-        "origins": ["https://your-frontend-domain.com", "http://localhost:*"],
+        "origins": ["https://your-frontend-domain.com", "http://localhost:*", "http://127.0.0.1:*"],
         "methods": ["GET"],
         "allow_headers": ["Content-Type"]
     }
@@ -20,98 +36,231 @@ CORS(app, resources={
 
 PREFERENCES_PATH = Path("C:/SimpleToolkit/preferences.json")
 
-def ensure_preferences_dir():
-    """确保目录和文件存在且有效，如果文件损坏则删除并重建"""
+# 下载、烧录、USB 端口和硬件变化等后台进度统一经 /api/events 推送到页面
+event_bus = EventBus()
+FINAL_STATUSES = ('completed', 'cancelled', 'error')    # 任务结束后推送完最终状态即不再保留
+
+def load_http_client():
+    """所有对外请求（更新检查、镜像列表、镜像下载）共用 http_client 的连接池"""
+    import http_client
+    http_client.configure(user_agent=f'SimpleToolkit/{APP_VERSION}',
+                          proxy=load_preferences().get('httpProxy', ''))
+    return http_client
+
+def create_update_checker():
+    """后台更新检查，遵循“自动检查更新”设置"""
+    http_client.resolve()
+    from update_checker import UpdateChecker
+    return UpdateChecker(
+        APP_VERSION,
+        enabled=lambda: load_preferences()['autoUpdateCheck']
+    )
+
+def create_burn_engine():
+    """镜像烧录任务在后台线程执行，进度经 event_bus 推送，也可通过 /api/burn/<id> 查询"""
+    from burn_engine import BurnEngine
+    return BurnEngine(on_progress=lambda job: event_bus.publish('burn', job['id'], job,
+                                                               final=job['status'] in FINAL_STATUSES))
+
+def create_hardware_inventory():
+    """硬件信息按类别缓存，接口直接返回缓存并在后台刷新过期的类别"""
+    from hardware_probe import HardwareInventory
+    inventory = HardwareInventory()
+    inventory.add_listener(publish_hardware_change)
+    # 首次打开硬件信息页面时才开始监视设备变化
     try:
-        PREFERENCES_PATH.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 如果文件不存在，直接创建默认设置
-        if not PREFERENCES_PATH.exists():
-            return reset_preferences_to_default()
-            
-        # 验证文件内容是否有效
-        try:
-            with open(PREFERENCES_PATH, 'r') as f:
-                json.load(f)  # 尝试解析验证
-            return True
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"偏好设置文件损坏: {str(e)}")
-            # 文件损坏，删除并重建
-            try:
-                PREFERENCES_PATH.unlink()  # 删除损坏的文件
-            except Exception as e:
-                print(f"删除损坏的偏好设置文件失败: {str(e)}")
-            return reset_preferences_to_default()
-            
+        inventory.start_watching()
     except Exception as e:
-        print(f"初始化偏好设置目录失败: {str(e)}")
-        return reset_preferences_to_default()
-    
-def reset_preferences_to_default():
-    """重置为默认偏好设置，确保创建新文件"""
-    default_prefs = {
-        'themeColor': None,
-        'themeMode': 'system',
-        'animationsEnabled': True,
-        'autoUpdateCheck': True,
-        'developerMode': False,
-        'radioGroups': {}
-    }
+        print(f"启动硬件监视失败: {str(e)}")
+    return inventory
+
+def create_usb_mapper():
+    """USB 端口映射，记录的端口设置与偏好设置放在同一目录"""
+    from usb_mapper import UsbMapper
+    mapper = UsbMapper(PREFERENCES_PATH.parent / 'usb_map.json')
+    mapper.add_listener(publish_usb_update)
+    # 首次打开USB映射页面时才枚举端口并订阅热插拔事件
     try:
-        with open(PREFERENCES_PATH, 'w') as f:
-            json.dump(default_prefs, f, indent=2)
-        print("已创建新的默认偏好设置文件")
-        return default_prefs
+        mapper.scan()
+        mapper.start_watching()
     except Exception as e:
-        print(f"创建默认偏好设置文件失败: {str(e)}")
-        return default_prefs
+        print(f"枚举USB端口失败: {str(e)}")
+    return mapper
 
-def load_preferences():
-    """加载并验证偏好设置文件"""
-    default_prefs = {
+def create_ssdt_service():
+    """SSDT 生成与 ACPI 工具共用一份表索引，索引按表内容缓存到磁盘"""
+    from ssdt_generator import SsdtService
+    return SsdtService(cache_dir=PREFERENCES_PATH.parent / 'acpi_index')
+
+def create_efi_config_service():
+    """EFI编辑器后端，首次保存前把原配置备份到“EFI备份目录”"""
+    from efi_config import EfiConfigService
+    return EfiConfigService(backup_dir=load_preferences()['efiBackupDir'])
+
+def create_download_handler():
+    """下载调度器；未完成下载的日志索引与偏好设置放在同一目录"""
+    http_client.resolve()
+    from download_handle import DownloadHandler
+    from image_library import ImageLibrary
+    from mirrors import MirrorManager
+    prefs = load_preferences()
+    return DownloadHandler(
+        on_progress=lambda download: event_bus.publish('download', download['id'], download,
+                                                       final=download['status'] in FINAL_STATUSES),
+        journal_index=PREFERENCES_PATH.parent / 'pending_downloads.json',
+        catalog_cache=PREFERENCES_PATH.parent / 'dmg_list_cache.json',
+        max_concurrent=prefs['maxConcurrentDownloads'],
+        rate_limit=prefs['downloadRateLimit'],
+        library=ImageLibrary(PREFERENCES_PATH.parent / 'images', quota=prefs['imageLibraryQuota']),
+        mirrors=MirrorManager(PREFERENCES_PATH.parent / 'mirror_stats.json')
+    )
+
+def create_download_manager():
+    """与主窗口绑定的文件对话框"""
+    from download_handle import DownloadManager
+    return DownloadManager(window)
+
+http_client = LazyService('http_client', load_http_client, startup_profiler)
+update_checker = LazyService('update_checker', create_update_checker, startup_profiler)
+burn_engine = LazyService('burn_engine', create_burn_engine, startup_profiler)
+hardware_inventory = LazyService('hardware_probe', create_hardware_inventory, startup_profiler)
+usb_mapper = LazyService('usb_mapper', create_usb_mapper, startup_profiler)
+ssdt_service = LazyService('ssdt_generator', create_ssdt_service, startup_profiler)
+efi_config = LazyService('efi_config', create_efi_config_service, startup_profiler)
+download_handler = LazyService('download_handle', create_download_handler, startup_profiler)
+download_manager = LazyService('download_manager', create_download_manager, startup_profiler)
+
+# 在 __main__ 中创建
+window = None
+
+def publish_usb_update(update):
+    """USB 端口变化：完整映射替换该通道的全部状态，增量按端口合并"""
+    if update['full']:
+        event_bus.publish('usb', 'map', update, reset=True)
+        return
+    for port in update['ports']:
+        event_bus.publish('usb', port['id'], port)
+    event_bus.publish('usb', 'warnings', {'warnings': update['warnings']})
+
+def publish_hardware_change(categories):
+    """硬件变化只通知类别，页面按需重新获取"""
+    for category in categories:
+        event_bus.publish('hardware', category, {'changed_at': time.time()})
+
+def default_preferences():
+    """返回默认偏好设置"""
+    return {
         'themeColor': None,
         'themeMode': 'system',
         'animationsEnabled': True,
         'autoUpdateCheck': True,
         'developerMode': False,
+        'maxConcurrentDownloads': 2,
+        'downloadRateLimit': 0,
+        'imageLibraryQuota': 32 * 1024 ** 3,
+        'httpProxy': '',
+        'efiBackupDir': str(Path.home() / 'Documents' / 'EFI_Backup'),
         'radioGroups': {}
     }
+
+def validate_preferences(prefs):
+    """验证偏好设置的数据结构，无效字段替换为默认值"""
+    if not isinstance(prefs, dict):
+        raise ValueError("偏好设置必须是字典")
+    default_prefs = default_preferences()
+    
+    # 验证每个字段
+    valid_prefs = {}
+    valid_prefs['themeColor'] = prefs.get('themeColor') if isinstance(prefs.get('themeColor'), (str, type(None))) else None
     
+    valid_prefs['themeMode'] = prefs.get('themeMode', 'system')
+    if valid_prefs['themeMode'] not in ['light', 'dark', 'system']:
+        valid_prefs['themeMode'] = 'system'
+    
+    for bool_key in ['animationsEnabled', 'autoUpdateCheck', 'developerMode']:
+        valid_prefs[bool_key] = bool(prefs.get(bool_key, default_prefs[bool_key]))
+    
+    valid_prefs['maxConcurrentDownloads'] = parse_int_setting(
+        prefs.get('maxConcurrentDownloads'), default_prefs['maxConcurrentDownloads'], 1, 8)
+    valid_prefs['downloadRateLimit'] = parse_int_setting(
+        prefs.get('downloadRateLimit'), default_prefs['downloadRateLimit'], 0)
+    valid_prefs['imageLibraryQuota'] = parse_int_setting(
+        prefs.get('imageLibraryQuota'), default_prefs['imageLibraryQuota'], 0)
+    
+    valid_prefs['httpProxy'] = prefs.get('httpProxy') if isinstance(prefs.get('httpProxy'), str) else ''
+    valid_prefs['efiBackupDir'] = prefs['efiBackupDir'] if isinstance(prefs.get('efiBackupDir'), str) else default_prefs['efiBackupDir']
+    
+    valid_prefs['radioGroups'] = prefs.get('radioGroups', {})
+    if not isinstance(valid_prefs['radioGroups'], dict):
+        valid_prefs['radioGroups'] = {}
+    
+    return valid_prefs
+
+# 偏好设置常驻内存，读请求不访问磁盘，修改后合并延迟写盘
+preferences_store = PreferencesStore(PREFERENCES_PATH, validate_preferences, default_preferences)
+
+def ensure_preferences_dir():
+    """确保目录和文件存在且有效，如果文件损坏则使用默认设置重建"""
     try:
-        # 确保文件存在
-        if not PREFERENCES_PATH.exists():
-            save_preferences(default_prefs)
-            return default_prefs
-        
-        # 读取文件
-        with open(PREFERENCES_PATH, 'r') as f:
-            prefs = json.load(f)
-        
-        # 验证数据结构
-        if not isinstance(prefs, dict):
-            raise ValueError("偏好设置必须是字典")
-        
-        # 验证每个字段
-        valid_prefs = {}
-        valid_prefs['themeColor'] = prefs.get('themeColor') if isinstance(prefs.get('themeColor'), (str, type(None))) else None
-        
-        valid_prefs['themeMode'] = prefs.get('themeMode', 'system')
-        if valid_prefs['themeMode'] not in ['light', 'dark', 'system']:
-            valid_prefs['themeMode'] = 'system'
-        
-        for bool_key in ['animationsEnabled', 'autoUpdateCheck', 'developerMode']:
-            valid_prefs[bool_key] = bool(prefs.get(bool_key, default_prefs[bool_key]))
-        
-        valid_prefs['radioGroups'] = prefs.get('radioGroups', {})
-        if not isinstance(valid_prefs['radioGroups'], dict):
-            valid_prefs['radioGroups'] = {}
-        
-        return valid_prefs
+        PREFERENCES_PATH.parent.mkdir(parents=True, exist_ok=True)
+        preferences_store.load()
+        return preferences_store.flush()
+    except Exception as e:
+        print(f"初始化偏好设置目录失败: {str(e)}")
+        return False
     
+def reset_preferences_to_default():
+    """重置为默认偏好设置并立即写盘"""
+    default_prefs = default_preferences()
+    preferences_store.replace(default_prefs)
+    if preferences_store.flush():
+        print("已创建新的默认偏好设置文件")
+    return default_prefs
+
+def load_preferences():
+    """返回内存中的偏好设置副本（首次调用时从文件加载并验证）"""
+    try:
+        return preferences_store.get()
     except Exception as e:
         print(f"加载偏好设置出错，使用默认值: {str(e)}")
-        return default_prefs
+        return default_preferences()
+
 
+def parse_int_setting(value, default, minimum=None, maximum=None):
+    """解析整数设置项，无效时返回默认值，并限制在给定范围内"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    if minimum is not None:
+        value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+def apply_download_preferences(prefs):
+    """把下载相关设置同步到下载调度器（尚未加载时创建时会读取最新设置）"""
+    if not download_handler.loaded:
+        return
+    download_handler.configure(
+        max_concurrent=prefs.get('maxConcurrentDownloads'),
+        rate_limit=prefs.get('downloadRateLimit')
+    )
+    download_handler.library.configure(quota=prefs.get('imageLibraryQuota'))
+
+def apply_developer_preferences(prefs):
+    """开发者模式开启时记录接口耗时、下载/烧录各阶段计数和事件推送情况"""
+    metrics.enable(prefs.get('developerMode', False))
+
+def apply_efi_preferences(prefs):
+    """把EFI备份目录同步到EFI编辑器（为空时保存前不备份）"""
+    if efi_config.loaded:
+        efi_config.configure(backup_dir=prefs.get('efiBackupDir'))
+
+def apply_network_preferences(prefs):
+    """把代理设置同步到共享HTTP会话（尚未加载时加载时会读取最新设置）"""
+    if http_client.loaded:
+        http_client.configure(proxy=prefs.get('httpProxy', ''))
 
 def resource_path(relative_path):
     """获取资源的绝对路径"""
@@ -196,7 +345,7 @@ HTML = r"""
             <div class="section-header">
                 <h2 class="section-title">概览</h2>
                 <div class="version-container">
-                    <span class="badge" id="current-version">v1.0.1</span>
+                    <span class="badge" id="current-version">v{{ app_version }}</span>
                     <span class="version-badge update-badge"></span>
                 </div>
             </div>
@@ -263,10 +412,10 @@ HTML = r"""
                 <p>检测并映射您的USB端口，生成适合您主板的USB定制文件</p>
                 
                 <div style="margin-top: 20px;">
-                    <button class="btn btn-primary">
+                    <button id="detect-usb-btn" class="btn btn-primary">
                         <i class="fas fa-search"></i> 检测USB端口
                     </button>
-                    <button class="btn btn-outline" style="margin-left: 10px;">
+                    <button id="export-usb-btn" class="btn btn-outline" style="margin-left: 10px;">
                         <i class="fas fa-file-export"></i> 导出配置
                     </button>
                 </div>
@@ -303,7 +452,7 @@ HTML = r"""
                 <div class="card">
                     <h3 class="card-title"><i class="fas fa-bolt"></i>电源管理</h3>
                     <p>生成CPU电源管理相关的SSDT补丁</p>
-                    <button class="btn btn-primary" style="margin-top: 15px;">
+                    <button id="ssdt-power-btn" class="btn btn-primary" style="margin-top: 15px;">
                         <i class="fas fa-magic"></i> 一键生成
                     </button>
                 </div>
@@ -312,14 +461,14 @@ HTML = r"""
                     <h3 class="card-title"><i class="fas fa-plug"></i>设备补丁</h3>
                     <p>为特定设备生成SSDT补丁</p>
                     <div style="margin-top: 15px;">
-                        <select class="form-control" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd; margin-bottom: 10px;">
-                            <option>选择设备类型</option>
-                            <option>USB控制器</option>
-                            <option>以太网卡</option>
-                            <option>声卡</option>
-                            <option>显卡</option>
+                        <select id="ssdt-device-select" class="form-control" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd; margin-bottom: 10px;">
+                            <option value="">选择设备类型</option>
+                            <option value="usbx">USB控制器</option>
+                            <option value="ethernet">以太网卡</option>
+                            <option value="hdef">声卡</option>
+                            <option value="igpu">显卡</option>
                         </select>
-                        <button class="btn btn-outline" style="width: 100%;">
+                        <button id="ssdt-device-btn" class="btn btn-outline" style="width: 100%;">
                             <i class="fas fa-cog"></i> 生成补丁
                         </button>
                     </div>
@@ -328,7 +477,7 @@ HTML = r"""
                 <div class="card">
                     <h3 class="card-title"><i class="fas fa-file-import"></i>导入SSDT</h3>
                     <p>导入已有的SSDT文件进行编辑</p>
-                    <button class="btn btn-primary" style="margin-top: 15px;">
+                    <button id="ssdt-import-btn" class="btn btn-primary" style="margin-top: 15px;">
                         <i class="fas fa-folder-open"></i> 选择文件
                     </button>
                 </div>
@@ -336,12 +485,12 @@ HTML = r"""
             
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-code"></i>SSDT编辑器</h3>
-                <textarea style="width: 100%; height: 300px; padding: 10px; border-radius: 8px; border: 1px solid #ddd; font-family: monospace; resize: vertical;"></textarea>
+                <textarea id="ssdt-editor" spellcheck="false" style="width: 100%; height: 300px; padding: 10px; border-radius: 8px; border: 1px solid #ddd; font-family: monospace; resize: vertical;"></textarea>
                 <div style="margin-top: 15px; display: flex; justify-content: flex-end;">
-                    <button class="btn btn-outline">
+                    <button id="ssdt-save-btn" class="btn btn-outline">
                         <i class="fas fa-save"></i> 保存
                     </button>
-                    <button class="btn btn-primary" style="margin-left: 10px;">
+                    <button id="ssdt-export-btn" class="btn btn-primary" style="margin-left: 10px;">
                         <i class="fas fa-download"></i> 导出
                     </button>
                 </div>
@@ -392,10 +541,9 @@ HTML = r"""
                 <div class="card">
                     <h3 class="card-title"><i class="fas fa-file-archive"></i>选择镜像</h3>
                     <div style="margin-top: 15px;">
-                        <div style="border: 2px dashed #ddd; border-radius: 8px; padding: 20px; text-align: center; cursor: pointer;">
+                        <div id="burn-source" style="border: 2px dashed #ddd; border-radius: 8px; padding: 20px; text-align: center; cursor: pointer;">
                             <i class="fas fa-cloud-upload-alt" style="font-size: 24px; color: var(--text-light);"></i>
-                            <p style="margin-top: 10px; color: var(--text-light);">点击选择或拖放镜像文件</p>
-                            <input type="file" style="display: none;">
+                            <p id="burn-source-name" style="margin-top: 10px; color: var(--text-light); word-break: break-all;">点击选择镜像文件</p>
                         </div>
                         <p style="margin-top: 10px; font-size: 12px; color: var(--text-light);">支持格式: .dmg, .iso, .img</p>
                     </div>
@@ -404,18 +552,13 @@ HTML = r"""
                 <div class="card">
                     <h3 class="card-title"><i class="fas fa-usb"></i>选择目标设备</h3>
                     <div style="margin-top: 15px;">
-                        <select class="form-control" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
-                            <option>选择USB设备</option>
-                            <option>SanDisk Ultra 32GB (F:)</option>
-                            <option>Samsung BAR Plus 64GB (G:)</option>
+                        <select id="burn-target" class="form-control" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+                            <option value="">选择USB设备</option>
                         </select>
                         <div style="margin-top: 15px;">
                             <div style="display: flex; justify-content: space-between; margin-bottom: 5px;">
                                 <span>容量</span>
-                                <span>28.8 GB 可用 / 32 GB</span>
-                            </div>
-                            <div class="progress-container">
-                                <div class="progress-bar" style="width: 90%"></div>
+                                <span id="burn-target-size">--</span>
                             </div>
                         </div>
                     </div>
@@ -426,16 +569,25 @@ HTML = r"""
                 <h3 class="card-title"><i class="fas fa-fire"></i>烧录选项</h3>
                 <div style="margin-top: 15px;">
                     <label style="display: flex; align-items: center; margin-bottom: 10px; cursor: pointer;">
-                        <input type="checkbox" style="margin-right: 10px;"> 格式化目标设备
+                        <input type="checkbox" id="burn-format" style="margin-right: 10px;"> 格式化目标设备
                     </label>
                     <label style="display: flex; align-items: center; margin-bottom: 10px; cursor: pointer;">
-                        <input type="checkbox" style="margin-right: 10px;"> 验证烧录结果
+                        <input type="checkbox" id="burn-verify" style="margin-right: 10px;" checked> 验证烧录结果
                     </label>
-                    <label style="display: flex; align-items: center; cursor: pointer;">
-                        <input type="checkbox" style="margin-right: 10px;"> 添加OpenCore引导
+                    <label style="display: flex; align-items: center; cursor: not-allowed; color: var(--text-light);" title="暂不支持">
+                        <input type="checkbox" style="margin-right: 10px;" disabled> 添加OpenCore引导
                     </label>
                 </div>
-                <button class="btn btn-primary" style="margin-top: 20px; width: 100%; padding: 12px;">
+                <div id="burn-progress" style="margin-top: 20px; display: none;">
+                    <div style="display: flex; justify-content: space-between; margin-bottom: 5px;">
+                        <span id="burn-status">--</span>
+                        <span id="burn-percent">0%</span>
+                    </div>
+                    <div class="progress-container">
+                        <div class="progress-bar" id="burn-progress-bar" style="width: 0%"></div>
+                    </div>
+                </div>
+                <button class="btn btn-primary" id="burn-start" style="margin-top: 20px; width: 100%; padding: 12px;">
                     <i class="fas fa-burn"></i> 开始烧录
                 </button>
             </div>
@@ -450,128 +602,60 @@ HTML = r"""
             
             <div class="card">
                 <h3 class="card-title"><i class="fas fa-desktop"></i>系统概览</h3>
-                <div class="hardware-info" style="margin-top: 15px;">
-                    <div class="info-item">
-                        <div class="info-label">操作系统</div>
-                        <div class="info-value">Windows 11 Pro</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">系统类型</div>
-                        <div class="info-value">64位操作系统</div>
-                    </div>
+                <div class="hardware-info" id="hw-system" style="margin-top: 15px;">
                     <div class="info-item">
-                        <div class="info-label">主板</div>
-                        <div class="info-value">ASUS ROG STRIX Z690-E</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">处理器</div>
-                        <div class="info-value">Intel Core i9-12900K</div>
+                        <div class="info-label">状态</div>
+                        <div class="info-value">检测中...</div>
                     </div>
                 </div>
             </div>
             
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-microchip"></i>处理器</h3>
-                <div class="hardware-info" style="margin-top: 15px;">
-                    <div class="info-item">
-                        <div class="info-label">名称</div>
-                        <div class="info-value">Intel Core i9-12900K</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">核心数</div>
-                        <div class="info-value">16 (8P+8E)</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">线程数</div>
-                        <div class="info-value">24</div>
-                    </div>
+                <div class="hardware-info" id="hw-cpu" style="margin-top: 15px;">
                     <div class="info-item">
-                        <div class="info-label">基础频率</div>
-                        <div class="info-value">3.2 GHz</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">最大频率</div>
-                        <div class="info-value">5.2 GHz</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">缓存</div>
-                        <div class="info-value">30 MB</div>
+                        <div class="info-label">状态</div>
+                        <div class="info-value">检测中...</div>
                     </div>
                 </div>
             </div>
             
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-memory"></i>内存</h3>
-                <div class="hardware-info" style="margin-top: 15px;">
-                    <div class="info-item">
-                        <div class="info-label">总容量</div>
-                        <div class="info-value">32 GB</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">类型</div>
-                        <div class="info-value">DDR5</div>
-                    </div>
+                <div class="hardware-info" id="hw-memory" style="margin-top: 15px;">
                     <div class="info-item">
-                        <div class="info-label">频率</div>
-                        <div class="info-value">5200 MHz</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">通道</div>
-                        <div class="info-value">双通道</div>
+                        <div class="info-label">状态</div>
+                        <div class="info-value">检测中...</div>
                     </div>
                 </div>
             </div>
             
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-gamepad"></i>显卡</h3>
-                <div class="hardware-info" style="margin-top: 15px;">
-                    <div class="info-item">
-                        <div class="info-label">主显卡</div>
-                        <div class="info-value">NVIDIA GeForce RTX 3080 Ti</div>
-                    </div>
+                <div class="hardware-info" id="hw-gpu" style="margin-top: 15px;">
                     <div class="info-item">
-                        <div class="info-label">显存</div>
-                        <div class="info-value">12 GB GDDR6X</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">集成显卡</div>
-                        <div class="info-value">Intel UHD Graphics 770</div>
+                        <div class="info-label">状态</div>
+                        <div class="info-value">检测中...</div>
                     </div>
                 </div>
             </div>
             
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-hdd"></i>存储设备</h3>
-                <div class="hardware-info" style="margin-top: 15px;">
-                    <div class="info-item">
-                        <div class="info-label">主硬盘</div>
-                        <div class="info-value">Samsung 980 Pro 1TB</div>
-                    </div>
+                <div class="hardware-info" id="hw-storage" style="margin-top: 15px;">
                     <div class="info-item">
-                        <div class="info-label">类型</div>
-                        <div class="info-value">NVMe SSD</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">第二硬盘</div>
-                        <div class="info-value">Seagate Barracuda 2TB</div>
+                        <div class="info-label">状态</div>
+                        <div class="info-value">检测中...</div>
                     </div>
                 </div>
             </div>
             
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-network-wired"></i>网络设备</h3>
-                <div class="hardware-info" style="margin-top: 15px;">
-                    <div class="info-item">
-                        <div class="info-label">有线网卡</div>
-                        <div class="info-value">Intel I225-V 2.5GbE</div>
-                    </div>
+                <div class="hardware-info" id="hw-network" style="margin-top: 15px;">
                     <div class="info-item">
-                        <div class="info-label">无线网卡</div>
-                        <div class="info-value">Intel Wi-Fi 6E AX210</div>
-                    </div>
-                    <div class="info-item">
-                        <div class="info-label">蓝牙</div>
-                        <div class="info-value">蓝牙 5.2</div>
+                        <div class="info-label">状态</div>
+                        <div class="info-value">检测中...</div>
                     </div>
                 </div>
             </div>
@@ -588,7 +672,7 @@ HTML = r"""
                 <div class="card">
                     <h3 class="card-title"><i class="fas fa-key"></i>EFI编辑器</h3>
                     <p>编辑和配置您的EFI分区</p>
-                    <button class="btn btn-primary" style="margin-top: 15px;">
+                    <button id="efi-editor-btn" class="btn btn-primary" style="margin-top: 15px;">
                         <i class="fas fa-edit"></i> 打开编辑器
                     </button>
                 </div>
@@ -604,7 +688,7 @@ HTML = r"""
                 <div class="card">
                     <h3 class="card-title"><i class="fas fa-terminal"></i>ACPI工具</h3>
                     <p>分析和编辑ACPI表</p>
-                    <button class="btn btn-primary" style="margin-top: 15px;">
+                    <button id="acpi-tool-btn" class="btn btn-primary" style="margin-top: 15px;">
                         <i class="fas fa-table"></i> 打开工具
                     </button>
                 </div>
@@ -695,8 +779,8 @@ HTML = r"""
                     <div style="margin-bottom: 15px;">
                         <label style="display: block; margin-bottom: 5px;">EFI备份目录</label>
                         <div style="display: flex; gap: 10px;">
-                            <input type="text" value="C:\Users\Username\Documents\EFI_Backup" style="flex: 1; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
-                            <button class="btn btn-outline">
+                            <input type="text" id="efi-backup-dir" placeholder="留空则保存配置前不备份" style="flex: 1; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+                            <button id="efi-backup-browse-btn" class="btn btn-outline">
                                 <i class="fas fa-folder-open"></i> 浏览
                             </button>
                         </div>
@@ -704,6 +788,27 @@ HTML = r"""
                 </div>
             </div>
             
+            <div class="card" style="margin-top: 20px;">
+                <h3 class="card-title"><i class="fas fa-download"></i>下载设置</h3>
+                <div style="margin-top: 15px;">
+                    <div style="margin-bottom: 15px;">
+                        <label style="display: block; margin-bottom: 5px;">同时下载任务数</label>
+                        <input type="number" id="max-concurrent-downloads" min="1" max="8" value="2" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+                    </div>
+                    
+                    <div style="margin-bottom: 15px;">
+                        <label style="display: block; margin-bottom: 5px;">下载限速 (KB/s，0 为不限速)</label>
+                        <input type="number" id="download-rate-limit" min="0" value="0" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+                    </div>
+                    
+                    <div>
+                        <label style="display: block; margin-bottom: 5px;">本地镜像库容量 (GB，0 为不保留下载过的镜像)</label>
+                        <input type="number" id="image-library-quota" min="0" value="32" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+                        <p id="image-library-usage" style="margin-top: 5px; color: var(--text-light); font-size: 13px;"></p>
+                    </div>
+                </div>
+            </div>
+            
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-cogs"></i>高级设置</h3>
                 <div style="margin-top: 15px;">
@@ -717,6 +822,11 @@ HTML = r"""
                         </select>
                     </div>
                     
+                    <div style="margin-bottom: 15px;">
+                        <label style="display: block; margin-bottom: 5px;">HTTP代理 (留空使用系统设置)</label>
+                        <input type="text" id="http-proxy" placeholder="http://127.0.0.1:7890" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+                    </div>
+                    
                     <div style="margin-bottom: 15px;">
                         <label style="display: flex; align-items: center; cursor: pointer;">
                             <input type="checkbox" id="auto-update-toggle" checked style="margin-right: 10px;">
@@ -733,6 +843,33 @@ HTML = r"""
                 </div>
             </div>
             
+            <div class="card developer-only" id="performance-panel" style="margin-top: 20px;">
+                <h3 class="card-title"><i class="fas fa-tachometer-alt"></i>性能面板</h3>
+                <div style="margin-top: 15px;">
+                    <p style="color: var(--text-light); margin-bottom: 10px;">
+                        开发者模式开启后开始计数，Prometheus 格式：<code>/api/metrics</code>
+                    </p>
+                    <div style="margin-bottom: 15px;">
+                        <button id="metrics-refresh-btn" class="btn btn-outline">
+                            <i class="fas fa-sync-alt"></i> 刷新
+                        </button>
+                        <button id="metrics-reset-btn" class="btn btn-outline" style="margin-left: 10px;">
+                            <i class="fas fa-eraser"></i> 清零
+                        </button>
+                        <button id="metrics-profile-btn" class="btn btn-outline" style="margin-left: 10px;">
+                            <i class="fas fa-microscope"></i> 采样调用栈 (5 秒)
+                        </button>
+                    </div>
+                    <h4>下载 / 烧录各阶段</h4>
+                    <div id="metrics-io" class="metrics-table"></div>
+                    <h4>进度事件推送</h4>
+                    <div id="metrics-events" class="metrics-table"></div>
+                    <h4>接口耗时</h4>
+                    <div id="metrics-routes" class="metrics-table"></div>
+                    <div id="metrics-profile" class="metrics-table"></div>
+                </div>
+            </div>
+            
             <div class="card" style="margin-top: 20px;">
                 <h3 class="card-title"><i class="fas fa-info-circle"></i>关于</h3>
                 <div style="margin-top: 15px;">
@@ -741,7 +878,7 @@ HTML = r"""
                         <div>
                             <h4>SimpleToolkit</h4>
                             <p style="color: var(--text-light); display: flex; align-items: center;">
-                                版本 <span id="current-version">1.0.1</span>
+                                版本 <span id="current-version">{{ app_version }}</span>
                                 <span class="version-badge update-badge" style="margin-left: 10px;"></span>
                             </p>
                             <p style="color: var(--text-light);">作者：laobamac</p>
@@ -779,46 +916,19 @@ HTML = r"""
 @app.route('/api/preferences', methods=['POST'])
 def save_preferences():
     try:
-        # 获取当前偏好设置
-        current_prefs = load_preferences()
-        
         # 获取并验证前端数据
         data = request.get_json()
         if not data:
             raise ValueError("请求数据为空")
         
-        # 处理主题颜色
-        if 'themeColor' in data:
-            try:
-                if data['themeColor'] is not None:
-                    json.loads(data['themeColor'])  # 验证JSON格式
-                current_prefs['themeColor'] = data['themeColor']
-            except json.JSONDecodeError:
-                print("主题颜色JSON格式无效")
-        
-        # 处理主题模式 (修复点)
-        if 'themeMode' in data:
-            if data['themeMode'] in ['light', 'dark', 'system']:
-                current_prefs['themeMode'] = data['themeMode']
-            else:
-                print(f"无效的主题模式: {data['themeMode']}")
-        
-        # 处理其他设置
-        bool_settings = ['animationsEnabled', 'autoUpdateCheck', 'developerMode']
-        for setting in bool_settings:
-            if setting in data:
-                current_prefs[setting] = str(data[setting]).lower() in ('true', '1', 't')
-        
-        # 处理单选按钮组
-        if 'radioGroups' in data and isinstance(data['radioGroups'], dict):
-            for group, value in data['radioGroups'].items():
-                if value is not None:  # 允许保存null/None值
-                    current_prefs['radioGroups'][group] = value
-        
-        # 保存更新后的设置
-        with open(PREFERENCES_PATH, 'w') as f:
-            json.dump(current_prefs, f, indent=2)
+        # 在锁内修改内存中的偏好设置，写盘由存储延迟合并完成
+        with preferences_store.edit() as current_prefs:
+            update_preferences(current_prefs, data)
         
+        apply_download_preferences(current_prefs)
+        apply_network_preferences(current_prefs)
+        apply_developer_preferences(current_prefs)
+        apply_efi_preferences(current_prefs)
         return jsonify({"status": "success"})
     
     except Exception as e:
@@ -829,6 +939,59 @@ def save_preferences():
             "details": str(e)
         }), 400
 
+def update_preferences(current_prefs, data):
+    """把前端提交的设置合并到 current_prefs，忽略无效值"""
+    # 处理主题颜色
+    if 'themeColor' in data:
+        try:
+            if data['themeColor'] is not None:
+                json.loads(data['themeColor'])  # 验证JSON格式
+            current_prefs['themeColor'] = data['themeColor']
+        except json.JSONDecodeError:
+            print("主题颜色JSON格式无效")
+    
+    # 处理主题模式 (修复点)
+    if 'themeMode' in data:
+        if data['themeMode'] in ['light', 'dark', 'system']:
+            current_prefs['themeMode'] = data['themeMode']
+        else:
+            print(f"无效的主题模式: {data['themeMode']}")
+    
+    # 处理其他设置
+    bool_settings = ['animationsEnabled', 'autoUpdateCheck', 'developerMode']
+    for setting in bool_settings:
+        if setting in data:
+            current_prefs[setting] = str(data[setting]).lower() in ('true', '1', 't')
+    
+    # 处理下载调度设置（限速单位：字节/秒，0 为不限速）
+    if 'maxConcurrentDownloads' in data:
+        current_prefs['maxConcurrentDownloads'] = parse_int_setting(
+            data['maxConcurrentDownloads'], current_prefs['maxConcurrentDownloads'], 1, 8)
+    if 'downloadRateLimit' in data:
+        current_prefs['downloadRateLimit'] = parse_int_setting(
+            data['downloadRateLimit'], current_prefs['downloadRateLimit'], 0)
+    if 'imageLibraryQuota' in data:
+        current_prefs['imageLibraryQuota'] = parse_int_setting(
+            data['imageLibraryQuota'], current_prefs['imageLibraryQuota'], 0)
+    
+    # 处理网络代理（空字符串表示使用系统代理设置）
+    if 'httpProxy' in data:
+        proxy = str(data['httpProxy'] or '').strip()
+        if proxy and not proxy.startswith(('http://', 'https://', 'socks5://', 'socks5h://')):
+            print(f"无效的代理地址: {proxy}")
+        else:
+            current_prefs['httpProxy'] = proxy
+    
+    # 处理EFI备份目录（空字符串表示保存配置前不备份）
+    if 'efiBackupDir' in data:
+        current_prefs['efiBackupDir'] = str(data['efiBackupDir'] or '').strip()
+    
+    # 处理单选按钮组
+    if 'radioGroups' in data and isinstance(data['radioGroups'], dict):
+        for group, value in data['radioGroups'].items():
+            if value is not None:  # 允许保存null/None值
+                current_prefs['radioGroups'][group] = value
+
 def select_save_path(filename=""):
             try:
                 # 确保下载目录存在
@@ -840,6 +1003,7 @@ def select_save_path(filename=""):
                 safe_name = safe_name[:255]  # 限制长度
             
                 # 调用文件对话框
+                import webview
                 result = window.create_file_dialog(
                     webview.SAVE_DIALOG,
                     directory=downloads_dir,
@@ -853,6 +1017,7 @@ def select_save_path(filename=""):
 
 def open_file_dialog(filename):
     try:
+        import webview
         result = window.create_file_dialog(
             webview.SAVE_DIALOG,
             directory=str(Path.home() / "Downloads"),
@@ -878,98 +1043,145 @@ def get_all_radio_values(html_content):
 @app.route('/api/preferences', methods=['GET'])
 def get_preferences():
     try:
-        prefs = load_preferences()
-        # 确保返回所有必要字段
-        default_prefs = {
-            'themeColor': None,
-            'themeMode': 'system',
-            'animationsEnabled': True,
-            'autoUpdateCheck': True,
-            'developerMode': False,
-            'radioGroups': {}
-        }
-        # 合并默认值和已保存值
-        for key in default_prefs:
-            if key not in prefs:
-                prefs[key] = default_prefs[key]
-        return jsonify(prefs)
+        # 直接返回内存中的设置，已在加载时验证并补全所有字段
+        return jsonify(load_preferences())
     except Exception as e:
         print(f"加载偏好设置出错: {str(e)}")
-        return jsonify(default_prefs), 200
+        return jsonify(default_preferences()), 200
 
 @app.cli.command('init-preferences')
 def initialize_preferences():
     """初始化偏好设置文件"""
+    preferences_existed = PREFERENCES_PATH.exists()
     ensure_preferences_dir()
-    if not PREFERENCES_PATH.exists():
+    if not preferences_existed:
         radio_groups = get_all_radio_values(HTML)
-        default_prefs = {
-            'themeColor': None,
-            'themeMode': 'system',
-            'animationsEnabled': 'true',
-            'autoUpdateCheck': 'true',
-            'developerMode': 'false',
-            'radioGroups': {name: None for name in radio_groups}
-        }
-        save_preferences(default_prefs)
+        with preferences_store.edit() as prefs:
+            prefs['radioGroups'] = {name: None for name in radio_groups}
+        preferences_store.flush()
+
+@app.cli.command('convert-dmg')
+@click.argument('source')
+@click.argument('output')
+@click.option('--workers', type=int, default=None, help='解压进程数，默认为CPU核心数')
+def convert_dmg(source, output, workers):
+    """把 UDIF 镜像（.dmg）转换为原始磁盘镜像（.img）"""
+    from udif import UdifImage
+    image = UdifImage(source)
+    with open(output, 'wb') as f:
+        for piece in image.iter_raw(workers):
+            f.write(piece)
+    print(f"已转换 {image.size} 字节到 {output}")
+
+@app.cli.command('serve')
+@click.option('--host', default=SERVER_HOST, help='监听地址，默认只允许本机访问')
+@click.option('--port', type=int, default=0, help='监听端口，默认随机选择空闲端口')
+@click.option('--workers', type=int, default=SERVER_WORKERS, help='处理请求的线程数')
+def serve(host, port, workers):
+    """不打开窗口，只启动本地服务（在浏览器中访问）"""
+    server = LocalServer(app, host=host, port=port, workers=workers)
+    apply_developer_preferences(load_preferences())
+    threading.Thread(target=build_assets, daemon=True).start()
+    print(f"服务已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    shutdown_services(server)
+
+def shutdown_services(server):
+    """退出前依次结束事件流、暂停下载并写好日志、等待进行中的请求完成，最后把设置落盘"""
+    event_bus.close()
+    if download_handler.loaded:
+        download_handler.shutdown()
+    server.stop()
+    preferences_store.flush()
+    if usb_mapper.loaded:
+        usb_mapper.flush()
+
+# 首页只渲染一次，之后直接返回缓存的（预压缩）字节
+home_page = None
+home_page_lock = threading.Lock()
+static_assets = StaticCache(resource_path('static'))
+# 带内容哈希的静态文件，页面中的引用在渲染时改写为这些地址
+asset_pipeline = AssetPipeline(resource_path('static'))
+
+def build_assets():
+    """生成带哈希的静态文件（裁剪字体较慢，在后台执行），完成后首页改用带哈希的地址并预先压缩"""
+    global home_page
+    try:
+        asset_pipeline.build([HTML])
+    except Exception as e:
+        print(f"生成静态文件清单失败: {str(e)}")
+        return
+    with home_page_lock:
+        home_page = None
+    asset_pipeline.warm()
+
+def get_home_page():
+    """渲染首页并缓存，重复调用直接返回缓存；静态文件清单尚未生成时引用原始地址"""
+    global home_page
+    with home_page_lock:
+        if home_page is None:
+            with app.app_context():
+                html = render_template_string(HTML, app_version=APP_VERSION)
+            html = asset_pipeline.rewrite(html)
+            home_page = CachedAsset(html.encode('utf-8'), 'text/html')
+        return home_page
 
 @app.route('/')
 def home():
-    return render_template_string(HTML)
+    return get_home_page().response(request)
 
 @app.route('/static/<path:filename>')
 def static_files(filename):
-    return send_from_directory(resource_path('static'), filename)
+    asset = asset_pipeline.get(filename) or static_assets.get(filename)
+    if asset is None:
+        abort(404)
+    return asset.response(request)
 
 @app.route('/static/webfonts/<path:filename>')
 def webfonts_files(filename):
-    return send_from_directory(resource_path('static/webfonts'), filename)
+    return static_files('webfonts/' + filename)
 
 
 @app.route('/api/check-update')
 def check_update():
-    """检查更新接口（服务端代理）"""
+    """检查更新接口：立即返回后台轮询缓存的结果，force=1 时请求尽快重新检查"""
     try:
-        # 实际请求外部API
-        response = requests.get(
-            'https://stapi.simplehac.cn/checkUpdate',
-            timeout=5,  # 5秒超时
-            headers={'User-Agent': 'SimpleToolkit/1.0'},  # 添加UA标识
-            verify=True  # 验证SSL证书
-        )
+        update_checker.start()
+        if request.args.get('force') == '1':
+            update_checker.request_check()
         
-        # 检查HTTP状态码
-        response.raise_for_status()
+        state = update_checker.snapshot()
+        if state['result']:
+            data = state['result']
+            data['checkedAt'] = state['checked_at']
+            data['checking'] = state['checking']
+            data['lastError'] = state['error']
+            return jsonify(data)
         
-        # 验证响应格式
-        data = response.json()
-        required_fields = ['latestVersion', 'downloadUrl', 'releaseNotes', 'releaseDate']
-        if not all(field in data for field in required_fields):
-            raise ValueError("Invalid API response format")
-            
-        # 添加客户端需要的附加字段
-        data['updateAvailable'] = data['latestVersion'] != '1.0.1'  # 应与客户端版本对比
-        
-        if 'releaseNotes' in data:
-            data['releaseNotes'] = data['releaseNotes'].replace('\\n', '\n')
+        # 还没有可用结果：检查进行中返回202，前端稍后再取
+        if state['checking'] or not state['error']:
+            return jsonify({'pending': True}), 202
+        return jsonify({'error': state['error']}), 503
         
-        return jsonify(data)
-        
-    except requests.exceptions.Timeout:
-        return jsonify({'error': '连接更新服务器超时'}), 504
-    except requests.exceptions.HTTPError as e:
-        return jsonify({'error': f'更新服务器响应异常 ({e.response.status_code})'}), 502
-    except (requests.exceptions.RequestException, ValueError) as e:
-        return jsonify({'error': f'检查更新失败: {str(e)}'}), 500
     except Exception as e:
         return jsonify({'error': f'未知错误: {str(e)}'}), 500
     
 @app.route('/api/dmg-list')
 def get_dmg_list():
-    """获取DMG镜像列表API"""
+    """获取DMG镜像列表API（服务端缓存 + ETag 协商）"""
     try:
-        result = download_handler.get_dmg_list()
-        return jsonify(result)
+        # refresh=1 时同步向服务器确认，否则优先使用缓存
+        force = request.args.get('refresh') == '1'
+        result = download_handler.get_dmg_list(force=force)
+        response = jsonify(result)
+        if result.get('status') == 'success' and result.get('etag'):
+            response.set_etag(result['etag'])
+            response.headers['Cache-Control'] = 'no-cache'
+            response = response.make_conditional(request)
+        return response
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -983,13 +1195,32 @@ def start_download():
         if not data or 'url' not in data or 'save_path' not in data:
             raise ValueError("无效的请求数据")
         
-        download_id = download_handler.start_download(data['url'], data['save_path'])
+        # connections: 分段连接数（可选），服务器不支持 Range 时自动退回单连接
+        # priority: 队列优先级（可选），数值越大越先开始
+        # checksum / chunklist_url: 镜像列表中提供的校验信息（可选），下载时边写边校验
+        # catalog_id: 镜像列表条目 ID（可选），本地镜像库中已有该镜像时直接取出
+        # mirrors: 同一镜像的其它下载地址（可选），下载前测速选择最快的镜像
+        mirrors = data.get('mirrors') or []
+        if not isinstance(mirrors, list):
+            raise ValueError("mirrors 必须是地址列表")
+        download_id = download_handler.start_download(
+            data['url'],
+            data['save_path'],
+            connections=data.get('connections'),
+            priority=data.get('priority', 0),
+            checksum=data.get('checksum'),
+            chunklist_url=data.get('chunklist_url'),
+            catalog_id=data.get('catalog_id'),
+            mirrors=mirrors
+        )
         if not download_id:
             raise Exception("无法启动下载")
-            
+        
+        download = download_handler.get_download(download_id)
         return jsonify({
             'success': True,
-            'download_id': download_id
+            'download_id': download_id,
+            'status': download['status'] if download else 'queued'
         })
     except Exception as e:
         return jsonify({
@@ -1004,7 +1235,11 @@ def cancel_download():
         if not data or 'download_id' not in data:
             raise ValueError("无效的请求数据")
         
-        success = download_handler.cancel_download(data['download_id'])
+        # 默认保留已下载的数据以便续传，discard 为 true 时删除
+        success = download_handler.cancel_download(
+            data['download_id'],
+            discard=bool(data.get('discard', False))
+        )
         return jsonify({
             'success': success,
             'message': '下载已取消' if success else '无法取消下载'
@@ -1014,95 +1249,773 @@ def cancel_download():
             'success': False,
             'message': str(e)
         }), 400
-    
-@app.route('/api/select-save-path', methods=['POST'])
-def api_select_save_path():
+
+@app.route('/api/resume-download', methods=['POST'])
+def resume_download():
     try:
         data = request.get_json()
-        filename = data.get('filename', 'download.dmg')
-        
-        save_path = download_manager.select_save_path(filename)
-        if not save_path:
-            return jsonify({'success': False, 'message': '用户取消选择'})
-            
+        if not data or not (data.get('download_id') or data.get('save_path')):
+            raise ValueError("无效的请求数据")
+
+        download_id = download_handler.resume_download(
+            download_id=data.get('download_id'),
+            save_path=data.get('save_path')
+        )
+        if not download_id:
+            raise Exception("没有可以继续的下载")
+
         return jsonify({
             'success': True,
-            'path': save_path
+            'download_id': download_id
         })
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'选择保存路径失败: {str(e)}'
-        }), 500
-    
-@app.route('/api/verify-path', methods=['POST'])
-def verify_path():
-    data = request.get_json()
-    path = data.get('path')
+            'message': str(e)
+        }), 400
     
+@app.route('/api/downloads')
+def list_downloads():
+    """下载队列列表"""
     try:
-        # 尝试创建测试文件
-        test_path = os.path.join(os.path.dirname(path), 'write_test.tmp')
-        with open(test_path, 'w') as f:
-            f.write('test')
-        os.remove(test_path)
-        return jsonify({'success': True})
+        result = download_handler.list_downloads()
+        result['success'] = True
+        return jsonify(result)
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f"路径验证失败: {str(e)}"
-        }), 400
+            'message': str(e)
+        }), 500
 
-if __name__ == '__main__':
-    # 确保必要的目录存在
-    ensure_preferences_dir()
-    required_dirs = [
-        resource_path('static'),
-        resource_path('static/webfonts'),
-        resource_path('static/fontawesome')
-    ]
-    for dir_path in required_dirs:
-        if not os.path.exists(dir_path):
-            os.makedirs(dir_path)
-    
-    # 创建空的ico文件（如果不存在）
-    ico_path = os.path.join(resource_path('static'), 'gui_toolkit.ico')
-    if not os.path.exists(ico_path):
-        with open(ico_path, 'wb') as f:
-            f.write(b'')
-
-    # 启动Flask服务器
-    import threading
-    t = threading.Thread(target=app.run, kwargs={'port': 5848})
-    t.daemon = True
-    t.start()
-    
-    # 创建PyWebView窗口
-    window = webview.create_window(
-        'SimpleToolkit',
-        'http://localhost:5848',
-        width=1200,
-        height=800,
-        resizable=False,
-        frameless=False,
-        easy_drag=True,
-        transparent=False,
-        on_top=False,
-        confirm_close=False  # 禁用关闭确认
-    )
-    download_handler = DownloadHandler(window)
-    download_manager = DownloadManager(window)
-    window.expose(open_file_dialog)
-    window.expose(select_save_path)
+@app.route('/api/mirrors', methods=['GET'])
+def list_mirrors():
+    """各镜像主机的测速结果（RTT、吞吐量估计、连续失败次数）"""
+    try:
+        return jsonify({'success': True, 'mirrors': download_handler.mirrors.snapshot()})
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f"读取镜像测速结果失败: {str(e)}"
+        }), 500
 
+@app.route('/api/library', methods=['GET'])
+def list_library():
+    """本地镜像库中的镜像及占用空间"""
+    try:
+        result = download_handler.library.list()
+        result['success'] = True
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f"读取镜像库失败: {str(e)}"
+        }), 500
 
-    @window.expose
-    def get_downloads_dir():
-        return str(Path.home() / "Downloads")
+@app.route('/api/library/remove', methods=['POST'])
+def remove_library_image():
+    """从镜像库删除镜像（已保存到下载目录的文件不受影响）"""
+    try:
+        data = request.get_json()
+        if not data or not data.get('sha256'):
+            raise ValueError("无效的请求数据")
+        success = download_handler.library.remove(data['sha256'])
+        return jsonify({
+            'success': success,
+            'message': '已从镜像库删除' if success else '镜像库中没有该镜像'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
 
-    @window.expose
-    def open_file_location(path):
-            os.startfile(os.path.dirname(path))
+@app.route('/api/downloads/reorder', methods=['POST'])
+def reorder_downloads():
+    try:
+        data = request.get_json()
+        if not data or not (isinstance(data.get('order'), list) or 'download_id' in data):
+            raise ValueError("无效的请求数据")
+        
+        success = download_handler.reorder_downloads(
+            order=data.get('order'),
+            download_id=data.get('download_id'),
+            priority=data.get('priority')
+        )
+        return jsonify({
+            'success': success,
+            'message': '队列已更新' if success else '找不到下载任务'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/downloads/pause', methods=['POST'])
+def pause_download():
+    try:
+        data = request.get_json()
+        if not data or 'download_id' not in data:
+            raise ValueError("无效的请求数据")
+        
+        success = download_handler.pause_download(data['download_id'])
+        return jsonify({
+            'success': success,
+            'message': '下载已暂停' if success else '无法暂停下载'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/hardware', methods=['GET'])
+def get_hardware():
+    try:
+        # categories: 逗号分隔的类别（默认全部）；refresh=1 强制重新探测
+        # wait: 最多等待刷新完成的秒数，默认不等待，未完成的类别列在 pending 中
+        categories = [c for c in request.args.get('categories', '').split(',') if c] or None
+        from hardware_probe import CATEGORIES as HARDWARE_CATEGORIES
+        if categories and any(c not in HARDWARE_CATEGORIES for c in categories):
+            raise ValueError("未知的硬件类别")
+        if request.args.get('refresh') == '1':
+            hardware_inventory.refresh(categories, force=True)
+        wait = min(max(float(request.args.get('wait', 0)), 0), 5)
+        result = hardware_inventory.get(categories, wait=wait)
+        return jsonify({
+            'success': True,
+            'categories': result['categories'],
+            'pending': result['pending']
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/events', methods=['GET'])
+def events():
+    """服务端事件流（SSE）：按通道推送合并后的进度增量"""
+    return Response(event_bus.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.before_request
+def start_request_timer():
+    if metrics.is_enabled():
+        g.metrics_started = time.perf_counter()
+
+@app.after_request
+def record_request_timing(response):
+    """按路由模板（而不是具体 URL）统计请求耗时"""
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        metrics.observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """性能计数：默认 Prometheus 文本格式，?format=json 返回设置页面板使用的汇总"""
+    if request.args.get('format') == 'json':
+        return jsonify({'success': True, 'metrics': metrics.snapshot()})
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/metrics/reset', methods=['POST'])
+def reset_metrics():
+    metrics.reset()
+    return jsonify({'success': True})
+
+@app.route('/api/metrics/profile', methods=['GET'])
+def profile_stacks():
+    """采样各线程调用栈，?format=collapsed 返回可直接交给 flamegraph.pl 的折叠格式"""
+    try:
+        if not metrics.is_enabled():
+            raise ValueError("请先在设置中启用开发者模式")
+        profile = metrics.sample_stacks(
+            float(request.args.get('seconds', metrics.DEFAULT_PROFILE_SECONDS)),
+            float(request.args.get('interval', metrics.DEFAULT_PROFILE_INTERVAL))
+        )
+        if request.args.get('format') == 'collapsed':
+            return Response(profile['collapsed'] + '\n', mimetype='text/plain; charset=utf-8')
+        return jsonify({'success': True, 'profile': profile})
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f"调用栈采样失败: {str(e)}"
+        }), 400
+
+@app.route('/api/usb/scan', methods=['POST'])
+def scan_usb_ports():
+    try:
+        usb_map = usb_mapper.scan()
+        return jsonify({
+            'success': usb_map['supported'],
+            'message': None if usb_map['supported'] else '当前系统不支持USB端口映射',
+            'map': usb_map
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/usb/ports', methods=['GET'])
+def get_usb_ports():
+    return jsonify({
+        'success': True,
+        'map': usb_mapper.get_map()
+    })
+
+@app.route('/api/usb/ports', methods=['POST'])
+def update_usb_ports():
+    try:
+        # ports: {端口ID: {'enabled': bool, 'connector': UsbConnector}}
+        data = request.get_json()
+        if not data or not isinstance(data.get('ports'), dict):
+            raise ValueError("无效的请求数据")
+        
+        usb_map = usb_mapper.update_ports(data['ports'])
+        return jsonify({
+            'success': True,
+            'map': usb_map
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/usb/export', methods=['POST'])
+def export_usb_ports():
+    try:
+        data = request.get_json()
+        if not data or 'save_path' not in data:
+            raise ValueError("无效的请求数据")
+        
+        path, warnings = usb_mapper.export(data['save_path'])
+        return jsonify({
+            'success': True,
+            'path': path,
+            'warnings': warnings
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/ssdt/load', methods=['POST'])
+def load_acpi_tables():
+    try:
+        # path: ACPI 表文件或目录，为空时读取本机固件的表
+        data = request.get_json(silent=True) or {}
+        return jsonify({
+            'success': True,
+            'summary': ssdt_service.load(data.get('path'))
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/ssdt/generate', methods=['POST'])
+def generate_ssdt():
+    try:
+        # patches: 补丁ID列表，一次生成全部；options: 公共选项，options[补丁ID] 为单个补丁的选项
+        data = request.get_json()
+        if not data or not isinstance(data.get('patches'), list):
+            raise ValueError("无效的请求数据")
+        
+        results = ssdt_service.generate(data['patches'], data.get('options') or {})
+        return jsonify({
+            'success': True,
+            'patches': {
+                patch: {
+                    'name': result['name'],
+                    'asl': result.get('asl'),
+                    'size': len(result['aml']) if 'aml' in result else 0,
+                    'error': result.get('error')
+                }
+                for patch, result in results.items()
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/ssdt/export', methods=['POST'])
+def export_ssdt():
+    try:
+        data = request.get_json()
+        if not data or 'save_path' not in data or not isinstance(data.get('patches'), list):
+            raise ValueError("无效的请求数据")
+        
+        path = ssdt_service.export(data['patches'], data.get('options') or {}, data['save_path'])
+        return jsonify({
+            'success': True,
+            'path': path
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/ssdt/save', methods=['POST'])
+def save_ssdt_source():
+    try:
+        # 保存编辑器内容：.dsl 直接保存，.aml 需要 iasl 编译
+        data = request.get_json()
+        if not data or 'save_path' not in data or 'source' not in data:
+            raise ValueError("无效的请求数据")
+        
+        from ssdt_generator import save_asl
+        return jsonify({
+            'success': True,
+            'path': save_asl(data['source'], data['save_path'])
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/ssdt/import', methods=['POST'])
+def import_ssdt():
+    try:
+        data = request.get_json()
+        if not data or 'path' not in data:
+            raise ValueError("无效的请求数据")
+        
+        from ssdt_generator import load_asl
+        return jsonify({
+            'success': True,
+            'source': load_asl(data['path'])
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/acpi/search', methods=['GET'])
+def search_acpi():
+    try:
+        # q: 路径片段或 _HID/_CID；types: 逗号分隔的对象类型
+        namespace = ssdt_service.current()
+        types = [t for t in request.args.get('types', '').split(',') if t] or None
+        limit = min(max(int(request.args.get('limit', 200)), 1), 1000)
+        return jsonify({
+            'success': True,
+            'results': namespace.search(request.args.get('q', ''), types, limit)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/acpi/object', methods=['GET'])
+def get_acpi_object():
+    try:
+        namespace = ssdt_service.current()
+        path = request.args.get('path', '')
+        obj = namespace.get(path)
+        if obj is None:
+            raise ValueError(f"找不到对象: {path}")
+        return jsonify({
+            'success': True,
+            'object': namespace.describe(obj),
+            'definitions': [namespace.describe(o) for o in namespace.paths.get(path, [])],
+            'children': namespace.children.get(path, []),
+            'raw': namespace.raw(path),
+            'referenced_by': namespace.references(path)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/acpi/patch', methods=['POST'])
+def acpi_patch_target():
+    try:
+        # 生成重命名对象的 OpenCore ACPI Patch（Find/Replace）
+        data = request.get_json()
+        if not data or 'path' not in data:
+            raise ValueError("无效的请求数据")
+        
+        return jsonify({
+            'success': True,
+            'patch': ssdt_service.current().patch_target(data['path'], data.get('new_name'))
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/efi/open', methods=['POST'])
+def open_efi_config():
+    try:
+        # path: config.plist 或 EFI 文件夹；文件未变化时复用已解析的配置
+        data = request.get_json()
+        if not data or 'path' not in data:
+            raise ValueError("无效的请求数据")
+        
+        return jsonify({
+            'success': True,
+            'summary': efi_config.open(data['path'], reload=bool(data.get('reload')))
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/efi/node', methods=['GET'])
+def get_efi_node():
+    try:
+        # path: 以 / 分隔的路径（如 Kernel/Add/0），键中的 / 写作 ~1
+        return jsonify({
+            'success': True,
+            'node': efi_config.node(request.args.get('path', ''))
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/efi/search', methods=['GET'])
+def search_efi_config():
+    try:
+        limit = min(max(int(request.args.get('limit', 200)), 1), 1000)
+        return jsonify({
+            'success': True,
+            'results': efi_config.search(request.args.get('q', ''), limit)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/efi/patch', methods=['POST'])
+def patch_efi_config():
+    try:
+        # patches: [{'op': 'replace'/'add'/'remove'/'move', 'path', 'value', 'type'（可选）, 'from'（move）}]
+        # 全部成功才生效；save 为真时随后写回文件
+        data = request.get_json()
+        if not data or not isinstance(data.get('patches'), list):
+            raise ValueError("无效的请求数据")
+        
+        result = efi_config.patch(data['patches'], save=bool(data.get('save')))
+        return jsonify(dict(result, success=True))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/efi/save', methods=['POST'])
+def save_efi_config():
+    try:
+        return jsonify(dict(efi_config.save(), success=True))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+def check_burn_target(target):
+    """只允许烧录到硬件探测到的可移动磁盘，拒绝系统盘"""
+    # 烧录前重新探测，设备可能已经拔出或换了一个
+    hardware_inventory.refresh(['storage'], force=True)
+    disks = hardware_inventory.get(['storage'], wait=5)['categories']['storage']['data'] or []
+    disk = next((d for d in disks if d.get('device') == target), None)
+    if disk is None:
+        raise ValueError(f"找不到目标设备: {target}")
+    if disk.get('system'):
+        raise ValueError("不能烧录到系统盘")
+    if not (disk.get('removable') or disk.get('transport') == 'usb'):
+        raise ValueError("只能烧录到可移动磁盘")
+
+@app.route('/api/burn', methods=['POST'])
+def start_burn():
+    try:
+        data = request.get_json()
+        if not data or 'target' not in data or not ('source' in data or 'url' in data):
+            raise ValueError("无效的请求数据")
+        check_burn_target(data['target'])
+        
+        # verify: 写入时计算哈希，写完后回读比较（对应“验证烧录结果”）
+        # format: 烧录前清零设备首尾的分区表（对应“格式化目标设备”）
+        # direct: 使用 O_DIRECT 绕过页缓存（系统不支持时自动关闭）
+        options = {
+            'verify': bool(data.get('verify', True)),
+            'direct': bool(data.get('direct', True)),
+            'wipe': bool(data.get('format', False))
+        }
+        if 'url' in data:
+            # 边下载边烧录：不经过中间文件，save_path（可选）保存一份镜像副本
+            # checksum / chunklist_url 与 /api/start-download 相同，在数据流上校验
+            stream = download_handler.open_stream(
+                data['url'],
+                checksum=data.get('checksum'),
+                chunklist_url=data.get('chunklist_url')
+            )
+            burn_id = burn_engine.start_stream(
+                stream,
+                data['target'],
+                tee_path=data.get('save_path'),
+                **options
+            )
+        else:
+            burn_id = burn_engine.start(data['source'], data['target'], **options)
+        return jsonify({
+            'success': True,
+            'burn_id': burn_id,
+            'status': burn_engine.get(burn_id)['status']
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+@app.route('/api/burn/<burn_id>', methods=['GET'])
+def get_burn(burn_id):
+    job = burn_engine.get(burn_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': '烧录任务不存在'
+        }), 404
+    return jsonify({
+        'success': True,
+        'burn': job
+    })
+
+@app.route('/api/burn/cancel', methods=['POST'])
+def cancel_burn():
+    try:
+        data = request.get_json()
+        if not data or 'burn_id' not in data:
+            raise ValueError("无效的请求数据")
+        
+        success = burn_engine.cancel(data['burn_id'])
+        return jsonify({
+            'success': success,
+            'message': '烧录已取消' if success else '烧录任务不存在'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+@app.route('/api/select-save-path', methods=['POST'])
+def api_select_save_path():
+    try:
+        data = request.get_json()
+        filename = data.get('filename', 'download.dmg')
+        
+        save_path = download_manager.select_save_path(filename)
+        if not save_path:
+            return jsonify({'success': False, 'message': '用户取消选择'})
+            
+        return jsonify({
+            'success': True,
+            'path': save_path
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'选择保存路径失败: {str(e)}'
+        }), 500
+    
+@app.route('/api/select-open-path', methods=['POST'])
+def api_select_open_path():
+    try:
+        data = request.get_json(silent=True) or {}
+        file_types = data.get('file_types') or ["所有文件 (*.*)"]
+        
+        path = download_manager.select_open_path(file_types)
+        if not path:
+            return jsonify({'success': False, 'message': '用户取消选择'})
+            
+        return jsonify({
+            'success': True,
+            'path': path
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'选择文件失败: {str(e)}'
+        }), 500
+    
+@app.route('/api/select-folder', methods=['POST'])
+def api_select_folder():
+    try:
+        path = download_manager.select_folder()
+        if not path:
+            return jsonify({'success': False, 'message': '用户取消选择'})
+            
+        return jsonify({
+            'success': True,
+            'path': path
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'选择文件夹失败: {str(e)}'
+        }), 500
+    
+@app.route('/api/verify-path', methods=['POST'])
+def verify_path():
+    data = request.get_json()
+    path = data.get('path')
+    
+    try:
+        # 尝试创建测试文件
+        test_path = os.path.join(os.path.dirname(path), 'write_test.tmp')
+        with open(test_path, 'w') as f:
+            f.write('test')
+        os.remove(test_path)
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f"路径验证失败: {str(e)}"
+        }), 400
+
+# 启动页：窗口一创建就显示，本地服务就绪后再切换到完整页面
+SHELL_HTML = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { margin: 0; height: 100vh; display: flex; flex-direction: column; align-items: center; justify-content: center;
+               font-family: -apple-system, "Microsoft YaHei", sans-serif; color: #fff;
+               background: linear-gradient(135deg, #3a7bd5, #00d2ff); }
+        .spinner { width: 36px; height: 36px; margin-top: 10px; border: 4px solid rgba(255, 255, 255, 0.3);
+                   border-top-color: #fff; border-radius: 50%; animation: spin 1s linear infinite; }
+        @keyframes spin { to { transform: rotate(360deg); } }
+    </style>
+</head>
+<body>
+    <h2>SimpleToolkit</h2>
+    <div class="spinner"></div>
+</body>
+</html>"""
+
+def prepare_resources():
+    """确保偏好设置和静态资源目录存在"""
+    ensure_preferences_dir()
+    apply_developer_preferences(load_preferences())
+    required_dirs = [
+        resource_path('static'),
+        resource_path('static/webfonts'),
+        resource_path('static/fontawesome')
+    ]
+    for dir_path in required_dirs:
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path)
+
+def start_server(server):
+    """窗口显示启动页后执行：准备目录、渲染首页并启动本地服务，然后切换到完整页面"""
+    startup_profiler.mark('窗口显示启动页')
+    with startup_profiler.phase('准备偏好设置与静态目录'):
+        prepare_resources()
+    # 预先渲染首页，页面请求时无需等待
+    with startup_profiler.phase('渲染首页'):
+        get_home_page()
+    with startup_profiler.phase('启动本地服务器'):
+        server.start()
+    window.load_url(server.url)
+
+def start_background_services():
+    """完整页面加载后再启动后台任务，重模块在这里或首次打开对应页面时才导入"""
+    # 在后台生成带哈希的静态文件
+    threading.Thread(target=build_assets, daemon=True).start()
+
+    # 先恢复上次未完成的下载；每个阶段单独处理异常，一个失败不影响后面的阶段
+    try:
+        with startup_profiler.phase('恢复未完成的下载'):
+            recovered = download_handler.recover_downloads()
+        if recovered:
+            print(f"已恢复 {len(recovered)} 个未完成的下载")
+    except Exception as e:
+        print(f"恢复未完成的下载失败: {str(e)}")
+
+    # 启动后台更新检查
+    try:
+        with startup_profiler.phase('启动更新检查'):
+            update_checker.start()
+    except Exception as e:
+        print(f"启动更新检查失败: {str(e)}")
+
+    # 硬件探测和USB端口枚举在首次打开对应页面时才开始
+    startup_profiler.report()
+
+if __name__ == '__main__':
+    # 打包后的程序在解压子进程中不再执行下面的启动流程
+    multiprocessing.freeze_support()
+    startup_profiler.mark('模块导入完成')
+
+    with startup_profiler.phase('导入 webview'):
+        import webview
+
+    # 本地服务器：线程池处理请求，监听 127.0.0.1 的随机空闲端口（窗口显示后才开始接受请求）
+    server = LocalServer(app)
+
+    # 创建PyWebView窗口，先显示启动页
+    with startup_profiler.phase('创建窗口'):
+        window = webview.create_window(
+            'SimpleToolkit',
+            html=SHELL_HTML,
+            width=1200,
+            height=800,
+            resizable=False,
+            frameless=False,
+            easy_drag=True,
+            transparent=False,
+            on_top=False,
+            confirm_close=False  # 禁用关闭确认
+        )
+    window.expose(open_file_dialog)
+    window.expose(select_save_path)
+
+
+    @window.expose
+    def get_downloads_dir():
+        return str(Path.home() / "Downloads")
+
+    @window.expose
+    def open_file_location(path):
+            os.startfile(os.path.dirname(path))
+
+    # 完整页面（而不是启动页）加载完成后启动后台任务
+    services_started = threading.Event()
+    def on_loaded():
+        url = window.get_current_url() or ''
+        if not url.startswith(server.url) or services_started.is_set():
+            return
+        services_started.set()
+        startup_profiler.mark('页面加载完成')
+        threading.Thread(target=start_background_services, daemon=True).start()
+    window.events.loaded += on_loaded
+
+    # 已有图标时使用（打包时随静态文件一起提供）
+    ico_path = os.path.join(resource_path('static'), 'gui_toolkit.ico')
     # 启动窗口
+    webview.start(start_server, (server,), icon=ico_path if os.path.isfile(ico_path) else None)
 
-    webview.start(icon=ico_path)
\ No newline at end of file
+    # 窗口关闭后再退出，保证下载日志和设置都已写入
+    shutdown_services(server)
\ No newline at end of file
@@ -0,0 +1,651 @@
+import os
+import sys
+import json
+import glob
+import time
+import platform
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# 各类硬件信息的缓存有效期（秒），变化越频繁的越短
+CATEGORY_TTL = {
+    'system': 3600,
+    'cpu': 3600,
+    'memory': 600,
+    'gpu': 600,
+    'storage': 30,
+    'network': 30,
+    'pci': 600
+}
+CATEGORIES = tuple(CATEGORY_TTL)
+WATCH_INTERVAL = 2.0        # 轮询设备变化的间隔（秒）
+PROBE_TIMEOUT = 15          # 外部命令（如 PowerShell）的超时（秒）
+PCI_IDS_PATHS = ('/usr/share/hwdata/pci.ids', '/usr/share/misc/pci.ids', '/usr/share/pci.ids')
+SYSTEM_MOUNTS = ('/', '/boot', '/boot/efi', '/usr', '/var', '/home')    # 所在磁盘视为系统盘
+
+# SMBIOS type 17 中的内存类型编号
+SMBIOS_MEMORY_TYPES = {
+    0x12: 'DDR', 0x13: 'DDR2', 0x18: 'DDR3', 0x1A: 'DDR4', 0x1B: 'LPDDR',
+    0x1C: 'LPDDR2', 0x1D: 'LPDDR3', 0x1E: 'LPDDR4', 0x22: 'DDR5', 0x23: 'LPDDR5'
+}
+
+
+def read_text(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def read_int(path, default=None, base=10):
+    value = read_text(path)
+    try:
+        return int(value, base)
+    except (TypeError, ValueError):
+        return default
+
+
+class PciIds:
+    """按需解析 pci.ids，把厂商/设备 ID 转换为名称"""
+
+    def __init__(self, paths=PCI_IDS_PATHS):
+        self.paths = paths
+        self.lock = threading.Lock()
+        self.vendors = None
+
+    def _load(self):
+        vendors = {}
+        path = next((p for p in self.paths if os.path.exists(p)), None)
+        if path:
+            vendor = None
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if not line.strip() or line.startswith('#'):
+                        continue
+                    if line.startswith('C '):
+                        # 之后是设备类别列表，不需要
+                        break
+                    if not line.startswith('\t'):
+                        vendor = vendors.setdefault(line[:4].lower(), [line[4:].strip(), {}])
+                    elif not line.startswith('\t\t') and vendor is not None:
+                        vendor[1][line[1:5].lower()] = line[5:].strip()
+        return vendors
+
+    def name(self, vendor_id, device_id=None):
+        with self.lock:
+            if self.vendors is None:
+                self.vendors = self._load()
+        vendor = self.vendors.get((vendor_id or '').lower())
+        if not vendor:
+            return None, None
+        return vendor[0], vendor[1].get((device_id or '').lower())
+
+
+pci_ids = PciIds()
+
+
+class Prober:
+    """通用探测器：只依赖 platform 模块，各系统的子类覆盖对应的 probe_* 方法"""
+
+    def probe(self, category):
+        method = getattr(self, f'probe_{category}', None)
+        return method() if method else None
+
+    def fingerprint(self, category):
+        """返回能反映设备增减的轻量指纹，用于判断是否需要重新探测；None 表示不监视"""
+        return None
+
+    def probe_system(self):
+        return {
+            'os': f"{platform.system()} {platform.release()}",
+            'arch': platform.machine(),
+            'board': None,
+            'cpu': platform.processor() or None
+        }
+
+    def probe_cpu(self):
+        return {
+            'name': platform.processor() or None,
+            'cores': None,
+            'threads': os.cpu_count(),
+            'base_mhz': None,
+            'max_mhz': None,
+            'cache_kb': None
+        }
+
+
+class LinuxProber(Prober):
+    """从 sysfs/procfs 读取硬件信息，不调用外部命令"""
+
+    def fingerprint(self, category):
+        if category == 'storage':
+            return tuple(sorted((name, read_text(f'/sys/block/{name}/size'))
+                                for name in os.listdir('/sys/block')))
+        if category == 'network':
+            return tuple(sorted((name, read_text(f'/sys/class/net/{name}/operstate'))
+                                for name in os.listdir('/sys/class/net')))
+        if category in ('pci', 'gpu'):
+            return tuple(sorted(os.listdir('/sys/bus/pci/devices'))) if os.path.isdir('/sys/bus/pci/devices') else ()
+        return None
+
+    def probe_system(self):
+        os_name = None
+        release = read_text('/etc/os-release', '')
+        for line in release.splitlines():
+            if line.startswith('PRETTY_NAME='):
+                os_name = line.split('=', 1)[1].strip().strip('"')
+        dmi = '/sys/class/dmi/id'
+        board = ' '.join(filter(None, [read_text(f'{dmi}/board_vendor'), read_text(f'{dmi}/board_name')]))
+        product = ' '.join(filter(None, [read_text(f'{dmi}/sys_vendor'), read_text(f'{dmi}/product_name')]))
+        return {
+            'os': os_name or f"Linux {platform.release()}",
+            'arch': platform.machine(),
+            'board': board or None,
+            'product': product or None,
+            'cpu': self._cpu_name()
+        }
+
+    @staticmethod
+    def _cpuinfo():
+        processors = []
+        current = {}
+        for line in (read_text('/proc/cpuinfo', '') or '').splitlines():
+            if not line.strip():
+                if current:
+                    processors.append(current)
+                current = {}
+                continue
+            key, _, value = line.partition(':')
+            current[key.strip()] = value.strip()
+        if current:
+            processors.append(current)
+        return processors
+
+    def _cpu_name(self):
+        processors = self._cpuinfo()
+        return processors[0].get('model name') if processors else None
+
+    def probe_cpu(self):
+        processors = self._cpuinfo()
+        first = processors[0] if processors else {}
+        cores = {(p.get('physical id'), p.get('core id')) for p in processors if 'core id' in p}
+        cpu0 = '/sys/devices/system/cpu/cpu0'
+        base = read_int(f'{cpu0}/cpufreq/base_frequency')
+        maximum = read_int(f'{cpu0}/cpufreq/cpuinfo_max_freq')
+        cache_kb = None
+        for index in glob.glob(f'{cpu0}/cache/index*'):
+            if read_text(f'{index}/level') == '3':
+                size = read_text(f'{index}/size', '')
+                if size.endswith('K') and size[:-1].isdigit():
+                    cache_kb = int(size[:-1])
+        if cache_kb is None and first.get('cache size', '').endswith('KB'):
+            cache_kb = int(first['cache size'].split()[0])
+        return {
+            'name': first.get('model name'),
+            'vendor': first.get('vendor_id'),
+            'cores': len(cores) or None,
+            'threads': len(processors) or os.cpu_count(),
+            'base_mhz': base // 1000 if base else None,
+            'max_mhz': maximum // 1000 if maximum else None,
+            'cache_kb': cache_kb
+        }
+
+    def probe_memory(self):
+        total_kb = None
+        for line in (read_text('/proc/meminfo', '') or '').splitlines():
+            if line.startswith('MemTotal:'):
+                total_kb = int(line.split()[1])
+        modules = self._memory_modules()
+        return {
+            'total': total_kb * 1024 if total_kb else None,
+            'type': next((m['type'] for m in modules if m['type']), None),
+            'speed_mhz': max((m['speed'] for m in modules if m['speed']), default=None),
+            'modules': len(modules) or None
+        }
+
+    @staticmethod
+    def _memory_modules():
+        """读取 SMBIOS type 17（内存设备）条目，通常需要 root 权限，无权限时返回空列表"""
+        modules = []
+        for entry in glob.glob('/sys/firmware/dmi/entries/17-*/raw'):
+            try:
+                with open(entry, 'rb') as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            if len(raw) < 0x17:
+                continue
+            size = int.from_bytes(raw[0x0C:0x0E], 'little')
+            if size in (0, 0xFFFF):
+                continue  # 空插槽
+            modules.append({
+                'type': SMBIOS_MEMORY_TYPES.get(raw[0x12]),
+                'speed': int.from_bytes(raw[0x15:0x17], 'little') or None
+            })
+        return modules
+
+    @staticmethod
+    def _pci_device(path):
+        vendor = (read_text(f'{path}/vendor') or '')[2:]
+        device = (read_text(f'{path}/device') or '')[2:]
+        vendor_name, device_name = pci_ids.name(vendor, device)
+        driver = os.path.realpath(f'{path}/driver')
+        return {
+            'address': os.path.basename(os.path.realpath(path)),
+            'vendor_id': vendor,
+            'device_id': device,
+            'class': (read_text(f'{path}/class') or '')[2:],
+            'vendor': vendor_name,
+            'name': device_name,
+            'driver': os.path.basename(driver) if os.path.exists(f'{path}/driver') else None
+        }
+
+    def probe_gpu(self):
+        gpus = []
+        for card in sorted(glob.glob('/sys/class/drm/card[0-9]')):
+            device = f'{card}/device'
+            if not os.path.exists(f'{device}/vendor'):
+                continue
+            info = self._pci_device(device)
+            info['primary'] = read_text(f'{device}/boot_vga') == '1'
+            info['vram'] = read_int(f'{device}/mem_info_vram_total')
+            gpus.append(info)
+        return gpus
+
+    def probe_storage(self):
+        disks = []
+        system = self._system_disks()
+        for name in sorted(os.listdir('/sys/block')):
+            if name.startswith(('loop', 'ram', 'zram', 'dm-', 'md', 'sr')):
+                continue
+            base = f'/sys/block/{name}'
+            sectors = read_int(f'{base}/size', 0)
+            if not sectors:
+                continue
+            path = os.path.realpath(base)
+            if name.startswith('nvme'):
+                transport = 'nvme'
+            elif '/usb' in path:
+                transport = 'usb'
+            elif '/virtio' in path:
+                transport = 'virtio'
+            else:
+                transport = 'sata'
+            disks.append({
+                'name': name,
+                'device': f'/dev/{name}',
+                'model': read_text(f'{base}/device/model'),
+                'size': sectors * 512,
+                'rotational': read_text(f'{base}/queue/rotational') == '1',
+                'removable': read_text(f'{base}/removable') == '1',
+                'transport': transport,
+                'system': name in system
+            })
+        return disks
+
+    def _system_disks(self):
+        """挂载了系统目录（/、/boot 等）的磁盘名"""
+        disks = set()
+        for mount in SYSTEM_MOUNTS:
+            try:
+                dev = os.stat(mount).st_dev
+            except OSError:
+                continue
+            disks |= self._disks_of(os.path.realpath(f'/sys/dev/block/{os.major(dev)}:{os.minor(dev)}'))
+        return disks
+
+    def _disks_of(self, path):
+        # 分区归到所在磁盘，dm/md 设备（LVM、RAID、加密卷）按 slaves 追溯到底层磁盘
+        if not os.path.isdir(path):
+            return set()
+        if os.path.exists(f'{path}/partition'):
+            return {os.path.basename(os.path.dirname(path))}
+        slaves = f'{path}/slaves'
+        names = os.listdir(slaves) if os.path.isdir(slaves) else []
+        if not names:
+            return {os.path.basename(path)}
+        disks = set()
+        for name in names:
+            disks |= self._disks_of(os.path.realpath(f'{slaves}/{name}'))
+        return disks
+
+    def probe_network(self):
+        adapters = []
+        for name in sorted(os.listdir('/sys/class/net')):
+            base = f'/sys/class/net/{name}'
+            if not os.path.exists(f'{base}/device'):
+                continue  # lo、网桥等虚拟接口
+            info = {
+                'name': name,
+                'kind': 'wireless' if os.path.exists(f'{base}/wireless') or os.path.exists(f'{base}/phy80211') else 'ethernet',
+                'mac': read_text(f'{base}/address'),
+                'state': read_text(f'{base}/operstate'),
+                'speed_mbps': max(read_int(f'{base}/speed', 0), 0) or None,
+                'vendor': None,
+                'model': None
+            }
+            if os.path.exists(f'{base}/device/vendor'):
+                pci = self._pci_device(f'{base}/device')
+                info['vendor'], info['model'] = pci['vendor'], pci['name']
+                info['driver'] = pci['driver']
+            adapters.append(info)
+        for hci in sorted(glob.glob('/sys/class/bluetooth/hci[0-9]*')):
+            adapters.append({
+                'name': os.path.basename(hci),
+                'kind': 'bluetooth',
+                'mac': read_text(f'{hci}/address'),
+                'state': None,
+                'speed_mbps': None,
+                'vendor': None,
+                'model': None
+            })
+        return adapters
+
+    def probe_pci(self):
+        return [self._pci_device(path) for path in sorted(glob.glob('/sys/bus/pci/devices/*'))]
+
+
+class WindowsProber(Prober):
+    """通过 PowerShell 的 Get-CimInstance 查询 WMI"""
+
+    @staticmethod
+    def _cim(class_name, properties, where=None, namespace=None):
+        command = f"Get-CimInstance -ClassName {class_name}"
+        if namespace:
+            command += f" -Namespace {namespace}"
+        if where:
+            command += f" -Filter \"{where}\""
+        command += f" | Select-Object {','.join(properties)} | ConvertTo-Json -Compress"
+        result = subprocess.run(
+            ['powershell', '-NoProfile', '-NonInteractive', '-Command', command],
+            capture_output=True, timeout=PROBE_TIMEOUT,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        output = result.stdout.decode('utf-8', 'replace').strip()
+        if not output:
+            return []
+        data = json.loads(output)
+        return data if isinstance(data, list) else [data]
+
+    def probe_system(self):
+        os_info = (self._cim('Win32_OperatingSystem', ['Caption', 'OSArchitecture']) or [{}])[0]
+        board = (self._cim('Win32_BaseBoard', ['Manufacturer', 'Product']) or [{}])[0]
+        cpu = (self._cim('Win32_Processor', ['Name']) or [{}])[0]
+        return {
+            'os': os_info.get('Caption'),
+            'arch': os_info.get('OSArchitecture'),
+            'board': ' '.join(filter(None, [board.get('Manufacturer'), board.get('Product')])) or None,
+            'cpu': (cpu.get('Name') or '').strip() or None
+        }
+
+    def probe_cpu(self):
+        cpu = (self._cim('Win32_Processor', ['Name', 'Manufacturer', 'NumberOfCores',
+                                              'NumberOfLogicalProcessors', 'MaxClockSpeed',
+                                              'L3CacheSize']) or [{}])[0]
+        return {
+            'name': (cpu.get('Name') or '').strip() or None,
+            'vendor': cpu.get('Manufacturer'),
+            'cores': cpu.get('NumberOfCores'),
+            'threads': cpu.get('NumberOfLogicalProcessors'),
+            'base_mhz': cpu.get('MaxClockSpeed'),
+            'max_mhz': None,
+            'cache_kb': cpu.get('L3CacheSize')
+        }
+
+    def probe_memory(self):
+        modules = self._cim('Win32_PhysicalMemory', ['Capacity', 'Speed', 'SMBIOSMemoryType'])
+        return {
+            'total': sum(int(m.get('Capacity') or 0) for m in modules) or None,
+            'type': next((SMBIOS_MEMORY_TYPES.get(m.get('SMBIOSMemoryType')) for m in modules
+                          if SMBIOS_MEMORY_TYPES.get(m.get('SMBIOSMemoryType'))), None),
+            'speed_mhz': max((m.get('Speed') or 0 for m in modules), default=0) or None,
+            'modules': len(modules) or None
+        }
+
+    def probe_gpu(self):
+        gpus = []
+        for i, gpu in enumerate(self._cim('Win32_VideoController', ['Name', 'AdapterRAM', 'PNPDeviceID'])):
+            pnp = gpu.get('PNPDeviceID') or ''
+            gpus.append({
+                'name': gpu.get('Name'),
+                'vendor': None,
+                'vendor_id': pnp.partition('VEN_')[2][:4].lower() or None,
+                'device_id': pnp.partition('DEV_')[2][:4].lower() or None,
+                'primary': i == 0,
+                'vram': gpu.get('AdapterRAM')
+            })
+        return gpus
+
+    def probe_storage(self):
+        disks = []
+        # 存储管理接口标出了启动盘和系统盘，编号与 Win32_DiskDrive 的 Index 相同
+        system = {disk.get('Number') for disk in self._cim('MSFT_Disk', ['Number', 'IsBoot', 'IsSystem'],
+                                                            namespace='root/Microsoft/Windows/Storage')
+                  if disk.get('IsBoot') or disk.get('IsSystem')}
+        for disk in self._cim('Win32_DiskDrive', ['DeviceID', 'Index', 'Model', 'Size', 'InterfaceType',
+                                                  'MediaType']):
+            media = disk.get('MediaType') or ''
+            disks.append({
+                'name': disk.get('DeviceID'),
+                'device': disk.get('DeviceID'),
+                'model': disk.get('Model'),
+                'size': int(disk.get('Size') or 0) or None,
+                'rotational': None,
+                'removable': 'Removable' in media or 'External' in media,
+                'transport': (disk.get('InterfaceType') or '').lower() or None,
+                'system': disk.get('Index') in system
+            })
+        return disks
+
+    def probe_network(self):
+        adapters = []
+        for nic in self._cim('Win32_NetworkAdapter', ['Name', 'MACAddress', 'NetConnectionStatus', 'Speed',
+                                                       'AdapterTypeID', 'Manufacturer'],
+                             where='PhysicalAdapter=True'):
+            name = nic.get('Name') or ''
+            lowered = name.lower()
+            kind = 'wireless' if any(k in lowered for k in ('wi-fi', 'wifi', 'wireless', '802.11')) else 'ethernet'
+            if 'bluetooth' in lowered:
+                kind = 'bluetooth'
+            speed = nic.get('Speed')
+            adapters.append({
+                'name': name,
+                'kind': kind,
+                'mac': nic.get('MACAddress'),
+                'state': 'up' if nic.get('NetConnectionStatus') == 2 else 'down',
+                'speed_mbps': int(speed) // 1000000 if speed else None,
+                'vendor': nic.get('Manufacturer'),
+                'model': name
+            })
+        return adapters
+
+    def probe_pci(self):
+        devices = []
+        for dev in self._cim('Win32_PnPEntity', ['Name', 'DeviceID', 'Service'], where="DeviceID like 'PCI%'"):
+            device_id = dev.get('DeviceID') or ''
+            devices.append({
+                'address': device_id,
+                'vendor_id': device_id.partition('VEN_')[2][:4].lower() or None,
+                'device_id': device_id.partition('DEV_')[2][:4].lower() or None,
+                'class': None,
+                'vendor': None,
+                'name': dev.get('Name'),
+                'driver': dev.get('Service')
+            })
+        return devices
+
+
+# 按 sys.platform 前缀选择探测器，可用 register_prober 为其他系统注册
+PROBERS = {
+    'linux': LinuxProber,
+    'win32': WindowsProber
+}
+
+
+def register_prober(platform_prefix, prober_class):
+    PROBERS[platform_prefix] = prober_class
+
+
+def default_prober():
+    for prefix, prober_class in PROBERS.items():
+        if sys.platform.startswith(prefix):
+            return prober_class()
+    return Prober()
+
+
+class HardwareInventory:
+    """并发探测各类硬件信息并按类别缓存：读取时立即返回缓存，过期或设备变化的类别在后台重新探测"""
+
+    def __init__(self, prober=None, ttl=None, max_workers=4):
+        self.prober = prober or default_prober()
+        self.ttl = dict(CATEGORY_TTL, **(ttl or {}))
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hw-probe')
+        self.cache = {}        # category -> {'data', 'updated_at', 'error'}
+        self.running = {}      # category -> Future
+        self.invalid = set()   # 设备发生变化、需要重新探测的类别
+        self.fingerprints = {}
+        self.watcher = None
+        self.monitor = None
+        self.listeners = []
+
+    def refresh(self, categories=None, force=False):
+        """在后台重新探测过期（或 force 时全部）的类别，返回正在进行的 Future 列表"""
+        now = time.time()
+        futures = []
+        with self.lock:
+            for category in categories or CATEGORIES:
+                if category not in self.ttl:
+                    continue
+                if category in self.running:
+                    futures.append(self.running[category])
+                    continue
+                entry = self.cache.get(category)
+                fresh = entry and now - entry['updated_at'] < self.ttl[category] and category not in self.invalid
+                if fresh and not force:
+                    continue
+                self.invalid.discard(category)
+                future = self.executor.submit(self._probe, category)
+                self.running[category] = future
+                futures.append(future)
+        return futures
+
+    def get(self, categories=None, wait=0.0):
+        """返回缓存的结果并触发过期类别的刷新；wait 为等待刷新完成的最长时间（秒）"""
+        categories = [c for c in (categories or CATEGORIES) if c in self.ttl]
+        futures = self.refresh(categories)
+        if wait > 0 and futures:
+            deadline = time.time() + wait
+            for future in futures:
+                try:
+                    future.result(max(0, deadline - time.time()))
+                except Exception:
+                    pass
+        now = time.time()
+        with self.lock:
+            result = {}
+            for category in categories:
+                entry = self.cache.get(category)
+                result[category] = {
+                    'data': entry['data'] if entry else None,
+                    'updated_at': entry['updated_at'] if entry else None,
+                    'stale': not entry or now - entry['updated_at'] >= self.ttl[category] or category in self.invalid,
+                    'error': entry['error'] if entry else None
+                }
+            pending = [c for c in categories if c in self.running]
+        return {'categories': result, 'pending': pending}
+
+    def invalidate(self, categories):
+        """标记类别已变化，下次读取时重新探测"""
+        with self.lock:
+            self.invalid.update(c for c in categories if c in self.ttl)
+
+    def add_listener(self, callback):
+        """设备变化时回调 callback(categories)"""
+        self.listeners.append(callback)
+
+    def _probe(self, category):
+        started = time.time()
+        try:
+            data = self.prober.probe(category)
+            error = None
+        except Exception as e:
+            print(f"探测硬件信息失败 ({category}): {str(e)}")
+            data = None
+            error = str(e)
+        with self.lock:
+            previous = self.cache.get(category)
+            if error and previous and previous['data'] is not None:
+                # 探测失败时保留上次的结果
+                data = previous['data']
+            self.cache[category] = {'data': data, 'updated_at': started, 'error': error}
+            self.running.pop(category, None)
+        return data
+
+    def start_watching(self, interval=WATCH_INTERVAL):
+        """后台监视设备变化：优先使用 pyudev 事件，否则轮询 sysfs 指纹"""
+        if self.watcher:
+            return
+        target = self._watch_udev if self._udev_monitor() else self._watch_poll
+        self.watcher = threading.Thread(target=target, args=(interval,), daemon=True)
+        self.watcher.start()
+
+    def _changed(self, categories):
+        categories = [c for c in categories if c in self.ttl]
+        if not categories:
+            return
+        self.invalidate(categories)
+        self.refresh(categories)
+        for callback in self.listeners:
+            try:
+                callback(categories)
+            except Exception as e:
+                print(f"硬件变化回调失败: {str(e)}")
+
+    def _watch_poll(self, interval):
+        while True:
+            changed = []
+            for category in CATEGORIES:
+                try:
+                    fingerprint = self.prober.fingerprint(category)
+                except Exception:
+                    fingerprint = None
+                if fingerprint is None:
+                    continue
+                if category in self.fingerprints and self.fingerprints[category] != fingerprint:
+                    changed.append(category)
+                self.fingerprints[category] = fingerprint
+            self._changed(changed)
+            time.sleep(interval)
+
+    # udev 子系统与硬件类别的对应关系
+    UDEV_SUBSYSTEMS = {
+        'block': ['storage'],
+        'net': ['network'],
+        'bluetooth': ['network'],
+        'pci': ['pci', 'gpu', 'network'],
+        'drm': ['gpu']
+    }
+
+    def _udev_monitor(self):
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            import pyudev  # 可选依赖
+        except ImportError:
+            return None
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            for subsystem in self.UDEV_SUBSYSTEMS:
+                monitor.filter_by(subsystem)
+        except Exception as e:
+            print(f"无法订阅 udev 事件，改为轮询: {str(e)}")
+            return None
+        self.monitor = monitor
+        return monitor
+
+    def _watch_udev(self, interval):
+        for device in iter(self.monitor.poll, None):
+            self._changed(self.UDEV_SUBSYSTEMS.get(device.subsystem, []))
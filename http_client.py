@@ -0,0 +1,140 @@
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import poolmanager
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# 所有对外 HTTP 请求共用一个连接池，复用 TCP/TLS 连接
+DEFAULT_TIMEOUT = (5, 30)            # (连接超时, 读取超时) 秒
+MAX_CONNECTIONS_PER_HOST = 24        # 每个主机保持的最大连接数，超出时等待空闲连接（下载调度器按自身上限调大）
+POOL_TIMEOUT = 30                    # 等待空闲连接的最长时间（秒），超时抛出 EmptyPoolError
+MAX_HOSTS = 16                       # 连接池缓存的主机数
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5                  # 重试等待基数（秒），按 2 的幂增长
+RETRY_JITTER = 0.5                   # 每次重试额外的随机等待上限（秒）
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class JitterRetry(Retry):
+    """在指数退避的基础上加入随机抖动，避免多个连接同时重试"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, RETRY_JITTER)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    """连接池已满时最多等待 POOL_TIMEOUT 秒；requests 不传 pool_timeout，默认会一直等待"""
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(timeout=POOL_TIMEOUT if timeout is None else timeout)
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(timeout=POOL_TIMEOUT if timeout is None else timeout)
+
+
+POOL_CLASSES = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+
+class PoolAdapter(HTTPAdapter):
+    """直连和 HTTP 代理使用等待有上限的连接池（SOCKS 代理使用自己的连接池类，保持不变）"""
+
+    @staticmethod
+    def _use_timed_pools(manager):
+        if manager.pool_classes_by_scheme is poolmanager.pool_classes_by_scheme:
+            manager.pool_classes_by_scheme = POOL_CLASSES
+        return manager
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self._use_timed_pools(self.poolmanager)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        return self._use_timed_pools(super().proxy_manager_for(proxy, **proxy_kwargs))
+
+
+_lock = threading.Lock()
+_session = None
+_settings = {
+    'timeout': DEFAULT_TIMEOUT,
+    'proxy': '',
+    'max_per_host': MAX_CONNECTIONS_PER_HOST,
+    'user_agent': 'SimpleToolkit'
+}
+
+
+def _build_session():
+    session = requests.Session()
+    retry = JitterRetry(
+        total=RETRY_TOTAL,
+        connect=RETRY_TOTAL,
+        read=0,  # 流式下载的读取错误由调用方从断点重试
+        status=RETRY_TOTAL,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        backoff_factor=RETRY_BACKOFF,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = PoolAdapter(
+        pool_connections=MAX_HOSTS,
+        pool_maxsize=_settings['max_per_host'],
+        pool_block=True,
+        max_retries=retry
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = _settings['user_agent']
+    proxy = _settings['proxy']
+    if proxy:
+        session.proxies = {'http': proxy, 'https': proxy}
+    return session
+
+
+def get_session():
+    """返回共享的 requests.Session（首次调用时创建）"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def configure(timeout=None, proxy=None, max_per_host=None, user_agent=None):
+    """更新超时、代理、每主机连接数和 UA；影响连接池的设置会重建会话"""
+    global _session
+    with _lock:
+        rebuild = False
+        if timeout is not None:
+            _settings['timeout'] = timeout
+        if proxy is not None and proxy != _settings['proxy']:
+            _settings['proxy'] = proxy
+            rebuild = True
+        if max_per_host is not None and max_per_host != _settings['max_per_host']:
+            _settings['max_per_host'] = max(1, int(max_per_host))
+            rebuild = True
+        if user_agent is not None and user_agent != _settings['user_agent']:
+            _settings['user_agent'] = user_agent
+            if _session is not None:
+                _session.headers['User-Agent'] = user_agent
+        if rebuild and _session is not None:
+            # 旧会话上正在进行的请求不受影响，结束后随旧会话释放
+            _session = _build_session()
+
+
+def request(method, url, timeout=None, **kwargs):
+    """通过共享会话发送请求，未指定超时时使用全局默认值"""
+    if timeout is None:
+        timeout = _settings['timeout']
+    return get_session().request(method, url, timeout=timeout, **kwargs)
+
+
+def get(url, **kwargs):
+    kwargs.setdefault('allow_redirects', True)
+    return request('GET', url, **kwargs)
@@ -0,0 +1,292 @@
+import os
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from integrity import READ_SIZE
+
+DEFAULT_QUOTA = 32 * 1024 ** 3     # 镜像库默认容量上限（字节），0 表示不保留镜像
+FICLONE = 0x40049409               # Linux 上创建共享数据块副本（reflink）的 ioctl
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    filename TEXT,
+    added REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES images(sha256) ON DELETE CASCADE,
+    PRIMARY KEY (kind, value)
+);
+CREATE INDEX IF NOT EXISTS aliases_sha256 ON aliases(sha256);
+CREATE INDEX IF NOT EXISTS images_last_used ON images(last_used);
+"""
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(READ_SIZE)
+            if not data:
+                break
+            sha.update(data)
+    return sha.hexdigest()
+
+
+def reflink(src, dst):
+    """在 Btrfs、XFS 等文件系统上创建共享数据块的副本，不支持时抛出 OSError"""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("当前系统不支持 reflink")
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def link_file(src, dst):
+    """依次尝试硬链接和 reflink，返回使用的方式；都不支持时（如跨卷）抛出 OSError"""
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        pass
+    reflink(src, dst)
+    return 'reflink'
+
+
+class ImageLibrary:
+    """按内容哈希（SHA-256）保存下载过的镜像，SQLite 索引记录镜像列表 ID 和下载地址到内容的映射；
+    只保存能硬链接或 reflink 的镜像（不额外占用空间），否则只记录原保存路径。
+    再次选择同一镜像时直接硬链接（或 reflink/复制）到保存路径，超出容量时按最近使用时间淘汰"""
+
+    def __init__(self, root, quota=DEFAULT_QUOTA):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.db_path = self.root / 'library.db'
+        self.quota = quota
+        self.lock = threading.Lock()
+        self.db = None
+
+    def configure(self, quota=None):
+        if quota is not None:
+            try:
+                self.quota = max(0, int(quota))
+            except (TypeError, ValueError):
+                self.quota = DEFAULT_QUOTA
+            self.evict()
+
+    @property
+    def enabled(self):
+        return self.quota > 0
+
+    def _connect(self):
+        if self.db is None:
+            self.objects.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=5)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA foreign_keys=ON')
+            db.executescript(SCHEMA)
+            self.db = db
+        return self.db
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    # ---- 查询 ----
+
+    def lookup(self, checksum=None, catalog_id=None):
+        """按内容哈希、镜像列表 ID 查找已保存的镜像；文件已被删除或修改时移除记录。
+        给出 checksum 时只返回内容一致的镜像。同一下载地址的内容可能已更新，不按地址复用"""
+        checksum = (checksum or '').lower() or None
+        with self.lock:
+            db = self._connect()
+            candidates = []
+            if checksum:
+                candidates.append(checksum)
+            if catalog_id:
+                row = db.execute('SELECT sha256 FROM aliases WHERE kind = ? AND value = ?',
+                                 ('catalog', catalog_id)).fetchone()
+                if row:
+                    candidates.append(row['sha256'])
+            for sha256 in candidates:
+                if checksum and sha256 != checksum:
+                    continue
+                row = db.execute('SELECT * FROM images WHERE sha256 = ?', (sha256,)).fetchone()
+                if not row:
+                    continue
+                if not self._intact(row):
+                    print(f"镜像库中的文件已被删除或修改，移除记录: {row['path']}")
+                    self._forget(db, row)
+                    continue
+                db.execute('UPDATE images SET last_used = ? WHERE sha256 = ?', (time.time(), sha256))
+                db.commit()
+                return dict(row)
+        return None
+
+    @staticmethod
+    def _intact(row):
+        try:
+            st = os.stat(row['path'])
+        except OSError:
+            return False
+        return st.st_size == row['size'] and st.st_mtime_ns == row['mtime_ns']
+
+    def list(self):
+        """镜像库内容（最近使用的在前）和占用空间"""
+        with self.lock:
+            db = self._connect()
+            rows = db.execute('SELECT * FROM images ORDER BY last_used DESC').fetchall()
+            aliases = {}
+            for alias in db.execute('SELECT * FROM aliases'):
+                aliases.setdefault(alias['sha256'], []).append((alias['kind'], alias['value']))
+        images = []
+        for row in rows:
+            item = dict(row)
+            item['catalog_ids'] = [value for kind, value in aliases.get(row['sha256'], []) if kind == 'catalog']
+            item['urls'] = [value for kind, value in aliases.get(row['sha256'], []) if kind == 'url']
+            images.append(item)
+        return {
+            'images': images,
+            'total_size': sum(item['size'] for item in images),
+            'quota': self.quota
+        }
+
+    # ---- 取出与保存 ----
+
+    def checkout(self, entry, save_path):
+        """把镜像放到保存路径（先链接到临时文件再替换，已有文件不会被写坏），返回使用的方式"""
+        source = entry['path']
+        if os.path.exists(save_path) and os.path.samefile(source, save_path):
+            return 'hardlink'
+        Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{save_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            try:
+                method = link_file(source, tmp_path)
+            except OSError:
+                # 跨卷时复制到保存路径，仍比重新下载快
+                shutil.copyfile(source, tmp_path)
+                method = 'copy'
+            os.replace(tmp_path, save_path)
+            return method
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def add(self, path, sha256=None, catalog_id=None, url=None, filename=None):
+        """把下载完成的文件加入镜像库（硬链接或 reflink，不额外占用空间），没有可信哈希时先计算；
+        两者都不支持时不复制，只记录原文件路径。返回内容哈希，镜像库已停用时返回 None"""
+        if not self.enabled:
+            return None
+        sha256 = (sha256 or '').lower() or hash_file(path)
+        with self.lock:
+            db = self._connect()
+            row = db.execute('SELECT * FROM images WHERE sha256 = ?', (sha256,)).fetchone()
+            stored = bool(row) and self._intact(row)
+        object_path = self.objects / sha256[:2] / (sha256 + Path(path).suffix.lower())
+        if not stored:
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = f"{object_path}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                link_file(path, tmp_path)
+                os.replace(tmp_path, object_path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                # 跨卷等无法共享数据块时不复制一份完整镜像，文件被移动或修改后记录自动失效
+                object_path = Path(os.path.abspath(path))
+        with self.lock:
+            db = self._connect()
+            now = time.time()
+            if stored:
+                db.execute('UPDATE images SET last_used = ? WHERE sha256 = ?', (now, sha256))
+            else:
+                st = os.stat(object_path)
+                # 记录已存在但文件失效时原地更新，保留其别名
+                db.execute('INSERT INTO images (sha256, path, size, mtime_ns, filename, added, last_used) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(sha256) DO UPDATE SET '
+                           'path = excluded.path, size = excluded.size, mtime_ns = excluded.mtime_ns, '
+                           'last_used = excluded.last_used',
+                           (sha256, str(object_path), st.st_size, st.st_mtime_ns,
+                            filename or os.path.basename(path), now, now))
+            for kind, value in (('catalog', catalog_id), ('url', url)):
+                if value:
+                    db.execute('INSERT OR REPLACE INTO aliases (kind, value, sha256) VALUES (?, ?, ?)',
+                               (kind, value, sha256))
+            db.commit()
+        self.evict()
+        return sha256
+
+    def add_async(self, path, **kwargs):
+        """在后台线程中加入镜像库（可能需要计算整个文件的哈希）"""
+        if not self.enabled:
+            return
+
+        def worker():
+            try:
+                self.add(path, **kwargs)
+            except Exception as e:
+                print(f"加入镜像库失败: {str(e)}")
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def remove(self, sha256):
+        with self.lock:
+            db = self._connect()
+            row = db.execute('SELECT * FROM images WHERE sha256 = ?', (sha256,)).fetchone()
+            if not row:
+                return False
+            self._forget(db, row)
+        return True
+
+    def evict(self):
+        """超出容量时按最近使用时间从旧到新删除，返回删除的数量"""
+        with self.lock:
+            if self.db is None and not self.db_path.exists():
+                return 0
+            db = self._connect()
+            rows = db.execute('SELECT * FROM images ORDER BY last_used ASC').fetchall()
+            total = sum(row['size'] for row in rows)
+            evicted = 0
+            for row in rows:
+                if total <= self.quota:
+                    break
+                self._forget(db, row)
+                total -= row['size']
+                evicted += 1
+        return evicted
+
+    def _owns(self, path):
+        return Path(path).resolve().parent.parent == self.objects.resolve()
+
+    def _forget(self, db, row):
+        # 只删除镜像库自己的链接，用户保存路径上的文件（包括只记录了原路径的镜像）不受影响
+        if self._owns(row['path']):
+            try:
+                os.remove(row['path'])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"删除镜像库文件失败: {str(e)}")
+        db.execute('DELETE FROM images WHERE sha256 = ?', (row['sha256'],))
+        db.commit()
@@ -0,0 +1,217 @@
+import bisect
+import hashlib
+import struct
+import threading
+
+# Apple chunklist 格式：36 字节头部 + 若干 (uint32 大小, SHA-256) 条目，小端序
+CHUNKLIST_MAGIC = b'CNKL'
+CHUNKLIST_HEADER = struct.Struct('<4sIBBBBQQQ')
+CHUNKLIST_ENTRY = struct.Struct('<I32s')
+CHUNK_METHOD_SHA256 = 1
+
+READ_SIZE = 4 * 1024 * 1024  # 补算哈希时每次从磁盘读取的大小
+
+
+class ChunkMismatch(Exception):
+    """某个 chunklist 块的哈希与清单不符"""
+
+
+class VerificationFailed(Exception):
+    """下载完成后的完整性校验未通过"""
+
+
+def parse_chunklist(data):
+    """解析 chunklist，返回 [(偏移, 大小, sha256摘要), ...]；签名部分不做校验"""
+    if len(data) < CHUNKLIST_HEADER.size:
+        raise ValueError("chunklist 文件过短")
+    (magic, header_size, _version, chunk_method, _sig_method, _pad,
+     chunk_count, chunk_offset, _sig_offset) = CHUNKLIST_HEADER.unpack_from(data)
+    if magic != CHUNKLIST_MAGIC or header_size != CHUNKLIST_HEADER.size:
+        raise ValueError("不是有效的 chunklist 文件")
+    if chunk_method != CHUNK_METHOD_SHA256:
+        raise ValueError(f"不支持的 chunklist 哈希算法: {chunk_method}")
+    if chunk_offset + chunk_count * CHUNKLIST_ENTRY.size > len(data):
+        raise ValueError("chunklist 条目不完整")
+
+    chunks = []
+    offset = 0
+    for i in range(chunk_count):
+        size, digest = CHUNKLIST_ENTRY.unpack_from(data, chunk_offset + i * CHUNKLIST_ENTRY.size)
+        chunks.append((offset, size, digest))
+        offset += size
+    return chunks
+
+
+class Sha256Verifier:
+    """整文件 SHA-256 校验：按顺序到达的数据直接在写入路径上计算；
+    分段下载时，领先于哈希位置的分段在追上时从磁盘（通常仍在页缓存中）补读"""
+
+    method = 'sha256'
+
+    def __init__(self, expected):
+        self.expected = expected.strip().lower()
+        self.sha = hashlib.sha256()
+        self.position = 0
+        self.lock = threading.Lock()
+        self.status = 'verifying'
+        self.message = None
+
+    def boundaries(self):
+        return None
+
+    def prepare(self, segments):
+        """续传时不需要调整分段，已完成部分会在 catch_up 中补算"""
+        return True
+
+    def update(self, segment, data):
+        """data 已写入 segment.offset 处；负责推进 segment.offset"""
+        with self.lock:
+            if segment.offset == self.position:
+                self.sha.update(data)
+                self.position += len(data)
+            segment.offset += len(data)
+
+    def catch_up(self, path, segments):
+        """把哈希位置推进到已连续写完的位置"""
+        ordered = sorted(segments, key=lambda s: s.start)
+        f = None
+        try:
+            while True:
+                with self.lock:
+                    end = self._done_end(ordered)
+                    start = self.position
+                if end <= start:
+                    return
+                # 区间 [start, end) 已写完且没有分段会在 position 处写入，可在锁外读取
+                if f is None:
+                    f = open(path, 'rb')
+                f.seek(start)
+                remaining = end - start
+                while remaining:
+                    block = f.read(min(READ_SIZE, remaining))
+                    if not block:
+                        raise IOError("读取下载文件失败")
+                    self.sha.update(block)
+                    remaining -= len(block)
+                with self.lock:
+                    self.position = end
+        finally:
+            if f:
+                f.close()
+
+    def _done_end(self, ordered):
+        for seg in ordered:
+            if seg.start <= self.position <= seg.end:
+                return seg.offset
+        return self.position
+
+    def finish(self, path, segments):
+        self.catch_up(path, segments)
+        digest = self.sha.hexdigest()
+        if digest == self.expected:
+            self.status = 'passed'
+            self.message = 'SHA-256 校验通过'
+        else:
+            self.status = 'failed'
+            self.message = f'SHA-256 不匹配 (期望 {self.expected[:12]}…，实际 {digest[:12]}…)'
+        return self.status == 'passed', self.message
+
+    def progress(self):
+        return {
+            'method': self.method,
+            'status': self.status,
+            'checked': self.position,
+            'message': self.message
+        }
+
+
+class ChunklistVerifier:
+    """按 Apple chunklist 逐块校验：每个分段在写入路径上计算所在块的哈希，
+    块写完即比较，不一致时回退到块起点由调用方重新下载"""
+
+    method = 'chunklist'
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.starts = [offset for offset, _, _ in chunks]
+        self.total_size = sum(size for _, size, _ in chunks)
+        self.lock = threading.Lock()
+        self.states = {}
+        self.verified = 0
+        self.status = 'verifying'
+        self.message = None
+
+    def boundaries(self):
+        """可用作分段边界的偏移（块起点）"""
+        return self.starts
+
+    def prepare(self, segments):
+        """续传时把各分段的写入位置退回所在块的起点；分段未按块对齐时返回 False"""
+        starts = set(self.starts)
+        starts.add(self.total_size)
+        if any(seg.start not in starts for seg in segments):
+            return False
+        with self.lock:
+            self.states.clear()
+            self.verified = 0
+            for seg in segments:
+                if not seg.done:
+                    index = bisect.bisect_right(self.starts, seg.offset) - 1
+                    seg.offset = max(seg.start, self.starts[index])
+                self.verified += seg.offset - seg.start
+        return True
+
+    def _chunk_at(self, offset):
+        index = bisect.bisect_right(self.starts, offset) - 1
+        chunk_offset, size, digest = self.chunks[index]
+        return chunk_offset, chunk_offset + size, digest
+
+    def update(self, segment, data):
+        """data 已写入 segment.offset 处；负责推进 segment.offset，块哈希不符时抛出 ChunkMismatch"""
+        key = id(segment)
+        view = memoryview(data)
+        while view:
+            with self.lock:
+                state = self.states.get(key)
+            if state is None:
+                chunk_start, chunk_end, digest = self._chunk_at(segment.offset)
+                if segment.offset != chunk_start:
+                    raise ChunkMismatch("分段写入位置未对齐到块起点")
+                state = [hashlib.sha256(), chunk_start, chunk_end, digest]
+                with self.lock:
+                    self.states[key] = state
+            sha, chunk_start, chunk_end, digest = state
+            part = view[:chunk_end - segment.offset]
+            sha.update(part)
+            view = view[len(part):]
+            if segment.offset + len(part) < chunk_end:
+                segment.offset += len(part)
+                continue
+            with self.lock:
+                del self.states[key]
+                if sha.digest() != digest:
+                    # 回退到块起点，已写入的坏数据会被重新下载覆盖
+                    segment.offset = chunk_start
+                    raise ChunkMismatch(f"块 {chunk_start}-{chunk_end - 1} 哈希不匹配")
+                segment.offset = chunk_end
+                self.verified += chunk_end - chunk_start
+
+    def catch_up(self, path, segments):
+        """逐块校验在写入路径上完成，无需补读"""
+
+    def finish(self, path, segments):
+        if self.verified == self.total_size:
+            self.status = 'passed'
+            self.message = f'chunklist 校验通过 ({len(self.chunks)} 块)'
+        else:
+            self.status = 'failed'
+            self.message = 'chunklist 校验未覆盖整个文件'
+        return self.status == 'passed', self.message
+
+    def progress(self):
+        return {
+            'method': self.method,
+            'status': self.status,
+            'checked': self.verified,
+            'message': self.message
+        }
@@ -0,0 +1,70 @@
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+HOST = '127.0.0.1'
+DEFAULT_WORKERS = 16       # 同时处理的连接数（事件流长连接也占用一个）
+IDLE_TIMEOUT = 30          # keep-alive 连接空闲多久后关闭（秒）
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """不逐条打印访问日志（错误仍会输出），空闲的 keep-alive 连接超时关闭"""
+
+    timeout = IDLE_TIMEOUT
+
+    def log_request(self, code='-', size='-'):
+        pass
+
+
+class LocalServer(BaseWSGIServer):
+    """本机 WSGI 服务器：只监听 127.0.0.1 的随机空闲端口，连接交给固定大小的线程池处理，
+    stop() 停止接受新连接并等待进行中的请求结束"""
+
+    multithread = True
+
+    def __init__(self, app, host=HOST, port=0, workers=DEFAULT_WORKERS):
+        super().__init__(host, port, app, handler=QuietRequestHandler)
+        self.port = self.socket.getsockname()[1]
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http')
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='http-server', daemon=True)
+        self.thread.start()
+
+    def process_request(self, request, client_address):
+        with self.connections_lock:
+            self.connections.add(request)
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self.connections_lock:
+                self.connections.discard(request)
+            self.shutdown_request(request)
+
+    def stop(self):
+        """停止服务：不再接受新连接，关闭空闲连接的读端，等待正在处理的请求写完响应"""
+        if self.thread:
+            self.shutdown()
+            self.thread = None
+        self.server_close()
+        with self.connections_lock:
+            connections = list(self.connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        self.pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,293 @@
+import re
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+# 开发者模式下的性能计数：接口耗时、下载/烧录各阶段的耗时与字节数、进度事件推送，以及按需的调用栈采样。
+# 未启用时各记录函数直接返回，热路径上只多一次布尔判断
+PREFIX = 'simpletoolkit_'
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_PROFILE_SECONDS = 5.0
+MAX_PROFILE_SECONDS = 30.0
+DEFAULT_PROFILE_INTERVAL = 0.01      # 采样间隔（秒）
+MIN_PROFILE_INTERVAL = 0.001
+PROFILE_TOP = 200                    # JSON 结果中保留的调用栈数量
+MAX_STACK_DEPTH = 64
+
+# 指标名 -> (类型, 说明)
+FAMILIES = {
+    'http_requests_total': ('counter', '按路由、方法和状态码统计的请求数'),
+    'http_request_duration_seconds': ('histogram', '请求处理耗时（不含流式响应的传输时间）'),
+    'io_seconds_total': ('counter', '下载/烧录各阶段累计耗时（各线程分别计时，可能超过实际经过的时间）'),
+    'io_bytes_total': ('counter', '下载/烧录各阶段处理的字节数'),
+    'io_chunks_total': ('counter', '下载/烧录各阶段处理的数据块数'),
+    'events_published_total': ('counter', '后台任务发布的进度事件数（合并前）'),
+    'events_sent_total': ('counter', '经 /api/events 实际推送给页面的消息数（合并后）'),
+    'events_sent_bytes_total': ('counter', '经 /api/events 推送的数据量'),
+    'events_delivery_seconds': ('histogram', '进度事件从发布到推送给页面的延迟'),
+}
+
+_lock = threading.Lock()
+_profile_lock = threading.Lock()
+_enabled = False
+_started = time.time()
+_counters = {}      # (指标名, 标签) -> 数值
+_histograms = {}    # (指标名, 标签) -> [各桶计数, 总和, 次数, 最大值]
+
+
+def enable(flag):
+    """开启或关闭计数（跟随“开发者模式”设置），关闭时保留已有数据"""
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """清空已记录的数据"""
+    global _started
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _started = time.time()
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def add(name, value=1, **labels):
+    """计数器加上 value"""
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """记录一次耗时到直方图"""
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0, 0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+        entry[3] = max(entry[3], value)
+
+
+def observe_request(method, route, status, seconds):
+    """计时中间件调用：记录一次请求"""
+    if not _enabled:
+        return
+    add('http_requests_total', method=method, route=route, status=str(status))
+    observe('http_request_duration_seconds', seconds, method=method, route=route)
+
+
+def record_io(path, stage, seconds, size=0):
+    """记录下载/烧录某一阶段的一次耗时和数据量"""
+    if not _enabled:
+        return
+    labels = _labels({'path': path, 'stage': stage})
+    with _lock:
+        for name, value in (('io_seconds_total', seconds), ('io_bytes_total', size),
+                            ('io_chunks_total', 1 if size else 0)):
+            key = (name, labels)
+            _counters[key] = _counters.get(key, 0) + value
+
+
+class Stopwatch:
+    """把循环中相邻两次 lap() 之间经过的时间计入给定阶段，用于区分网络等待、磁盘写入、限速等耗时；
+    创建时未启用计数则 lap() 不做任何事"""
+
+    __slots__ = ('path', 'enabled', 'last')
+
+    def __init__(self, path):
+        self.path = path
+        self.enabled = _enabled
+        self.last = time.perf_counter()
+
+    def lap(self, stage, size=0):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        record_io(self.path, stage, now - self.last, size)
+        self.last = now
+
+
+# ---- 输出 ----
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus():
+    """Prometheus 文本格式（0.0.4）"""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, (list(entry[0]),) + tuple(entry[1:])) for key, entry in _histograms.items())
+        started = _started
+    lines = [
+        f'# HELP {PREFIX}metrics_enabled 开发者模式计数是否开启',
+        f'# TYPE {PREFIX}metrics_enabled gauge',
+        f'{PREFIX}metrics_enabled {int(_enabled)}',
+        f'# HELP {PREFIX}metrics_start_time_seconds 开始计数的时间',
+        f'# TYPE {PREFIX}metrics_start_time_seconds gauge',
+        f'{PREFIX}metrics_start_time_seconds {started!r}',
+    ]
+    described = set()
+
+    def describe(name):
+        if name not in described:
+            described.add(name)
+            kind, text = FAMILIES.get(name, ('untyped', name))
+            lines.append(f'# HELP {PREFIX}{name} {text}')
+            lines.append(f'# TYPE {PREFIX}{name} {kind}')
+
+    for (name, labels), value in counters:
+        describe(name)
+        lines.append(f'{PREFIX}{name}{_format_labels(labels)} {_format_value(value)}')
+    for (name, labels), (buckets, total, count, _max) in histograms:
+        describe(name)
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS, buckets):
+            cumulative += n
+            lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+        lines.append(f'{PREFIX}{name}_sum{_format_labels(labels)} {total!r}')
+        lines.append(f'{PREFIX}{name}_count{_format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def snapshot():
+    """设置页性能面板使用的汇总数据"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(entry) for key, entry in _histograms.items()}
+        started = _started
+
+    routes = {}
+    for (name, labels), (_buckets, total, count, peak) in histograms.items():
+        if name != 'http_request_duration_seconds':
+            continue
+        labels = dict(labels)
+        routes[(labels['method'], labels['route'])] = {
+            'method': labels['method'], 'route': labels['route'], 'count': count, 'errors': 0,
+            'total_ms': round(total * 1000, 2), 'avg_ms': round(total * 1000 / count, 2) if count else 0,
+            'max_ms': round(peak * 1000, 2)
+        }
+    io = {}
+    events = {}
+    for (name, labels), value in counters.items():
+        labels = dict(labels)
+        if name == 'http_requests_total' and int(labels['status']) >= 400:
+            route = routes.get((labels['method'], labels['route']))
+            if route:
+                route['errors'] += value
+        elif name.startswith('io_'):
+            stages = io.setdefault(labels['path'], {})
+            stage = stages.setdefault(labels['stage'], {'stage': labels['stage'], 'seconds': 0.0, 'bytes': 0, 'chunks': 0})
+            stage[name[3:-6]] += value
+        elif name.startswith('events_'):
+            channel = events.setdefault(labels['channel'], {'channel': labels['channel'], 'published': 0, 'sent': 0, 'bytes': 0})
+            channel[{'events_published_total': 'published', 'events_sent_total': 'sent',
+                     'events_sent_bytes_total': 'bytes'}[name]] += value
+
+    for path, stages in io.items():
+        total = sum(stage['seconds'] for stage in stages.values()) or 1
+        for stage in stages.values():
+            stage['share'] = round(stage['seconds'] / total, 4)
+            # 每个阶段处理数据的速度（字节/秒），用于判断瓶颈在哪一侧
+            stage['rate'] = round(stage['bytes'] / stage['seconds']) if stage['seconds'] and stage['bytes'] else 0
+            stage['seconds'] = round(stage['seconds'], 4)
+        io[path] = sorted(stages.values(), key=lambda stage: -stage['seconds'])
+
+    delivery = {'count': 0, 'avg_ms': 0, 'max_ms': 0}
+    for (name, _labels_), (_buckets, total, count, peak) in histograms.items():
+        if name == 'events_delivery_seconds' and count:
+            delivery['avg_ms'] = round((delivery['avg_ms'] * delivery['count'] + total * 1000) / (delivery['count'] + count), 2)
+            delivery['count'] += count
+            delivery['max_ms'] = max(delivery['max_ms'], round(peak * 1000, 2))
+
+    return {
+        'enabled': _enabled,
+        'started': started,
+        'uptime': round(time.time() - started, 1),
+        'routes': sorted(routes.values(), key=lambda route: -route['total_ms']),
+        'io': io,
+        'events': sorted(events.values(), key=lambda channel: channel['channel']),
+        'delivery': delivery
+    }
+
+
+# ---- 调用栈采样 ----
+
+def _thread_label(name):
+    # 线程池中的线程名带序号，合并为同一类
+    return re.sub(r'\d+', 'N', str(name))
+
+
+def _collapse(thread_name, frame):
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    parts.append(_thread_label(thread_name))
+    return ';'.join(reversed(parts))
+
+
+def sample_stacks(seconds=DEFAULT_PROFILE_SECONDS, interval=DEFAULT_PROFILE_INTERVAL):
+    """在 seconds 秒内每隔 interval 秒采样所有线程的调用栈，返回折叠格式的栈及出现次数（挂钟时间，包括等待中的线程）"""
+    seconds = min(max(float(seconds), 0.1), MAX_PROFILE_SECONDS)
+    interval = max(float(interval), MIN_PROFILE_INTERVAL)
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("已有调用栈采样正在进行")
+    try:
+        me = threading.get_ident()
+        stacks = Counter()
+        leaves = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _collapse(names.get(ident, ident), frame)
+                stacks[stack] += 1
+                leaves[stack.rsplit(';', 1)[-1]] += 1
+            samples += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+    return {
+        'seconds': seconds,
+        'interval': interval,
+        'samples': samples,
+        'stacks': [{'stack': stack, 'count': count} for stack, count in stacks.most_common(PROFILE_TOP)],
+        'functions': [{'function': name, 'count': count} for name, count in leaves.most_common(30)],
+        'collapsed': '\n'.join(f'{stack} {count}' for stack, count in stacks.most_common())
+    }
@@ -0,0 +1,191 @@
+import json
+import time
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait
+import http_client
+from download_handle import write_json_atomic
+
+PROBE_SIZE = 256 * 1024          # 探测时请求的字节数
+PROBE_TIMEOUT = (3, 5)           # 探测请求的 (连接超时, 读取超时) 秒
+PROBE_TTL = 600                  # 测速结果在多久内不必重新探测（秒）
+DECAY_HALF_LIFE = 1800           # 旧测速结果的权重每隔多久减半（秒）
+MAX_PROBE_WORKERS = 8
+PROBE_DEADLINE = 1.0             # 排序时最多等待探测多久（秒），未完成的探测在后台继续并计入之后的排序
+SAVE_INTERVAL = 30               # 测速结果写盘的最小间隔（秒）
+FAILURE_PENALTY = 0.5            # 请求失败或卡住时吞吐量估计乘以该系数
+
+
+def mirror_key(url):
+    """按主机统计：同一主机上的不同文件共用测速结果"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class MirrorManager:
+    """镜像源测速与排序：并发发送小的 Range 请求测量 RTT 和吞吐量，结果按主机缓存并随时间衰减，
+    下载过程中的实际速度和失败也会计入"""
+
+    def __init__(self, cache_path=None, ttl=PROBE_TTL, half_life=DECAY_HALF_LIFE):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.ttl = ttl
+        self.half_life = half_life
+        self.stats = None       # 主机 -> {'rtt', 'throughput', 'failures', 'measured'}
+        self.lock = threading.Lock()
+        self.last_save = 0.0
+
+    # ---- 排序 ----
+
+    def rank(self, urls):
+        """返回按预期速度从快到慢排列的地址；测速结果过期的镜像先并发探测，
+        报告的文件大小与最快镜像不一致的镜像被排除"""
+        urls = list(dict.fromkeys(urls))
+        if len(urls) < 2:
+            return urls
+        now = time.time()
+        with self.lock:
+            stats = self._load()
+            stale = [url for url in urls
+                     if now - stats.get(mirror_key(url), {}).get('measured', 0) >= self.ttl]
+        sizes = {}
+        if stale:
+            pool = ThreadPoolExecutor(max_workers=min(len(stale), MAX_PROBE_WORKERS), thread_name_prefix='mirror-probe')
+            futures = {pool.submit(self.probe, url): url for url in stale}
+            done, _pending = wait(futures, timeout=PROBE_DEADLINE)
+            pool.shutdown(wait=False)
+            for future in done:
+                result = future.result()
+                if result:
+                    sizes[futures[future]] = result['size']
+        ranked = sorted(urls, key=self._score, reverse=True)
+        best_size = next((sizes[url] for url in ranked if sizes.get(url)), None)
+        if best_size:
+            for url in [url for url in ranked if sizes.get(url) and sizes[url] != best_size]:
+                print(f"镜像文件大小不一致，忽略: {url}")
+                ranked.remove(url)
+        self._save()
+        return ranked
+
+    def best(self, urls, exclude=()):
+        """不重新探测，按已有结果返回最快的地址"""
+        candidates = [url for url in dict.fromkeys(urls) if url not in exclude]
+        if not candidates:
+            return None
+        return max(candidates, key=self._score)
+
+    def expected_rate(self, url):
+        """已知的吞吐量估计（字节/秒），没有数据时为 0"""
+        with self.lock:
+            entry = self._load().get(mirror_key(url))
+            return entry['throughput'] if entry else 0
+
+    def _score(self, url):
+        with self.lock:
+            entry = self._load().get(mirror_key(url))
+        if not entry:
+            return (0, 0.0)
+        # 吞吐量相同（如都只有失败记录）时 RTT 小的优先
+        return (entry['throughput'], -entry['rtt'])
+
+    # ---- 测速 ----
+
+    def probe(self, url):
+        """请求文件开头的 PROBE_SIZE 字节，记录 RTT 和吞吐量，返回结果；失败时返回 None"""
+        try:
+            started = time.perf_counter()
+            with http_client.get(url, headers={'Range': f'bytes=0-{PROBE_SIZE - 1}'},
+                                 stream=True, timeout=PROBE_TIMEOUT) as response:
+                response.raise_for_status()
+                rtt = time.perf_counter() - started
+                size = 0
+                if response.status_code == 206:
+                    total = response.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+                    size = int(total) if total.isdigit() else 0
+                received = 0
+                body_started = time.perf_counter()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    received += len(chunk)
+                    if received >= PROBE_SIZE:
+                        break
+                elapsed = time.perf_counter() - body_started
+        except Exception as e:
+            print(f"镜像测速失败 {mirror_key(url)}: {str(e)}")
+            self.record_failure(url)
+            return None
+        # 数据很少时吞吐量按 RTT 估算，避免除以接近 0 的时间
+        throughput = received / max(elapsed, rtt / 2, 1e-3)
+        self._update(url, throughput, rtt)
+        return {'url': url, 'rtt': rtt, 'throughput': throughput, 'size': size}
+
+    def record(self, url, size, seconds):
+        """计入下载过程中实际测得的速度"""
+        if size and seconds > 0:
+            self._update(url, size / seconds, None)
+
+    def record_failure(self, url):
+        """请求失败或分段卡住：降低该镜像的吞吐量估计"""
+        key = mirror_key(url)
+        with self.lock:
+            entry = self._load().setdefault(key, {'rtt': 0.0, 'throughput': 0.0, 'failures': 0, 'measured': 0})
+            entry['throughput'] *= FAILURE_PENALTY
+            entry['failures'] += 1
+            entry['measured'] = time.time()
+
+    def _update(self, url, throughput, rtt):
+        key = mirror_key(url)
+        now = time.time()
+        with self.lock:
+            stats = self._load()
+            entry = stats.get(key)
+            if not entry or not entry['throughput']:
+                stats[key] = {'rtt': rtt or 0.0, 'throughput': throughput, 'failures': 0, 'measured': now}
+                return
+            # 旧结果的权重随时间衰减：刚测过的保留一半，半衰期之前的只占四分之一
+            weight = 0.5 * 0.5 ** ((now - entry['measured']) / self.half_life)
+            entry['throughput'] = entry['throughput'] * weight + throughput * (1 - weight)
+            if rtt is not None:
+                entry['rtt'] = entry['rtt'] * weight + rtt * (1 - weight) if entry['rtt'] else rtt
+            entry['failures'] = 0
+            entry['measured'] = now
+
+    def snapshot(self):
+        """各镜像主机的测速结果（按吞吐量从高到低）"""
+        with self.lock:
+            stats = {key: dict(value) for key, value in self._load().items()}
+        items = [dict(value, host=key) for key, value in stats.items()]
+        return sorted(items, key=lambda item: -item['throughput'])
+
+    # ---- 持久化 ----
+
+    def _load(self):
+        # 调用方持有 self.lock
+        if self.stats is None:
+            self.stats = {}
+            if self.cache_path and self.cache_path.exists():
+                try:
+                    with open(self.cache_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    self.stats = {key: value for key, value in data.items()
+                                  if isinstance(value, dict) and 'throughput' in value}
+                except Exception as e:
+                    print(f"读取镜像测速缓存失败: {str(e)}")
+        return self.stats
+
+    def _save(self, force=False):
+        if not self.cache_path:
+            return
+        now = time.time()
+        if not force and now - self.last_save < SAVE_INTERVAL:
+            return
+        self.last_save = now
+        with self.lock:
+            data = {key: dict(value) for key, value in self._load().items()}
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.cache_path, data)
+        except Exception as e:
+            print(f"保存镜像测速缓存失败: {str(e)}")
+
+    def flush(self):
+        self._save(force=True)
@@ -0,0 +1,109 @@
+import os
+import copy
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+WRITE_DELAY = 0.5       # 最后一次修改后等待多久写盘（秒）
+MAX_WRITE_DELAY = 2.0   # 连续修改时最迟多久写一次（秒）
+
+
+class PreferencesStore:
+    """线程安全的内存偏好设置：启动时读取一次，读请求直接返回内存副本，
+    修改后合并延迟写盘，写入时先写临时文件再 os.replace，避免文件写坏"""
+
+    def __init__(self, path, validate, defaults, delay=WRITE_DELAY, max_delay=MAX_WRITE_DELAY):
+        self.path = path
+        self.validate = validate
+        self.defaults = defaults
+        self.delay = delay
+        self.max_delay = max_delay
+        self.lock = threading.RLock()
+        self.write_lock = threading.Lock()
+        self.prefs = None
+        self.dirty = False
+        self.first_dirty = None
+        self.timer = None
+        # 进程退出前把未写入的修改落盘
+        atexit.register(self.flush)
+
+    def load(self):
+        """从文件加载偏好设置（只在首次调用时读盘），文件缺失或损坏时使用默认值并重写"""
+        with self.lock:
+            if self.prefs is not None:
+                return
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.prefs = self.validate(json.load(f))
+                return
+            except FileNotFoundError:
+                print("偏好设置文件不存在，使用默认设置")
+            except Exception as e:
+                print(f"偏好设置文件损坏，使用默认设置: {str(e)}")
+            self.prefs = self.defaults()
+            self._mark_dirty()
+
+    def get(self):
+        """返回偏好设置的副本"""
+        with self.lock:
+            self.load()
+            return copy.deepcopy(self.prefs)
+
+    @contextmanager
+    def edit(self):
+        """在锁内修改偏好设置，代码块正常结束后才提交并安排写盘"""
+        with self.lock:
+            self.load()
+            prefs = copy.deepcopy(self.prefs)
+            yield prefs
+            if prefs != self.prefs:
+                self.prefs = prefs
+                self._mark_dirty()
+
+    def replace(self, prefs):
+        """整体替换偏好设置"""
+        with self.lock:
+            self.prefs = copy.deepcopy(prefs)
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        now = time.monotonic()
+        self.dirty = True
+        if self.first_dirty is None:
+            self.first_dirty = now
+        delay = min(self.delay, max(0.0, self.first_dirty + self.max_delay - now))
+        if self.timer:
+            self.timer.cancel()
+        self.timer = threading.Timer(delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush(self):
+        """立即把未写入的修改写盘"""
+        with self.write_lock:
+            with self.lock:
+                if not self.dirty:
+                    return True
+                snapshot = copy.deepcopy(self.prefs)
+                self.dirty = False
+                self.first_dirty = None
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_name(self.path.name + '.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(snapshot, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                return True
+            except Exception as e:
+                print(f"保存偏好设置文件失败: {str(e)}")
+                with self.lock:
+                    # 保留脏标记，下次修改或退出时重试
+                    self.dirty = True
+                return False
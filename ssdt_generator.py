@@ -0,0 +1,617 @@
+import os
+import time
+import struct
+import shutil
+import zipfile
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from functools import lru_cache
+from acpi_tables import TABLE_HEADER, AcpiNamespace, load_tables, split_path, tables_hash
+
+OEM_ID = b'STKIT '
+CREATOR_ID = b'INTL'
+CREATOR_REVISION = 0x20200925
+RESULT_CACHE_SIZE = 256     # 缓存的生成结果数（按表哈希 + 补丁 + 选项）
+NAMESPACE_CACHE_SIZE = 4    # 缓存的命名空间索引数（按表哈希）
+
+# External 声明的对象类型
+OBJECT_TYPES = {'int': 0x01, 'device': 0x06, 'method': 0x08, 'processor': 0x0C}
+OBJECT_TYPE_NAMES = {0x01: 'IntObj', 0x06: 'DeviceObj', 0x08: 'MethodObj', 0x0C: 'ProcessorObj'}
+
+# 常见设备的 _ADR（PCI 设备号 << 16 | 功能号）
+ADR_LPC = 0x001F0000
+ADR_HDA = (0x001F0003, 0x001B0000)
+ADR_ETHERNET = (0x001F0006, 0x00190000)
+ADR_IGPU = 0x00020000
+
+
+class SsdtError(Exception):
+    """无法为当前 ACPI 表生成补丁"""
+
+
+# ---- AML 编码 ----
+
+def pkg_length(body_length):
+    """编码 PkgLength（长度包含 PkgLength 自身）"""
+    for count, limit in ((1, 1 << 6), (2, 1 << 12), (3, 1 << 20), (4, 1 << 28)):
+        total = body_length + count
+        if total < limit:
+            break
+    else:
+        raise SsdtError("AML 对象过大")
+    if count == 1:
+        return bytes([total])
+    out = [((count - 1) << 6) | (total & 0x0F)]
+    total >>= 4
+    for _ in range(count - 1):
+        out.append(total & 0xFF)
+        total >>= 8
+    return bytes(out)
+
+
+def name_string(path):
+    segments = [s.encode('ascii') for s in split_path(path)]
+    prefix = b'\\' if path.startswith('\\') else b''
+    if len(segments) == 1:
+        return prefix + segments[0]
+    if len(segments) == 2:
+        return prefix + b'\x2e' + b''.join(segments)
+    return prefix + b'\x2f' + bytes([len(segments)]) + b''.join(segments)
+
+
+def asl_path(path):
+    """ASL 中的名称去掉 NameSeg 末尾的填充下划线"""
+    prefix = '\\' if path.startswith('\\') else ''
+    return prefix + '.'.join(s.rstrip('_') or '_' for s in split_path(path))
+
+
+def asl_string(value):
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+# ---- ASL/AML 语法树：模板由这些节点组成，同时生成 ASL 源码和 AML 字节码 ----
+
+class Node:
+    def aml(self):
+        raise NotImplementedError
+
+    def asl(self, indent=0):
+        raise NotImplementedError
+
+
+def value_aml(value):
+    if isinstance(value, Node):
+        return value.aml()
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        if value in (0, 1):
+            return bytes([value])
+        if value == 0xFFFFFFFFFFFFFFFF:
+            return b'\xff'
+        for prefix, size in ((0x0A, 1), (0x0B, 2), (0x0C, 4), (0x0E, 8)):
+            if value < 1 << (8 * size):
+                return bytes([prefix]) + value.to_bytes(size, 'little')
+        raise SsdtError("整数超出范围")
+    if isinstance(value, str):
+        return b'\x0d' + value.encode('ascii') + b'\0'
+    if isinstance(value, bytes):
+        return Buffer(value).aml()
+    if isinstance(value, (list, tuple)):
+        return Package(value).aml()
+    raise SsdtError(f"不支持的值类型: {type(value).__name__}")
+
+
+def value_asl(value, indent=0):
+    if isinstance(value, Node):
+        return value.asl(indent)
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return {0: 'Zero', 1: 'One', 0xFFFFFFFFFFFFFFFF: 'Ones'}.get(value, f'0x{value:02X}')
+    if isinstance(value, str):
+        return asl_string(value)
+    if isinstance(value, bytes):
+        return Buffer(value).asl(indent)
+    return Package(value).asl(indent)
+
+
+def block_asl(header, children, indent):
+    pad = '    ' * indent
+    lines = [pad + header, pad + '{']
+    lines += [child.asl(indent + 1) for child in children]
+    lines.append(pad + '}')
+    return '\n'.join(lines)
+
+
+class Raw(Node):
+    """固定编码的表达式（如 ArgX、_OSI 调用）"""
+
+    def __init__(self, aml, asl):
+        self._aml = aml
+        self._asl = asl
+
+    def aml(self):
+        return self._aml
+
+    def asl(self, indent=0):
+        return self._asl
+
+
+def Arg(n):
+    return Raw(bytes([0x68 + n]), f'Arg{n}')
+
+
+def Osi(name):
+    return Raw(b'_OSI' + value_aml(name), f'_OSI ({asl_string(name)})')
+
+
+def LEqual(a, b):
+    return Raw(b'\x93' + value_aml(a) + value_aml(b), f'LEqual ({value_asl(a)}, {value_asl(b)})')
+
+
+class Buffer(Node):
+    def __init__(self, data):
+        self.data = data
+
+    def aml(self):
+        body = value_aml(len(self.data)) + self.data
+        return b'\x11' + pkg_length(len(body)) + body
+
+    def asl(self, indent=0):
+        items = ', '.join(f'0x{b:02X}' for b in self.data)
+        return f'Buffer ({value_asl(len(self.data))}) {{ {items} }}'
+
+
+class Package(Node):
+    def __init__(self, items):
+        self.items = list(items)
+
+    def aml(self):
+        body = bytes([len(self.items)]) + b''.join(value_aml(v) for v in self.items)
+        return b'\x12' + pkg_length(len(body)) + body
+
+    def asl(self, indent=0):
+        pad = '    ' * indent
+        lines = [f'Package (0x{len(self.items):02X})', pad + '{']
+        # 设备属性按 键, 值 成对排列
+        for i, item in enumerate(self.items):
+            comma = ',' if i < len(self.items) - 1 else ''
+            lines.append(pad + '    ' + value_asl(item, indent + 1) + comma)
+        lines.append(pad + '}')
+        return '\n'.join(lines)
+
+
+class Statement(Node):
+    def __init__(self, opcode, keyword, value):
+        self.opcode = opcode
+        self.keyword = keyword
+        self.value = value
+
+    def aml(self):
+        return bytes([self.opcode]) + value_aml(self.value)
+
+    def asl(self, indent=0):
+        return '    ' * indent + f'{self.keyword} ({value_asl(self.value, indent)})'
+
+
+def Return(value):
+    return Statement(0xA4, 'Return', value)
+
+
+class Name(Node):
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def aml(self):
+        return b'\x08' + name_string(self.name) + value_aml(self.value)
+
+    def asl(self, indent=0):
+        return '    ' * indent + f'Name ({asl_path(self.name)}, {value_asl(self.value, indent)})'
+
+
+class External(Node):
+    def __init__(self, path, kind):
+        self.path = path
+        self.kind = OBJECT_TYPES[kind]
+
+    def aml(self):
+        return b'\x15' + name_string(self.path) + bytes([self.kind, 0])
+
+    def asl(self, indent=0):
+        return '    ' * indent + f'External ({asl_path(self.path)}, {OBJECT_TYPE_NAMES[self.kind]})'
+
+
+class Block(Node):
+    """带 PkgLength 的块：Scope / Device / Method / If / Else"""
+
+    def __init__(self, opcode, header, children, head=b''):
+        self.opcode = opcode
+        self.header = header
+        self.children = children
+        self.head = head
+
+    def aml(self):
+        body = self.head + b''.join(child.aml() for child in self.children)
+        return self.opcode + pkg_length(len(body)) + body
+
+    def asl(self, indent=0):
+        return block_asl(self.header, self.children, indent)
+
+
+def Scope(path, *children):
+    return Block(b'\x10', f'Scope ({asl_path(path)})', children, name_string(path))
+
+
+def Device(path, *children):
+    return Block(b'\x5b\x82', f'Device ({asl_path(path)})', children, name_string(path))
+
+
+def Method(name, args, *children):
+    return Block(b'\x14', f'Method ({asl_path(name)}, {args}, NotSerialized)', children,
+                 name_string(name) + bytes([args & 0x07]))
+
+
+def If(condition, *children):
+    return Block(b'\xa0', f'If ({value_asl(condition)})', children, value_aml(condition))
+
+
+def Else(*children):
+    return Block(b'\xa1', 'Else', children)
+
+
+def darwin_sta(enabled=0x0F, disabled=0):
+    """只在 macOS 下启用的 _STA"""
+    return Method('_STA', 0,
+                  If(Osi('Darwin'), Return(enabled)),
+                  Else(Return(disabled)))
+
+
+def device_properties(properties):
+    """_DSM 注入设备属性（Arg2 为 0 时返回支持的功能位）"""
+    items = []
+    for key, value in properties.items():
+        items += [key, value]
+    return Method('_DSM', 4,
+                  If(LEqual(Arg(2), 0), Return(b'\x03')),
+                  Return(items))
+
+
+class Ssdt:
+    """一张 SSDT：表头 + 顶层定义"""
+
+    def __init__(self, table_id, *children):
+        self.table_id = table_id
+        self.children = children
+
+    def aml(self):
+        body = b''.join(child.aml() for child in self.children)
+        header = TABLE_HEADER.pack(b'SSDT', TABLE_HEADER.size + len(body), 2, 0, OEM_ID,
+                                   self.table_id.encode('ascii').ljust(8, b'\0'), 0,
+                                   CREATOR_ID, CREATOR_REVISION)
+        table = bytearray(header + body)
+        table[9] = (-sum(table)) & 0xFF
+        return bytes(table)
+
+    def asl(self):
+        header = f'DefinitionBlock ("", "SSDT", 2, "{OEM_ID.decode().strip()}", "{self.table_id}", 0x00000000)'
+        return block_asl(header, self.children, 0) + '\n'
+
+
+# ---- 补丁模板 ----
+# 每个模板只依赖从命名空间查到的路径和用户选项，编译结果按参数缓存
+
+def _require(paths, message):
+    if not paths:
+        raise SsdtError(message)
+    return paths[0]
+
+
+def _find_lpc(namespace):
+    return _require(namespace.find_by_adr(ADR_LPC), "找不到 LPC 桥（_ADR 0x001F0000）")
+
+
+@lru_cache(maxsize=64)
+def compile_plug(cpu_path, cpu_type):
+    table = Ssdt('CpuPlug',
+                 External(cpu_path, cpu_type),
+                 Scope(cpu_path,
+                       If(Osi('Darwin'), device_properties({'plugin-type': 1}))))
+    return table.asl(), table.aml()
+
+
+def template_plug(namespace, options):
+    """SSDT-PLUG：在第一个 CPU 对象上设置 plugin-type，启用 XCPM 原生电源管理"""
+    cpu = options.get('cpu_path') or _require(namespace.processors(), "找不到 CPU 对象")
+    obj = namespace.get(cpu)
+    cpu_type = 'processor' if obj is None or obj['type'] == 'processor' else 'device'
+    return compile_plug(cpu, cpu_type)
+
+
+@lru_cache(maxsize=64)
+def compile_ec(lpc_path):
+    table = Ssdt('SsdtEC',
+                 External(lpc_path, 'device'),
+                 Scope(lpc_path,
+                       Device('EC',
+                              Name('_HID', 'ACID0001'),
+                              darwin_sta())))
+    return table.asl(), table.aml()
+
+
+def template_ec(namespace, options):
+    """SSDT-EC：macOS 需要名为 EC 的嵌入式控制器，在 LPC 桥下添加一个仅 macOS 可见的假 EC"""
+    lpc = options.get('lpc_path') or _find_lpc(namespace)
+    if any(path.endswith('.EC__') for path in namespace.by_path):
+        raise SsdtError("DSDT 中已存在名为 EC 的设备，无需添加")
+    return compile_ec(lpc)
+
+
+@lru_cache(maxsize=64)
+def compile_usbx(sleep_supply, wake_supply, sleep_limit, wake_limit):
+    table = Ssdt('SsdtUsbx',
+                 Scope('\\_SB',
+                       Device('USBX',
+                              Name('_ADR', 0),
+                              device_properties({
+                                  'kUSBSleepPowerSupply': sleep_supply,
+                                  'kUSBSleepPortCurrentLimit': sleep_limit,
+                                  'kUSBWakePowerSupply': wake_supply,
+                                  'kUSBWakePortCurrentLimit': wake_limit
+                              }),
+                              darwin_sta())))
+    return table.asl(), table.aml()
+
+
+def template_usbx(namespace, options):
+    """SSDT-USBX：USB 端口供电参数（单位 mA）"""
+    return compile_usbx(
+        int(options.get('sleep_supply', 0x13EC)),
+        int(options.get('wake_supply', 0x13EC)),
+        int(options.get('sleep_limit', 0x0834)),
+        int(options.get('wake_limit', 0x0834))
+    )
+
+
+@lru_cache(maxsize=64)
+def compile_pmc(lpc_path):
+    crs = Buffer(bytes([0x86, 0x09, 0x00, 0x01]) + struct.pack('<II', 0xFE000000, 0x00010000) + b'\x79\x00')
+    table = Ssdt('PMCR',
+                 External(lpc_path, 'device'),
+                 Scope(lpc_path,
+                       Device('PMCR',
+                              Name('_HID', 'APP9876'),
+                              darwin_sta(0x0B),
+                              Name('_CRS', crs))))
+    return table.asl(), table.aml()
+
+
+def template_pmc(namespace, options):
+    """SSDT-PMC：300 系列主板的 NVRAM 需要 PMC 设备"""
+    return compile_pmc(options.get('lpc_path') or _find_lpc(namespace))
+
+
+@lru_cache(maxsize=64)
+def compile_pnlf(uid):
+    table = Ssdt('PNLF',
+                 Scope('\\_SB',
+                       Device('PNLF',
+                              Name('_HID', 'APP0002'),
+                              Name('_CID', 'backlight'),
+                              Name('_UID', uid),
+                              darwin_sta(0x0B))))
+    return table.asl(), table.aml()
+
+
+def template_pnlf(namespace, options):
+    """SSDT-PNLF：笔记本内屏亮度调节（_UID 按核显代数选择，默认 0x13）"""
+    return compile_pnlf(int(options.get('uid', 0x13)))
+
+
+@lru_cache(maxsize=64)
+def compile_properties(table_id, device_path, properties):
+    table = Ssdt(table_id,
+                 External(device_path, 'device'),
+                 Scope(device_path,
+                       If(Osi('Darwin'), device_properties(dict(properties)))))
+    return table.asl(), table.aml()
+
+
+def _device_by_adr(namespace, options, candidates, message):
+    if options.get('device_path'):
+        return options['device_path']
+    for adr in candidates:
+        paths = namespace.find_by_adr(adr)
+        if paths:
+            return paths[0]
+    raise SsdtError(message)
+
+
+def template_hdef(namespace, options):
+    """声卡：注入 AppleALC 的 layout-id"""
+    path = _device_by_adr(namespace, options, ADR_HDA, "找不到声卡（HDA）设备")
+    layout = int(options.get('layout_id', 1))
+    return compile_properties('HDEF', path, (('layout-id', layout.to_bytes(4, 'little')),))
+
+
+def template_ethernet(namespace, options):
+    """以太网卡：标记为内建网卡，App Store 和 iCloud 需要 en0 为内建设备"""
+    path = _device_by_adr(namespace, options, ADR_ETHERNET, "找不到板载以太网卡")
+    return compile_properties('Ethernet', path, (('built-in', b'\x00'),))
+
+
+def template_igpu(namespace, options):
+    """核显：注入 ig-platform-id"""
+    path = _device_by_adr(namespace, options, (ADR_IGPU,), "找不到核显设备")
+    platform_id = int(str(options.get('platform_id', '0x3E9B0007')), 0)
+    return compile_properties('IGPU', path, (('AAPL,ig-platform-id', platform_id.to_bytes(4, 'little')),))
+
+
+# 补丁 ID -> (文件名, 模板, 模板使用的选项)
+PATCHES = OrderedDict([
+    ('plug', ('SSDT-PLUG', template_plug, ('cpu_path',))),
+    ('ec', ('SSDT-EC', template_ec, ('lpc_path',))),
+    ('usbx', ('SSDT-USBX', template_usbx, ('sleep_supply', 'wake_supply', 'sleep_limit', 'wake_limit'))),
+    ('pmc', ('SSDT-PMC', template_pmc, ('lpc_path',))),
+    ('pnlf', ('SSDT-PNLF', template_pnlf, ('uid',))),
+    ('hdef', ('SSDT-HDEF', template_hdef, ('device_path', 'layout_id'))),
+    ('ethernet', ('SSDT-ETHERNET', template_ethernet, ('device_path',))),
+    ('igpu', ('SSDT-IGPU', template_igpu, ('device_path', 'platform_id')))
+])
+
+
+class SsdtService:
+    """加载 ACPI 表并建立设备索引，按需批量生成补丁；
+    索引按表哈希缓存，生成结果按 (表哈希, 补丁, 相关选项) 缓存，修改选项后只重新套用模板"""
+
+    def __init__(self, loader=load_tables, cache_dir=None):
+        self.loader = loader
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.namespaces = OrderedDict()   # 表哈希 -> AcpiNamespace
+        self.results = OrderedDict()      # (表哈希, 补丁, 选项) -> 结果
+        self.namespace = None
+
+    def load(self, path=None):
+        """读取 ACPI 表并建立索引：内存中已有相同内容的索引时直接复用，
+        否则优先读取磁盘上的索引缓存，都没有时才解析"""
+        started = time.time()
+        tables = self.loader(path)
+        if not any(t.is_aml for t in tables):
+            raise SsdtError("没有找到 DSDT/SSDT 表")
+        key = tables_hash(tables)
+        with self.lock:
+            namespace = self.namespaces.get(key)
+            if namespace is not None:
+                self.namespaces.move_to_end(key)
+        if namespace is None:
+            namespace = AcpiNamespace(tables, self.cache_dir)
+            with self.lock:
+                self.namespaces[key] = namespace
+                while len(self.namespaces) > NAMESPACE_CACHE_SIZE:
+                    self.namespaces.popitem(last=False)
+        else:
+            for table in tables:
+                table.close()
+        with self.lock:
+            self.namespace = namespace
+        return dict(self.summary(), elapsed=round(time.time() - started, 4))
+
+    def summary(self):
+        namespace = self.current()
+        lpc = namespace.find_by_adr(ADR_LPC)
+        return {
+            'hash': namespace.hash,
+            'tables': [t.to_dict() for t in namespace.tables],
+            'objects': len(namespace.objects),
+            'devices': len(namespace.devices()),
+            'processors': namespace.processors(),
+            'lpc': lpc[0] if lpc else None,
+            'errors': namespace.errors[:20],
+            'cached': namespace.cached,
+            'patches': list(PATCHES)
+        }
+
+    def current(self):
+        with self.lock:
+            namespace = self.namespace
+        if namespace is None:
+            raise SsdtError("请先加载 ACPI 表")
+        return namespace
+
+    def generate(self, patches, options=None):
+        """批量生成补丁：返回 {补丁ID: {'name', 'asl', 'aml'}}，失败的补丁包含 'error'"""
+        namespace = self.current()
+        options = options or {}
+        results = {}
+        for patch in patches:
+            if patch not in PATCHES:
+                results[patch] = {'name': patch, 'error': '未知的补丁类型'}
+                continue
+            name, template, used = PATCHES[patch]
+            # options[补丁ID] 为该补丁单独的选项，覆盖公共选项
+            patch_options = dict(options)
+            if isinstance(options.get(patch), dict):
+                patch_options.update(options[patch])
+            key = (namespace.hash, patch, tuple((k, str(patch_options.get(k))) for k in used))
+            with self.lock:
+                cached = self.results.get(key)
+                if cached is not None:
+                    self.results.move_to_end(key)
+            if cached is None:
+                try:
+                    asl, aml = template(namespace, patch_options)
+                    cached = {'name': name, 'asl': asl, 'aml': aml}
+                except (SsdtError, ValueError) as e:
+                    cached = {'name': name, 'error': str(e)}
+                with self.lock:
+                    self.results[key] = cached
+                    while len(self.results) > RESULT_CACHE_SIZE:
+                        self.results.popitem(last=False)
+            results[patch] = cached
+        return results
+
+    def export(self, patches, options, save_path):
+        """保存生成的 .aml：单个补丁直接写文件，多个补丁打包为 zip"""
+        results = self.generate(patches, options)
+        failed = {p: r['error'] for p, r in results.items() if 'error' in r}
+        if failed:
+            raise SsdtError('；'.join(f"{results[p]['name']}: {e}" for p, e in failed.items()))
+        tmp_path = f"{save_path}.tmp"
+        if len(results) == 1:
+            with open(tmp_path, 'wb') as f:
+                f.write(next(iter(results.values()))['aml'])
+        else:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for result in results.values():
+                    archive.writestr(f"{result['name']}.aml", result['aml'])
+                    archive.writestr(f"{result['name']}.dsl", result['asl'])
+        os.replace(tmp_path, save_path)
+        return save_path
+
+
+def save_asl(source, save_path):
+    """保存编辑器中的 ASL 源码；目标为 .aml 时调用 iasl 编译（需要安装 iasl）"""
+    if not save_path.lower().endswith('.aml'):
+        with open(save_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        return save_path
+    iasl = shutil.which('iasl')
+    if not iasl:
+        raise SsdtError("编译 ASL 需要安装 iasl，或保存为 .dsl 文件")
+    with tempfile.TemporaryDirectory() as tmp:
+        dsl = os.path.join(tmp, 'SSDT.dsl')
+        with open(dsl, 'w', encoding='utf-8') as f:
+            f.write(source)
+        result = subprocess.run([iasl, '-p', os.path.join(tmp, 'SSDT'), dsl],
+                                capture_output=True, text=True, timeout=60)
+        output = os.path.join(tmp, 'SSDT.aml')
+        if result.returncode != 0 or not os.path.exists(output):
+            raise SsdtError(f"iasl 编译失败: {(result.stdout + result.stderr).strip()[-500:]}")
+        shutil.copyfile(output, save_path)
+    return save_path
+
+
+def load_asl(path):
+    """导入 SSDT：.dsl 直接读取，.aml 需要 iasl 反编译"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] not in (b'SSDT', b'DSDT'):
+        if b'\0' in data:
+            raise SsdtError("不是有效的 SSDT 文件")
+        return data.decode('utf-8', 'replace')
+    iasl = shutil.which('iasl')
+    if not iasl:
+        raise SsdtError("反编译 .aml 需要安装 iasl，请导入 .dsl 文件")
+    with tempfile.TemporaryDirectory() as tmp:
+        aml = os.path.join(tmp, 'SSDT.aml')
+        shutil.copyfile(path, aml)
+        result = subprocess.run([iasl, '-d', aml], capture_output=True, text=True, timeout=60)
+        output = os.path.join(tmp, 'SSDT.dsl')
+        if result.returncode != 0 or not os.path.exists(output):
+            raise SsdtError(f"iasl 反编译失败: {(result.stdout + result.stderr).strip()[-500:]}")
+        with open(output, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
@@ -0,0 +1,113 @@
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+
+REPORT_IMPORTS = 25        # 报告中列出的最慢导入数量
+
+
+class StartupProfiler:
+    """--profile-startup：统计各模块首次导入的耗时（含其依赖）与启动各阶段的耗时，未启用时不做任何事"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.imports = []      # (模块名, 耗时)，只记录最外层的导入
+        self.phases = []       # (阶段名, 开始, 耗时)，时间相对进程启动计时点
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.reported = False  # 启动报告打印之后，延迟加载的模块各自单独报告
+
+    def install(self):
+        """替换 __import__，记录首次导入的模块"""
+        if not self.enabled:
+            return
+        original = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            depth = getattr(self.local, 'depth', 0)
+            self.local.depth = depth + 1
+            started = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                self.local.depth = depth
+                if depth == 0:
+                    with self.lock:
+                        self.imports.append((name, time.perf_counter() - started))
+
+        builtins.__import__ = timed_import
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                elapsed = time.perf_counter() - started
+                with self.lock:
+                    self.phases.append((name, started - self.origin, elapsed))
+
+    def mark(self, name):
+        """记录一个时间点（如窗口首次绘制）"""
+        if self.enabled:
+            with self.lock:
+                self.phases.append((name, time.perf_counter() - self.origin, None))
+
+    def report(self, title='启动耗时'):
+        if not self.enabled:
+            return
+        with self.lock:
+            imports = sorted(self.imports, key=lambda item: -item[1])
+            phases = sorted(self.phases, key=lambda item: item[1])
+            self.imports = []
+            self.phases = []
+        lines = [f"==== {title} ===="]
+        if phases:
+            lines.append("阶段（开始时间 / 耗时）:")
+            for name, started, elapsed in phases:
+                duration = f"{elapsed * 1000:8.1f} ms" if elapsed is not None else ' ' * 11
+                lines.append(f"  {started * 1000:8.1f} ms  {duration}  {name}")
+        if imports:
+            total = sum(elapsed for _, elapsed in imports)
+            lines.append(f"模块导入（共 {len(imports)} 个，{total * 1000:.1f} ms，含各自的依赖）:")
+            for name, elapsed in imports[:REPORT_IMPORTS]:
+                lines.append(f"  {elapsed * 1000:8.1f} ms  {name}")
+        print('\n'.join(lines))
+        self.reported = True
+
+
+class LazyService:
+    """首次访问属性时才导入模块并创建对象，之后直接转发到该对象"""
+
+    def __init__(self, name, factory, profiler=None):
+        self._name = name
+        self._factory = factory
+        self._profiler = profiler
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def resolve(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    profiler = self._profiler
+                    if profiler:
+                        with profiler.phase(f"加载 {self._name}"):
+                            self._instance = self._factory()
+                        if profiler.reported:
+                            profiler.report(f"延迟加载 {self._name}")
+                    else:
+                        self._instance = self._factory()
+        return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
@@ -39,8 +39,9 @@ class DMGDownloader {
             // 延迟以展示动画
             await new Promise(resolve => setTimeout(resolve, 300));
             
-            const url = `/api/dmg-list?t=${force ? Date.now() : ''}`;
-            const response = await fetch(url);
+            // 服务端缓存镜像列表并返回ETag，浏览器用 If-None-Match 协商
+            const url = force ? '/api/dmg-list?refresh=1' : '/api/dmg-list';
+            const response = await fetch(url, { cache: 'no-cache' });
             
             if (!response.ok) throw new Error(`HTTP错误 ${response.status}`);
             
@@ -135,6 +136,10 @@ class DMGDownloader {
                             </button>
                             <button class="btn btn-primary download-btn" 
                                     data-url="${encodeURIComponent(dmg.downloadUrl)}"
+                                    data-checksum="${dmg.sha256 || dmg.checksum || ''}"
+                                    data-chunklist="${dmg.chunklistUrl ? encodeURIComponent(dmg.chunklistUrl) : ''}"
+                                    data-catalog-id="${encodeURIComponent(this.getCatalogId(dmg))}"
+                                    data-mirrors="${encodeURIComponent(JSON.stringify(dmg.mirrors || []))}"
                                     data-filename="${dmg.title.replace(/\s+/g, '_')}_${dmg.version}.dmg">
                                 <i class="fas fa-download"></i> 下载
                             </button>
@@ -151,6 +156,37 @@ class DMGDownloader {
         // 重新绑定事件
         this.initCopyButtons();
         this.initToggleButton();
+        this.markLibraryImages();
+    }
+
+    // 镜像列表条目的标识，本地镜像库按它识别同一镜像
+    getCatalogId(dmg) {
+        return String(dmg.id || `${dmg.title} ${dmg.version} ${dmg.build}`);
+    }
+
+    // 标记本地镜像库中已有的镜像，点击后直接取出而不是重新下载
+    async markLibraryImages() {
+        try {
+            const response = await fetch('/api/library');
+            const data = await response.json();
+            if (!data.success) return;
+            const catalogIds = new Set();
+            const urls = new Set();
+            data.images.forEach(image => {
+                image.catalog_ids.forEach(id => catalogIds.add(id));
+                image.urls.forEach(url => urls.add(url));
+            });
+            document.querySelectorAll('.dmg-item .download-btn').forEach(btn => {
+                const catalogId = decodeURIComponent(btn.getAttribute('data-catalog-id'));
+                const url = decodeURIComponent(btn.getAttribute('data-url'));
+                if (catalogIds.has(catalogId) || urls.has(url)) {
+                    btn.innerHTML = '<i class="fas fa-hdd"></i> 本地已有';
+                    btn.title = '本地镜像库中已有该镜像，选择保存位置后立即完成';
+                }
+            });
+        } catch (error) {
+            console.error('读取镜像库失败:', error);
+        }
     }
 
     initCopyButtons() {
@@ -37,6 +37,20 @@ class DownloadManager {
                 this.openFileLocation(path);
             }
 
+            // 暂停下载按钮
+            if (e.target.closest('.pause-download-btn')) {
+                const btn = e.target.closest('.pause-download-btn');
+                const downloadId = btn.getAttribute('data-download-id');
+                this.pauseDownload(downloadId);
+            }
+
+            // 继续下载按钮
+            if (e.target.closest('.resume-download-btn')) {
+                const btn = e.target.closest('.resume-download-btn');
+                const downloadId = btn.getAttribute('data-download-id');
+                this.resumeDownload(downloadId);
+            }
+
             // 重试按钮
             if (e.target.closest('.retry-download-btn')) {
                 const btn = e.target.closest('.retry-download-btn');
@@ -106,7 +120,14 @@ class DownloadManager {
                 body: JSON.stringify({
                     url: url,
                     save_path: savePath,
-                    filename: filename
+                    filename: filename,
+                    checksum: btn?.getAttribute('data-checksum') || null,
+                    catalog_id: btn?.getAttribute('data-catalog-id') ?
+                        decodeURIComponent(btn.getAttribute('data-catalog-id')) : null,
+                    mirrors: btn?.getAttribute('data-mirrors') ?
+                        JSON.parse(decodeURIComponent(btn.getAttribute('data-mirrors'))) : [],
+                    chunklist_url: btn?.getAttribute('data-chunklist') ?
+                        decodeURIComponent(btn.getAttribute('data-chunklist')) : null
                 })
             });
 
@@ -132,7 +153,7 @@ class DownloadManager {
                 id: data.download_id,
                 filename: filename,
                 path: savePath,
-                status: 'downloading',
+                status: data.status || 'downloading',
                 progress: 0,
                 speed: '0 KB/s',
                 eta: '--',
@@ -351,6 +372,7 @@ class DownloadManager {
         item.style.transform = 'translateY(10px)';
         
         item.innerHTML = this._getDownloadItemHTML(download);
+        item.dataset.state = this._getRenderState(download);
         
         // 触发动画
         setTimeout(() => {
@@ -360,6 +382,29 @@ class DownloadManager {
         }, 10);
     }
 
+    // 进度推送：按钮和状态不变时只改写进度相关的节点，不重建整个下载项
+    updateDownload(download) {
+        const item = document.getElementById(`download-${download.id}`);
+        if (!item || item.dataset.state !== this._getRenderState(download)) {
+            this.addDownloadItem(download);
+            return;
+        }
+        const progress = Math.min(100, Math.max(0, download.progress || 0));
+        item.querySelector('.download-progress').textContent = `${progress.toFixed(1)}%`;
+        item.querySelector('.download-progress-bar').style.width = `${progress}%`;
+        item.querySelector('.download-speed').textContent = download.speed;
+        item.querySelector('.download-eta').textContent = `剩余: ${download.eta}`;
+        const verify = item.querySelector('.download-verify');
+        if (verify) verify.title = download.verification.message || '';
+    }
+
+    // 决定下载项结构（状态文字、按钮、校验标记）的字段
+    _getRenderState(download) {
+        const verification = download.verification || {};
+        return [download.status, download.resumable, download.path,
+                verification.status, verification.method].join('|');
+    }
+
     _getDownloadItemHTML(download) {
         const progress = Math.min(100, Math.max(0, download.progress || 0));
         const statusClass = download.status === 'error' ? 'error' : 
@@ -370,7 +415,10 @@ class DownloadManager {
                 <div class="download-header">
                     <span class="download-filename">${download.filename}</span>
                     <span class="download-status">${download.status === 'downloading' ? '下载中' : 
-                                               download.status === 'completed' ? '已完成' : '失败'}</span>
+                                               download.status === 'queued' ? '排队中' :
+                                               download.status === 'paused' ? '已暂停' :
+                                               download.status === 'completed' ? (download.reused ? '已完成（本地镜像库）' : '已完成') :
+                                               download.status === 'cancelled' ? '已取消' : '失败'}</span>
                 </div>
                 
                 <div class="download-path">${download.path}</div>
@@ -379,6 +427,7 @@ class DownloadManager {
                     <span class="download-progress">${progress.toFixed(1)}%</span>
                     <span class="download-speed">${download.speed}</span>
                     <span class="download-eta">剩余: ${download.eta}</span>
+                    ${this._getVerificationHTML(download.verification)}
                 </div>
                 
                 <div class="progress-container">
@@ -387,7 +436,10 @@ class DownloadManager {
             </div>
             
             <div class="download-actions">
-                ${download.status === 'downloading' ? `
+                ${download.status === 'downloading' || download.status === 'queued' ? `
+                    <button class="btn btn-outline pause-download-btn" data-download-id="${download.id}">
+                        <i class="fas fa-pause"></i>
+                    </button>
                     <button class="btn btn-outline cancel-download-btn" data-download-id="${download.id}">
                         <i class="fas fa-times"></i> 取消
                     </button>
@@ -395,6 +447,10 @@ class DownloadManager {
                     <button class="btn btn-outline open-folder-btn" data-path="${download.path}">
                         <i class="fas fa-folder-open"></i>
                     </button>
+                ` : download.resumable ? `
+                    <button class="btn btn-outline resume-download-btn" data-download-id="${download.id}">
+                        <i class="fas fa-play"></i> 继续
+                    </button>
                 ` : `
                     <button class="btn btn-outline retry-download-btn" 
                             data-url="${encodeURIComponent(download.url)}"
@@ -406,6 +462,24 @@ class DownloadManager {
         `;
     }
 
+    _getVerificationHTML(verification) {
+        if (!verification) return '';
+        const states = {
+            pending: { icon: 'fa-hourglass-half', text: '等待校验' },
+            verifying: { icon: 'fa-shield-alt', text: '校验中' },
+            passed: { icon: 'fa-check-circle', text: '校验通过' },
+            failed: { icon: 'fa-times-circle', text: '校验失败' }
+        };
+        const state = states[verification.status] || states.pending;
+        const method = verification.method === 'chunklist' ? 'chunklist' :
+                       verification.method === 'sha256' ? 'SHA-256' : '';
+        return `
+            <span class="download-verify ${verification.status}" title="${verification.message || ''}">
+                <i class="fas ${state.icon}"></i> ${state.text}${method ? ` (${method})` : ''}
+            </span>
+        `;
+    }
+
     cancelDownload(downloadId) {
         const download = this.activeDownloads.get(downloadId);
         if (download) {
@@ -435,6 +509,44 @@ class DownloadManager {
         });
     }
 
+    pauseDownload(downloadId) {
+        fetch('/api/downloads/pause', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ download_id: downloadId })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message || '无法暂停下载');
+            }
+            showToast('下载已暂停', 'info');
+        })
+        .catch(error => {
+            console.error('暂停下载失败:', error);
+            showToast(`暂停下载失败: ${error.message}`, 'error');
+        });
+    }
+
+    resumeDownload(downloadId) {
+        fetch('/api/resume-download', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ download_id: downloadId })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message || '无法继续下载');
+            }
+            showToast('下载已继续', 'success');
+        })
+        .catch(error => {
+            console.error('继续下载失败:', error);
+            showToast(`继续下载失败: ${error.message}`, 'error');
+        });
+    }
+
     openFileLocation(path) {
         try {
             pywebview.api.open_file_location(path);
@@ -450,10 +562,10 @@ document.addEventListener('DOMContentLoaded', () => {
     window.downloadManager = new DownloadManager();
 });
 
-// 供Python调用的更新下载项函数
+// 事件流推送下载状态时调用的更新函数
 function updateDownloadItem(download) {
     if (window.downloadManager) {
-        window.downloadManager.addDownloadItem(download);
+        window.downloadManager.updateDownload(download);
         
         // 更新关联按钮状态
         const activeDownload = window.downloadManager.activeDownloads.get(download.id);
@@ -10,7 +10,12 @@ const appState = {
     ],
     markedLoaded: false,
     updateCheckInProgress: false,
-    updateChecked: false
+    updateChecked: false,
+    hardwareLoading: false,
+    usbMap: null,
+    burnStatus: {},
+    burn: { source: null, jobId: null, targets: [] },
+    ssdt: { loaded: false, summary: null, patches: [], names: [], options: {}, generatedSource: '' }
 };
 
 // 在initializeApp中添加marked.js加载
@@ -21,6 +26,10 @@ async function initializeApp() {
         await loadMarked();
         await applyPreferences();
         setupEventListeners();
+        connectEvents();
+        
+        // 后台加载硬件信息（服务端已缓存，不阻塞初始化）
+        loadHardwareInfo();
         
         // 只在初始化时检查一次更新
         if (document.getElementById('auto-update-toggle').checked) {
@@ -86,10 +95,18 @@ async function applyPreferences() {
     document.getElementById('auto-update-toggle').checked = prefs.autoUpdateCheck;
     document.getElementById('developer-mode-toggle').checked = prefs.developerMode;
     
+    // 应用下载设置（限速在界面上以KB/s显示）
+    document.getElementById('max-concurrent-downloads').value = prefs.maxConcurrentDownloads;
+    document.getElementById('download-rate-limit').value = Math.round(prefs.downloadRateLimit / 1024);
+    document.getElementById('image-library-quota').value = Math.round(prefs.imageLibraryQuota / 1024 ** 3);
+    document.getElementById('http-proxy').value = prefs.httpProxy;
+    document.getElementById('efi-backup-dir').value = prefs.efiBackupDir;
+    
     // 应用开发者模式
     if (prefs.developerMode) {
         document.body.classList.add('developer-mode');
     }
+    setMetricsPolling(prefs.developerMode);
     
     // 恢复单选按钮状态
     restoreRadioSelections(prefs.radioGroups);
@@ -111,6 +128,11 @@ async function loadPreferences() {
             animationsEnabled: Boolean(prefs.animationsEnabled),
             autoUpdateCheck: Boolean(prefs.autoUpdateCheck),
             developerMode: Boolean(prefs.developerMode),
+            maxConcurrentDownloads: parseInt(prefs.maxConcurrentDownloads, 10) || 2,
+            downloadRateLimit: parseInt(prefs.downloadRateLimit, 10) || 0,
+            imageLibraryQuota: Number.isInteger(prefs.imageLibraryQuota) ? prefs.imageLibraryQuota : 32 * 1024 ** 3,
+            httpProxy: typeof prefs.httpProxy === 'string' ? prefs.httpProxy : '',
+            efiBackupDir: typeof prefs.efiBackupDir === 'string' ? prefs.efiBackupDir : '',
             radioGroups: prefs.radioGroups || {}
         };
     } catch (error) {
@@ -122,6 +144,11 @@ async function loadPreferences() {
             animationsEnabled: true,
             autoUpdateCheck: true,
             developerMode: false,
+            maxConcurrentDownloads: 2,
+            downloadRateLimit: 0,
+            imageLibraryQuota: 32 * 1024 ** 3,
+            httpProxy: '',
+            efiBackupDir: '',
             radioGroups: {}
         };
     }
@@ -270,6 +297,44 @@ function restoreRadioSelections(radioGroups) {
 
 // 设置事件监听器
 function setupEventListeners() {
+    // USB端口映射
+    const detectUsbBtn = document.getElementById('detect-usb-btn');
+    if (detectUsbBtn) {
+        detectUsbBtn.addEventListener('click', detectUsbPorts);
+    }
+    const exportUsbBtn = document.getElementById('export-usb-btn');
+    if (exportUsbBtn) {
+        exportUsbBtn.addEventListener('click', exportUsbPorts);
+    }
+
+    // SSDT定制与ACPI工具
+    const ssdtButtons = {
+        'ssdt-power-btn': () => generateSsdtPatches(['plug', 'ec']),
+        'ssdt-device-btn': generateDevicePatch,
+        'ssdt-import-btn': importSsdt,
+        'ssdt-save-btn': saveSsdt,
+        'ssdt-export-btn': exportSsdt,
+        'acpi-tool-btn': openAcpiTool
+    };
+    Object.entries(ssdtButtons).forEach(([id, handler]) => {
+        const button = document.getElementById(id);
+        if (button) button.addEventListener('click', handler);
+    });
+
+    // 镜像烧录
+    const burnSource = document.getElementById('burn-source');
+    if (burnSource) burnSource.addEventListener('click', selectBurnSource);
+    const burnTarget = document.getElementById('burn-target');
+    if (burnTarget) burnTarget.addEventListener('change', showBurnTargetSize);
+    const burnStart = document.getElementById('burn-start');
+    if (burnStart) burnStart.addEventListener('click', toggleBurn);
+
+    // EFI编辑器
+    const efiEditorBtn = document.getElementById('efi-editor-btn');
+    if (efiEditorBtn) {
+        efiEditorBtn.addEventListener('click', openEfiEditor);
+    }
+
     // 检查更新按钮
     const checkUpdateBtnNew = document.getElementById('check-update-btn');
     if (checkUpdateBtnNew) {
@@ -319,6 +384,7 @@ function setupEventListeners() {
     if (devModeToggle) {
         devModeToggle.addEventListener('change', function() {
             document.body.classList.toggle('developer-mode', this.checked);
+            setMetricsPolling(this.checked);
             savePreferences({
                 developerMode: this.checked,
                 themeMode: localStorage.getItem('themeMode') || 'system',
@@ -345,6 +411,59 @@ function setupEventListeners() {
         });
     }
     
+    // 下载设置
+    const maxConcurrentInput = document.getElementById('max-concurrent-downloads');
+    const rateLimitInput = document.getElementById('download-rate-limit');
+    [maxConcurrentInput, rateLimitInput].forEach(input => {
+        if (!input) return;
+        input.addEventListener('change', () => {
+            const maxConcurrent = Math.min(8, Math.max(1, parseInt(maxConcurrentInput.value, 10) || 1));
+            const rateLimitKb = Math.max(0, parseInt(rateLimitInput.value, 10) || 0);
+            maxConcurrentInput.value = maxConcurrent;
+            rateLimitInput.value = rateLimitKb;
+            savePreferences({
+                maxConcurrentDownloads: maxConcurrent,
+                downloadRateLimit: rateLimitKb * 1024
+            });
+        });
+    });
+    
+    // 本地镜像库容量
+    const libraryQuotaInput = document.getElementById('image-library-quota');
+    if (libraryQuotaInput) {
+        libraryQuotaInput.addEventListener('change', async () => {
+            const quotaGb = Math.max(0, parseInt(libraryQuotaInput.value, 10) || 0);
+            libraryQuotaInput.value = quotaGb;
+            await savePreferences({ imageLibraryQuota: quotaGb * 1024 ** 3 });
+            loadLibraryUsage();
+        });
+    }
+    
+    // EFI备份目录
+    const efiBackupInput = document.getElementById('efi-backup-dir');
+    if (efiBackupInput) {
+        efiBackupInput.addEventListener('change', () => {
+            savePreferences({ efiBackupDir: efiBackupInput.value.trim() });
+        });
+    }
+    const efiBackupBrowseBtn = document.getElementById('efi-backup-browse-btn');
+    if (efiBackupBrowseBtn) {
+        efiBackupBrowseBtn.addEventListener('click', async () => {
+            const folder = await postJson('/api/select-folder');
+            if (!folder.success) return;
+            efiBackupInput.value = folder.path;
+            savePreferences({ efiBackupDir: folder.path });
+        });
+    }
+    
+    // 代理设置
+    const proxyInput = document.getElementById('http-proxy');
+    if (proxyInput) {
+        proxyInput.addEventListener('change', () => {
+            savePreferences({ httpProxy: proxyInput.value.trim() });
+        });
+    }
+    
     // 单选按钮
     document.querySelectorAll('input[type="radio"]').forEach(radio => {
         radio.addEventListener('change', () => {
@@ -364,16 +483,52 @@ function setupEventListeners() {
     if (checkUpdateBtn) {
         checkUpdateBtn.addEventListener('click', checkForUpdates);
     }
+    
+    // 性能面板
+    const metricsRefreshBtn = document.getElementById('metrics-refresh-btn');
+    if (metricsRefreshBtn) {
+        metricsRefreshBtn.addEventListener('click', loadMetrics);
+    }
+    const metricsResetBtn = document.getElementById('metrics-reset-btn');
+    if (metricsResetBtn) {
+        metricsResetBtn.addEventListener('click', async () => {
+            await postJson('/api/metrics/reset');
+            loadMetrics();
+        });
+    }
+    const metricsProfileBtn = document.getElementById('metrics-profile-btn');
+    if (metricsProfileBtn) {
+        metricsProfileBtn.addEventListener('click', profileStacks);
+    }
 }
 
-// 检查更新
-async function checkForUpdates() {
+// 获取后台缓存的更新检查结果；检查尚未完成时（202）稍后重试
+async function fetchUpdateInfo(force) {
+    const maxAttempts = 10;
+    for (let attempt = 0; attempt < maxAttempts; attempt++) {
+        const url = force && attempt === 0 ? '/api/check-update?force=1' : '/api/check-update';
+        const response = await fetch(url);
+        if (response.status === 202) {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+            continue;
+        }
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.error || `HTTP错误 ${response.status}`);
+        }
+        return response.json();
+    }
+    throw new Error('检查更新超时');
+}
+
+// 检查更新（按钮点击时要求服务端重新检查，自动检查直接使用缓存）
+async function checkForUpdates(event) {
     // 防止重复检查
     if (appState.updateCheckInProgress) return;
     appState.updateCheckInProgress = true;
     
     const btn = document.getElementById('check-update-btn');
-    const currentVersion = document.querySelector('#current-version').textContent.trim();
+    const manual = event instanceof Event;
     
     try {
         // 更新按钮状态
@@ -382,16 +537,11 @@ async function checkForUpdates() {
             btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 检查中...';
         }
 
-        const response = await fetch('/api/check-update');
-        if (!response.ok) throw new Error(`HTTP错误 ${response.status}`);
-
-        const data = await response.json();
+        const data = await fetchUpdateInfo(manual);
         if (!data.latestVersion) throw new Error('无效的更新数据');
 
-        const currentVersionNum = currentVersion.replace('v', '').trim();
-        const latestVersionNum = data.latestVersion.replace('v', '').trim();
-        
-        if (latestVersionNum !== currentVersionNum) {
+        // 版本比较由服务端按语义化版本完成
+        if (data.updateAvailable) {
             document.querySelectorAll('.version-badge').forEach(badge => {
                 badge.textContent = `新版本 v${data.latestVersion}`;
                 badge.style.display = 'inline-flex';
@@ -635,56 +785,913 @@ function showSection(sectionId) {
     
     document.getElementById(sectionId).classList.add('active');
     document.querySelector(`.nav-item[onclick="showSection('${sectionId}')"]`).classList.add('active');
+    
+    if (sectionId === 'hardware') {
+        loadHardwareInfo();
+    }
+    if (sectionId === 'usb' && !appState.usbMap) {
+        loadUsbPorts();
+    }
+    if (sectionId === 'burn') {
+        loadBurnTargets();
+    }
+    if (sectionId === 'settings') {
+        loadLibraryUsage();
+        if (appState.metricsTimer) loadMetrics();
+    }
 }
 
-// 模拟USB端口检测
-function detectUsbPorts() {
-    const portsContainer = document.getElementById('usb-ports');
-    portsContainer.innerHTML = `
-        <div style="background-color: #f8f9fa; border-radius: 8px; padding: 15px;">
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                <div>
-                    <strong>USB 3.0 Port (HS01)</strong>
-                    <div style="font-size: 12px; color: var(--text-light);">XHCI控制器</div>
-                </div>
-                <label class="switch">
-                    <input type="checkbox" checked>
-                    <span class="slider round"></span>
-                </label>
+// 加载硬件信息：先显示服务端缓存，仍在探测的类别稍后再取
+async function loadHardwareInfo() {
+    if (appState.hardwareLoading) return;
+    appState.hardwareLoading = true;
+    try {
+        for (let attempt = 0; attempt < 20; attempt++) {
+            const response = await fetch('/api/hardware');
+            const data = await response.json();
+            if (!data.success) throw new Error(data.message || '获取硬件信息失败');
+            renderHardwareInfo(data.categories);
+            if (!data.pending.length) break;
+            await new Promise(resolve => setTimeout(resolve, 500));
+        }
+    } catch (error) {
+        console.error('加载硬件信息失败:', error);
+    } finally {
+        appState.hardwareLoading = false;
+    }
+}
+
+function formatBytes(bytes) {
+    if (!bytes) return '--';
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let i = 0;
+    while (bytes >= 1024 && i < units.length - 1) {
+        bytes /= 1024;
+        i++;
+    }
+    return `${bytes.toFixed(i >= 3 ? 1 : 0)} ${units[i]}`;
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function renderHardwareItems(containerId, items) {
+    const container = document.getElementById(containerId);
+    if (!container) return;
+    if (!items.length) items = [['状态', '未检测到设备']];
+    container.innerHTML = items.map(([label, value]) => `
+                    <div class="info-item">
+                        <div class="info-label">${escapeHtml(label)}</div>
+                        <div class="info-value">${escapeHtml(value == null || value === '' ? '--' : String(value))}</div>
+                    </div>`).join('');
+}
+
+function renderHardwareInfo(categories) {
+    const ready = name => categories[name] && categories[name].data;
+    const mhz = value => value ? `${(value / 1000).toFixed(1)} GHz` : null;
+    const deviceName = dev => [dev.vendor, dev.name || dev.model].filter(Boolean).join(' ')
+        || (dev.vendor_id ? `${dev.vendor_id}:${dev.device_id}` : null);
+
+    if (ready('system')) {
+        const sys = categories.system.data;
+        renderHardwareItems('hw-system', [
+            ['操作系统', sys.os],
+            ['系统类型', sys.arch],
+            ['主板', sys.board || sys.product],
+            ['处理器', sys.cpu]
+        ]);
+    }
+    if (ready('cpu')) {
+        const cpu = categories.cpu.data;
+        renderHardwareItems('hw-cpu', [
+            ['名称', cpu.name],
+            ['核心数', cpu.cores],
+            ['线程数', cpu.threads],
+            ['基础频率', mhz(cpu.base_mhz)],
+            ['最大频率', mhz(cpu.max_mhz)],
+            ['缓存', cpu.cache_kb ? formatBytes(cpu.cache_kb * 1024) : null]
+        ]);
+    }
+    if (ready('memory')) {
+        const mem = categories.memory.data;
+        renderHardwareItems('hw-memory', [
+            ['总容量', formatBytes(mem.total)],
+            ['类型', mem.type],
+            ['频率', mem.speed_mhz ? `${mem.speed_mhz} MHz` : null],
+            ['插槽', mem.modules]
+        ]);
+    }
+    if (ready('gpu')) {
+        const gpus = [...categories.gpu.data].sort((a, b) => b.primary - a.primary);
+        renderHardwareItems('hw-gpu', gpus.flatMap((gpu, i) => {
+            const items = [[i === 0 ? '主显卡' : `显卡 ${i + 1}`, deviceName(gpu)]];
+            if (gpu.vram) items.push(['显存', formatBytes(gpu.vram)]);
+            return items;
+        }));
+    }
+    if (ready('storage')) {
+        renderHardwareItems('hw-storage', categories.storage.data.map((disk, i) => [
+            i === 0 ? '主硬盘' : `硬盘 ${i + 1}`,
+            `${disk.model || disk.name} (${formatBytes(disk.size)}${disk.transport ? ', ' + disk.transport.toUpperCase() : ''})`
+        ]));
+    }
+    if (ready('network')) {
+        const kinds = { ethernet: '有线网卡', wireless: '无线网卡', bluetooth: '蓝牙' };
+        renderHardwareItems('hw-network', categories.network.data.map(nic => [
+            kinds[nic.kind] || nic.kind,
+            deviceName(nic) || nic.name
+        ]));
+    }
+}
+
+// 服务端事件流：/api/events 按通道推送合并后的增量，这里合并成完整状态后交给各模块
+const eventHandlers = {
+    download: entries => entries.forEach(({ state }) => updateDownloadItem(state)),
+    burn: entries => entries.forEach(({ state }) => updateBurnJob(state)),
+    usb: entries => {
+        const ports = [];
+        let warnings = null;
+        entries.forEach(({ key, state }) => {
+            if (key === 'map') updateUsbPorts(Object.assign({}, state, { full: true }));
+            else if (key === 'warnings') warnings = state.warnings;
+            else ports.push(state);
+        });
+        if (!appState.usbMap || (!ports.length && !warnings)) return;
+        updateUsbPorts({ full: false, ports, warnings: warnings || appState.usbMap.warnings });
+    },
+    hardware: () => {
+        if (document.getElementById('hardware').classList.contains('active')) loadHardwareInfo();
+    }
+};
+
+function connectEvents() {
+    const source = new EventSource('/api/events');
+    const states = {};
+    Object.keys(eventHandlers).forEach(channel => {
+        source.addEventListener(channel, event => {
+            let store = states[channel] || (states[channel] = {});
+            const entries = [];
+            JSON.parse(event.data).forEach(entry => {
+                if (entry.reset) {
+                    store = states[channel] = {};
+                    return;
+                }
+                const state = store[entry.key] = Object.assign(store[entry.key] || {}, entry.data);
+                entries.push({ key: entry.key, state });
+            });
+            eventHandlers[channel](entries);
+        });
+    });
+    source.onerror = () => console.warn('事件流连接中断，正在重连');
+}
+
+// 镜像烧录：目标设备取自硬件信息中的可移动磁盘
+async function loadBurnTargets() {
+    try {
+        const response = await fetch('/api/hardware?categories=storage&wait=2');
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message || '获取设备列表失败');
+        const disks = data.categories.storage.data || [];
+        appState.burn.targets = disks.filter(disk => disk.device && !disk.system && (disk.removable || disk.transport === 'usb'));
+        const select = document.getElementById('burn-target');
+        const selected = select.value;
+        select.innerHTML = '<option value="">选择USB设备</option>' + appState.burn.targets.map(disk =>
+            `<option value="${escapeHtml(disk.device)}">${escapeHtml(disk.model || disk.name)} (${formatBytes(disk.size)})</option>`
+        ).join('');
+        if (appState.burn.targets.some(disk => disk.device === selected)) select.value = selected;
+        showBurnTargetSize();
+    } catch (error) {
+        console.error('获取设备列表失败:', error);
+    }
+}
+
+function showBurnTargetSize() {
+    const device = document.getElementById('burn-target').value;
+    const disk = appState.burn.targets.find(d => d.device === device);
+    document.getElementById('burn-target-size').textContent = disk ? formatBytes(disk.size) : '--';
+}
+
+async function selectBurnSource() {
+    if (appState.burn.jobId) return;
+    const file = await postJson('/api/select-open-path', {
+        file_types: ['镜像文件 (*.dmg;*.iso;*.img)', '所有文件 (*.*)']
+    });
+    if (!file.success) return;
+    appState.burn.source = file.path;
+    document.getElementById('burn-source-name').textContent = file.path;
+}
+
+// 开始烧录；烧录进行中时按钮用于取消
+async function toggleBurn() {
+    try {
+        if (appState.burn.jobId) {
+            const data = await postJson('/api/burn/cancel', { burn_id: appState.burn.jobId });
+            if (!data.success) throw new Error(data.message);
+            return;
+        }
+        const target = document.getElementById('burn-target').value;
+        if (!appState.burn.source) throw new Error('请先选择镜像文件');
+        if (!target) throw new Error('请先选择目标设备');
+        if (!confirm(`烧录会清除 ${target} 上的全部数据，确定继续吗？`)) return;
+        const data = await postJson('/api/burn', {
+            source: appState.burn.source,
+            target,
+            format: document.getElementById('burn-format').checked,
+            verify: document.getElementById('burn-verify').checked
+        });
+        if (!data.success) throw new Error(data.message);
+        appState.burn.jobId = data.burn_id;
+        appState.burnStatus[data.burn_id] = data.status;
+        setBurnRunning(true);
+    } catch (error) {
+        showToast('烧录失败: ' + error.message, 'error');
+    }
+}
+
+function setBurnRunning(running) {
+    const button = document.getElementById('burn-start');
+    button.innerHTML = running ? '<i class="fas fa-stop"></i> 取消烧录' : '<i class="fas fa-burn"></i> 开始烧录';
+    document.getElementById('burn-progress').style.display = running ? 'block' : 'none';
+    if (running) showBurnProgress({ status: 'queued', progress: 0 });
+}
+
+function showBurnProgress(job) {
+    const labels = { queued: '等待中', writing: '正在写入', verifying: '正在校验' };
+    const speed = job.speed ? ` · ${formatBytes(job.speed)}/s` : '';
+    document.getElementById('burn-status').textContent = (labels[job.status] || job.status) + speed;
+    document.getElementById('burn-percent').textContent = `${Math.round(job.progress)}%`;
+    document.getElementById('burn-progress-bar').style.width = `${job.progress}%`;
+}
+
+// 烧录进度：只在状态变化时提示
+function updateBurnJob(job) {
+    if (job.id === appState.burn.jobId) {
+        if (['completed', 'cancelled', 'error'].includes(job.status)) {
+            appState.burn.jobId = null;
+            setBurnRunning(false);
+        } else {
+            showBurnProgress(job);
+        }
+    }
+    const previous = appState.burnStatus[job.id];
+    appState.burnStatus[job.id] = job.status;
+    if (!previous || previous === job.status) return;
+    if (job.status === 'completed') showToast('烧录完成', 'success');
+    else if (job.status === 'cancelled') showToast('烧录已取消', 'info');
+    else if (job.status === 'error') showToast('烧录失败: ' + job.error, 'error');
+}
+
+// USB端口映射：服务端监听热插拔事件，端口变化经事件流交给 updateUsbPorts
+// 首次打开页面时取已枚举的映射（服务端此时才开始枚举和监听）
+async function loadUsbPorts() {
+    try {
+        const response = await fetch('/api/usb/ports');
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message || '获取USB端口失败');
+        if (!appState.usbMap) updateUsbPorts(Object.assign({}, data.map, { full: true }));
+    } catch (error) {
+        console.error('获取USB端口失败:', error);
+    }
+}
+
+async function detectUsbPorts() {
+    try {
+        const response = await fetch('/api/usb/scan', { method: 'POST' });
+        const data = await response.json();
+        if (!data.map) throw new Error(data.message || '检测USB端口失败');
+        appState.usbMap = data.map;
+        renderUsbPorts();
+        if (!data.success) showToast(data.message);
+    } catch (error) {
+        console.error('检测USB端口失败:', error);
+        showToast('检测USB端口失败: ' + error.message, 'error');
+    }
+}
+
+// 服务端推送：full 为真时是完整映射，否则只替换变化的端口
+function updateUsbPorts(update) {
+    if (update.full || !appState.usbMap) {
+        appState.usbMap = update;
+    } else {
+        const changed = new Map(update.ports.map(port => [port.id, port]));
+        appState.usbMap.ports = appState.usbMap.ports.map(port => changed.get(port.id) || port);
+        appState.usbMap.warnings = update.warnings;
+    }
+    renderUsbPorts();
+}
+
+function renderUsbPorts() {
+    const container = document.getElementById('usb-ports');
+    const map = appState.usbMap;
+    if (!container || !map) return;
+    if (!map.supported) {
+        container.innerHTML = '<p style="color: var(--text-light);">当前系统不支持USB端口映射，请在 Linux 环境中运行</p>';
+        return;
+    }
+
+    const connectorOptions = selected => Object.entries(map.connectors).map(([value, name]) =>
+        `<option value="${value}" ${Number(value) === selected ? 'selected' : ''}>${escapeHtml(name)}</option>`).join('');
+    const describeDevice = dev => escapeHtml(dev.product || (dev.vid ? `${dev.vid}:${dev.pid}` : dev.name));
+
+    container.innerHTML = map.controllers.map(controller => {
+        const ports = map.ports.filter(port => port.controller === controller.address);
+        const enabled = ports.filter(port => port.enabled).length;
+        return `
+        <div style="background-color: #f8f9fa; border-radius: 8px; padding: 15px; margin-bottom: 10px;">
+            <div style="margin-bottom: 10px;">
+                <strong>${escapeHtml(controller.name || controller.address)}</strong>
+                <div style="font-size: 12px; color: var(--text-light);">${escapeHtml(controller.address)} · ${escapeHtml(controller.driver || '--')} · 已启用 ${enabled}/${ports.length} 个端口</div>
             </div>
+            ${ports.map(port => {
+                const current = port.devices.map(describeDevice).join('、');
+                const seen = port.seen.map(describeDevice).join('、');
+                return `
             <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
                 <div>
-                    <strong>USB 3.0 Port (HS02)</strong>
-                    <div style="font-size: 12px; color: var(--text-light);">XHCI控制器</div>
+                    <strong>${port.name}</strong> <span style="font-size: 12px;">${port.type === 'usb3' ? 'USB 3' : 'USB 2'}${port.companion ? ' / ' + port.companion : ''}</span>
+                    <div style="font-size: 12px; color: var(--text-light);">${current ? '当前: ' + current : (seen ? '曾连接: ' + seen : '未检测到设备')}</div>
                 </div>
-                <label class="switch">
-                    <input type="checkbox" checked>
-                    <span class="slider round"></span>
-                </label>
-            </div>
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                <div>
-                    <strong>USB 2.0 Port (HS03)</strong>
-                    <div style="font-size: 12px; color: var(--text-light);">EHCI控制器</div>
+                <div style="display: flex; align-items: center; gap: 10px;">
+                    <select class="usb-connector" data-port="${escapeHtml(port.id)}">${connectorOptions(port.connector)}</select>
+                    <label class="switch">
+                        <input type="checkbox" class="usb-enabled" data-port="${escapeHtml(port.id)}" ${port.enabled ? 'checked' : ''}>
+                        <span class="slider round"></span>
+                    </label>
                 </div>
-                <label class="switch">
-                    <input type="checkbox">
-                    <span class="slider round"></span>
-                </label>
+            </div>`;
+            }).join('')}
+        </div>`;
+    }).join('') + `
+        <p style="margin-top: 15px; font-size: 12px; color: var(--text-light);">已检测到${map.ports.length}个USB端口，请把USB 2.0和USB 3.0设备分别插入每个接口，建议每个控制器启用不超过15个端口。</p>
+        ${map.warnings.map(warning => `<p style="font-size: 12px; color: var(--danger-color);">${escapeHtml(warning)}</p>`).join('')}`;
+
+    container.querySelectorAll('.usb-enabled').forEach(input => {
+        input.addEventListener('change', () => saveUsbPort(input.dataset.port, { enabled: input.checked }));
+    });
+    container.querySelectorAll('.usb-connector').forEach(select => {
+        select.addEventListener('change', () => saveUsbPort(select.dataset.port, { connector: Number(select.value) }));
+    });
+}
+
+async function saveUsbPort(portId, change) {
+    try {
+        const response = await fetch('/api/usb/ports', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ports: { [portId]: change } })
+        });
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message);
+        appState.usbMap = data.map;
+        renderUsbPorts();
+    } catch (error) {
+        showToast('保存端口设置失败: ' + error.message, 'error');
+    }
+}
+
+async function exportUsbPorts() {
+    try {
+        const pathResponse = await fetch('/api/select-save-path', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: 'USBPorts.zip' })
+        });
+        const pathData = await pathResponse.json();
+        if (!pathData.success) return;
+
+        const response = await fetch('/api/usb/export', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ save_path: pathData.path })
+        });
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message);
+        showToast('USBPorts.kext 已导出', 'success');
+        data.warnings.forEach(warning => showToast(warning, 'error'));
+    } catch (error) {
+        showToast('导出配置失败: ' + error.message, 'error');
+    }
+}
+
+// SSDT定制：服务端缓存ACPI表索引和生成结果，修改选项后重新生成无需重新解析
+async function postJson(url, body = {}) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    });
+    return response.json();
+}
+
+async function ensureAcpiLoaded() {
+    if (appState.ssdt.loaded) return true;
+    // 先读取本机的ACPI表，失败时让用户选择导出的 DSDT
+    let data = await postJson('/api/ssdt/load');
+    if (!data.success) {
+        const file = await postJson('/api/select-open-path', {
+            file_types: ['ACPI表 (*.aml;*.dat;*.bin)', '所有文件 (*.*)']
+        });
+        if (!file.success) return false;
+        data = await postJson('/api/ssdt/load', { path: file.path });
+        if (!data.success) throw new Error(data.message);
+    }
+    appState.ssdt.loaded = true;
+    appState.ssdt.summary = data.summary;
+    return true;
+}
+
+async function generateSsdtPatches(patches, options = {}) {
+    try {
+        if (!await ensureAcpiLoaded()) return;
+        const data = await postJson('/api/ssdt/generate', { patches, options });
+        if (!data.success) throw new Error(data.message);
+
+        const generated = Object.entries(data.patches).filter(([, patch]) => !patch.error);
+        const failed = Object.values(data.patches).filter(patch => patch.error);
+        const editor = document.getElementById('ssdt-editor');
+        editor.value = generated.map(([, patch]) => patch.asl).join('\n');
+        appState.ssdt.patches = generated.map(([id]) => id);
+        appState.ssdt.names = generated.map(([, patch]) => patch.name);
+        appState.ssdt.options = options;
+        appState.ssdt.generatedSource = editor.value;
+
+        if (failed.length) {
+            showToast(failed.map(patch => `${patch.name}: ${patch.error}`).join('；'), 'error');
+        } else {
+            showToast(`已生成 ${generated.map(([, patch]) => patch.name).join('、')}`, 'success');
+        }
+    } catch (error) {
+        showToast('生成SSDT失败: ' + error.message, 'error');
+    }
+}
+
+function generateDevicePatch() {
+    const patch = document.getElementById('ssdt-device-select').value;
+    if (!patch) {
+        showToast('请先选择设备类型', 'error');
+        return;
+    }
+    generateSsdtPatches([patch]);
+}
+
+async function importSsdt() {
+    try {
+        const file = await postJson('/api/select-open-path', {
+            file_types: ['SSDT (*.dsl;*.aml)', '所有文件 (*.*)']
+        });
+        if (!file.success) return;
+        const data = await postJson('/api/ssdt/import', { path: file.path });
+        if (!data.success) throw new Error(data.message);
+        document.getElementById('ssdt-editor').value = data.source;
+        appState.ssdt.patches = [];
+    } catch (error) {
+        showToast('导入SSDT失败: ' + error.message, 'error');
+    }
+}
+
+async function saveSsdtSource(filename) {
+    const file = await postJson('/api/select-save-path', { filename });
+    if (!file.success) return;
+    const data = await postJson('/api/ssdt/save', {
+        source: document.getElementById('ssdt-editor').value,
+        save_path: file.path
+    });
+    if (!data.success) throw new Error(data.message);
+    showToast('已保存到 ' + data.path, 'success');
+}
+
+async function saveSsdt() {
+    try {
+        await saveSsdtSource('SSDT.dsl');
+    } catch (error) {
+        showToast('保存失败: ' + error.message, 'error');
+    }
+}
+
+async function exportSsdt() {
+    try {
+        const state = appState.ssdt;
+        const editor = document.getElementById('ssdt-editor');
+        if (!state.patches.length || editor.value !== state.generatedSource) {
+            // 编辑器内容已修改或为导入的文件，需要编译
+            await saveSsdtSource('SSDT.aml');
+            return;
+        }
+        const filename = state.patches.length === 1 ? `${state.names[0]}.aml` : 'SSDT.zip';
+        const file = await postJson('/api/select-save-path', { filename });
+        if (!file.success) return;
+        const data = await postJson('/api/ssdt/export', {
+            patches: state.patches,
+            options: state.options,
+            save_path: file.path
+        });
+        if (!data.success) throw new Error(data.message);
+        showToast('已导出到 ' + data.path, 'success');
+    } catch (error) {
+        showToast('导出失败: ' + error.message, 'error');
+    }
+}
+
+// ACPI工具：搜索命名空间索引、查看对象并生成重命名补丁
+async function openAcpiTool() {
+    try {
+        if (!await ensureAcpiLoaded()) return;
+    } catch (error) {
+        showToast('加载ACPI表失败: ' + error.message, 'error');
+        return;
+    }
+    const summary = appState.ssdt.summary;
+
+    const modal = document.createElement('div');
+    modal.className = 'update-modal-overlay';
+    modal.innerHTML = `
+        <div class="update-modal" style="width: 760px;">
+            <h3>ACPI工具</h3>
+            <p class="release-date">${summary.tables.map(t => `${escapeHtml(t.signature)} (${escapeHtml(t.oem_table_id)})`).join('、')} · ${summary.objects} 个对象${summary.cached ? ' · 已使用缓存索引' : ''}</p>
+            <input type="text" class="acpi-search" placeholder="输入路径、名称或 _HID（如 PNP0C09）" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+            <div style="display: flex; gap: 10px; margin-top: 10px; min-height: 0; flex: 1;">
+                <div class="acpi-results" style="flex: 1; overflow-y: auto; max-height: 50vh; font-family: monospace; font-size: 12px;"></div>
+                <div class="acpi-detail" style="flex: 1; overflow-y: auto; max-height: 50vh; font-size: 12px;"></div>
             </div>
-            <div style="display: flex; justify-content: space-between; align-items: center;">
-                <div>
-                    <strong>USB Type-C Port (HS04)</strong>
-                    <div style="font-size: 12px; color: var(--text-light);">XHCI控制器</div>
-                </div>
-                <label class="switch">
-                    <input type="checkbox" checked>
-                    <span class="slider round"></span>
-                </label>
+            <div class="modal-actions">
+                <button class="btn btn-outline close-btn">关闭</button>
+            </div>
+        </div>
+    `;
+    document.body.appendChild(modal);
+    setTimeout(() => {
+        modal.style.opacity = '1';
+        modal.querySelector('.update-modal').style.opacity = '1';
+    }, 10);
+    modal.querySelector('.close-btn').onclick = () => modal.remove();
+
+    const input = modal.querySelector('.acpi-search');
+    const results = modal.querySelector('.acpi-results');
+    const detail = modal.querySelector('.acpi-detail');
+    let timer = null;
+
+    const showObject = async path => {
+        const response = await fetch('/api/acpi/object?path=' + encodeURIComponent(path));
+        const data = await response.json();
+        if (!data.success) {
+            detail.textContent = data.message;
+            return;
+        }
+        const obj = data.object;
+        const rows = [
+            ['路径', obj.path], ['类型', obj.type], ['所在表', `${obj.table} (${obj.oem_table_id})`],
+            ['偏移', '0x' + obj.offset.toString(16).toUpperCase()], ['长度', obj.length],
+            ['_HID', obj.hid], ['_CID', obj.cid], ['_ADR', obj.adr == null ? null : '0x' + obj.adr.toString(16).toUpperCase()],
+            ['值', obj.value == null ? null : String(obj.value)], ['参数个数', obj.args]
+        ].filter(([, value]) => value != null);
+        detail.innerHTML = `
+            ${rows.map(([label, value]) => `<div><strong>${label}:</strong> ${escapeHtml(String(value))}</div>`).join('')}
+            ${data.children.length ? `<div style="margin-top: 8px;"><strong>子对象:</strong> ${data.children.map(child => `<a href="#" class="acpi-link" data-path="${escapeHtml(child)}">${escapeHtml(child.split('.').pop())}</a>`).join(' ')}</div>` : ''}
+            ${data.referenced_by.length ? `<div style="margin-top: 8px;"><strong>引用它的方法:</strong> ${data.referenced_by.map(ref => `<a href="#" class="acpi-link" data-path="${escapeHtml(ref)}">${escapeHtml(ref)}</a>`).join(' ')}</div>` : ''}
+            <div style="margin-top: 8px; font-family: monospace; word-break: break-all; color: var(--text-light);">${data.raw}</div>
+            <button class="btn btn-outline acpi-patch-btn" style="margin-top: 10px;"><i class="fas fa-cog"></i> 生成重命名补丁</button>
+            <div class="acpi-patch" style="margin-top: 8px; font-family: monospace; word-break: break-all;"></div>
+        `;
+        detail.querySelectorAll('.acpi-link').forEach(link => {
+            link.onclick = event => {
+                event.preventDefault();
+                showObject(link.dataset.path);
+            };
+        });
+        detail.querySelector('.acpi-patch-btn').onclick = async () => {
+            const data = await postJson('/api/acpi/patch', { path: obj.path });
+            const target = detail.querySelector('.acpi-patch');
+            if (!data.success) {
+                target.textContent = data.message;
+                return;
+            }
+            const patch = data.patch;
+            target.innerHTML = `
+                <div>TableSignature: ${escapeHtml(patch.table)}</div>
+                <div>Find: ${patch.find}</div>
+                <div>Replace: ${patch.replace}</div>
+                ${patch.unique ? '' : `<div style="color: var(--danger-color);">匹配 ${patch.count} 处，请限定 OemTableId 或 Skip</div>`}`;
+        };
+    };
+
+    const search = async () => {
+        const response = await fetch('/api/acpi/search?q=' + encodeURIComponent(input.value));
+        const data = await response.json();
+        if (!data.success) {
+            results.textContent = data.message;
+            return;
+        }
+        results.innerHTML = data.results.map(obj => `
+            <div class="acpi-result" data-path="${escapeHtml(obj.path)}" style="cursor: pointer; padding: 2px 0;">
+                ${escapeHtml(obj.path)} <span style="color: var(--text-light);">${obj.type}${obj.hid ? ' ' + escapeHtml(obj.hid) : ''}</span>
+            </div>`).join('') || '<p style="color: var(--text-light);">没有匹配的对象</p>';
+        results.querySelectorAll('.acpi-result').forEach(row => {
+            row.onclick = () => showObject(row.dataset.path);
+        });
+    };
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(search, 200);
+    });
+    input.value = 'PNP0A08';
+    search();
+}
+
+// EFI编辑器：逐层浏览 config.plist，每次修改作为补丁提交，保存时后台只重写改动的部分
+async function openEfiEditor() {
+    const file = await postJson('/api/select-open-path', {
+        file_types: ['OpenCore配置 (*.plist)', '所有文件 (*.*)']
+    });
+    if (!file.success) return;
+    const opened = await postJson('/api/efi/open', { path: file.path });
+    if (!opened.success) {
+        showToast('打开配置失败: ' + opened.message, 'error');
+        return;
+    }
+    const summary = opened.summary;
+
+    const modal = document.createElement('div');
+    modal.className = 'update-modal-overlay';
+    modal.innerHTML = `
+        <div class="update-modal" style="width: 760px;">
+            <h3>EFI编辑器</h3>
+            <p class="release-date"><span class="efi-file">${escapeHtml(summary.path)} · ${summary.nodes} 个节点 · 解析 ${Math.round(summary.parse_time * 1000)} ms${summary.cached ? ' · 已使用缓存' : ''}</span> <span class="efi-modified" style="color: var(--danger-color);"></span></p>
+            <input type="text" class="efi-search" placeholder="搜索键名或字符串值（如 SecureBootModel）" style="width: 100%; padding: 8px; border-radius: 8px; border: 1px solid #ddd;">
+            <div class="efi-crumbs" style="margin-top: 10px; font-size: 13px;"></div>
+            <div class="efi-children" style="margin-top: 8px; overflow-y: auto; max-height: 45vh; font-size: 12px;"></div>
+            <div class="efi-issues" style="margin-top: 8px; overflow-y: auto; max-height: 15vh; font-size: 12px;"></div>
+            <div class="modal-actions">
+                <button class="btn btn-outline close-btn">关闭</button>
+                <button class="btn btn-primary save-btn"><i class="fas fa-save"></i> 保存</button>
             </div>
         </div>
-        <p style="margin-top: 15px; font-size: 12px; color: var(--text-light);">已检测到4个USB端口，建议启用不超过15个端口以获得最佳兼容性。</p>
     `;
+    document.body.appendChild(modal);
+    setTimeout(() => {
+        modal.style.opacity = '1';
+        modal.querySelector('.update-modal').style.opacity = '1';
+    }, 10);
+
+    const input = modal.querySelector('.efi-search');
+    const crumbs = modal.querySelector('.efi-crumbs');
+    const list = modal.querySelector('.efi-children');
+    const issuesBox = modal.querySelector('.efi-issues');
+    const modifiedLabel = modal.querySelector('.efi-modified');
+    let current = '';
+    let modified = summary.modified;
+    let timer = null;
+
+    const showIssues = (issues, count) => {
+        issuesBox.innerHTML = issues.map(issue => `
+            <div style="color: ${issue.severity === 'error' ? 'var(--danger-color)' : 'var(--text-light)'};">
+                <a href="#" class="efi-link" data-path="${escapeHtml(issue.path.split('/').slice(0, -1).join('/'))}">${escapeHtml(issue.path || '/')}</a>: ${escapeHtml(issue.message)}
+            </div>`).join('') + (count > issues.length ? `<div style="color: var(--text-light);">…共 ${count} 条</div>` : '');
+        issuesBox.querySelectorAll('.efi-link').forEach(link => {
+            link.onclick = event => {
+                event.preventDefault();
+                showNode(link.dataset.path);
+            };
+        });
+    };
+    const setModified = value => {
+        modified = value;
+        modifiedLabel.textContent = value ? '· 未保存' : '';
+    };
+
+    const applyPatches = async patches => {
+        const data = await postJson('/api/efi/patch', { patches });
+        if (!data.success) {
+            showToast('修改失败: ' + data.message, 'error');
+            return false;
+        }
+        showIssues(data.issues, data.issue_count);
+        setModified(data.modified);
+        return true;
+    };
+
+    const valueEditor = child => {
+        if (child.type === 'bool') {
+            return `<input type="checkbox" class="efi-value" ${child.value ? 'checked' : ''}>`;
+        }
+        return `<input type="text" class="efi-value" value="${escapeHtml(String(child.value))}" style="width: 100%; padding: 2px 6px; border-radius: 4px; border: 1px solid #ddd; font-family: monospace;">`;
+    };
+
+    const showNode = async path => {
+        const response = await fetch('/api/efi/node?path=' + encodeURIComponent(path));
+        const data = await response.json();
+        if (!data.success) {
+            list.textContent = data.message;
+            return;
+        }
+        const node = data.node;
+        if (!node.children) {
+            // 搜索结果指向标量时显示其所在的字典/数组
+            return showNode(node.crumbs.length > 1 ? node.crumbs[node.crumbs.length - 2].path : '');
+        }
+        current = node.path;
+        crumbs.innerHTML = [{ name: 'Root', path: '' }, ...node.crumbs].map(crumb =>
+            `<a href="#" class="efi-link" data-path="${escapeHtml(crumb.path)}">${escapeHtml(crumb.name)}</a>`).join(' / ');
+        const isArray = node.type === 'array';
+        list.innerHTML = node.children.map((child, index) => `
+            <div class="efi-row" data-path="${escapeHtml(child.path)}" data-index="${index}" style="display: flex; gap: 8px; align-items: center; padding: 3px 0; border-bottom: 1px solid rgba(0,0,0,0.05);">
+                <div style="flex: 0 0 35%; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; font-family: monospace;" title="${escapeHtml(String(child.key))}">${escapeHtml(String(child.key))}${child.label ? ` <span style="color: var(--text-light);">${escapeHtml(child.label)}</span>` : ''}</div>
+                <div style="flex: 0 0 50px; color: var(--text-light);">${child.type}</div>
+                <div style="flex: 1;">${child.count !== undefined
+                    ? `<a href="#" class="efi-link" data-path="${escapeHtml(child.path)}">${child.count} 项</a>`
+                    : valueEditor(child)}</div>
+                ${isArray && index > 0 ? '<button class="btn btn-outline efi-up" title="上移" style="padding: 2px 8px;"><i class="fas fa-arrow-up"></i></button>' : ''}
+                <button class="btn btn-outline efi-remove" title="删除" style="padding: 2px 8px;"><i class="fas fa-trash"></i></button>
+            </div>`).join('') || '<p style="color: var(--text-light);">空</p>';
+
+        list.querySelectorAll('.efi-link').forEach(link => {
+            link.onclick = event => {
+                event.preventDefault();
+                showNode(link.dataset.path);
+            };
+        });
+        crumbs.querySelectorAll('.efi-link').forEach(link => {
+            link.onclick = event => {
+                event.preventDefault();
+                showNode(link.dataset.path);
+            };
+        });
+        list.querySelectorAll('.efi-row').forEach(row => {
+            const child = node.children[Number(row.dataset.index)];
+            const editor = row.querySelector('.efi-value');
+            if (editor) {
+                editor.addEventListener('change', async () => {
+                    const value = child.type === 'bool' ? editor.checked : editor.value;
+                    if (await applyPatches([{ op: 'replace', path: child.path, value }])) {
+                        child.value = value;
+                    } else if (child.type === 'bool') {
+                        editor.checked = child.value;
+                    } else {
+                        editor.value = child.value;
+                    }
+                });
+            }
+            const up = row.querySelector('.efi-up');
+            if (up) {
+                up.onclick = async () => {
+                    const target = node.path ? `${node.path}/${child.key - 1}` : String(child.key - 1);
+                    if (await applyPatches([{ op: 'move', from: child.path, path: target }])) showNode(current);
+                };
+            }
+            row.querySelector('.efi-remove').onclick = async () => {
+                if (await applyPatches([{ op: 'remove', path: child.path }])) showNode(current);
+            };
+        });
+    };
+
+    const search = async () => {
+        if (!input.value.trim()) {
+            showNode(current);
+            return;
+        }
+        const response = await fetch('/api/efi/search?q=' + encodeURIComponent(input.value));
+        const data = await response.json();
+        if (!data.success) {
+            list.textContent = data.message;
+            return;
+        }
+        list.innerHTML = data.results.map(item => `
+            <div class="efi-result" data-path="${escapeHtml(item.parent)}" style="cursor: pointer; padding: 2px 0; font-family: monospace;">
+                ${escapeHtml(item.path)} <span style="color: var(--text-light);">${item.type}${item.value !== undefined ? ' = ' + escapeHtml(String(item.value)) : ''}</span>
+            </div>`).join('') || '<p style="color: var(--text-light);">没有匹配的键</p>';
+        list.querySelectorAll('.efi-result').forEach(row => {
+            row.onclick = () => showNode(row.dataset.path);
+        });
+    };
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(search, 200);
+    });
+    modal.querySelector('.save-btn').onclick = async () => {
+        const data = await postJson('/api/efi/save');
+        if (!data.success) {
+            showToast('保存失败: ' + data.message, 'error');
+            return;
+        }
+        setModified(false);
+        showToast(data.backup ? `已保存，原配置已备份到 ${data.backup}` : '已保存', 'success');
+    };
+    modal.querySelector('.close-btn').onclick = () => {
+        if (modified && !confirm('有未保存的修改，确定关闭吗？（修改会保留到下次打开同一文件）')) return;
+        modal.remove();
+    };
+
+    setModified(modified);
+    showIssues(summary.issues, summary.issue_count);
+    if (summary.warnings.length) {
+        showToast(summary.warnings[0]);
+    }
+    showNode('');
+}
+
+// 本地镜像库占用
+async function loadLibraryUsage() {
+    const usage = document.getElementById('image-library-usage');
+    if (!usage) return;
+    try {
+        const response = await fetch('/api/library');
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message);
+        usage.textContent = `已保存 ${data.images.length} 个镜像，共 ${formatBytes(data.total_size)}`;
+    } catch (error) {
+        usage.textContent = '';
+        console.error('读取镜像库失败:', error);
+    }
+}
+
+// 开发者模式性能面板：停留在设置页时定时读取 /api/metrics 的汇总
+const METRICS_POLL_INTERVAL = 2000;
+const IO_STAGE_NAMES = {
+    connect: '建立连接', network: '等待网络数据', disk: '写入磁盘', verify: '校验', throttle: '限速等待', notify: '进度回调',
+    read: '读取镜像', hash: '计算哈希', write_wait: '等待写线程', read_wait: '等待读线程', write: '写入设备',
+    tee: '保存副本', fsync: '刷新缓存', verify_read: '回读', verify_hash: '回读哈希'
+};
+
+function setMetricsPolling(enabled) {
+    clearInterval(appState.metricsTimer);
+    appState.metricsTimer = null;
+    if (!enabled) return;
+    appState.metricsTimer = setInterval(() => {
+        if (document.getElementById('settings').classList.contains('active')) loadMetrics();
+    }, METRICS_POLL_INTERVAL);
+}
+
+function renderMetricsTable(containerId, headers, rows) {
+    const container = document.getElementById(containerId);
+    if (!container) return;
+    if (!rows.length) {
+        container.innerHTML = '<p style="color: var(--text-light);">暂无数据</p>';
+        return;
+    }
+    container.innerHTML = `<table>
+        <tr>${headers.map(header => `<th>${header}</th>`).join('')}</tr>
+        ${rows.map(row => `<tr>${row.map(cell => `<td>${escapeHtml(String(cell))}</td>`).join('')}</tr>`).join('')}
+    </table>`;
+}
+
+async function loadMetrics() {
+    try {
+        const response = await fetch('/api/metrics?format=json');
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message || '获取性能数据失败');
+        const metrics = data.metrics;
+        const io = [];
+        Object.entries(metrics.io).forEach(([path, stages]) => {
+            stages.forEach(stage => io.push([
+                path === 'download' ? '下载' : '烧录',
+                IO_STAGE_NAMES[stage.stage] || stage.stage,
+                stage.seconds.toFixed(2) + ' s',
+                (stage.share * 100).toFixed(1) + '%',
+                formatBytes(stage.bytes),
+                stage.chunks || '--',
+                stage.rate ? formatBytes(stage.rate) + '/s' : '--'
+            ]));
+        });
+        renderMetricsTable('metrics-io', ['任务', '阶段', '耗时', '占比', '数据量', '块数', '速度'], io);
+        const delivery = metrics.delivery;
+        renderMetricsTable('metrics-events', ['通道', '发布', '推送', '推送数据量'],
+            metrics.events.map(channel => [channel.channel, channel.published, channel.sent, formatBytes(channel.bytes)])
+                .concat(delivery.count ? [['推送延迟', `平均 ${delivery.avg_ms} ms`, `最大 ${delivery.max_ms} ms`, '']] : []));
+        renderMetricsTable('metrics-routes', ['方法', '路由', '次数', '错误', '平均', '最大'],
+            metrics.routes.slice(0, 20).map(route => [
+                route.method, route.route, route.count, route.errors, route.avg_ms + ' ms', route.max_ms + ' ms'
+            ]));
+    } catch (error) {
+        console.error('加载性能数据失败:', error);
+    }
+}
+
+async function profileStacks() {
+    const button = document.getElementById('metrics-profile-btn');
+    const container = document.getElementById('metrics-profile');
+    button.disabled = true;
+    container.innerHTML = '<p style="color: var(--text-light);">正在采样...</p>';
+    try {
+        const response = await fetch('/api/metrics/profile?seconds=5');
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message);
+        const profile = data.profile;
+        container.innerHTML = `<h4>调用栈采样（${profile.samples} 次，每 ${profile.interval * 1000} ms）</h4>
+            <table>
+                <tr><th>最常出现的栈顶函数</th><th>次数</th></tr>
+                ${profile.functions.map(item => `<tr><td>${escapeHtml(item.function)}</td><td>${item.count}</td></tr>`).join('')}
+            </table>
+            <pre>${escapeHtml(profile.collapsed)}</pre>`;
+    } catch (error) {
+        container.innerHTML = '';
+        showToast(error.message, 'error');
+    } finally {
+        button.disabled = false;
+    }
 }
 
 // 启动应用
@@ -0,0 +1,132 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+import threading
+from flask import Response
+
+try:
+    import brotli  # 可选依赖，未安装时只提供 gzip
+except ImportError:
+    brotli = None
+
+# 这些类型压缩收益明显；woff2/png/ico 等本身已压缩，直接原样返回
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/javascript', 'application/json',
+    'image/svg+xml', 'font/ttf', 'application/x-font-ttf', 'font/sfnt'
+)
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def is_compressible(mimetype):
+    return any(mimetype.startswith(prefix) for prefix in COMPRESSIBLE_TYPES)
+
+
+class CachedAsset:
+    """内存中的响应体：原始数据、预压缩变体和强 ETag（压缩在首次使用或预热时进行）"""
+
+    def __init__(self, data, mimetype, cache_control='no-cache'):
+        self.data = data
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.sha256(data).hexdigest()[:32]
+        self.lock = threading.Lock()
+        self.variants = None
+
+    def compress(self):
+        """生成预压缩变体（只执行一次）"""
+        with self.lock:
+            if self.variants is not None:
+                return self.variants
+            variants = {}
+            if len(self.data) >= MIN_COMPRESS_SIZE and is_compressible(self.mimetype):
+                if brotli is not None:
+                    variants['br'] = brotli.compress(self.data, quality=BROTLI_QUALITY)
+                variants['gzip'] = gzip.compress(self.data, compresslevel=GZIP_LEVEL, mtime=0)
+            # 压缩后没有变小的变体不保留
+            self.variants = {k: v for k, v in variants.items() if len(v) < len(self.data)}
+            return self.variants
+
+    def choose_encoding(self, accept_encoding):
+        """按 Accept-Encoding 选择预压缩变体，优先 br"""
+        accepted = set()
+        for item in (accept_encoding or '').split(','):
+            name, _, params = item.partition(';')
+            key, _, value = params.strip().partition('=')
+            try:
+                if key.strip() == 'q' and float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(name.strip().lower())
+        variants = self.compress()
+        for encoding in ('br', 'gzip'):
+            if encoding in variants and (encoding in accepted or '*' in accepted):
+                return encoding
+        return None
+
+    def response(self, request):
+        """生成响应：If-None-Match 命中时返回 304，否则返回最合适的预压缩变体"""
+        headers = {
+            'ETag': f'"{self.etag}"',
+            'Cache-Control': self.cache_control
+        }
+        variants = self.compress()
+        if variants:
+            headers['Vary'] = 'Accept-Encoding'
+        if request.if_none_match.contains(self.etag):
+            return Response(status=304, headers=headers)
+
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding'))
+        body = variants[encoding] if encoding else self.data
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        response = Response(body, mimetype=self.mimetype, headers=headers)
+        response.direct_passthrough = True
+        return response
+
+
+class StaticCache:
+    """按需加载静态文件到内存并缓存压缩结果，文件修改后自动重新加载"""
+
+    def __init__(self, root, cache_control='no-cache'):
+        self.root = os.path.realpath(root)
+        self.cache_control = cache_control
+        self.lock = threading.Lock()
+        self.assets = {}
+
+    def resolve(self, filename):
+        """把请求路径解析为 root 下的真实文件路径，越界或不存在时返回 None"""
+        path = os.path.realpath(os.path.join(self.root, filename))
+        if os.path.commonpath([self.root, path]) != self.root or not os.path.isfile(path):
+            return None
+        return path
+
+    def get(self, filename):
+        path = self.resolve(filename)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            cached = self.assets.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        asset = CachedAsset(data, mimetype, self.cache_control)
+        with self.lock:
+            self.assets[path] = (key, asset)
+        return asset
+
+    def warm(self):
+        """预先加载并压缩目录下的所有文件"""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                asset = self.get(os.path.relpath(os.path.join(dirpath, name), self.root))
+                if asset is not None:
+                    asset.compress()
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# 模块都在仓库根目录
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def range_server():
+    """本地的 Range 测试服务器（benchmark.RangeServer）"""
+    from benchmark import RangeServer
+    server = RangeServer()
+    server.start()
+    yield server
+    server.stop()
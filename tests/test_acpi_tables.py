@@ -0,0 +1,178 @@
+import pickle
+
+import pytest
+
+import acpi_tables
+from acpi_tables import AcpiNamespace, AcpiTable, AmlParser, decode_eisa_id, split_path
+from ssdt_generator import (Device, Method, Name, Return, Scope, Ssdt, compile_ec, compile_plug,
+                            compile_pmc, compile_pnlf, compile_properties, compile_usbx)
+
+LPCB = '\\_SB_.PCI0.LPCB'
+EC0 = '\\_SB_.PCI0.LPCB.EC0_'
+XHC = '\\_SB_.PCI0.XHC_'
+
+
+def dsdt():
+    """用 SSDT 生成器的语法树拼出一张小 DSDT：两个 _STA 方法字节完全相同"""
+    table = Ssdt('TestDsdt',
+                 Scope('\\_SB',
+                       Device('PCI0',
+                              Name('_HID', 0x080AD041),     # EisaId ("PNP0A08")
+                              Name('_ADR', 0),
+                              Device('LPCB',
+                                     Name('_ADR', 0x001F0000),
+                                     Device('EC0',
+                                            Name('_HID', 0x090CD041),     # EisaId ("PNP0C09")
+                                            Method('_STA', 0, Return(0x0F)))),
+                              Device('XHC',
+                                     Name('_ADR', 0x00140000),
+                                     Method('_STA', 0, Return(0x0F)))),
+                       Device('PR00',
+                              Name('_HID', 'ACPI0007'),
+                              Name('_UID', 0))))
+    data = bytearray(table.aml())
+    data[0:4] = b'DSDT'
+    data[9] = 0
+    data[9] = (-sum(data)) & 0xFF
+    return AcpiTable(bytes(data))
+
+
+def tables():
+    return [dsdt(), AcpiTable(compile_ec('\\_SB.PCI0.LPCB')[1]), AcpiTable(compile_plug('\\_SB.PR00', 'device')[1])]
+
+
+def test_table_header():
+    table = dsdt()
+    assert table.signature == 'DSDT'
+    assert table.oem_table_id == 'TestDsdt'
+    assert table.checksum_ok
+    assert table.is_aml
+
+
+def test_decode_eisa_id():
+    assert decode_eisa_id(0x080AD041) == 'PNP0A08'
+    assert decode_eisa_id(0x090CD041) == 'PNP0C09'
+
+
+def test_parser_paths_and_offsets():
+    table = dsdt()
+    parser = AmlParser(table.data)
+    objects = parser.parse(table.length)
+    assert not parser.errors
+    assert [(obj['path'], obj['type']) for obj in objects] == [
+        ('\\_SB_', 'scope'),
+        ('\\_SB_.PCI0', 'device'),
+        ('\\_SB_.PCI0._HID', 'name'),
+        ('\\_SB_.PCI0._ADR', 'name'),
+        (LPCB, 'device'),
+        (LPCB + '._ADR', 'name'),
+        (EC0, 'device'),
+        (EC0 + '._HID', 'name'),
+        (EC0 + '._STA', 'method'),
+        (XHC, 'device'),
+        (XHC + '._ADR', 'name'),
+        (XHC + '._STA', 'method'),
+        ('\\_SB_.PR00', 'device'),
+        ('\\_SB_.PR00._HID', 'name'),
+        ('\\_SB_.PR00._UID', 'name')
+    ]
+    opcodes = {'scope': b'\x10', 'device': b'\x5b\x82', 'name': b'\x08', 'method': b'\x14'}
+    for obj in objects:
+        # 偏移指向对象的操作码，NameSeg 位置是路径的最后一段
+        assert table.read(obj['offset'], len(opcodes[obj['type']])) == opcodes[obj['type']]
+        assert table.read(obj['name_offset'], 4) == split_path(obj['path'])[-1].encode('ascii')
+        assert obj['offset'] + obj['length'] <= table.length
+    by_path = {obj['path']: obj for obj in objects}
+    # 容器的长度覆盖其中所有子对象
+    device = by_path[LPCB]
+    for path in (LPCB + '._ADR', EC0, EC0 + '._STA'):
+        child = by_path[path]
+        assert device['offset'] < child['offset']
+        assert child['offset'] + child['length'] <= device['offset'] + device['length']
+    assert by_path[XHC + '._STA']['args'] == 0
+    assert by_path[LPCB + '._ADR']['value'] == 0x001F0000
+    assert by_path['\\_SB_.PR00._HID']['value'] == 'ACPI0007'
+
+
+@pytest.mark.parametrize('compiled, paths', [
+    (compile_plug('\\_SB.PR00', 'device'), ['\\_SB_.PR00._DSM']),
+    (compile_ec('\\_SB.PCI0.LPCB'), [LPCB + '.EC__', LPCB + '.EC__._HID', LPCB + '.EC__._STA']),
+    (compile_usbx(0x13EC, 0x13EC, 0x0834, 0x0834), ['\\_SB_.USBX', '\\_SB_.USBX._ADR', '\\_SB_.USBX._DSM']),
+    (compile_pmc('\\_SB.PCI0.LPCB'), [LPCB + '.PMCR', LPCB + '.PMCR._CRS']),
+    (compile_pnlf(0x13), ['\\_SB_.PNLF', '\\_SB_.PNLF._CID', '\\_SB_.PNLF._UID']),
+    (compile_properties('HDEF', '\\_SB.PCI0.HDEF', (('layout-id', b'\x01\x00\x00\x00'),)), ['\\_SB_.PCI0.HDEF._DSM'])
+])
+def test_parse_generated_ssdt(compiled, paths):
+    _, aml = compiled
+    table = AcpiTable(aml)
+    assert table.checksum_ok
+    parser = AmlParser(table.data)
+    found = {obj['path'] for obj in parser.parse(table.length)}
+    assert not parser.errors
+    assert set(paths) <= found
+
+
+def test_namespace_lookup():
+    namespace = AcpiNamespace(tables())
+    assert not namespace.errors
+    # SSDT 中的 External 和 Scope 不覆盖 DSDT 中的设备定义
+    assert namespace.get(LPCB)['type'] == 'device'
+    assert namespace.get(LPCB)['table'] == 0
+    assert LPCB in [obj['path'] for obj in namespace.devices()]
+    assert namespace.find_by_adr(0x001F0000) == [LPCB]
+    assert namespace.find_by_adr(0x00140000, parent='\\_SB_.PCI0') == [XHC]
+    assert namespace.find_by_adr(0x00140000, parent=LPCB) == []
+    assert namespace.find_by_hid('PNP0C09') == [EC0]
+    assert namespace.find_by_hid('acid0001') == [LPCB + '.EC__']
+    assert namespace.processors() == ['\\_SB_.PR00']
+    assert namespace.children[LPCB] == [LPCB + '._ADR', EC0, LPCB + '.EC__']
+    assert [obj['path'] for obj in namespace.search('ec0')] == [EC0, EC0 + '._HID', EC0 + '._STA']
+
+
+def test_patch_target_is_unique():
+    namespace = AcpiNamespace(tables())
+    for path in (EC0, XHC, EC0 + '._STA', XHC + '._STA'):
+        patch = namespace.patch_target(path)
+        table = namespace.tables[namespace.get(path)['table']]
+        find, replace = bytes.fromhex(patch['find']), bytes.fromhex(patch['replace'])
+        assert patch['unique'] and patch['count'] == 1
+        assert table.count(find) == 1
+        assert find == table.read(patch['offset'], len(find))
+        assert replace[4:] == find[4:] and replace[:1] == b'X'
+    # 两个 _STA 方法字节相同，Find 需要延伸到方法之后才唯一
+    assert len(bytes.fromhex(namespace.patch_target(EC0 + '._STA')['find'])) > 10
+    assert namespace.patch_target(EC0, 'EC')['replace'].startswith(b'EC__'.hex().upper())
+    with pytest.raises(ValueError):
+        namespace.patch_target('\\_SB_.NONE')
+
+
+def test_index_cache(tmp_path):
+    first = AcpiNamespace(tables(), cache_dir=tmp_path)
+    assert not first.cached
+    cache_files = list(tmp_path.glob('*.idx'))
+    assert [f.name for f in cache_files] == [f'{first.hash}.idx']
+
+    second = AcpiNamespace(tables(), cache_dir=tmp_path)
+    assert second.cached
+    assert second.by_path == first.by_path
+    assert second.find_by_hid('PNP0C09') == [EC0]
+    assert second.patch_target(EC0) == first.patch_target(EC0)
+
+    # 表内容不同时使用另一个缓存文件
+    other = AcpiNamespace(tables()[:2], cache_dir=tmp_path)
+    assert not other.cached
+    assert len(list(tmp_path.glob('*.idx'))) == 2
+
+
+def test_index_cache_rebuilt_when_stale(tmp_path, monkeypatch):
+    path = tmp_path / f'{AcpiNamespace(tables(), cache_dir=tmp_path).hash}.idx'
+    path.write_bytes(b'not a pickle')
+    assert not AcpiNamespace(tables(), cache_dir=tmp_path).cached
+    assert AcpiNamespace(tables(), cache_dir=tmp_path).cached
+
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    monkeypatch.setattr(acpi_tables, 'INDEX_VERSION', state['version'] + 1)
+    namespace = AcpiNamespace(tables(), cache_dir=tmp_path)
+    assert not namespace.cached
+    assert namespace.find_by_adr(0x001F0000) == [LPCB]
@@ -0,0 +1,134 @@
+import hashlib
+
+import pytest
+
+from asset_pipeline import HASH_LENGTH, IMMUTABLE_CACHE, AssetPipeline, split_url, subset_icon_rules, used_icons
+from static_cache import StaticCache
+
+ICONS_CSS = ('@font-face{font-family:"FA";src:url(../webfonts/fa.woff2?v=6) format("woff2"),'
+             'url(../webfonts/fa.eot) format("embedded-opentype")}'
+             '.fa-download:before{content:"\\f019"}.fa-trash:before,.fa-remove:before{content:"\\f1f8"}'
+             '.fa-spin{animation:spin 2s}')
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    root = tmp_path / 'static'
+    (root / 'css').mkdir(parents=True)
+    (root / 'webfonts').mkdir()
+    (root / 'img').mkdir()
+    (root / 'css' / 'app.css').write_text('body{background:url("../img/bg.png#x")}', encoding='utf-8')
+    (root / 'css' / 'icons.css').write_text(ICONS_CSS, encoding='utf-8')
+    (root / 'webfonts' / 'fa.woff2').write_bytes(b'wOF2 font data')
+    (root / 'img' / 'bg.png').write_bytes(b'\x89PNG background')
+    (root / 'app.js').write_text("icon.className = 'fa-download'; img.src = '/static/img/bg.png';", encoding='utf-8')
+    (tmp_path / 'secret.txt').write_text('secret', encoding='utf-8')
+    return root
+
+
+def hashed_name(path, data):
+    base, _, ext = path.rpartition('.')
+    return f'{base}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.{ext}'
+
+
+def test_split_url():
+    assert split_url('a.woff2?v=6#iefix') == ('a.woff2', '?v=6#iefix')
+    assert split_url('a.woff2#x?y') == ('a.woff2', '#x?y')
+    assert split_url('a.woff2') == ('a.woff2', '')
+
+
+def test_subset_icon_rules():
+    icons = used_icons(['<i class="fa-solid fa-download"></i>', "'fa-remove'"])
+    assert icons == {'fa-solid', 'fa-download', 'fa-remove'}
+    css, codepoints = subset_icon_rules(ICONS_CSS, icons)
+    assert codepoints == {0xf019, 0xf1f8}
+    assert '.fa-download:before{content:"\\f019"}' in css
+    assert '.fa-remove:before{content:"\\f1f8"}' in css
+    assert 'fa-trash' not in css
+    # 不是图标的规则保持不变
+    assert '.fa-spin{animation:spin 2s}' in css
+    assert subset_icon_rules('body{margin:0}', icons) == ('body{margin:0}', None)
+
+
+def test_build_hashes_and_rewrites_references(static_dir):
+    pipeline = AssetPipeline(str(static_dir))
+    manifest = pipeline.build(['<i class="fa-download"></i>'])
+    assert set(manifest) == {'css/app.css', 'css/icons.css', 'webfonts/fa.woff2', 'img/bg.png', 'app.js'}
+    assert manifest['img/bg.png'] == hashed_name('img/bg.png', b'\x89PNG background')
+    image = '/static/' + manifest['img/bg.png']
+    # CSS 的相对地址和 JS 中的绝对地址都改写为带哈希的地址，保留查询参数和锚点
+    app_css = pipeline.get(manifest['css/app.css'])
+    assert app_css.data.decode('utf-8') == f'body{{background:url({image}#x)}}'
+    assert manifest['css/app.css'] == hashed_name('css/app.css', app_css.data)
+    assert image in pipeline.get(manifest['app.js']).data.decode('utf-8')
+    # 指向不存在文件的字体格式被删除，只保留用到的图标
+    icons_css = pipeline.get(manifest['css/icons.css']).data.decode('utf-8')
+    assert f'url(/static/{manifest["webfonts/fa.woff2"]}?v=6) format("woff2")' in icons_css
+    assert 'fa.eot' not in icons_css
+    assert 'fa-trash' not in icons_css and 'fa-download' in icons_css
+    asset = pipeline.get(manifest['css/app.css'])
+    assert asset.cache_control == IMMUTABLE_CACHE
+    assert asset.mimetype == 'text/css'
+    # 只能按带哈希的地址取
+    assert pipeline.get('css/app.css') is None
+
+
+def test_changed_dependency_changes_referrer_hash(static_dir):
+    pipeline = AssetPipeline(str(static_dir))
+    first = dict(pipeline.build())
+    (static_dir / 'img' / 'bg.png').write_bytes(b'\x89PNG new background')
+    second = pipeline.build()
+    assert second['img/bg.png'] != first['img/bg.png']
+    assert second['css/app.css'] != first['css/app.css']
+    assert second['app.js'] != first['app.js']
+    assert second['css/icons.css'] == first['css/icons.css']
+    assert pipeline.get(first['img/bg.png']) is None
+
+
+def test_rewrite_page(static_dir):
+    pipeline = AssetPipeline(str(static_dir))
+    html = '<link href="/static/css/app.css"><script src="/static/missing.js"></script>'
+    # 清单生成前保持原地址
+    assert pipeline.rewrite(html) == html
+    manifest = pipeline.build([html])
+    assert pipeline.rewrite(html) == (f'<link href="/static/{manifest["css/app.css"]}">'
+                                      '<script src="/static/missing.js"></script>')
+
+
+@pytest.fixture
+def client(static_dir, monkeypatch):
+    gui_toolkit = pytest.importorskip('gui_toolkit')
+    pipeline = AssetPipeline(str(static_dir))
+    manifest = pipeline.build()
+    monkeypatch.setattr(gui_toolkit, 'asset_pipeline', pipeline)
+    monkeypatch.setattr(gui_toolkit, 'static_assets', StaticCache(str(static_dir)))
+    return gui_toolkit.app.test_client(), manifest
+
+
+def test_static_route_serves_hashed_and_plain_files(client):
+    client, manifest = client
+    response = client.get('/static/' + manifest['css/app.css'])
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE
+    plain = client.get('/static/css/app.css')
+    assert plain.status_code == 200
+    assert plain.headers['Cache-Control'] == 'no-cache'
+    assert plain.get_data() == b'body{background:url("../img/bg.png#x")}'
+    assert client.get('/static/webfonts/' + manifest['webfonts/fa.woff2'][9:]).get_data() == b'wOF2 font data'
+
+
+@pytest.mark.parametrize('url', [
+    '/static/../secret.txt',
+    '/static/css/../../secret.txt',
+    '/static/%2e%2e/secret.txt',
+    '/static/css/%2e%2e/%2e%2e/secret.txt',
+    '/static/..%2fsecret.txt',
+    '/static/webfonts/..%2f..%2fsecret.txt',
+    '/static/missing.css',
+    '/static/css'
+])
+def test_static_route_rejects_traversal(client, url):
+    client, _ = client
+    response = client.get(url)
+    assert response.status_code == 404
+    assert b'secret' not in response.get_data()
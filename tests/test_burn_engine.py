@@ -0,0 +1,277 @@
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+import burn_engine
+from burn_engine import ALIGNMENT, WIPE_SIZE, BurnEngine
+from test_udif import make_udif, sample_disk
+
+BUFFER = ALIGNMENT * 4
+
+
+def wait(engine, job_id, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = engine.get(job_id)
+        if job['status'] in ('completed', 'cancelled', 'error'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"烧录没有结束: {engine.get(job_id)}")
+
+
+class FakeStream:
+    """start_stream 使用的数据流：可以少给数据、让来源校验失败，或在给出一部分数据后等待取消"""
+
+    def __init__(self, data, size=None, ok=True, block_after=None):
+        self.url = 'http://mirror.invalid/image.img'
+        self.data = data
+        self.declared = len(data) if size is None else size
+        self.ok = ok
+        self.block_after = block_after
+        self.cancel_event = None
+        self.reading = threading.Event()
+        self.closed = False
+
+    def open(self):
+        self.size = self.declared
+        self.position = 0
+
+    def readinto(self, view):
+        if self.block_after is not None and self.position >= self.block_after:
+            self.reading.set()
+            self.cancel_event.wait(10)
+            return 0
+        n = min(len(view), len(self.data) - self.position)
+        view[:n] = self.data[self.position:self.position + n]
+        self.position += n
+        return n
+
+    def finish(self):
+        return (True, '校验通过') if self.ok else (False, '来源校验失败')
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def engine():
+    return BurnEngine(buffer_size=BUFFER)
+
+
+def test_burn_image_to_file(tmp_path, engine):
+    data = os.urandom(BUFFER * 5 + 1234)
+    source = tmp_path / 'image.img'
+    source.write_bytes(data)
+    target = tmp_path / 'target.bin'
+    job = wait(engine, engine.start(str(source), str(target), verify=True))
+    assert job['status'] == 'completed', job['error']
+    assert target.read_bytes() == data
+    assert job['sha256'] == hashlib.sha256(data).hexdigest()
+    assert job['written'] == job['verified'] == job['total_size'] == len(data)
+
+
+def test_burn_udif_image_to_file(tmp_path, engine):
+    raw = sample_disk()
+    source = make_udif(tmp_path / 'image.dmg', raw, [(0, 16), (16, 24)])
+    target = tmp_path / 'disk.img'
+    job = wait(engine, engine.start(str(source), str(target), verify=True))
+    assert job['status'] == 'completed', job['error']
+    assert target.read_bytes() == raw
+    assert job['integrity'].startswith('UDIF 校验通过')
+
+
+def test_corrupt_udif_fails(tmp_path, engine):
+    source = make_udif(tmp_path / 'image.dmg', sample_disk(), [(0, 40)], crc=0x12345678)
+    job = wait(engine, engine.start(str(source), str(tmp_path / 'disk.img')))
+    assert job['status'] == 'error'
+    assert 'CRC32' in job['error']
+
+
+def test_rejects_invalid_sources(tmp_path, engine):
+    with pytest.raises(ValueError):
+        engine.start(str(tmp_path / 'notes.txt'), str(tmp_path / 'target.bin'))
+    with pytest.raises(FileNotFoundError):
+        engine.start(str(tmp_path / 'missing.img'), str(tmp_path / 'target.bin'))
+    source = tmp_path / 'image.img'
+    source.write_bytes(b'x' * ALIGNMENT)
+    with pytest.raises(ValueError):
+        engine.start(str(source), str(source))
+
+
+def test_short_read_fails(tmp_path, engine):
+    data = os.urandom(BUFFER * 2)
+    stream = FakeStream(data, size=len(data) + ALIGNMENT)
+    job = wait(engine, engine.start_stream(stream, str(tmp_path / 'target.bin')))
+    assert job['status'] == 'error'
+    assert '不完整' in job['error']
+    assert stream.closed
+
+
+def test_source_check_failure(tmp_path, engine):
+    stream = FakeStream(os.urandom(BUFFER), ok=False)
+    job = wait(engine, engine.start_stream(stream, str(tmp_path / 'target.bin')))
+    assert job['status'] == 'error'
+    assert job['error'] == '来源校验失败'
+
+
+def test_verify_mismatch_fails(tmp_path):
+    data = os.urandom(BUFFER * 3)
+    source = tmp_path / 'image.img'
+    source.write_bytes(data)
+    target = tmp_path / 'target.bin'
+
+    def corrupt(job):
+        # 写完、回读之前改掉目标中的一个字节
+        if job['status'] == 'verifying':
+            with open(target, 'r+b') as f:
+                f.seek(BUFFER + 7)
+                f.write(bytes([data[BUFFER + 7] ^ 0xFF]))
+
+    engine = BurnEngine(on_progress=corrupt, buffer_size=BUFFER)
+    job = wait(engine, engine.start(str(source), str(target), verify=True))
+    assert job['status'] == 'error'
+    assert '回读校验失败' in job['error']
+
+
+def test_verify_can_be_skipped(tmp_path):
+    data = os.urandom(BUFFER)
+    source = tmp_path / 'image.img'
+    source.write_bytes(data)
+    statuses = []
+    engine = BurnEngine(on_progress=lambda job: statuses.append(job['status']), buffer_size=BUFFER)
+    job = wait(engine, engine.start(str(source), str(tmp_path / 'target.bin'), verify=False))
+    assert job['status'] == 'completed'
+    assert job['verified'] == 0
+    assert 'verifying' not in statuses
+
+
+def test_cancel(tmp_path, engine):
+    stream = FakeStream(os.urandom(BUFFER * 4), block_after=BUFFER * 2)
+    job_id = engine.start_stream(stream, str(tmp_path / 'target.bin'))
+    assert stream.reading.wait(10)
+    assert engine.cancel(job_id)
+    job = wait(engine, job_id)
+    assert job['status'] == 'cancelled'
+    assert not engine.cancel('burn-missing')
+
+
+def test_same_target_is_busy(tmp_path, engine):
+    stream = FakeStream(os.urandom(BUFFER), block_after=0)
+    target = str(tmp_path / 'target.bin')
+    job_id = engine.start_stream(stream, target)
+    with pytest.raises(RuntimeError):
+        engine.start_stream(FakeStream(b''), target)
+    engine.cancel(job_id)
+    wait(engine, job_id)
+
+
+def test_wipe_clears_both_ends(tmp_path, engine):
+    size = WIPE_SIZE * 3
+    device = tmp_path / 'device.bin'
+    device.write_bytes(b'\xaa' * size)
+    fd = os.open(device, os.O_RDWR)
+    try:
+        engine._wipe(fd, size)
+        assert os.lseek(fd, 0, os.SEEK_CUR) == 0
+    finally:
+        os.close(fd)
+    data = device.read_bytes()
+    assert data[:WIPE_SIZE] == bytes(WIPE_SIZE)
+    assert data[-WIPE_SIZE:] == bytes(WIPE_SIZE)
+    assert data[WIPE_SIZE:-WIPE_SIZE] == b'\xaa' * WIPE_SIZE
+
+
+def test_wipe_option_on_device(tmp_path, engine, monkeypatch):
+    # 把普通文件当作块设备：不截断，写入前清零首尾（备份 GPT 所在的末尾也被清掉）
+    device = tmp_path / 'device.bin'
+    device.write_bytes(b'\xaa' * (WIPE_SIZE * 3))
+    monkeypatch.setattr(burn_engine, 'is_block_device', lambda path: path == str(device))
+    data = os.urandom(BUFFER * 2)
+    source = tmp_path / 'image.img'
+    source.write_bytes(data)
+    job = wait(engine, engine.start(str(source), str(device), verify=True, wipe=True))
+    assert job['status'] == 'completed', job['error']
+    written = device.read_bytes()
+    assert len(written) == WIPE_SIZE * 3
+    assert written[:len(data)] == data
+    assert written[len(data):WIPE_SIZE] == bytes(WIPE_SIZE - len(data))
+    assert written[WIPE_SIZE:-WIPE_SIZE] == b'\xaa' * WIPE_SIZE
+    assert written[-WIPE_SIZE:] == bytes(WIPE_SIZE)
+
+
+def test_image_larger_than_device(tmp_path, engine, monkeypatch):
+    device = tmp_path / 'device.bin'
+    device.write_bytes(bytes(BUFFER))
+    monkeypatch.setattr(burn_engine, 'is_block_device', lambda path: path == str(device))
+    source = tmp_path / 'image.img'
+    source.write_bytes(os.urandom(BUFFER * 2))
+    job = wait(engine, engine.start(str(source), str(device)))
+    assert job['status'] == 'error'
+    assert '容量不足' in job['error']
+
+
+class FakeInventory:
+    def __init__(self, disks):
+        self.disks = disks
+        self.refreshed = False
+
+    def refresh(self, categories=None, force=False):
+        self.refreshed = force
+
+    def get(self, categories=None, wait=0.0):
+        return {'categories': {'storage': {'data': self.disks}}, 'pending': []}
+
+
+class FakeEngine:
+    def __init__(self):
+        self.started = []
+
+    def start(self, source, target, **options):
+        self.started.append((source, target, options))
+        return 'burn-test'
+
+    def get(self, job_id):
+        return {'status': 'queued'}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    gui_toolkit = pytest.importorskip('gui_toolkit')
+    inventory = FakeInventory([
+        {'device': '/dev/sda', 'removable': False, 'transport': 'sata', 'system': True},
+        {'device': '/dev/sdb', 'removable': True, 'transport': 'usb', 'system': True},
+        {'device': '/dev/sdc', 'removable': False, 'transport': 'nvme', 'system': False},
+        {'device': '/dev/sdd', 'removable': False, 'transport': 'usb', 'system': False},
+        {'device': '/dev/sde', 'removable': True, 'transport': 'sata', 'system': False}
+    ])
+    engine = FakeEngine()
+    monkeypatch.setattr(gui_toolkit, 'hardware_inventory', inventory)
+    monkeypatch.setattr(gui_toolkit, 'burn_engine', engine)
+    return gui_toolkit.app.test_client(), inventory, engine
+
+
+@pytest.mark.parametrize('target, message', [
+    ('/dev/sda', '系统盘'),
+    ('/dev/sdb', '系统盘'),
+    ('/dev/sdc', '可移动磁盘'),
+    ('/dev/sdz', '找不到目标设备'),
+    ('/tmp/image-copy.img', '找不到目标设备')
+])
+def test_api_rejects_unsafe_targets(api, target, message):
+    client, inventory, engine = api
+    response = client.post('/api/burn', json={'source': '/tmp/image.img', 'target': target})
+    assert response.status_code == 400
+    assert message in response.get_json()['message']
+    assert inventory.refreshed
+    assert not engine.started
+
+
+@pytest.mark.parametrize('target', ['/dev/sdd', '/dev/sde'])
+def test_api_accepts_removable_disks(api, target):
+    client, _, engine = api
+    response = client.post('/api/burn', json={'source': '/tmp/image.img', 'target': target, 'format': True})
+    assert response.get_json()['success']
+    assert engine.started == [('/tmp/image.img', target, {'verify': True, 'direct': True, 'wipe': True})]
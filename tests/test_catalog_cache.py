@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import download_handle
+from download_handle import DownloadHandler
+
+CATALOG = [{'id': '042-1', 'name': 'macOS Sonoma', 'downloadUrl': 'https://mirror.invalid/sonoma.dmg',
+            'mirrors': ['https://mirror2.invalid/sonoma.dmg']}]
+
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    """上游镜像列表接口：带 ETag，条件请求命中时返回 304"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('If-None-Match'))
+        if server.failing:
+            self.send_error(404)
+            return
+        etag = f'"v{server.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = json.dumps({'data': server.catalog}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CatalogHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.failing = False
+    server.version = 1
+    server.catalog = CATALOG
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(download_handle, 'DMG_LIST_URL', f'http://127.0.0.1:{server.server_address[1]}/dmgList')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_refreshed(handler):
+    deadline = time.time() + 10
+    while handler.catalog_refreshing:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_fresh_cache_is_served_without_request(tmp_path, upstream):
+    handler = DownloadHandler(catalog_cache=tmp_path / 'catalog.json')
+    first = handler.get_dmg_list()
+    assert first['status'] == 'success'
+    assert not first['stale']
+    assert first['data'][0]['mirrors'] == ['https://mirror.invalid/sonoma.dmg', 'https://mirror2.invalid/sonoma.dmg']
+    second = handler.get_dmg_list()
+    assert second['etag'] == first['etag']
+    assert upstream.requests == [None]
+    # 重新启动后直接使用磁盘上的缓存
+    restarted = DownloadHandler(catalog_cache=tmp_path / 'catalog.json')
+    assert restarted.get_dmg_list()['etag'] == first['etag']
+    assert upstream.requests == [None]
+
+
+def test_force_refresh_uses_conditional_request(tmp_path, upstream):
+    handler = DownloadHandler(catalog_cache=tmp_path / 'catalog.json')
+    first = handler.get_dmg_list()
+    time.sleep(0.01)
+    second = handler.get_dmg_list(force=True)
+    # 上游返回 304：沿用缓存的数据和 ETag，只更新获取时间
+    assert upstream.requests == [None, '"v1"']
+    assert second['etag'] == first['etag']
+    assert second['data'] == first['data']
+    assert second['fetched_at'] > first['fetched_at']
+    # 上游内容变化后 ETag 随之变化
+    upstream.version = 2
+    upstream.catalog = CATALOG + [{'id': '042-2', 'downloadUrl': 'https://mirror.invalid/sequoia.dmg'}]
+    third = handler.get_dmg_list(force=True)
+    assert third['etag'] != first['etag']
+    assert [item['id'] for item in third['data']] == ['042-1', '042-2']
+
+
+def test_stale_while_revalidate(tmp_path, upstream):
+    handler = DownloadHandler(catalog_cache=tmp_path / 'catalog.json', catalog_ttl=0)
+    first = handler.get_dmg_list()
+    upstream.version = 2
+    upstream.catalog = []
+    # 过期后立即返回旧数据，同时在后台刷新
+    stale = handler.get_dmg_list()
+    assert stale['stale']
+    assert stale['etag'] == first['etag']
+    wait_refreshed(handler)
+    assert upstream.requests == [None, '"v1"']
+    assert handler.get_dmg_list()['data'] == []
+
+
+def test_upstream_failure_falls_back_to_cache(tmp_path, upstream):
+    handler = DownloadHandler(catalog_cache=tmp_path / 'catalog.json')
+    first = handler.get_dmg_list()
+    upstream.failing = True
+    result = handler.get_dmg_list(force=True)
+    assert result['status'] == 'success'
+    assert result['stale']
+    assert result['data'] == first['data']
+    assert '使用缓存的镜像列表' in result['message']
+    assert DownloadHandler(catalog_cache=tmp_path / 'other.json').get_dmg_list()['status'] == 'error'
+
+
+def test_api_answers_304(tmp_path, upstream, monkeypatch):
+    gui_toolkit = pytest.importorskip('gui_toolkit')
+    monkeypatch.setattr(gui_toolkit, 'download_handler', DownloadHandler(catalog_cache=tmp_path / 'catalog.json'))
+    client = gui_toolkit.app.test_client()
+    response = client.get('/api/dmg-list')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    response = client.get('/api/dmg-list', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert upstream.requests == [None]
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import download_handle
+from download_handle import JOURNAL_SUFFIX, DownloadHandler, DownloadTask, Segment
+
+ROOT = Path(__file__).resolve().parent.parent
+MB = 1024 * 1024
+
+# 在子进程中限速下载，等待被杀掉
+KILLED_DOWNLOAD = """
+import sys, time
+sys.path.insert(0, sys.argv[1])
+import download_handle
+download_handle.MIN_SEGMENT_SIZE = 1024 * 1024
+download_handle.JOURNAL_INTERVAL = 0.05
+handler = download_handle.DownloadHandler(journal_index=sys.argv[2], rate_limit=2 * 1024 * 1024)
+handler.start_download(sys.argv[3], sys.argv[4], connections=4, checksum=sys.argv[5])
+time.sleep(60)
+"""
+
+
+def synthetic_bytes(server, name):
+    """测试服务器上虚拟文件的完整内容"""
+    synthetic = server.files['/' + name]
+    return b''.join(bytes(piece) for piece in synthetic.pieces(0, synthetic.size - 1))
+
+
+def wait_download(handler, download_id, statuses=('completed', 'error', 'cancelled', 'paused'), timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        download = handler.get_download(download_id)
+        if download and download['status'] in statuses:
+            return download
+        time.sleep(0.02)
+    raise AssertionError(f"下载没有结束: {handler.get_download(download_id)}")
+
+
+def journal_progress(path):
+    try:
+        journal = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return 0
+    return sum(offset - start for start, _, offset in journal['segments'])
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(download_handle, 'MIN_SEGMENT_SIZE', MB)
+    monkeypatch.setattr(download_handle, 'JOURNAL_INTERVAL', 0.05)
+
+
+def test_resume_after_kill(tmp_path, range_server):
+    url = range_server.add_file('kill.dmg', 16 * MB)
+    data = synthetic_bytes(range_server, 'kill.dmg')
+    save_path = str(tmp_path / 'kill.dmg')
+    index = str(tmp_path / 'downloads.json')
+    process = subprocess.Popen([sys.executable, '-c', KILLED_DOWNLOAD, str(ROOT), index, url, save_path,
+                                hashlib.sha256(data).hexdigest()])
+    try:
+        deadline = time.time() + 20
+        while journal_progress(save_path + JOURNAL_SUFFIX) < 3 * MB:
+            assert time.time() < deadline, "子进程没有写入下载日志"
+            assert process.poll() is None
+            time.sleep(0.02)
+    finally:
+        process.kill()
+        process.wait()
+    assert journal_progress(save_path + JOURNAL_SUFFIX) < len(data)
+
+    # 重新启动后按未完成下载列表续传，已下载的部分不再请求
+    handler = DownloadHandler(journal_index=index)
+    recovered = handler.recover_downloads()
+    assert len(recovered) == 1
+    download = wait_download(handler, recovered[0])
+    assert download['status'] == 'completed', download['error']
+    assert download['verification']['status'] == 'passed'
+    assert Path(save_path).read_bytes() == data
+    assert not os.path.exists(save_path + JOURNAL_SUFFIX)
+    assert json.loads(Path(index).read_text(encoding='utf-8')) == []
+
+
+def test_pause_cancel_and_resume(tmp_path, range_server, small_segments):
+    url = range_server.add_file('pause.dmg', 8 * MB)
+    save_path = str(tmp_path / 'pause.dmg')
+    handler = DownloadHandler(rate_limit=2 * MB)
+    download_id = handler.start_download(url, save_path, connections=2)
+    deadline = time.time() + 10
+    while handler.get_download(download_id)['downloaded'] < MB:
+        assert time.time() < deadline
+        time.sleep(0.02)
+    assert handler.pause_download(download_id)
+    assert wait_download(handler, download_id)['status'] == 'paused'
+
+    # 已暂停的下载取消后保留已下载部分和日志
+    assert handler.cancel_download(download_id)
+    assert handler.get_download(download_id)['status'] == 'cancelled'
+    assert os.path.exists(save_path + JOURNAL_SUFFIX)
+    kept = journal_progress(save_path + JOURNAL_SUFFIX)
+    assert kept >= MB
+
+    handler.configure(rate_limit=0)
+    assert handler.resume_download(download_id) == download_id
+    download = wait_download(handler, download_id)
+    assert download['status'] == 'completed', download['error']
+    assert Path(save_path).read_bytes() == synthetic_bytes(range_server, 'pause.dmg')
+
+
+def test_cancel_paused_with_discard(tmp_path, range_server, small_segments):
+    url = range_server.add_file('discard.dmg', 4 * MB)
+    save_path = str(tmp_path / 'discard.dmg')
+    handler = DownloadHandler(rate_limit=MB)
+    download_id = handler.start_download(url, save_path)
+    wait_download(handler, download_id, statuses=('downloading',))
+    assert handler.pause_download(download_id)
+    wait_download(handler, download_id)
+    assert handler.cancel_download(download_id, discard=True)
+    assert not os.path.exists(save_path)
+    assert not os.path.exists(save_path + JOURNAL_SUFFIX)
+
+
+def test_resume_completed_download_returns_existing_id(tmp_path, range_server):
+    url = range_server.add_file('done.dmg', MB)
+    save_path = tmp_path / 'done.dmg'
+    handler = DownloadHandler()
+    download_id = handler.start_download(url, str(save_path))
+    assert wait_download(handler, download_id)['status'] == 'completed'
+    stat = save_path.stat()
+    # 已完成的下载不会被重新下载
+    assert handler.resume_download(download_id) == download_id
+    assert handler.resume_download(save_path=str(save_path)) == download_id
+    assert handler.get_download(download_id)['status'] == 'completed'
+    assert save_path.stat().st_mtime_ns == stat.st_mtime_ns
+    assert save_path.stat().st_ino == stat.st_ino
+
+
+def test_resume_unknown_download():
+    assert DownloadHandler().resume_download('dl-missing') is None
+    assert not DownloadHandler().cancel_download('dl-missing')
+
+
+def test_journal_does_not_flush_target_while_downloading(tmp_path, monkeypatch):
+    save_path = tmp_path / 'image.dmg'
+    save_path.write_bytes(bytes(4 * MB))
+    flushed = []
+    fsync = os.fsync
+
+    def record(fd):
+        flushed.append(os.fstat(fd).st_ino)
+        fsync(fd)
+
+    monkeypatch.setattr(download_handle.os, 'fsync', record)
+    task = DownloadTask('http://mirror.invalid/image.dmg', str(save_path))
+    task.accepts_ranges = True
+    task.total_size = 4 * MB
+    task.segments = [Segment(0, 2 * MB - 1, MB), Segment(2 * MB, 4 * MB - 1)]
+    task.downloaded = MB
+    handler = DownloadHandler()
+    target = save_path.stat().st_ino
+
+    handler._save_journal(task)
+    assert journal_progress(task.journal_path) == MB
+    assert target not in flushed
+    # 节流期间不写日志
+    task.segments[1].offset += MB
+    handler._save_journal(task)
+    assert journal_progress(task.journal_path) == MB
+    # 暂停、取消等强制写入时先把数据刷到磁盘
+    handler._save_journal(task, force=True)
+    assert journal_progress(task.journal_path) == 2 * MB
+    assert target in flushed
@@ -0,0 +1,156 @@
+import time
+
+import pytest
+
+import download_handle
+from download_handle import MAX_CONCURRENT_LIMIT, DownloadHandler, TokenBucket
+from test_download_journal import MB, synthetic_bytes, wait_download
+
+
+class Clock:
+    """替换 download_handle.time：monotonic 返回当前时间，sleep 只推进时间并记录"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class Event:
+    def __init__(self):
+        self.waits = []
+
+    def wait(self, seconds):
+        self.waits.append(seconds)
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(download_handle, 'time', clock)
+    return clock
+
+
+def test_unlimited_bucket_never_waits(clock):
+    bucket = TokenBucket()
+    bucket.consume(10 * MB)
+    assert clock.sleeps == []
+
+
+def test_bucket_rate(clock):
+    bucket = TokenBucket(MB)
+    # 初始没有令牌，透支后等待补足
+    bucket.consume(MB // 2)
+    assert clock.sleeps == [0.5]
+    # 空闲期间最多积累一秒的令牌
+    clock.now += 10
+    bucket.consume(MB)
+    assert clock.sleeps == [0.5]
+    bucket.consume(MB)
+    assert clock.sleeps == [0.5, 1.0]
+    # 长时间平均速度等于设定值
+    started = clock.now
+    for _ in range(20):
+        bucket.consume(MB // 4)
+    assert clock.now - started == pytest.approx(5.0)
+
+
+def test_bucket_wait_uses_cancel_event(clock):
+    bucket = TokenBucket(MB)
+    event = Event()
+    bucket.consume(2 * MB, event)
+    assert event.waits == [2.0]
+    assert clock.sleeps == []
+
+
+def test_set_rate_caps_tokens(clock):
+    bucket = TokenBucket(4 * MB)
+    clock.now += 10
+    bucket.set_rate(MB)
+    assert bucket.capacity == MB
+    bucket.set_rate(0)
+    bucket.consume(100 * MB)
+    assert clock.sleeps == []
+
+
+def test_configure_limits():
+    handler = DownloadHandler(max_concurrent=100, rate_limit='fast')
+    assert handler.max_concurrent == MAX_CONCURRENT_LIMIT
+    assert handler.rate_limiter.rate == 0
+    handler.configure(max_concurrent=0, rate_limit=2 * MB)
+    assert handler.max_concurrent == 1
+    assert handler.rate_limiter.rate == 2 * MB
+    handler.configure(max_concurrent='many')
+    assert handler.max_concurrent == download_handle.DEFAULT_MAX_CONCURRENT
+
+
+def queue_order(handler):
+    queued = [d for d in handler.list_downloads()['downloads'] if d['status'] == 'queued']
+    return [d['id'] for d in sorted(queued, key=lambda d: d['queue_position'])]
+
+
+def test_queue_priority_and_reorder(tmp_path, range_server):
+    url = range_server.add_file('image.dmg', 8 * MB)
+    handler = DownloadHandler(max_concurrent=1, rate_limit=MB // 2)
+    running = handler.start_download(url, str(tmp_path / 'running.dmg'))
+    wait_download(handler, running, statuses=('downloading',))
+    b = handler.start_download(url, str(tmp_path / 'b.dmg'))
+    c = handler.start_download(url, str(tmp_path / 'c.dmg'), priority=5)
+    d = handler.start_download(url, str(tmp_path / 'd.dmg'))
+    # 优先级高的排在前面，同优先级按加入顺序
+    assert queue_order(handler) == [c, b, d]
+    # 同优先级内按给定顺序，不跨越优先级
+    assert handler.reorder_downloads(order=[d, b])
+    assert queue_order(handler) == [c, d, b]
+    assert handler.reorder_downloads(download_id=b, priority=10)
+    assert queue_order(handler) == [b, c, d]
+    assert not handler.reorder_downloads(download_id='dl-missing', priority=1)
+    assert handler.get_download(running)['status'] == 'downloading'
+
+    # 排在最前的任务在名额空出后开始
+    assert handler.cancel_download(running, discard=True)
+    wait_download(handler, running, statuses=('cancelled',))
+    wait_download(handler, b, statuses=('downloading', 'completed'))
+    assert queue_order(handler) == [c, d]
+
+    # 取消排队中的任务直接移出队列
+    assert handler.cancel_download(c)
+    assert handler.get_download(c)['status'] == 'cancelled'
+    assert queue_order(handler) == [d]
+    handler.configure(rate_limit=0)
+    for download_id in (b, d):
+        assert wait_download(handler, download_id)['status'] == 'completed'
+    assert (tmp_path / 'd.dmg').read_bytes() == synthetic_bytes(range_server, 'image.dmg')
+
+
+def test_max_concurrent(tmp_path, range_server):
+    url = range_server.add_file('image.dmg', 4 * MB)
+    handler = DownloadHandler(max_concurrent=2, rate_limit=MB // 4)
+    ids = [handler.start_download(url, str(tmp_path / f'{i}.dmg')) for i in range(4)]
+    statuses = [handler.get_download(i)['status'] for i in ids]
+    assert statuses == ['downloading', 'downloading', 'queued', 'queued']
+    # 提高并发上限后立即开始排队的任务
+    handler.configure(max_concurrent=3)
+    assert handler.get_download(ids[2])['status'] == 'downloading'
+    assert handler.get_download(ids[3])['status'] == 'queued'
+    for download_id in ids:
+        handler.cancel_download(download_id, discard=True)
+    for download_id in ids:
+        assert wait_download(handler, download_id)['status'] == 'cancelled'
+
+
+def test_rate_limit_slows_download(tmp_path, range_server):
+    url = range_server.add_file('image.dmg', 3 * MB)
+    handler = DownloadHandler(rate_limit=2 * MB)
+    started = time.monotonic()
+    download = wait_download(handler, handler.start_download(url, str(tmp_path / 'image.dmg')))
+    assert download['status'] == 'completed'
+    # 3MB 在 2MB/s 下至少需要 1 秒（最后一块透支的等待不计）
+    assert time.monotonic() - started >= 1.0
@@ -0,0 +1,120 @@
+import hashlib
+import time
+
+import pytest
+
+from benchmark import RangeRequestHandler
+from burn_engine import ALIGNMENT, BurnEngine
+from download_handle import DownloadHandler
+from integrity import parse_chunklist
+from test_burn_engine import wait
+from test_download_journal import MB, synthetic_bytes
+from test_integrity import make_chunklist
+
+
+class RecordingHandler(RangeRequestHandler):
+    """记录请求头；drop_after 不为空时，第一个完整请求发出这么多字节后断开连接"""
+
+    def do_GET(self):
+        self.server.requests.append({'Range': self.headers.get('Range'), 'If-Range': self.headers.get('If-Range')})
+        header = self.headers.get('Range', '')
+        drop_after = self.server.drop_after
+        if drop_after is None or header:
+            return super().do_GET()
+        self.server.drop_after = None
+        synthetic = self.server.files[self.path]
+        self.send_response(200)
+        self.send_header('Content-Length', str(synthetic.size))
+        self.send_header('ETag', f'"{synthetic.etag}"')
+        self.end_headers()
+        for piece in synthetic.pieces(0, drop_after - 1):
+            self.wfile.write(piece)
+        self.close_connection = True
+
+
+@pytest.fixture
+def server(range_server):
+    range_server.RequestHandlerClass = RecordingHandler
+    range_server.requests = []
+    range_server.drop_after = None
+    return range_server
+
+
+@pytest.fixture
+def engine():
+    return BurnEngine(buffer_size=ALIGNMENT * 256)
+
+
+def test_stream_to_target_and_tee(tmp_path, server, engine):
+    # 大小不是缓冲区的整数倍：最后一块不满时读线程会再读一次，读完后不能重连
+    url = server.add_file('image.dmg', 3 * MB + 5)
+    data = synthetic_bytes(server, 'image.dmg')
+    stream = DownloadHandler().open_stream(url, checksum=hashlib.sha256(data).hexdigest())
+    target, tee = tmp_path / 'disk.img', tmp_path / 'image.dmg'
+    job = wait(engine, engine.start_stream(stream, str(target), tee_path=str(tee)))
+    assert job['status'] == 'completed', job['error']
+    assert job['integrity'] == 'SHA-256 校验通过'
+    assert target.read_bytes() == data
+    assert tee.read_bytes() == data
+    # 一次探测加一次顺序读取，中间没有落盘的下载文件
+    assert [r['Range'] for r in server.requests] == ['bytes=0-0', None]
+
+
+def test_stream_reconnects_with_range(tmp_path, server, engine):
+    url = server.add_file('image.dmg', 4 * MB)
+    data = synthetic_bytes(server, 'image.dmg')
+    server.drop_after = MB + 100000
+    stream = DownloadHandler().open_stream(url, checksum=hashlib.sha256(data).hexdigest())
+    job = wait(engine, engine.start_stream(stream, str(tmp_path / 'disk.img')))
+    assert job['status'] == 'completed', job['error']
+    assert (tmp_path / 'disk.img').read_bytes() == data
+    # 从已读到的位置续读，并用 If-Range 确认文件没有变化
+    etag = f'"{server.files["/image.dmg"].etag}"'
+    assert server.requests[1:] == [{'Range': None, 'If-Range': None},
+                                   {'Range': f'bytes={MB}-', 'If-Range': etag}]
+
+
+def test_checksum_failure_aborts_burn(tmp_path, server, engine):
+    url = server.add_file('image.dmg', 2 * MB)
+    stream = DownloadHandler().open_stream(url, checksum='ab' * 32)
+    tee = tmp_path / 'image.dmg'
+    job = wait(engine, engine.start_stream(stream, str(tmp_path / 'disk.img'), tee_path=str(tee)))
+    assert job['status'] == 'error'
+    assert 'SHA-256 不匹配' in job['error']
+    assert job['verified'] == 0
+    assert not tee.exists()
+
+
+def test_chunklist_mismatch_aborts_mid_stream(tmp_path, server, engine, monkeypatch):
+    url = server.add_file('image.dmg', 4 * MB)
+    data = bytearray(synthetic_bytes(server, 'image.dmg'))
+    data[2 * MB + 10] ^= 0xFF
+    chunklist = make_chunklist(bytes(data), chunk_size=MB)
+    monkeypatch.setattr(DownloadHandler, '_fetch_chunklist', staticmethod(lambda url: parse_chunklist(chunklist)))
+    stream = DownloadHandler().open_stream(url, chunklist_url='http://mirror.invalid/image.chunklist')
+    tee = tmp_path / 'image.dmg'
+    job = wait(engine, engine.start_stream(stream, str(tmp_path / 'disk.img'), tee_path=str(tee)))
+    assert job['status'] == 'error'
+    assert '哈希不匹配' in job['error']
+    # 坏块之后的数据不再写入
+    assert job['written'] <= 2 * MB
+    assert not tee.exists()
+
+
+def test_cancel_stops_download_and_removes_tee(tmp_path, server, engine):
+    url = server.add_file('image.dmg', 8 * MB)
+    stream = DownloadHandler(rate_limit=MB).open_stream(url)
+    tee = tmp_path / 'image.dmg'
+    job_id = engine.start_stream(stream, str(tmp_path / 'disk.img'), tee_path=str(tee))
+    deadline = time.time() + 10
+    while not engine.get(job_id)['written']:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    started = time.monotonic()
+    assert engine.cancel(job_id)
+    job = wait(engine, job_id)
+    # 限速等待被取消打断，不必等剩余数据
+    assert time.monotonic() - started < 2
+    assert job['status'] == 'cancelled'
+    assert not tee.exists()
+    assert stream.response is None
@@ -0,0 +1,241 @@
+import plistlib
+from pathlib import Path
+
+import pytest
+
+from efi_config import EfiConfigService, PlistDocument, PlistError, join_path, split_path
+
+SAMPLE = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+<dict>
+	<key>ACPI</key>
+	<dict>
+		<key>Add</key>
+		<array>
+			<dict>
+				<key>Comment</key>
+				<string>EC &amp; USBX &lt;desktop&gt;</string>
+				<key>Enabled</key>
+				<true/>
+				<key>Path</key>
+				<string>SSDT-EC-USBX.aml</string>
+			</dict>
+			<!-- 保留的注释 -->
+			<dict>
+				<key>Comment</key>
+				<string/>
+				<key>Enabled</key>
+				<false/>
+				<key>Path</key>
+				<string>SSDT-PLUG.aml</string>
+			</dict>
+		</array>
+	</dict>
+	<key>Misc</key>
+	<dict>
+		<key>Debug</key>
+		<dict>
+			<key>Target</key>
+			<integer>3</integer>
+		</dict>
+		<key>Security</key>
+		<dict>
+			<key>ScanPolicy</key>
+			<integer>0</integer>
+			<key>Vault</key>
+			<string>Optional</string>
+		</dict>
+	</dict>
+	<key>NVRAM</key>
+	<dict>
+		<key>Add</key>
+		<dict>
+			<key>7C436110-AB2A-4BBB-A880-FE41995C9F82</key>
+			<dict>
+				<key>boot-args</key>
+				<string>-v keepsyms=1</string>
+				<key>csr-active-config</key>
+				<data>AAAAAA==</data>
+			</dict>
+		</dict>
+	</dict>
+</dict>
+</plist>
+"""
+
+NVRAM = 'NVRAM/Add/7C436110-AB2A-4BBB-A880-FE41995C9F82'
+
+
+def open_document(tmp_path, text=SAMPLE, newline='\n', bom=False):
+    data = text.replace('\n', newline).encode('utf-8')
+    if bom:
+        data = b'\xef\xbb\xbf' + data
+    path = tmp_path / 'config.plist'
+    path.write_bytes(data)
+    return PlistDocument(path)
+
+
+def reparse(document):
+    return plistlib.loads(document.render().encode('utf-8'))
+
+
+def test_unchanged_document_renders_original_text(tmp_path):
+    document = open_document(tmp_path)
+    assert document.render() == SAMPLE
+
+
+def test_parse_escaped_and_empty_strings(tmp_path):
+    document = open_document(tmp_path)
+    assert document.describe('ACPI/Add/0/Comment')['value'] == 'EC & USBX <desktop>'
+    assert document.describe('ACPI/Add/1/Comment')['value'] == ''
+    assert document.describe(NVRAM + '/csr-active-config')['value'] == '00000000'
+
+
+def test_replace(tmp_path):
+    document = open_document(tmp_path)
+    assert document.apply([
+        {'op': 'replace', 'path': 'Misc/Debug/Target', 'value': '0x43'},
+        {'op': 'replace', 'path': 'ACPI/Add/1/Comment', 'value': 'a & b <c>'},
+        {'op': 'replace', 'path': NVRAM + '/csr-active-config', 'value': '03080000'}
+    ]) == ['Misc/Debug/Target', 'ACPI/Add/1/Comment', NVRAM + '/csr-active-config']
+    data = reparse(document)
+    assert data['Misc']['Debug']['Target'] == 0x43
+    assert data['ACPI']['Add'][1]['Comment'] == 'a & b <c>'
+    assert data['NVRAM']['Add']['7C436110-AB2A-4BBB-A880-FE41995C9F82']['csr-active-config'] == b'\x03\x08\x00\x00'
+    # 未改动的部分保持原文
+    text = document.render()
+    assert '<string>EC &amp; USBX &lt;desktop&gt;</string>' in text
+    assert '<!-- 保留的注释 -->' in text
+    assert document.modified
+
+
+def test_add(tmp_path):
+    document = open_document(tmp_path)
+    document.apply([
+        {'op': 'add', 'path': 'ACPI/Add/-', 'value': {'Comment': 'AWAC', 'Enabled': True, 'Path': 'SSDT-AWAC.aml'}},
+        {'op': 'add', 'path': 'Misc/Debug/DisplayLevel', 'value': 2147483650},
+        {'op': 'add', 'path': NVRAM + '/prev-lang:kbd', 'value': 'zh-Hans:252'}
+    ])
+    data = reparse(document)
+    assert [entry['Path'] for entry in data['ACPI']['Add']] == ['SSDT-EC-USBX.aml', 'SSDT-PLUG.aml', 'SSDT-AWAC.aml']
+    assert data['ACPI']['Add'][2]['Enabled'] is True
+    assert data['Misc']['Debug'] == {'Target': 3, 'DisplayLevel': 2147483650}
+    assert data['NVRAM']['Add']['7C436110-AB2A-4BBB-A880-FE41995C9F82']['prev-lang:kbd'] == 'zh-Hans:252'
+
+
+def test_add_to_existing_key_replaces(tmp_path):
+    document = open_document(tmp_path)
+    document.apply([{'op': 'add', 'path': 'Misc/Security/Vault', 'value': 'Secure'}])
+    data = reparse(document)
+    assert list(data['Misc']['Security']) == ['ScanPolicy', 'Vault']
+    assert data['Misc']['Security']['Vault'] == 'Secure'
+
+
+def test_remove(tmp_path):
+    document = open_document(tmp_path)
+    document.apply([
+        {'op': 'remove', 'path': 'ACPI/Add/0'},
+        {'op': 'remove', 'path': 'Misc/Security/ScanPolicy'}
+    ])
+    data = reparse(document)
+    assert data['ACPI']['Add'] == [{'Comment': '', 'Enabled': False, 'Path': 'SSDT-PLUG.aml'}]
+    assert data['Misc']['Security'] == {'Vault': 'Optional'}
+
+
+def test_move(tmp_path):
+    document = open_document(tmp_path)
+    document.apply([
+        # 同一数组内调整顺序
+        {'op': 'move', 'from': 'ACPI/Add/1', 'path': 'ACPI/Add/0'},
+        # 移动到其它层级
+        {'op': 'move', 'from': 'Misc/Debug/Target', 'path': 'Misc/Security/Target'}
+    ])
+    data = reparse(document)
+    assert [entry['Path'] for entry in data['ACPI']['Add']] == ['SSDT-PLUG.aml', 'SSDT-EC-USBX.aml']
+    assert data['ACPI']['Add'][1]['Comment'] == 'EC & USBX <desktop>'
+    assert data['Misc']['Debug'] == {}
+    assert data['Misc']['Security']['Target'] == 3
+
+
+def test_move_into_itself_is_rejected(tmp_path):
+    document = open_document(tmp_path)
+    with pytest.raises(PlistError):
+        document.apply([{'op': 'move', 'from': 'Misc', 'path': 'Misc/Debug/Misc'}])
+
+
+def test_failed_batch_is_rolled_back(tmp_path):
+    document = open_document(tmp_path)
+    document.apply([{'op': 'replace', 'path': 'Misc/Debug/Target', 'value': 67}])
+    dirty = set(document.dirty)
+    revision = document.revision
+    before = document.render()
+    with pytest.raises(PlistError):
+        document.apply([
+            {'op': 'replace', 'path': 'Misc/Security/Vault', 'value': 'Secure'},
+            {'op': 'remove', 'path': 'ACPI/Add/0'},
+            {'op': 'move', 'from': 'ACPI/Add/0', 'path': 'Misc/Entry'},
+            {'op': 'add', 'path': 'ACPI/Add/-', 'value': {'Path': 'SSDT-AWAC.aml'}},
+            {'op': 'replace', 'path': 'Misc/Security/ScanPolicy', 'value': 'not a number'}
+        ])
+    assert document.dirty == dirty
+    assert document.revision == revision
+    assert document.render() == before
+    assert reparse(document)['Misc']['Debug']['Target'] == 67
+
+
+def test_type_error_on_written_value_is_rejected(tmp_path):
+    document = open_document(tmp_path)
+    with pytest.raises(PlistError):
+        document.apply([{'op': 'replace', 'path': 'ACPI/Add/0/Enabled', 'value': 'maybe'}])
+    assert not document.dirty
+    assert document.render() == SAMPLE
+
+
+def test_crlf_file_keeps_line_endings(tmp_path):
+    document = open_document(tmp_path, newline='\r\n')
+    assert document.newline == '\r\n'
+    document.apply([
+        {'op': 'add', 'path': 'ACPI/Add/-', 'value': {'Comment': 'AWAC', 'Enabled': True, 'Path': 'SSDT-AWAC.aml'}},
+        {'op': 'move', 'from': 'Misc/Debug/Target', 'path': 'Misc/Security/Target'}
+    ])
+    text = document.render()
+    assert '\n' not in text.replace('\r\n', '')
+    assert reparse(document)['ACPI']['Add'][2]['Path'] == 'SSDT-AWAC.aml'
+
+
+def test_bom_is_preserved_on_save(tmp_path):
+    document = open_document(tmp_path, bom=True)
+    assert document.bom
+    document.apply([{'op': 'replace', 'path': 'Misc/Security/Vault', 'value': 'Secure'}])
+    result = document.save()
+    data = Path(result['path']).read_bytes()
+    assert data.startswith(b'\xef\xbb\xbf')
+    assert plistlib.loads(data)['Misc']['Security']['Vault'] == 'Secure'
+    assert data[3:].decode('utf-8') == SAMPLE.replace('<string>Optional</string>', '<string>Secure</string>')
+    assert not document.modified
+
+
+def test_save_backs_up_original_once(tmp_path):
+    service = EfiConfigService(backup_dir=str(tmp_path / 'backup'))
+    (tmp_path / 'EFI' / 'OC').mkdir(parents=True)
+    (tmp_path / 'EFI' / 'OC' / 'config.plist').write_text(SAMPLE, encoding='utf-8')
+    summary = service.open(str(tmp_path / 'EFI'))
+    assert summary['cached'] is False
+    first = service.patch([{'op': 'replace', 'path': 'Misc/Debug/Target', 'value': 0}], save=True)
+    second = service.patch([{'op': 'replace', 'path': 'Misc/Debug/Target', 'value': 1}], save=True)
+    assert first['saved']['backup'] == second['saved']['backup']
+    assert Path(first['saved']['backup']).read_text(encoding='utf-8') == SAMPLE
+    assert service.open(str(tmp_path / 'EFI'))['cached'] is True
+
+
+def test_file_changed_on_disk_is_not_overwritten(tmp_path):
+    document = open_document(tmp_path)
+    document.apply([{'op': 'replace', 'path': 'Misc/Security/Vault', 'value': 'Secure'}])
+    Path(document.path).write_text(SAMPLE + '\n', encoding='utf-8')
+    with pytest.raises(PlistError):
+        document.save()
+
+
+def test_path_escaping():
+    assert split_path(join_path(['NVRAM', 'a/b', 'c~d'])) == ['NVRAM', 'a/b', 'c~d']
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from event_stream import RETRY_MS, EventBus
+
+
+def parse(message):
+    """SSE 消息 -> (channel, 条目列表)"""
+    lines = message.strip().split('\n')
+    assert lines[0].startswith('event: ') and lines[1].startswith('data: ')
+    return lines[0][7:], json.loads(lines[1][6:])
+
+
+@pytest.fixture
+def bus():
+    bus = EventBus(interval=0, keepalive=0.05)
+    yield bus
+    bus.close()
+
+
+def subscribe(bus):
+    stream = bus.stream()
+    assert next(stream) == f"retry: {RETRY_MS}\n\n"
+    return stream
+
+
+def test_initial_state_and_deltas(bus):
+    bus.publish('download', 'a', {'status': 'downloading', 'progress': 1, 'speed': '1 MB/s'})
+    bus.publish('burn', 'b', {'status': 'writing'})
+    stream = subscribe(bus)
+    # 连接建立时先收到全部当前状态
+    assert parse(next(stream)) == ('download', [{'key': 'a', 'data': {'status': 'downloading', 'progress': 1,
+                                                                       'speed': '1 MB/s'}}])
+    assert parse(next(stream)) == ('burn', [{'key': 'b', 'data': {'status': 'writing'}}])
+    # 之后只发送变化的字段
+    bus.publish('download', 'a', {'status': 'downloading', 'progress': 2, 'speed': '1 MB/s'})
+    assert parse(next(stream)) == ('download', [{'key': 'a', 'data': {'progress': 2}}])
+    # 没有变化的更新不发送
+    bus.publish('download', 'a', {'status': 'downloading', 'progress': 2, 'speed': '1 MB/s'})
+    assert next(stream) == ": keepalive\n\n"
+
+
+def test_updates_are_coalesced(bus):
+    stream = subscribe(bus)
+    for progress in range(10):
+        bus.publish('download', 'a', {'progress': progress})
+    bus.publish('download', 'b', {'progress': 5})
+    # 两次推送之间的更新合并，每个条目只发送最新状态，按最后更新的顺序
+    assert parse(next(stream)) == ('download', [{'key': 'a', 'data': {'progress': 9}},
+                                                {'key': 'b', 'data': {'progress': 5}}])
+
+
+def test_reset_replaces_channel(bus):
+    bus.publish('usb', 'p1', {'name': 'HS01'})
+    bus.publish('usb', 'p2', {'name': 'HS02'})
+    stream = subscribe(bus)
+    next(stream)
+    bus.publish('usb', 'map', {'ports': 3}, reset=True)
+    assert parse(next(stream)) == ('usb', [{'reset': True}, {'key': 'map', 'data': {'ports': 3}}])
+    assert list(bus.latest) == [('usb', 'map')]
+    # 清空后同一条目重新发送完整状态
+    bus.publish('usb', 'p1', {'name': 'HS01'})
+    assert parse(next(stream)) == ('usb', [{'key': 'p1', 'data': {'name': 'HS01'}}])
+
+
+def test_final_state_without_subscribers_is_dropped(bus):
+    bus.publish('download', 'a', {'status': 'downloading'})
+    bus.publish('download', 'a', {'status': 'completed'}, final=True)
+    assert bus.latest == {}
+    # 之后连接的订阅者看不到已结束的任务
+    bus.publish('download', 'b', {'status': 'queued'})
+    stream = subscribe(bus)
+    assert parse(next(stream)) == ('download', [{'key': 'b', 'data': {'status': 'queued'}}])
+
+
+def test_final_state_is_kept_until_every_subscriber_sent_it(bus):
+    fast, slow = subscribe(bus), subscribe(bus)
+    bus.publish('burn', 'job', {'status': 'writing', 'written': 1})
+    assert parse(next(fast))[1] == [{'key': 'job', 'data': {'status': 'writing', 'written': 1}}]
+    assert parse(next(slow))[1] == [{'key': 'job', 'data': {'status': 'writing', 'written': 1}}]
+    bus.publish('burn', 'job', {'status': 'completed', 'written': 2}, final=True)
+    assert parse(next(fast))[1] == [{'key': 'job', 'data': {'status': 'completed', 'written': 2}}]
+    # 快的订阅者继续读取后，慢的订阅者还没有收到最终状态
+    assert next(fast) == ": keepalive\n\n"
+    assert ('burn', 'job') in bus.latest
+    assert parse(next(slow))[1] == [{'key': 'job', 'data': {'status': 'completed', 'written': 2}}]
+    assert next(slow) == ": keepalive\n\n"
+    assert bus.latest == {}
+    # 同一任务重新开始（如续传）时发送完整状态
+    bus.publish('burn', 'job', {'status': 'writing', 'written': 2})
+    assert parse(next(fast))[1] == [{'key': 'job', 'data': {'status': 'writing', 'written': 2}}]
+
+
+def test_closed_subscriber_does_not_hold_entries(bus):
+    stream = subscribe(bus)
+    other = subscribe(bus)
+    bus.publish('download', 'a', {'status': 'error'}, final=True)
+    next(stream)
+    next(stream)
+    assert ('download', 'a') in bus.latest
+    # 断开的订阅者不再阻止删除
+    other.close()
+    assert bus.latest == {}
+    assert len(bus.cursors) == 1
+
+
+def test_close_ends_streams(bus):
+    stream = subscribe(bus)
+    bus.close()
+    with pytest.raises(StopIteration):
+        next(stream)
+    bus.publish('download', 'a', {'status': 'queued'})
+    assert bus.latest == {}
@@ -0,0 +1,51 @@
+import pytest
+from urllib3.exceptions import EmptyPoolError
+
+import http_client
+from download_handle import MAX_CONCURRENT_LIMIT, MAX_CONNECTIONS, DownloadHandler
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # 每个测试使用自己的会话和设置
+    monkeypatch.setattr(http_client, '_session', None)
+    monkeypatch.setattr(http_client, '_settings', dict(http_client._settings))
+    yield http_client
+    if http_client._session is not None:
+        http_client._session.close()
+
+
+def pool_for(session, url):
+    return session.get_adapter(url).poolmanager.connection_from_url(url)
+
+
+def test_pool_covers_scheduler_limits(client):
+    DownloadHandler()
+    session = client.get_session()
+    adapter = session.get_adapter('https://mirror.invalid/')
+    # 所有任务的全部分段连接同时进行时也不会等待连接池
+    assert adapter._pool_maxsize >= MAX_CONCURRENT_LIMIT * MAX_CONNECTIONS
+    assert adapter._pool_block
+    assert isinstance(pool_for(session, 'https://mirror.invalid/'), http_client.TimedHTTPSConnectionPool)
+    assert isinstance(pool_for(session, 'http://mirror.invalid/'), http_client.TimedHTTPConnectionPool)
+
+
+def test_http_proxy_uses_timed_pools(client):
+    client.configure(proxy='http://127.0.0.1:3128')
+    adapter = client.get_session().get_adapter('https://mirror.invalid/')
+    manager = adapter.proxy_manager_for('http://127.0.0.1:3128')
+    assert manager.pool_classes_by_scheme is http_client.POOL_CLASSES
+
+
+def test_full_pool_waits_with_timeout(client, range_server, monkeypatch):
+    monkeypatch.setattr(http_client, 'POOL_TIMEOUT', 0.2)
+    client.configure(max_per_host=1)
+    url = range_server.add_file('image.dmg', 1024 * 1024)
+    with client.get(url, stream=True) as first:
+        assert first.status_code == 200
+        # 唯一的连接仍在读取，第二个请求等待超时而不是一直挂起
+        with pytest.raises(EmptyPoolError):
+            client.get(url, stream=True)
+    # 连接归还后可以继续使用
+    with client.get(url, headers={'Range': 'bytes=0-0'}) as response:
+        assert response.status_code == 206
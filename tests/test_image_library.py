@@ -0,0 +1,150 @@
+import hashlib
+import os
+
+import pytest
+
+import image_library
+from image_library import ImageLibrary
+
+
+class Clock:
+    """单调递增的时间，避免最近使用时间相同"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_library, 'time', Clock())
+    library = ImageLibrary(tmp_path / 'library')
+    yield library
+    library.close()
+
+
+def write_image(path, size=4096, seed=b'image'):
+    data = (hashlib.sha256(seed).digest() * (size // 32 + 1))[:size]
+    path.write_bytes(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def no_links(monkeypatch):
+    def fail(*args):
+        raise OSError("跨卷")
+
+    monkeypatch.setattr(image_library.os, 'link', fail)
+    monkeypatch.setattr(image_library, 'reflink', fail)
+
+
+def test_add_and_lookup(tmp_path, library):
+    download = tmp_path / 'BaseSystem.dmg'
+    sha256 = write_image(download)
+    # 没有给出哈希时自行计算
+    assert library.add(str(download), catalog_id='042-12345', url='http://mirror.invalid/a.dmg') == sha256
+    entry = library.lookup(checksum=sha256.upper())
+    assert entry['sha256'] == sha256
+    assert entry['filename'] == 'BaseSystem.dmg'
+    # 同一卷上为硬链接，不额外占用空间
+    assert os.path.samefile(entry['path'], download)
+    assert os.path.dirname(os.path.dirname(entry['path'])) == str(library.objects)
+    assert library.lookup(catalog_id='042-12345')['sha256'] == sha256
+    # 给出的哈希与镜像列表 ID 对应的内容不一致时不复用
+    assert library.lookup(checksum='0' * 64, catalog_id='042-12345') is None
+    assert library.lookup(catalog_id='missing') is None
+    listed = library.list()
+    assert listed['total_size'] == 4096
+    assert listed['images'][0]['catalog_ids'] == ['042-12345']
+    assert listed['images'][0]['urls'] == ['http://mirror.invalid/a.dmg']
+
+
+def test_reuse_links_into_save_path(tmp_path, library):
+    download = tmp_path / 'a.dmg'
+    sha256 = write_image(download)
+    library.add(str(download), sha256=sha256)
+    save_path = tmp_path / 'other' / 'b.dmg'
+    save_path.parent.mkdir()
+    save_path.write_bytes(b'old content')
+    entry = library.lookup(checksum=sha256)
+    assert library.checkout(entry, str(save_path)) == 'hardlink'
+    assert save_path.read_bytes() == download.read_bytes()
+    assert not list(save_path.parent.glob('*.tmp'))
+    # 保存路径已是同一个文件时不做任何事
+    assert library.checkout(entry, str(save_path)) == 'hardlink'
+
+
+def test_checkout_copies_across_volumes(tmp_path, library, monkeypatch):
+    download = tmp_path / 'a.dmg'
+    sha256 = write_image(download)
+    library.add(str(download), sha256=sha256)
+    no_links(monkeypatch)
+    save_path = tmp_path / 'b.dmg'
+    assert library.checkout(library.lookup(checksum=sha256), str(save_path)) == 'copy'
+    assert save_path.read_bytes() == download.read_bytes()
+
+
+def test_add_without_links_records_original(tmp_path, library, monkeypatch):
+    no_links(monkeypatch)
+    download = tmp_path / 'a.dmg'
+    sha256 = write_image(download)
+    library.add(str(download), sha256=sha256, catalog_id='042-1')
+    # 不复制完整镜像，只记录原文件
+    assert not [p for p in library.objects.rglob('*') if p.is_file()]
+    entry = library.lookup(catalog_id='042-1')
+    assert entry['path'] == str(download)
+    # 移除记录时不删除用户的文件
+    assert library.remove(sha256)
+    assert download.exists()
+    assert library.lookup(checksum=sha256) is None
+
+
+def test_modified_file_is_forgotten(tmp_path, library, monkeypatch):
+    no_links(monkeypatch)
+    download = tmp_path / 'a.dmg'
+    sha256 = write_image(download)
+    library.add(str(download), sha256=sha256)
+    download.write_bytes(b'changed')
+    assert library.lookup(checksum=sha256) is None
+    assert library.list()['images'] == []
+    assert download.read_bytes() == b'changed'
+
+
+def test_evict_least_recently_used(tmp_path, library):
+    library.quota = 4096 * 2
+    hashes = []
+    for name in ('a', 'b', 'c'):
+        path = tmp_path / f'{name}.dmg'
+        hashes.append(write_image(path, seed=name.encode()))
+        if name == 'c':
+            # 加入第三个之前用过 a，淘汰的应当是 b
+            assert library.lookup(checksum=hashes[0])
+        library.add(str(path), sha256=hashes[-1])
+    remaining = [image['sha256'] for image in library.list()['images']]
+    assert remaining == [hashes[2], hashes[0]]
+    # 淘汰只删除镜像库中的链接
+    assert (tmp_path / 'b.dmg').exists()
+    assert not list(library.objects.rglob(hashes[1] + '*'))
+    library.configure(quota=4096)
+    assert [image['sha256'] for image in library.list()['images']] == [hashes[2]]
+
+
+def test_add_existing_image_updates_aliases(tmp_path, library):
+    download = tmp_path / 'a.dmg'
+    sha256 = write_image(download)
+    library.add(str(download), sha256=sha256, catalog_id='042-1')
+    copy = tmp_path / 'copy.dmg'
+    copy.write_bytes(download.read_bytes())
+    assert library.add(str(copy), catalog_id='042-2') == sha256
+    assert len(library.list()['images']) == 1
+    assert library.lookup(catalog_id='042-2')['sha256'] == sha256
+
+
+def test_disabled_library_stores_nothing(tmp_path):
+    library = ImageLibrary(tmp_path / 'library', quota=0)
+    download = tmp_path / 'a.dmg'
+    write_image(download)
+    assert library.add(str(download)) is None
+    assert not (tmp_path / 'library').exists()
@@ -0,0 +1,229 @@
+import hashlib
+import threading
+
+import pytest
+
+import download_handle
+from benchmark import RangeRequestHandler
+from download_handle import JOURNAL_SUFFIX, DownloadHandler, Segment
+from integrity import (CHUNKLIST_ENTRY, CHUNKLIST_HEADER, CHUNKLIST_MAGIC, ChunklistVerifier, ChunkMismatch,
+                       Sha256Verifier, parse_chunklist)
+from test_download_journal import MB, synthetic_bytes, wait_download
+
+CHUNK = 300000
+
+
+def make_chunklist(data, chunk_size=CHUNK):
+    """按固定块大小生成 chunklist"""
+    entries = []
+    for offset in range(0, len(data), chunk_size):
+        chunk = data[offset:offset + chunk_size]
+        entries.append(CHUNKLIST_ENTRY.pack(len(chunk), hashlib.sha256(chunk).digest()))
+    header = CHUNKLIST_HEADER.pack(CHUNKLIST_MAGIC, CHUNKLIST_HEADER.size, 1, 1, 1, 0,
+                                   len(entries), CHUNKLIST_HEADER.size, 0)
+    return header + b''.join(entries)
+
+
+def sample(size=CHUNK * 4 + 1234):
+    # 周期 251 与块大小不对齐，各块内容不同
+    return (bytes(range(251)) * (size // 251 + 1))[:size]
+
+
+def write(verifier, segment, data, piece=70000):
+    """模拟下载：分块写入 segment.offset 处的数据"""
+    while segment.offset <= segment.end:
+        end = min(segment.offset + piece, segment.end + 1)
+        verifier.update(segment, data[segment.offset:end])
+
+
+def test_parse_chunklist():
+    data = sample()
+    chunks = parse_chunklist(make_chunklist(data))
+    assert [(offset, size) for offset, size, _ in chunks] == [
+        (0, CHUNK), (CHUNK, CHUNK), (2 * CHUNK, CHUNK), (3 * CHUNK, CHUNK), (4 * CHUNK, 1234)]
+    assert chunks[1][2] == hashlib.sha256(data[CHUNK:2 * CHUNK]).digest()
+    with pytest.raises(ValueError):
+        parse_chunklist(b'CNKL')
+    with pytest.raises(ValueError):
+        parse_chunklist(b'XXXX' + make_chunklist(data)[4:])
+    with pytest.raises(ValueError):
+        parse_chunklist(make_chunklist(data)[:-10])
+
+
+def test_sha256_in_order():
+    data = sample()
+    verifier = Sha256Verifier(hashlib.sha256(data).hexdigest().upper())
+    segment = Segment(0, len(data) - 1)
+    write(verifier, segment, data)
+    assert verifier.position == len(data)
+    assert verifier.finish('unused', [segment]) == (True, 'SHA-256 校验通过')
+    assert verifier.progress()['status'] == 'passed'
+
+
+def test_sha256_catches_up_from_disk(tmp_path):
+    data = sample()
+    path = tmp_path / 'image.dmg'
+    path.write_bytes(bytes(len(data)))
+    verifier = Sha256Verifier(hashlib.sha256(data).hexdigest())
+    middle = len(data) // 2
+    first, second = Segment(0, middle - 1), Segment(middle, len(data) - 1)
+
+    def download(segment):
+        with open(path, 'r+b') as f:
+            f.seek(segment.start)
+            f.write(data[segment.start:segment.end + 1])
+        write(verifier, segment, data)
+
+    # 后一个分段先写完：哈希位置不动，写入的数据留在磁盘上
+    download(second)
+    assert verifier.position == 0
+    verifier.catch_up(path, [first, second])
+    assert verifier.position == 0
+    # 前一个分段写了一半，catch_up 不越过它的写入位置
+    first.offset = CHUNK
+    with open(path, 'r+b') as f:
+        f.write(data[:CHUNK])
+    verifier.catch_up(path, [first, second])
+    assert verifier.position == CHUNK
+    # 剩余部分按顺序到达，写完后从磁盘补读后一个分段
+    download(first)
+    assert verifier.position == middle
+    ok, message = verifier.finish(path, [first, second])
+    assert ok, message
+    assert verifier.position == len(data)
+
+
+def test_sha256_mismatch(tmp_path):
+    data = sample()
+    verifier = Sha256Verifier('0' * 64)
+    segment = Segment(0, len(data) - 1)
+    write(verifier, segment, data)
+    ok, message = verifier.finish(tmp_path / 'unused', [segment])
+    assert not ok
+    assert 'SHA-256 不匹配' in message
+    assert verifier.progress()['status'] == 'failed'
+
+
+def test_chunklist_across_segments():
+    data = sample()
+    verifier = ChunklistVerifier(parse_chunklist(make_chunklist(data)))
+    assert verifier.boundaries() == [0, CHUNK, 2 * CHUNK, 3 * CHUNK, 4 * CHUNK]
+    segments = [Segment(0, 2 * CHUNK - 1), Segment(2 * CHUNK, len(data) - 1)]
+    threads = [threading.Thread(target=write, args=(verifier, seg, data)) for seg in segments]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert verifier.verified == len(data)
+    assert verifier.finish(None, segments)[0]
+
+
+def test_chunklist_mismatch_rewinds_to_chunk_start():
+    data = sample()
+    verifier = ChunklistVerifier(parse_chunklist(make_chunklist(data)))
+    corrupted = bytearray(data)
+    corrupted[CHUNK + 5] ^= 0xFF
+    segment = Segment(0, len(data) - 1)
+    verifier.update(segment, data[:CHUNK])
+    with pytest.raises(ChunkMismatch):
+        write(verifier, segment, bytes(corrupted))
+    # 回退到坏块起点，之前通过的块仍然计数
+    assert segment.offset == CHUNK
+    assert verifier.verified == CHUNK
+    write(verifier, segment, data)
+    assert verifier.finish(None, [segment])[0]
+
+
+def test_chunklist_incomplete():
+    data = sample()
+    verifier = ChunklistVerifier(parse_chunklist(make_chunklist(data)))
+    segment = Segment(0, 2 * CHUNK - 1)
+    write(verifier, segment, data)
+    ok, message = verifier.finish(None, [segment])
+    assert not ok
+    assert verifier.progress()['checked'] == 2 * CHUNK
+
+
+def test_chunklist_prepare_on_resume():
+    data = sample()
+    verifier = ChunklistVerifier(parse_chunklist(make_chunklist(data)))
+    # 续传时写到一半的块从块起点重新下载
+    segments = [Segment(0, 2 * CHUNK - 1, CHUNK + 100), Segment(2 * CHUNK, len(data) - 1, len(data))]
+    assert verifier.prepare(segments)
+    assert [seg.offset for seg in segments] == [CHUNK, len(data)]
+    assert verifier.verified == CHUNK + len(data) - 2 * CHUNK
+    # 分段没有对齐到块起点时不能使用 chunklist
+    assert not verifier.prepare([Segment(0, 999), Segment(1000, len(data) - 1)])
+
+
+class CorruptingHandler(RangeRequestHandler):
+    """第一个非探测的分段请求返回的数据中有一个字节被改动"""
+
+    def do_GET(self):
+        header = self.headers.get('Range', '')
+        with self.server.corrupt_lock:
+            corrupt = header not in ('', 'bytes=0-0') and not self.server.corrupted
+            self.server.corrupted = self.server.corrupted or corrupt
+        if not corrupt:
+            return super().do_GET()
+        synthetic = self.server.files[self.path]
+        start, _, end = header[6:].partition('-')
+        start, end = int(start), int(end)
+        self.send_response(206)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Content-Range', f'bytes {start}-{end}/{synthetic.size}')
+        self.send_header('ETag', f'"{synthetic.etag}"')
+        self.end_headers()
+        for index, piece in enumerate(synthetic.pieces(start, end)):
+            piece = bytearray(piece)
+            if index == 0:
+                piece[1000] ^= 0xFF
+            self.wfile.write(piece)
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(download_handle, 'MIN_SEGMENT_SIZE', MB)
+
+
+def serve_chunklist(monkeypatch, chunklist):
+    monkeypatch.setattr(DownloadHandler, '_fetch_chunklist', staticmethod(lambda url: parse_chunklist(chunklist)))
+
+
+def test_download_redownloads_corrupt_chunk(tmp_path, range_server, small_segments, monkeypatch):
+    range_server.RequestHandlerClass = CorruptingHandler
+    range_server.corrupt_lock = threading.Lock()
+    range_server.corrupted = False
+    url = range_server.add_file('image.dmg', 3 * MB + 5)
+    data = synthetic_bytes(range_server, 'image.dmg')
+    serve_chunklist(monkeypatch, make_chunklist(data, chunk_size=MB // 2))
+    handler = DownloadHandler()
+    download = wait_download(handler, handler.start_download(
+        url, str(tmp_path / 'image.dmg'), connections=3, chunklist_url='http://mirror.invalid/image.chunklist'))
+    assert range_server.corrupted
+    assert download['status'] == 'completed', download['error']
+    assert download['verification']['method'] == 'chunklist'
+    assert download['verification']['status'] == 'passed'
+    assert (tmp_path / 'image.dmg').read_bytes() == data
+
+
+def test_download_with_checksum(tmp_path, range_server, small_segments):
+    url = range_server.add_file('image.dmg', 3 * MB + 5)
+    data = synthetic_bytes(range_server, 'image.dmg')
+    handler = DownloadHandler()
+    download = wait_download(handler, handler.start_download(
+        url, str(tmp_path / 'image.dmg'), connections=3, checksum=hashlib.sha256(data).hexdigest()))
+    assert download['status'] == 'completed', download['error']
+    assert download['verification'] == {'method': 'sha256', 'status': 'passed', 'checked': len(data),
+                                        'message': 'SHA-256 校验通过'}
+
+
+def test_download_checksum_mismatch(tmp_path, range_server, small_segments):
+    url = range_server.add_file('image.dmg', 2 * MB)
+    save_path = tmp_path / 'image.dmg'
+    handler = DownloadHandler()
+    download = wait_download(handler, handler.start_download(url, str(save_path), connections=2, checksum='ab' * 32))
+    assert download['status'] == 'error'
+    assert 'SHA-256 不匹配' in download['error']
+    # 校验失败的下载无法续传，日志被删除
+    assert not (tmp_path / ('image.dmg' + JOURNAL_SUFFIX)).exists()
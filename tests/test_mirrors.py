@@ -0,0 +1,234 @@
+import json
+import threading
+import time
+
+import pytest
+
+import download_handle
+import mirrors
+from benchmark import RangeRequestHandler
+from download_handle import DownloadHandler, DownloadTask, MirrorSwitch, Segment
+from mirrors import DECAY_HALF_LIFE, FAILURE_PENALTY, MirrorManager, mirror_key
+from test_download_journal import MB, synthetic_bytes, wait_download
+
+FAST = 'http://fast.invalid/image.dmg'
+SLOW = 'https://SLOW.invalid:8443/pub/image.dmg'
+DEAD = 'http://dead.invalid/image.dmg'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mirrors, 'time', clock)
+    return clock
+
+
+def test_mirror_key():
+    assert mirror_key(SLOW) == 'https://slow.invalid:8443'
+    assert mirror_key('http://fast.invalid/other.dmg') == mirror_key(FAST)
+
+
+def test_measurements_decay(clock):
+    manager = MirrorManager()
+    manager.record(FAST, 4 * MB, 1.0)
+    assert manager.expected_rate(FAST) == 4 * MB
+    # 刚测过的旧结果占一半
+    manager.record(FAST, 2 * MB, 1.0)
+    assert manager.expected_rate(FAST) == pytest.approx(3 * MB)
+    # 一个半衰期之后旧结果只占四分之一
+    clock.now += DECAY_HALF_LIFE
+    manager.record(FAST, 1 * MB, 1.0)
+    assert manager.expected_rate(FAST) == pytest.approx(3 * MB * 0.25 + 1 * MB * 0.75)
+    # 很久以前的结果几乎不再起作用
+    clock.now += DECAY_HALF_LIFE * 20
+    manager.record(FAST, 8 * MB, 1.0)
+    assert manager.expected_rate(FAST) == pytest.approx(8 * MB, rel=1e-5)
+    # 没有数据或时间无效的记录被忽略
+    manager.record(SLOW, 0, 1.0)
+    manager.record(SLOW, MB, 0)
+    assert manager.expected_rate(SLOW) == 0
+
+
+def test_failures_lower_the_ranking(clock):
+    manager = MirrorManager()
+    manager.record(FAST, 4 * MB, 1.0)
+    manager.record(SLOW, 3 * MB, 1.0)
+    assert manager.best([SLOW, FAST]) == FAST
+    manager.record_failure(FAST)
+    assert manager.expected_rate(FAST) == 4 * MB * FAILURE_PENALTY
+    assert manager.best([SLOW, FAST]) == SLOW
+    assert manager.best([SLOW, FAST], exclude={SLOW}) == FAST
+    assert manager.best([SLOW], exclude={SLOW}) is None
+    # 失败后重新测得的速度清除失败计数
+    manager.record(FAST, 4 * MB, 1.0)
+    assert manager.snapshot()[0]['failures'] == 0
+
+
+def test_equal_throughput_prefers_lower_rtt(clock):
+    manager = MirrorManager()
+    manager._update(FAST, MB, 0.05)
+    manager._update(SLOW, MB, 0.2)
+    assert manager.best([SLOW, FAST]) == FAST
+
+
+class FakeProbe:
+    """按主机返回固定的测速结果，记录探测过的地址"""
+
+    def __init__(self, manager, results):
+        self.manager = manager
+        self.results = results
+        self.probed = []
+
+    def __call__(self, url):
+        self.probed.append(url)
+        result = self.results[url]
+        if result is None:
+            self.manager.record_failure(url)
+            return None
+        throughput, size = result
+        self.manager._update(url, throughput, 0.01)
+        return {'url': url, 'rtt': 0.01, 'throughput': throughput, 'size': size}
+
+
+def test_rank_probes_stale_mirrors(clock, monkeypatch):
+    manager = MirrorManager(ttl=600)
+    probe = FakeProbe(manager, {FAST: (8 * MB, 100), SLOW: (2 * MB, 100), DEAD: None})
+    monkeypatch.setattr(manager, 'probe', probe)
+    assert manager.rank([SLOW, DEAD, FAST, SLOW]) == [FAST, SLOW, DEAD]
+    assert sorted(probe.probed) == sorted([SLOW, DEAD, FAST])
+    # 测速结果有效期内不重新探测
+    probe.probed.clear()
+    clock.now += 300
+    assert manager.rank([SLOW, FAST]) == [FAST, SLOW]
+    assert probe.probed == []
+    clock.now += 301
+    manager.rank([SLOW, FAST])
+    assert sorted(probe.probed) == sorted([SLOW, FAST])
+    assert manager.rank([FAST]) == [FAST]
+
+
+def test_rank_drops_mirror_with_different_size(clock, monkeypatch):
+    manager = MirrorManager()
+    monkeypatch.setattr(manager, 'probe', FakeProbe(manager, {FAST: (8 * MB, 100), SLOW: (2 * MB, 99), DEAD: (MB, 0)}))
+    # 大小未知（如不支持 Range）的镜像保留
+    assert manager.rank([SLOW, FAST, DEAD]) == [FAST, DEAD]
+
+
+def test_rank_does_not_wait_for_slow_probes(monkeypatch):
+    monkeypatch.setattr(mirrors, 'PROBE_DEADLINE', 0.05)
+    manager = MirrorManager()
+    release = threading.Event()
+    fast_probe = FakeProbe(manager, {FAST: (MB, 100), SLOW: (8 * MB, 100)})
+
+    def probe(url):
+        if url == SLOW:
+            release.wait(10)
+        return fast_probe(url)
+
+    monkeypatch.setattr(manager, 'probe', probe)
+    assert manager.rank([SLOW, FAST]) == [FAST, SLOW]
+    # 未完成的探测在后台继续，结果计入之后的排序
+    release.set()
+    deadline = time.time() + 5
+    while not manager.expected_rate(SLOW) and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.rank([SLOW, FAST]) == [SLOW, FAST]
+
+
+def test_stats_are_persisted(tmp_path, clock):
+    path = tmp_path / 'mirrors.json'
+    manager = MirrorManager(path)
+    manager.record(FAST, 4 * MB, 1.0)
+    manager.record_failure(SLOW)
+    manager.flush()
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert set(data) == {mirror_key(FAST), mirror_key(SLOW)}
+    restored = MirrorManager(path)
+    assert restored.expected_rate(FAST) == 4 * MB
+    assert restored.snapshot() == manager.snapshot()
+    path.write_text('not json', encoding='utf-8')
+    assert MirrorManager(path).snapshot() == []
+
+
+def test_slow_segment_switches_to_faster_mirror(clock):
+    manager = MirrorManager()
+    manager.record(FAST, 8 * MB, 1.0)
+    handler = DownloadHandler(mirrors=manager)
+    task = DownloadTask(SLOW, 'image.dmg', 2)
+    task.mirrors = [SLOW, FAST]
+    task.source_url = SLOW
+    segment = Segment(0, MB)
+    # 其它镜像的预期速度不到两倍时不切换
+    handler._compare_mirror(task, segment, SLOW, 5 * MB, 1.0)
+    assert segment.url is None
+    with pytest.raises(MirrorSwitch):
+        handler._compare_mirror(task, segment, SLOW, 2 * MB, 1.0)
+    assert segment.url == FAST
+    # 实际速度计入当前镜像的测速结果
+    assert manager.expected_rate(SLOW) == pytest.approx(5 * MB * 0.5 + 2 * MB * 0.5)
+
+
+def test_switch_mirror_after_failure(clock):
+    manager = MirrorManager()
+    manager.record(SLOW, 8 * MB, 1.0)
+    handler = DownloadHandler(mirrors=manager)
+    task = DownloadTask(SLOW, 'image.dmg', 2)
+    task.source_url = SLOW
+    segment = Segment(0, MB)
+    assert not handler._switch_mirror(task, segment)
+    task.mirrors = [SLOW, FAST]
+    assert handler._switch_mirror(task, segment)
+    assert segment.url == FAST
+    assert manager.expected_rate(SLOW) == 8 * MB * FAILURE_PENALTY
+    assert not DownloadHandler()._switch_mirror(task, segment)
+
+
+class StallingHandler(RangeRequestHandler):
+    """从 127.0.0.1 请求的分段不返回数据，直到测试结束"""
+
+    def do_GET(self):
+        header = self.headers.get('Range', '')
+        if self.headers['Host'].startswith('127.0.0.1') and header not in ('', 'bytes=0-0'):
+            self.server.stalled.set()
+            self.server.release.wait(10)
+            self.close_connection = True
+            return
+        return super().do_GET()
+
+
+def test_stalled_segments_switch_mirror(tmp_path, range_server, monkeypatch):
+    monkeypatch.setattr(download_handle, 'MIN_SEGMENT_SIZE', MB)
+    monkeypatch.setattr(download_handle, 'STALL_TIMEOUT', 0.3)
+    range_server.RequestHandlerClass = StallingHandler
+    range_server.stalled = threading.Event()
+    range_server.release = threading.Event()
+    stalling = range_server.add_file('image.dmg', 2 * MB + 7)
+    working = stalling.replace('127.0.0.1', 'localhost')
+    data = synthetic_bytes(range_server, 'image.dmg')
+    manager = MirrorManager()
+    # 卡住的镜像测速结果更好，排在前面
+    manager.record(stalling, 100 * MB, 1.0)
+    manager.record(working, MB, 1.0)
+    handler = DownloadHandler(mirrors=manager)
+    try:
+        download = wait_download(handler, handler.start_download(
+            stalling, str(tmp_path / 'image.dmg'), connections=2, mirrors=[working]))
+    finally:
+        range_server.release.set()
+    assert range_server.stalled.is_set()
+    assert download['status'] == 'completed', download['error']
+    assert (tmp_path / 'image.dmg').read_bytes() == data
+    stats = {entry['host']: entry for entry in manager.snapshot()}
+    assert stats[mirror_key(stalling)]['throughput'] < 100 * MB
+    assert stats[mirror_key(working)]['throughput'] > 0
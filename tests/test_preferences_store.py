@@ -0,0 +1,162 @@
+import json
+import threading
+
+import pytest
+
+import preferences_store
+from preferences_store import PreferencesStore
+
+DEFAULTS = {'theme': 'light', 'downloads': {'connections': 4}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeTimer:
+    """记录写盘计时器，由测试手动触发"""
+    created = []
+
+    def __init__(self, delay, function):
+        self.delay = delay
+        self.function = function
+        self.cancelled = False
+        self.daemon = False
+        FakeTimer.created.append(self)
+
+    def start(self):
+        pass
+
+    def cancel(self):
+        self.cancelled = True
+
+    def fire(self):
+        assert not self.cancelled
+        return self.function()
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    FakeTimer.created = []
+    clock = Clock()
+    monkeypatch.setattr(preferences_store, 'time', clock)
+    monkeypatch.setattr(threading, 'Timer', FakeTimer)
+    return clock
+
+
+def validate(prefs):
+    if not isinstance(prefs.get('theme'), str):
+        raise ValueError('theme')
+    return prefs
+
+
+@pytest.fixture
+def store(tmp_path, timers):
+    store = PreferencesStore(tmp_path / 'config' / 'preferences.json', validate, lambda: json.loads(json.dumps(DEFAULTS)))
+    yield store
+    store.flush()
+
+
+def read(store):
+    return json.loads(store.path.read_text(encoding='utf-8'))
+
+
+def test_missing_file_uses_defaults(store):
+    assert store.get() == DEFAULTS
+    assert store.dirty
+    assert store.flush()
+    assert read(store) == DEFAULTS
+
+
+def test_corrupt_file_uses_defaults(store):
+    store.path.parent.mkdir()
+    store.path.write_text('{"theme": 1}', encoding='utf-8')
+    assert store.get() == DEFAULTS
+    store.path.write_text('{"theme": "dark"}', encoding='utf-8')
+    # 只在首次访问时读盘
+    assert store.get() == DEFAULTS
+
+
+def test_get_returns_copy(store):
+    prefs = store.get()
+    prefs['downloads']['connections'] = 16
+    assert store.get() == DEFAULTS
+
+
+def test_edits_are_debounced(store, timers):
+    store.path.parent.mkdir()
+    store.path.write_text(json.dumps(DEFAULTS), encoding='utf-8')
+    for connections in (8, 12):
+        with store.edit() as prefs:
+            prefs['downloads']['connections'] = connections
+        timers.now += 0.4
+    # 每次修改重新计时，只有最后一个计时器有效，写盘前文件不变
+    first, second = FakeTimer.created
+    assert first.cancelled and not second.cancelled
+    assert first.delay == second.delay == store.delay
+    assert read(store) == DEFAULTS
+    assert second.fire()
+    assert read(store)['downloads']['connections'] == 12
+    assert not store.dirty and store.timer is None
+
+
+def test_continuous_edits_are_written_by_max_delay(store, timers):
+    store.get()
+    store.flush()
+    for _ in range(5):
+        timers.now += 0.4
+        store.replace(dict(DEFAULTS, theme=str(timers.now)))
+    # 第一次修改后 1.6 秒又有修改：离最迟写盘时间只剩 0.4 秒
+    assert FakeTimer.created[-1].delay == pytest.approx(store.max_delay - 1.6)
+    timers.now += 0.4
+    store.replace(dict(DEFAULTS, theme='dark'))
+    assert FakeTimer.created[-1].delay == 0.0
+    FakeTimer.created[-1].fire()
+    assert read(store)['theme'] == 'dark'
+    # 写盘后重新开始计算最迟时间
+    store.replace(dict(DEFAULTS, theme='light'))
+    assert FakeTimer.created[-1].delay == store.delay
+
+
+def test_unchanged_or_failed_edit_is_not_saved(store):
+    store.get()
+    store.flush()
+    created = len(FakeTimer.created)
+    with store.edit() as prefs:
+        prefs['theme'] = 'light'
+    with pytest.raises(RuntimeError):
+        with store.edit() as prefs:
+            prefs['theme'] = 'dark'
+            raise RuntimeError('中途失败')
+    assert store.get()['theme'] == 'light'
+    assert not store.dirty
+    assert len(FakeTimer.created) == created
+
+
+def test_flush_replaces_file_atomically(store, monkeypatch):
+    store.get()
+    store.flush()
+    store.replace(dict(DEFAULTS, theme='dark'))
+    replaced = []
+    real_replace = preferences_store.os.replace
+
+    def failing_replace(src, dst):
+        replaced.append((src, dst))
+        # 替换前临时文件已经写完整
+        assert json.loads(open(src, encoding='utf-8').read())['theme'] == 'dark'
+        raise OSError('磁盘已满')
+
+    monkeypatch.setattr(preferences_store.os, 'replace', failing_replace)
+    assert not store.flush()
+    assert replaced == [(store.path.with_name('preferences.json.tmp'), store.path)]
+    # 替换失败时原文件保持完整，修改仍待写入
+    assert read(store) == DEFAULTS
+    assert store.dirty
+    monkeypatch.setattr(preferences_store.os, 'replace', real_replace)
+    assert store.flush()
+    assert read(store)['theme'] == 'dark'
+    assert not store.path.with_name('preferences.json.tmp').exists()
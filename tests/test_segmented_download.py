@@ -0,0 +1,123 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+import download_handle
+from benchmark import RangeRequestHandler
+from download_handle import DownloadHandler, DownloadTask
+from test_download_journal import MB, synthetic_bytes, wait_download
+
+
+class NoRangeHandler(RangeRequestHandler):
+    """忽略 Range 头、总是返回整个文件的服务器"""
+
+    def _respond(self, send_body):
+        del self.headers['Range']
+        super()._respond(send_body)
+
+
+class DroppingHandler(RangeRequestHandler):
+    """第一个非探测的分段请求只发出一部分数据就断开连接"""
+
+    def do_GET(self):
+        header = self.headers.get('Range', '')
+        with self.server.drop_lock:
+            drop = header not in ('', 'bytes=0-0') and not self.server.dropped
+            self.server.dropped = self.server.dropped or drop
+        if not drop:
+            return super().do_GET()
+        synthetic = self.server.files[self.path]
+        start, _, end = header[6:].partition('-')
+        start, end = int(start), int(end)
+        self.send_response(206)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Content-Range', f'bytes {start}-{end}/{synthetic.size}')
+        self.send_header('ETag', f'"{synthetic.etag}"')
+        self.end_headers()
+        self.wfile.write(next(synthetic.pieces(start, end))[:100000])
+        self.close_connection = True
+
+
+@pytest.fixture
+def small_segments(monkeypatch):
+    monkeypatch.setattr(download_handle, 'MIN_SEGMENT_SIZE', MB)
+
+
+def plan(total_size, connections, verifier=None):
+    task = DownloadTask('http://mirror.invalid/a.dmg', 'a.dmg', connections)
+    task.total_size = total_size
+    task.verifier = verifier
+    DownloadHandler._plan_segments(task)
+    return [(seg.start, seg.end) for seg in task.segments]
+
+
+def assert_contiguous(segments, total_size):
+    assert segments[0][0] == 0
+    assert segments[-1][1] == total_size - 1
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert start == end + 1
+
+
+def test_plan_splits_by_connections(small_segments):
+    segments = plan(8 * MB + 3, 4)
+    assert len(segments) == 4
+    assert_contiguous(segments, 8 * MB + 3)
+    # 余数并入最后一段
+    assert segments[-1][1] - segments[-1][0] + 1 == 2 * MB + 3
+
+
+def test_small_file_uses_fewer_segments(small_segments):
+    assert plan(MB - 1, 8) == [(0, MB - 2)]
+    segments = plan(3 * MB, 8)
+    assert len(segments) == 3
+    assert_contiguous(segments, 3 * MB)
+
+
+def test_plan_aligns_to_chunk_boundaries(small_segments):
+    class Boundaries:
+        def boundaries(self):
+            return [0, 1500000, 2600000, 3100000]
+
+    # 每个分段从均分位置之后的第一个块起点开始，之后没有块起点时不再切分
+    segments = plan(4 * MB, 4, Boundaries())
+    assert [start for start, _ in segments] == [0, 1500000, 2600000]
+    assert_contiguous(segments, 4 * MB)
+
+
+@pytest.mark.parametrize('connections', [1, 3, 8])
+def test_segmented_download_reassembles_file(tmp_path, range_server, small_segments, connections):
+    size = 5 * MB + 12345
+    url = range_server.add_file('image.dmg', size)
+    save_path = tmp_path / 'image.dmg'
+    handler = DownloadHandler()
+    download = wait_download(handler, handler.start_download(url, str(save_path), connections=connections))
+    assert download['status'] == 'completed', download['error']
+    assert download['connections'] == min(connections, 5)
+    assert download['downloaded'] == size
+    assert save_path.read_bytes() == synthetic_bytes(range_server, 'image.dmg')
+
+
+def test_download_without_range_support(tmp_path, range_server, small_segments):
+    range_server.RequestHandlerClass = NoRangeHandler
+    url = range_server.add_file('plain.dmg', 3 * MB + 7)
+    save_path = tmp_path / 'plain.dmg'
+    handler = DownloadHandler()
+    download = wait_download(handler, handler.start_download(url, str(save_path), connections=4))
+    assert download['status'] == 'completed', download['error']
+    assert download['connections'] == 1
+    assert not download['resumable']
+    assert save_path.read_bytes() == synthetic_bytes(range_server, 'plain.dmg')
+
+
+def test_dropped_segment_continues_from_offset(tmp_path, range_server, small_segments):
+    range_server.RequestHandlerClass = DroppingHandler
+    range_server.drop_lock = threading.Lock()
+    range_server.dropped = False
+    url = range_server.add_file('flaky.dmg', 4 * MB)
+    save_path = tmp_path / 'flaky.dmg'
+    handler = DownloadHandler()
+    download = wait_download(handler, handler.start_download(url, str(save_path), connections=4))
+    assert range_server.dropped
+    assert download['status'] == 'completed', download['error']
+    assert Path(save_path).read_bytes() == synthetic_bytes(range_server, 'flaky.dmg')
@@ -0,0 +1,145 @@
+import pytest
+
+import ssdt_generator
+from acpi_tables import AcpiNamespace, AcpiTable, AmlParser
+from ssdt_generator import (SsdtError, SsdtService, compile_ec, compile_plug, compile_pmc, compile_pnlf,
+                            compile_properties, compile_usbx, pkg_length)
+from test_acpi_tables import LPCB, XHC, dsdt
+
+
+@pytest.mark.parametrize('body, size', [
+    (0, 1), (62, 1),
+    (63, 2), (4093, 2),
+    (4094, 3), ((1 << 20) - 4, 3),
+    ((1 << 20) - 3, 4), ((1 << 28) - 5, 4)
+])
+def test_pkg_length_boundaries(body, size):
+    encoded = pkg_length(body)
+    assert len(encoded) == size
+    # 长度包含 PkgLength 自身
+    assert AmlParser(encoded + b'\0' * 4).pkg_length(0) == (body + size, size)
+
+
+def test_pkg_length_too_large():
+    with pytest.raises(SsdtError):
+        pkg_length((1 << 28) - 4)
+
+
+COMPILED = [
+    (compile_plug('\\_SB.PR00', 'device'), {'\\_SB_.PR00._DSM': 'method'}),
+    (compile_ec('\\_SB.PCI0.LPCB'), {LPCB + '.EC__': 'device', LPCB + '.EC__._HID': 'name',
+                                    LPCB + '.EC__._STA': 'method'}),
+    (compile_usbx(0x13EC, 0x13EC, 0x0834, 0x0834), {'\\_SB_.USBX': 'device', '\\_SB_.USBX._DSM': 'method'}),
+    (compile_pmc('\\_SB.PCI0.LPCB'), {LPCB + '.PMCR': 'device', LPCB + '.PMCR._CRS': 'name'}),
+    (compile_pnlf(0x13), {'\\_SB_.PNLF': 'device', '\\_SB_.PNLF._UID': 'name'}),
+    (compile_properties('XHC', '\\_SB.PCI0.XHC', (('acpi-wake-type', b'\x01'),)), {XHC + '._DSM': 'method'}),
+    # 属性数据足够大，各层 PkgLength 需要 2、3 字节
+    (compile_properties('BIG', '\\_SB.PCI0.XHC', (('blob', bytes(range(256)) * 20),)), {XHC + '._DSM': 'method'})
+]
+
+
+@pytest.mark.parametrize('compiled, expected', COMPILED)
+def test_compiled_table_round_trip(compiled, expected):
+    asl, aml = compiled
+    table = AcpiTable(aml)
+    assert table.signature == 'SSDT'
+    assert table.length == len(aml)
+    assert sum(aml) & 0xFF == 0
+    assert table.checksum_ok
+    assert asl.startswith('DefinitionBlock')
+    namespace = AcpiNamespace([dsdt(), table])
+    assert not namespace.errors
+    for path, kind in expected.items():
+        obj = namespace.get(path)
+        assert obj is not None, path
+        assert obj['type'] == kind
+        assert obj['table'] == 1
+        assert obj['offset'] + obj['length'] <= table.length
+
+
+def test_pnlf_uid_value():
+    namespace = AcpiNamespace([dsdt(), AcpiTable(compile_pnlf(0x1A)[1])])
+    assert namespace.get('\\_SB_.PNLF._UID')['value'] == 0x1A
+    assert namespace.get('\\_SB_.PNLF._HID')['value'] == 'APP0002'
+
+
+class Loader:
+    """记录调用次数的表加载器"""
+
+    def __init__(self):
+        self.calls = 0
+        self.tables = lambda: [dsdt()]
+
+    def __call__(self, path):
+        self.calls += 1
+        return self.tables()
+
+
+@pytest.fixture
+def service():
+    service = SsdtService(loader=Loader())
+    service.load()
+    return service
+
+
+def test_generate_is_memoized(service, monkeypatch):
+    calls = []
+    name, template, used = ssdt_generator.PATCHES['pnlf']
+
+    def counting(namespace, options):
+        calls.append(options.get('uid'))
+        return template(namespace, options)
+
+    monkeypatch.setitem(ssdt_generator.PATCHES, 'pnlf', (name, counting, used))
+    first = service.generate(['pnlf', 'ec'])
+    assert first['pnlf']['name'] == 'SSDT-PNLF'
+    assert AcpiTable(first['ec']['aml']).checksum_ok
+    # 相同的表和选项直接返回缓存的结果
+    assert service.generate(['pnlf'])['pnlf'] is first['pnlf']
+    # 模板不使用的选项不影响缓存
+    assert service.generate(['pnlf'], {'layout_id': 7})['pnlf'] is first['pnlf']
+    assert calls == [None]
+    # 模板使用的选项变化时重新生成；单独的补丁选项覆盖公共选项
+    second = service.generate(['pnlf'], {'uid': 0x13, 'pnlf': {'uid': 0x1A}})
+    assert second['pnlf'] is not first['pnlf']
+    assert calls == [None, 0x1A]
+    assert service.generate(['pnlf'], {'uid': 0x1A})['pnlf'] is second['pnlf']
+    assert calls == [None, 0x1A]
+
+
+def test_generate_cache_keyed_on_table_hash(service):
+    first = service.generate(['ec'])['ec']
+    # 内容相同的表复用索引和结果
+    service.load()
+    assert service.generate(['ec'])['ec'] is first
+    # 表内容变化后重新生成
+    service.loader.tables = lambda: [dsdt(), AcpiTable(compile_pnlf(0x13)[1])]
+    service.load()
+    second = service.generate(['ec'])['ec']
+    assert second is not first
+    assert second['aml'] == first['aml']
+    assert service.loader.calls == 3
+
+
+def test_generate_errors(service):
+    results = service.generate(['hdef', 'nope', 'usbx'])
+    assert 'HDA' in results['hdef']['error']
+    assert results['nope']['error'] == '未知的补丁类型'
+    assert 'aml' in results['usbx']
+    # 失败结果同样缓存，直到选项变化
+    assert service.generate(['hdef'])['hdef'] is results['hdef']
+    fixed = service.generate(['hdef'], {'device_path': '\\_SB.PCI0.HDAS'})['hdef']
+    assert AcpiTable(fixed['aml']).checksum_ok
+
+
+def test_result_cache_is_bounded(service, monkeypatch):
+    monkeypatch.setattr(ssdt_generator, 'RESULT_CACHE_SIZE', 3)
+    for uid in range(5):
+        service.generate(['pnlf'], {'uid': uid})
+    assert len(service.results) == 3
+    assert [key[2] for key in service.results] == [(('uid', '2'),), (('uid', '3'),), (('uid', '4'),)]
+
+
+def test_generate_requires_loaded_tables():
+    with pytest.raises(SsdtError):
+        SsdtService(loader=Loader()).generate(['ec'])
@@ -0,0 +1,139 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask, request
+
+import static_cache
+from static_cache import MIN_COMPRESS_SIZE, CachedAsset, StaticCache
+
+CSS = ('body{margin:0;padding:0}\n' * 200).encode('utf-8')
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(static_cache, 'brotli', None)
+
+
+def serve(asset):
+    app = Flask(__name__)
+    app.add_url_rule('/asset', 'asset', lambda: asset.response(request))
+    return app.test_client()
+
+
+def test_etag_is_content_hash():
+    assert CachedAsset(CSS, 'text/css').etag == CachedAsset(CSS, 'text/css').etag
+    assert CachedAsset(CSS, 'text/css').etag != CachedAsset(CSS + b' ', 'text/css').etag
+
+
+def test_gzip_variant(no_brotli):
+    client = serve(CachedAsset(CSS, 'text/css', 'public, max-age=60'))
+    response = client.get('/asset', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['Cache-Control'] == 'public, max-age=60'
+    assert response.mimetype == 'text/css'
+    assert gzip.decompress(response.get_data()) == CSS
+    # 客户端不接受压缩时返回原始数据
+    plain = client.get('/asset', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.get_data() == CSS
+
+
+def test_brotli_is_preferred():
+    brotli = pytest.importorskip('brotli')
+    client = serve(CachedAsset(CSS, 'text/css'))
+    response = client.get('/asset', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == CSS
+    response = client.get('/asset', headers={'Accept-Encoding': 'gzip, br;q=0'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+@pytest.mark.parametrize('header, encoding', [
+    ('gzip', 'gzip'),
+    ('GZIP;q=0.5', 'gzip'),
+    ('*', 'gzip'),
+    ('gzip;q=0', None),
+    ('gzip;q=abc', None),
+    ('', None),
+    (None, None)
+])
+def test_choose_encoding(no_brotli, header, encoding):
+    assert CachedAsset(CSS, 'text/css').choose_encoding(header) == encoding
+
+
+@pytest.mark.parametrize('data, mimetype', [
+    (CSS[:MIN_COMPRESS_SIZE - 1], 'text/css'),
+    (CSS, 'font/woff2'),
+    (os.urandom(4096), 'text/plain')
+])
+def test_no_useless_variants(data, mimetype):
+    # 太小、本身已压缩或压缩后没有变小的内容不提供压缩变体
+    asset = CachedAsset(data, mimetype)
+    assert asset.compress() == {}
+    response = serve(asset).get('/asset', headers={'Accept-Encoding': 'gzip, br'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Vary' not in response.headers
+    assert response.get_data() == data
+
+
+def test_if_none_match(no_brotli):
+    asset = CachedAsset(CSS, 'text/css')
+    client = serve(asset)
+    etag = client.get('/asset').headers['ETag']
+    assert etag == f'"{asset.etag}"'
+    response = client.get('/asset', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert client.get('/asset', headers={'If-None-Match': '"other", ' + etag}).status_code == 304
+    assert client.get('/asset', headers={'If-None-Match': '*'}).status_code == 304
+    # 内容变化后旧的 ETag 不再命中
+    changed = serve(CachedAsset(CSS + b'a{}', 'text/css'))
+    assert changed.get('/asset', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_compress_runs_once(monkeypatch, no_brotli):
+    calls = []
+    real_compress = gzip.compress
+    monkeypatch.setattr(static_cache.gzip, 'compress', lambda *a, **k: calls.append(1) or real_compress(*a, **k))
+    client = serve(CachedAsset(CSS, 'text/css'))
+    for _ in range(3):
+        client.get('/asset', headers={'Accept-Encoding': 'gzip'})
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    root = tmp_path / 'static'
+    (root / 'css').mkdir(parents=True)
+    (root / 'css' / 'app.css').write_bytes(CSS)
+    (tmp_path / 'secret.txt').write_text('secret')
+    return root
+
+
+def test_static_cache_reloads_changed_file(static_dir):
+    cache = StaticCache(str(static_dir))
+    asset = cache.get('css/app.css')
+    assert asset.mimetype == 'text/css'
+    assert cache.get('css/app.css') is asset
+    path = static_dir / 'css' / 'app.css'
+    path.write_bytes(CSS + b'a{}')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    reloaded = cache.get('css/app.css')
+    assert reloaded is not asset
+    assert reloaded.data == CSS + b'a{}'
+
+
+@pytest.mark.parametrize('filename', ['../secret.txt', 'css/../../secret.txt', 'missing.css', 'css'])
+def test_static_cache_rejects_outside_and_missing(static_dir, filename):
+    assert StaticCache(str(static_dir)).get(filename) is None
+
+
+def test_static_cache_rejects_symlink_escape(static_dir):
+    (static_dir / 'link.txt').symlink_to(static_dir.parent / 'secret.txt')
+    assert StaticCache(str(static_dir)).get('link.txt') is None
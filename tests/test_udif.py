@@ -0,0 +1,188 @@
+import bz2
+import lzma
+import os
+import plistlib
+import struct
+import zlib
+
+import pytest
+
+from udif import (CHUNK_BZIP2, CHUNK_COMMENT, CHUNK_END, CHUNK_LZMA, CHUNK_RAW, CHUNK_ZERO,
+                  CHUNK_ZLIB, KOLY, MISH, MISH_CHUNK, SECTOR_SIZE, UdifError, UdifImage, UdifSource,
+                  adc_decompress, is_udif)
+
+COMPRESSORS = {
+    CHUNK_ZLIB: zlib.compress,
+    CHUNK_BZIP2: bz2.compress,
+    CHUNK_LZMA: lzma.compress,
+    CHUNK_RAW: bytes
+}
+
+
+def sample_disk(sectors=40):
+    """前后有数据、中间整段为零的磁盘内容"""
+    data = bytearray(sectors * SECTOR_SIZE)
+    for i in range(0, 12 * SECTOR_SIZE):
+        data[i] = (i * 7) % 251
+    data[-3 * SECTOR_SIZE:] = os.urandom(3 * SECTOR_SIZE)
+    return bytes(data)
+
+
+def make_udif(path, raw, partitions, chunk_sectors=4, prefix=b'', crc=None, extra_chunks=()):
+    """按 Apple 的布局写一个 UDIF 镜像：数据区 + 块表 plist + 末尾的 koly 头；
+    partitions 为 [(起始扇区, 扇区数)]，非零块轮流使用几种压缩方式"""
+    fork = bytearray()
+    blkx = []
+    kinds = list(COMPRESSORS)
+    used = 0
+    for index, (first, count) in enumerate(partitions):
+        chunks = [MISH_CHUNK.pack(CHUNK_COMMENT, 0, 0, 0, 0, 0)]
+        data_offset = len(fork)
+        for sector in range(0, count, chunk_sectors):
+            sectors = min(chunk_sectors, count - sector)
+            data = raw[(first + sector) * SECTOR_SIZE:(first + sector + sectors) * SECTOR_SIZE]
+            if not any(data):
+                kind, packed = CHUNK_ZERO, b''
+            else:
+                kind = kinds[used % len(kinds)]
+                used += 1
+                packed = COMPRESSORS[kind](data)
+            chunks.append(MISH_CHUNK.pack(kind, 0, sector, sectors, len(fork) - data_offset, len(packed)))
+            fork += packed
+        chunks.extend(extra_chunks)
+        chunks.append(MISH_CHUNK.pack(CHUNK_END, 0, count, 0, len(fork) - data_offset, 0))
+        checksum = crc if crc is not None else zlib.crc32(raw[first * SECTOR_SIZE:(first + count) * SECTOR_SIZE])
+        mish = MISH.pack(b'mish', 1, first, count, data_offset, 0, 0, bytes(24), 2, 32,
+                         struct.pack('>I', checksum) + bytes(124), len(chunks)) + b''.join(chunks)
+        blkx.append({'Name': f'disk image (part{index})', 'ID': str(index), 'Attributes': '0x0050', 'Data': mish})
+    xml = plistlib.dumps({'resource-fork': {'blkx': blkx}})
+    fork_offset = len(prefix)
+    xml_offset = fork_offset + len(fork)
+    koly = KOLY.pack(b'koly', 4, KOLY.size, 1, 0, fork_offset, len(fork), 0, 0, 1, 1, bytes(16), 2, 32,
+                     bytes(128), xml_offset, len(xml), bytes(120), 2, 32, bytes(128), 1,
+                     len(raw) // SECTOR_SIZE, 0, 0, 0)
+    path.write_bytes(prefix + bytes(fork) + xml + koly)
+    return path
+
+
+def read_all(source, size=3000):
+    out = bytearray()
+    buffer = bytearray(size)
+    while True:
+        n = source.readinto(memoryview(buffer))
+        if not n:
+            return bytes(out)
+        out += buffer[:n]
+
+
+def test_is_udif(tmp_path):
+    raw = sample_disk()
+    assert is_udif(make_udif(tmp_path / 'a.dmg', raw, [(0, 40)]))
+    plain = tmp_path / 'plain.img'
+    plain.write_bytes(raw)
+    assert not is_udif(plain)
+    assert not is_udif(tmp_path / 'missing.dmg')
+
+
+def test_parse_block_table(tmp_path):
+    raw = sample_disk()
+    image = UdifImage(make_udif(tmp_path / 'a.dmg', raw, [(0, 16), (16, 24)], prefix=b'\0' * 100))
+    assert image.size == len(raw)
+    assert [p['name'] for p in image.partitions] == ['disk image (part0)', 'disk image (part1)']
+    assert [p['crc32'] for p in image.partitions] == [zlib.crc32(raw[:16 * SECTOR_SIZE]),
+                                                       zlib.crc32(raw[16 * SECTOR_SIZE:])]
+    # 注释和结束标记不进入块表，输出区间连续且按顺序
+    assert len(image.chunks) == 10
+    position = 0
+    for chunk in image.chunks:
+        assert chunk.out_offset == position
+        position += chunk.out_length
+    assert position == len(raw)
+    assert image.compressed
+    # 数据位置加上了数据区在文件中的偏移
+    first = image.chunks[0]
+    assert first.kind == CHUNK_ZLIB and first.in_offset == 100
+    with open(image.path, 'rb') as f:
+        f.seek(first.in_offset)
+        assert zlib.decompress(f.read(first.in_length)) == raw[:first.out_length]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_iter_raw_matches_disk(tmp_path, workers):
+    raw = sample_disk()
+    image = UdifImage(make_udif(tmp_path / 'a.dmg', raw, [(0, 16), (16, 24)], prefix=b'x' * 512))
+    crcs = {}
+    assert b''.join(image.iter_raw(workers=workers, crcs=crcs)) == raw
+    assert [crcs[i] for i in range(2)] == [p['crc32'] for p in image.partitions]
+
+
+def test_uncompressed_image_needs_no_workers(tmp_path):
+    raw = bytes(range(256)) * 32
+    path = tmp_path / 'raw.dmg'
+    fork = raw
+    chunks = [MISH_CHUNK.pack(CHUNK_RAW, 0, 0, 16, 0, len(raw)), MISH_CHUNK.pack(CHUNK_END, 0, 16, 0, len(raw), 0)]
+    mish = MISH.pack(b'mish', 1, 0, 16, 0, 0, 0, bytes(24), 0, 0, bytes(128), len(chunks)) + b''.join(chunks)
+    xml = plistlib.dumps({'resource-fork': {'blkx': [{'Name': 'whole disk', 'Data': mish}]}})
+    koly = KOLY.pack(b'koly', 4, KOLY.size, 1, 0, 0, len(fork), 0, 0, 1, 1, bytes(16), 2, 32, bytes(128),
+                     len(fork), len(xml), bytes(120), 2, 32, bytes(128), 1, 16, 0, 0, 0)
+    path.write_bytes(fork + xml + koly)
+    image = UdifImage(path)
+    assert not image.compressed
+    assert image.partitions == [{'name': 'whole disk', 'crc32': None}]
+    assert b''.join(image.iter_raw()) == raw
+
+
+def test_source_reads_and_verifies(tmp_path):
+    raw = sample_disk()
+    source = UdifSource(str(make_udif(tmp_path / 'a.dmg', raw, [(0, 16), (16, 24)])), workers=1)
+    source.open()
+    assert source.size == len(raw)
+    assert read_all(source) == raw
+    ok, message = source.finish()
+    assert ok, message
+    source.close()
+
+
+def test_source_reports_crc_mismatch(tmp_path):
+    raw = sample_disk()
+    source = UdifSource(str(make_udif(tmp_path / 'a.dmg', raw, [(0, 40)], crc=0x12345678)), workers=1)
+    source.open()
+    assert read_all(source) == raw
+    ok, message = source.finish()
+    assert not ok
+    assert 'part0' in message
+    source.close()
+
+
+def test_adc_decompress():
+    # 4 字节原样数据，再从 4 字节之前复制 8 字节
+    assert adc_decompress(b'\x83abcd\x44\x00\x03', 12) == b'abcdabcdabcd'
+    # 短引用：长度 3，距离 1
+    assert adc_decompress(b'\x81ab\x00\x01', 5) == b'ababa'
+    with pytest.raises(UdifError):
+        adc_decompress(b'\x44\x00\x10', 8)
+
+
+def test_not_udif(tmp_path):
+    path = tmp_path / 'plain.img'
+    path.write_bytes(sample_disk())
+    with pytest.raises(UdifError):
+        UdifImage(path)
+    short = tmp_path / 'short.img'
+    short.write_bytes(b'koly')
+    with pytest.raises(UdifError):
+        UdifImage(short)
+
+
+def test_unsupported_chunk_type(tmp_path):
+    raw = sample_disk()
+    extra = [MISH_CHUNK.pack(0x12345678, 0, 40, 4, 0, 0)]
+    with pytest.raises(UdifError):
+        UdifImage(make_udif(tmp_path / 'a.dmg', raw, [(0, 40)], extra_chunks=extra))
+
+
+def test_overlapping_chunks(tmp_path):
+    raw = sample_disk()
+    image = UdifImage(make_udif(tmp_path / 'a.dmg', raw, [(0, 16), (8, 32)]))
+    with pytest.raises(UdifError):
+        b''.join(image.iter_raw(workers=1))
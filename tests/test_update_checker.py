@@ -0,0 +1,137 @@
+import pytest
+import requests
+
+import update_checker
+from update_checker import RETRY_BASE, RETRY_MAX, UpdateChecker, is_newer, version_key
+
+RELEASE = {'latestVersion': 'v1.3.0', 'downloadUrl': 'https://example.invalid/app.zip',
+           'releaseNotes': '修复问题\\n改进下载', 'releaseDate': '2026-10-01'}
+
+
+@pytest.mark.parametrize('version, key', [
+    ('1.2.3', ((1, 2, 3), 1, '')),
+    ('v1.2', ((1, 2), 1, '')),
+    (' V1.2.0 ', ((1, 2), 1, '')),
+    ('1.2.0-beta', ((1, 2), 0, 'beta')),
+    ('1.2.3rc', ((1, 2, 3), 1, '')),
+    ('1.x', ((1,), 1, '')),
+    (2, ((2,), 1, ''))
+])
+def test_version_key(version, key):
+    assert version_key(version) == key
+
+
+@pytest.mark.parametrize('latest, current, newer', [
+    ('1.10.0', '1.9.9', True),
+    ('v2', '1.99', True),
+    ('1.2', '1.2.0', False),
+    ('1.2.0', 'v1.2', False),
+    ('1.2.0', '1.2.0-beta', True),
+    ('1.2.0-beta', '1.2.0', False),
+    ('1.2.0-rc1', '1.2.0-beta', True),
+    ('1.2.1-alpha', '1.2.0', True),
+    ('1.2.0', '1.3.0', False)
+])
+def test_is_newer(latest, current, newer):
+    assert is_newer(latest, current) is newer
+
+
+class Response:
+    def __init__(self, data=None, status=200):
+        self.data = data
+        self.status_code = status
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(response=self)
+
+    def json(self):
+        return dict(self.data)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(update_checker, 'time', clock)
+    return clock
+
+
+def serve(monkeypatch, *responses):
+    """依次返回给定的响应，异常对象直接抛出"""
+    pending = list(responses)
+
+    def get(url, **kwargs):
+        response = pending.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(update_checker.http_client, 'get', get)
+
+
+def test_check_caches_result(monkeypatch, clock):
+    serve(monkeypatch, Response(RELEASE))
+    checker = UpdateChecker('1.2.9', interval=600)
+    checker._check()
+    snapshot = checker.snapshot()
+    assert snapshot['error'] is None
+    assert snapshot['result']['updateAvailable'] is True
+    assert snapshot['result']['currentVersion'] == '1.2.9'
+    assert snapshot['result']['releaseNotes'] == '修复问题\n改进下载'
+    assert snapshot['next_check'] == clock.now + 600
+    assert not snapshot['checking']
+
+
+def test_check_rejects_incomplete_response(monkeypatch, clock):
+    serve(monkeypatch, Response({'latestVersion': '9.9'}))
+    checker = UpdateChecker('1.0')
+    checker._check()
+    assert checker.result is None
+    assert 'Invalid API response format' in checker.error
+
+
+def test_failures_back_off(monkeypatch, clock):
+    serve(monkeypatch, requests.exceptions.Timeout(), Response(status=503),
+          *[requests.exceptions.ConnectionError('offline')] * 10, Response(RELEASE))
+    checker = UpdateChecker('1.3.0')
+    checker._check()
+    assert checker.error == '连接更新服务器超时'
+    assert checker.next_check == clock.now + RETRY_BASE
+    checker._check()
+    assert checker.error == '更新服务器响应异常 (503)'
+    assert checker.next_check == clock.now + RETRY_BASE * 2
+    for _ in range(10):
+        checker._check()
+    assert checker.error.startswith('检查更新失败')
+    assert checker.next_check == clock.now + RETRY_MAX
+    # 成功后清除错误和退避
+    checker._check()
+    assert checker.error is None and checker.failures == 0
+    assert checker.result['updateAvailable'] is False
+
+
+def test_manual_check_is_rate_limited(monkeypatch, clock):
+    serve(monkeypatch, Response(RELEASE), requests.exceptions.Timeout())
+    checker = UpdateChecker('1.2.9', interval=600)
+    checker._check()
+    # 刚检查过，手动检查被忽略
+    checker.request_check()
+    assert not checker.force_requested
+    assert checker.next_check == clock.now + 600
+    clock.now += 61
+    checker.request_check()
+    assert checker.force_requested and checker.next_check == 0.0
+    assert checker.snapshot()['checking']
+    # 失败后手动检查不跳过退避时间
+    checker._check()
+    checker.request_check()
+    assert checker.force_requested
+    assert checker.next_check == clock.now + RETRY_BASE
@@ -0,0 +1,313 @@
+import os
+import bz2
+import lzma
+import zlib
+import struct
+import plistlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import lzfse  # 可选依赖，新版 macOS 镜像使用 LZFSE 压缩
+except ImportError:
+    lzfse = None
+
+# UDIF 结构均为大端序：文件末尾 512 字节的 koly 头 + XML plist 中每个分区的 mish 块表
+SECTOR_SIZE = 512
+KOLY_MAGIC = b'koly'
+KOLY = struct.Struct('>4sIIIQQQQQII16sII128sQQ120sII128sIQIII')
+MISH_MAGIC = b'mish'
+MISH = struct.Struct('>4sIQQQII24sII128sI')
+MISH_CHUNK = struct.Struct('>IIQQQQ')
+
+CHUNK_ZERO = 0x00000000
+CHUNK_RAW = 0x00000001
+CHUNK_IGNORE = 0x00000002
+CHUNK_ADC = 0x80000004
+CHUNK_ZLIB = 0x80000005
+CHUNK_BZIP2 = 0x80000006
+CHUNK_LZFSE = 0x80000007
+CHUNK_LZMA = 0x80000008
+CHUNK_COMMENT = 0x7ffffffe
+CHUNK_END = 0xffffffff
+COMPRESSED_TYPES = (CHUNK_ADC, CHUNK_ZLIB, CHUNK_BZIP2, CHUNK_LZFSE, CHUNK_LZMA)
+CHECKSUM_CRC32 = 2
+
+ZERO_PIECE = 8 * 1024 * 1024       # 零填充块按此大小分段输出
+RAW_PIECE = 8 * 1024 * 1024
+WINDOW_PER_WORKER = 4              # 每个解压进程同时排队的块数，限制内存占用
+
+
+class UdifError(Exception):
+    """UDIF 镜像格式错误或不支持"""
+
+
+def is_udif(path):
+    """文件末尾是否为 koly 头"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < KOLY.size:
+                return False
+            f.seek(-KOLY.size, os.SEEK_END)
+            return f.read(4) == KOLY_MAGIC
+    except OSError:
+        return False
+
+
+def adc_decompress(data, size):
+    """Apple Data Compression（早期镜像使用的 LZ77 变体）"""
+    out = bytearray()
+    i = 0
+    while i < len(data) and len(out) < size:
+        code = data[i]
+        if code & 0x80:
+            length = (code & 0x7f) + 1
+            out += data[i + 1:i + 1 + length]
+            i += 1 + length
+            continue
+        if code & 0x40:
+            length = (code & 0x3f) + 4
+            distance = (data[i + 1] << 8) | data[i + 2]
+            i += 3
+        else:
+            length = ((code & 0x3c) >> 2) + 3
+            distance = ((code & 0x03) << 8) | data[i + 1]
+            i += 2
+        start = len(out) - distance - 1
+        if start < 0:
+            raise UdifError("ADC 数据损坏")
+        for k in range(length):
+            out.append(out[start + k])
+    return bytes(out)
+
+
+def decompress(kind, data, size):
+    if kind == CHUNK_ZLIB:
+        out = zlib.decompress(data)
+    elif kind == CHUNK_BZIP2:
+        out = bz2.decompress(data)
+    elif kind == CHUNK_LZMA:
+        out = lzma.decompress(data)
+    elif kind == CHUNK_ADC:
+        out = adc_decompress(data, size)
+    elif kind == CHUNK_LZFSE:
+        if lzfse is None:
+            raise UdifError("镜像使用 LZFSE 压缩，需要安装 pyliblzfse")
+        out = lzfse.decompress(data)
+    else:
+        raise UdifError(f"不支持的块类型: {kind:#x}")
+    if len(out) != size:
+        raise UdifError("解压后的数据长度与块表不符")
+    return out
+
+
+# ---- 解压进程 ----
+
+_worker_file = None
+
+
+def _init_worker(path):
+    global _worker_file
+    _worker_file = open(path, 'rb')
+
+
+def _decompress_block(kind, offset, length, size):
+    _worker_file.seek(offset)
+    return decompress(kind, _worker_file.read(length), size)
+
+
+class Chunk:
+    """块表中的一项：输出位置/长度与镜像文件中的数据位置/长度（字节）"""
+
+    __slots__ = ('kind', 'partition', 'out_offset', 'out_length', 'in_offset', 'in_length')
+
+    def __init__(self, kind, partition, out_offset, out_length, in_offset, in_length):
+        self.kind = kind
+        self.partition = partition
+        self.out_offset = out_offset
+        self.out_length = out_length
+        self.in_offset = in_offset
+        self.in_length = in_length
+
+
+class UdifImage:
+    """解析 UDIF 镜像并按顺序输出解压后的原始磁盘数据"""
+
+    def __init__(self, path):
+        self.path = path
+        self.partitions = []   # [{'name', 'crc32'}]，crc32 为块表中记录的解压后校验值
+        self.chunks = []
+        self.size = 0
+        self._parse()
+
+    def _parse(self):
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+            if file_size < KOLY.size:
+                raise UdifError("文件过短，不是 UDIF 镜像")
+            f.seek(-KOLY.size, os.SEEK_END)
+            fields = KOLY.unpack(f.read(KOLY.size))
+            magic, _version, header_size = fields[0], fields[1], fields[2]
+            if magic != KOLY_MAGIC or header_size != KOLY.size:
+                raise UdifError("不是有效的 UDIF 镜像")
+            data_fork_offset = fields[5]
+            xml_offset, xml_length = fields[15], fields[16]
+            sector_count = fields[22]
+            if not xml_length or xml_offset + xml_length > file_size:
+                raise UdifError("UDIF 镜像缺少块表")
+            f.seek(xml_offset)
+            plist = plistlib.loads(f.read(xml_length))
+
+        try:
+            blkx = plist['resource-fork']['blkx']
+        except (KeyError, TypeError):
+            raise UdifError("UDIF 镜像缺少 blkx 块表")
+
+        for entry in blkx:
+            self._parse_mish(entry.get('Data', b''), entry.get('Name', ''), data_fork_offset)
+        self.chunks.sort(key=lambda c: c.out_offset)
+        end = max((c.out_offset + c.out_length for c in self.chunks), default=0)
+        self.size = max(sector_count * SECTOR_SIZE, end)
+
+    def _parse_mish(self, data, name, data_fork_offset):
+        if len(data) < MISH.size:
+            raise UdifError(f"分区 {name} 的块表损坏")
+        (magic, _version, first_sector, _sector_count, data_offset, _buffers, _descriptors,
+         _reserved, checksum_type, checksum_bits, checksum, count) = MISH.unpack_from(data)
+        if magic != MISH_MAGIC or len(data) < MISH.size + count * MISH_CHUNK.size:
+            raise UdifError(f"分区 {name} 的块表损坏")
+        crc = None
+        if checksum_type == CHECKSUM_CRC32 and checksum_bits == 32:
+            crc = struct.unpack_from('>I', checksum)[0]
+        index = len(self.partitions)
+        self.partitions.append({'name': name, 'crc32': crc})
+
+        for i in range(count):
+            kind, _comment, sector, sectors, offset, length = MISH_CHUNK.unpack_from(
+                data, MISH.size + i * MISH_CHUNK.size)
+            if kind in (CHUNK_COMMENT, CHUNK_END) or not sectors:
+                continue
+            if kind not in (CHUNK_ZERO, CHUNK_RAW, CHUNK_IGNORE) + COMPRESSED_TYPES:
+                raise UdifError(f"不支持的块类型: {kind:#x}")
+            self.chunks.append(Chunk(
+                kind, index,
+                (first_sector + sector) * SECTOR_SIZE, sectors * SECTOR_SIZE,
+                data_fork_offset + data_offset + offset, length
+            ))
+
+    @property
+    def compressed(self):
+        return any(c.kind in COMPRESSED_TYPES for c in self.chunks)
+
+    def iter_raw(self, workers=None, crcs=None):
+        """按顺序产出原始磁盘数据；压缩块交给进程池并行解压，
+        crcs 不为空时累计每个分区解压后数据的 CRC32"""
+        executor = None
+        if self.compressed:
+            workers = workers or os.cpu_count() or 1
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(self.path,))
+        window = (workers or 1) * WINDOW_PER_WORKER
+        pending = deque()
+        chunks = iter(self.chunks)
+        position = 0
+        try:
+            with open(self.path, 'rb') as f:
+                while True:
+                    # 保持窗口内有足够多的块在解压
+                    while len(pending) < window:
+                        chunk = next(chunks, None)
+                        if chunk is None:
+                            break
+                        future = None
+                        if chunk.kind in COMPRESSED_TYPES:
+                            future = executor.submit(_decompress_block, chunk.kind, chunk.in_offset,
+                                                     chunk.in_length, chunk.out_length)
+                        pending.append((chunk, future))
+                    if not pending:
+                        break
+
+                    chunk, future = pending.popleft()
+                    if chunk.out_offset < position:
+                        raise UdifError("块表中的区间重叠")
+                    # 块之间的空隙按零填充
+                    yield from self._zeros(chunk.out_offset - position)
+                    position = chunk.out_offset
+                    for piece in self._chunk_data(f, chunk, future):
+                        if crcs is not None:
+                            crcs[chunk.partition] = zlib.crc32(piece, crcs.get(chunk.partition, 0))
+                        position += len(piece)
+                        yield piece
+                yield from self._zeros(self.size - position)
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _zeros(length):
+        zeros = bytes(min(length, ZERO_PIECE))
+        while length > 0:
+            piece = zeros[:min(length, ZERO_PIECE)]
+            length -= len(piece)
+            yield piece
+
+    def _chunk_data(self, f, chunk, future):
+        if future is not None:
+            yield future.result()
+        elif chunk.kind == CHUNK_RAW:
+            f.seek(chunk.in_offset)
+            remaining = chunk.out_length
+            while remaining:
+                piece = f.read(min(RAW_PIECE, remaining))
+                if not piece:
+                    raise UdifError("镜像数据不完整")
+                remaining -= len(piece)
+                yield piece
+        else:
+            yield from self._zeros(chunk.out_length)
+
+
+class UdifSource:
+    """把 UDIF 镜像作为原始磁盘数据提供给烧录引擎（open/readinto/finish/close）"""
+
+    def __init__(self, path, workers=None):
+        self.path = path
+        self.workers = workers
+        self.image = None
+        self.size = 0
+        self.pieces = None
+        self.pending = memoryview(b'')
+        self.crcs = {}
+
+    def open(self):
+        self.image = UdifImage(self.path)
+        self.size = self.image.size
+        self.pieces = self.image.iter_raw(self.workers, self.crcs)
+
+    def readinto(self, view):
+        filled = 0
+        while filled < len(view):
+            if not self.pending:
+                piece = next(self.pieces, None)
+                if piece is None:
+                    break
+                self.pending = memoryview(piece)
+            n = min(len(view) - filled, len(self.pending))
+            view[filled:filled + n] = self.pending[:n]
+            self.pending = self.pending[n:]
+            filled += n
+        return filled
+
+    def finish(self):
+        """对比块表中记录的各分区 CRC32"""
+        for index, partition in enumerate(self.image.partitions):
+            if partition['crc32'] is not None and self.crcs.get(index, 0) != partition['crc32']:
+                return False, f"分区 {partition['name']} 的 CRC32 校验失败"
+        return True, f"UDIF 校验通过 ({len(self.image.partitions)} 个分区)"
+
+    def close(self):
+        if self.pieces is not None:
+            self.pieces.close()
+            self.pieces = None
@@ -0,0 +1,133 @@
+import re
+import time
+import threading
+import requests
+import http_client
+
+UPDATE_URL = 'https://stapi.simplehac.cn/checkUpdate'
+CHECK_INTERVAL = 6 * 3600      # 成功后的缓存有效期（秒）
+RETRY_BASE = 60                # 失败后首次重试间隔（秒），之后指数退避
+RETRY_MAX = 3600               # 失败重试间隔上限（秒）
+MIN_FORCE_INTERVAL = 60        # 手动检查的最小间隔（秒）
+REQUIRED_FIELDS = ['latestVersion', 'downloadUrl', 'releaseNotes', 'releaseDate']
+
+
+def version_key(version):
+    """把 'v1.2.10-beta' 这类版本号转换为可比较的元组，正式版大于同号的预发布版"""
+    version = str(version).strip().lstrip('vV')
+    main, _, pre = version.partition('-')
+    numbers = []
+    for part in main.split('.'):
+        match = re.match(r'\d+', part)
+        numbers.append(int(match.group()) if match else 0)
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+    return (tuple(numbers), 0 if pre else 1, pre)
+
+
+def is_newer(latest, current):
+    return version_key(latest) > version_key(current)
+
+
+class UpdateChecker:
+    """后台轮询更新服务器并缓存结果，接口直接返回缓存，不在请求线程中联网"""
+
+    def __init__(self, current_version, enabled=None, url=UPDATE_URL, interval=CHECK_INTERVAL):
+        self.current_version = current_version
+        self.enabled = enabled or (lambda: True)
+        self.url = url
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.result = None
+        self.error = None
+        self.checked_at = 0.0
+        self.next_check = 0.0
+        self.failures = 0
+        self.checking = False
+        self.force_requested = False
+
+    def start(self):
+        """启动后台轮询线程（重复调用无副作用）"""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+
+    def request_check(self):
+        """请求尽快检查一次（手动检查），受最小间隔和失败退避限制"""
+        with self.lock:
+            if time.time() - self.checked_at < MIN_FORCE_INTERVAL and not self.failures:
+                return
+            self.force_requested = True
+            if not self.failures:
+                self.next_check = 0.0
+        self.wake.set()
+
+    def snapshot(self):
+        """返回当前缓存的检查结果"""
+        with self.lock:
+            return {
+                'result': dict(self.result) if self.result else None,
+                'error': self.error,
+                'checked_at': self.checked_at,
+                'checking': self.checking or self.force_requested,
+                'next_check': self.next_check
+            }
+
+    def _loop(self):
+        while True:
+            with self.lock:
+                wait = self.next_check - time.time()
+                forced = self.force_requested
+            if wait > 0:
+                self.wake.wait(wait)
+                self.wake.clear()
+                continue
+            if forced or self.enabled():
+                self._check()
+            else:
+                # 自动检查已关闭，等待设置变化或手动检查
+                with self.lock:
+                    self.next_check = time.time() + RETRY_BASE
+
+    def _check(self):
+        with self.lock:
+            self.checking = True
+            self.force_requested = False
+        try:
+            # 更新检查使用较短的超时，不影响下载的超时设置
+            response = http_client.get(self.url, timeout=5, verify=True)
+            response.raise_for_status()
+            data = response.json()
+            if not all(field in data for field in REQUIRED_FIELDS):
+                raise ValueError("Invalid API response format")
+
+            data['currentVersion'] = self.current_version
+            data['updateAvailable'] = is_newer(data['latestVersion'], self.current_version)
+            data['releaseNotes'] = data['releaseNotes'].replace('\\n', '\n')
+
+            with self.lock:
+                self.result = data
+                self.error = None
+                self.failures = 0
+                self.checked_at = time.time()
+                self.next_check = self.checked_at + self.interval
+        except Exception as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                message = '连接更新服务器超时'
+            elif isinstance(e, requests.exceptions.HTTPError):
+                message = f'更新服务器响应异常 ({e.response.status_code})'
+            else:
+                message = f'检查更新失败: {str(e)}'
+            print(message)
+            with self.lock:
+                self.error = message
+                self.failures += 1
+                self.checked_at = time.time()
+                self.next_check = self.checked_at + min(RETRY_BASE * 2 ** (self.failures - 1), RETRY_MAX)
+        finally:
+            with self.lock:
+                self.checking = False
@@ -0,0 +1,488 @@
+import os
+import re
+import sys
+import time
+import socket
+import zipfile
+import plistlib
+import threading
+from hardware_probe import pci_ids, read_text, read_int
+from preferences_store import PreferencesStore
+
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+UEVENT_BUFFER_SIZE = 64 * 1024
+LISTING_INTERVAL = 1.0      # 无法使用 netlink 时对比设备目录的间隔（秒）
+MAX_SEEN_DEVICES = 8        # 每个端口记住的历史设备数
+MAX_PORTS = 15              # macOS 每个控制器最多识别 15 个端口
+
+# Info.plist 中 UsbConnector 的取值
+USB_CONNECTORS = {
+    0: 'USB 2.0 Type-A',
+    3: 'USB 3.0 Type-A',
+    8: 'Type-C (仅USB 2.0)',
+    9: 'Type-C (带切换)',
+    10: 'Type-C (不带切换)',
+    255: '内部'
+}
+
+# 不同控制器驱动在 macOS 中对应的 IOProviderClass
+PROVIDER_CLASSES = {
+    'xhci': 'AppleUSBXHCIPCI',
+    'ehci': 'AppleUSBEHCIPCI'
+}
+
+ROOT_HUB = re.compile(r'usb(\d+)')
+DEVICE_NAME = re.compile(r'(\d+)-(\d+)((?:\.\d+)*)')
+
+
+def parse_uevent(data):
+    """解析内核 uevent 消息，返回 (action, devpath, 属性字典)；不是内核消息时返回 None"""
+    if data.startswith(b'libudev'):
+        return None
+    parts = data.split(b'\0')
+    header = parts[0].decode('utf-8', 'replace')
+    if '@' not in header:
+        return None
+    props = {}
+    for part in parts[1:]:
+        key, sep, value = part.decode('utf-8', 'replace').partition('=')
+        if sep:
+            props[key] = value
+    action, _, devpath = header.partition('@')
+    return props.get('ACTION', action), props.get('DEVPATH', devpath), props
+
+
+def port_data(address):
+    """端口地址按 4 字节小端序写入 Info.plist"""
+    return address.to_bytes(4, 'little')
+
+
+class UsbMapper:
+    """USB 端口映射：从 sysfs 枚举控制器和端口，监听热插拔事件增量记录每个端口上出现过的设备，
+    用户确认端口类型后导出 USBPorts.kext"""
+
+    def __init__(self, map_path, sysfs_root='/sys'):
+        self.sysfs_root = sysfs_root
+        self.store = PreferencesStore(map_path, self._validate, lambda: {'ports': {}})
+        self.lock = threading.RLock()
+        self.controllers = {}   # PCI 地址 -> 控制器信息
+        self.ports = {}         # 端口 ID -> 端口信息
+        self.bus_ports = {}     # (总线号, 根端口号) -> 端口 ID
+        self.buses = set()      # 已知的总线号（包括不需要映射的 USB 1.1 总线）
+        self.connected = {}     # 设备名（如 1-3.2） -> (端口 ID, 设备信息)
+        self.port_warnings = {} # PCI 地址 -> 启用端口数超限的提示，热插拔时只重算受影响的控制器
+        self.listeners = []
+        self.watcher = None
+        self.event_source = None
+
+    @property
+    def supported(self):
+        """目前只支持从 Linux 的 sysfs 枚举端口（如在 Linux Live 系统中运行）"""
+        return sys.platform.startswith('linux') and os.path.isdir(self._devices_dir())
+
+    @staticmethod
+    def _validate(data):
+        if not isinstance(data, dict) or not isinstance(data.get('ports'), dict):
+            raise ValueError("USB 映射文件格式错误")
+        return data
+
+    # ---- 枚举 ----
+
+    def _devices_dir(self):
+        return os.path.join(self.sysfs_root, 'bus', 'usb', 'devices')
+
+    def _controller_info(self, pci_path):
+        vendor = read_int(os.path.join(pci_path, 'vendor'), base=16)
+        device = read_int(os.path.join(pci_path, 'device'), base=16)
+        driver_link = os.path.join(pci_path, 'driver')
+        driver = os.path.basename(os.path.realpath(driver_link)) if os.path.exists(driver_link) else ''
+        provider = next((cls for key, cls in PROVIDER_CLASSES.items() if key in driver), None)
+        name = None
+        if vendor is not None and device is not None:
+            vendor_name, device_name = pci_ids.name(f'{vendor:04x}', f'{device:04x}')
+            name = ' '.join(n for n in (vendor_name, device_name) if n) or f'{vendor:04x}:{device:04x}'
+        return {
+            'address': os.path.basename(pci_path),
+            'vendor': vendor,
+            'device': device,
+            'name': name,
+            'driver': driver,
+            'provider_class': provider,
+            'acpi_path': read_text(os.path.join(pci_path, 'firmware_node', 'path')),
+            'buses': {}
+        }
+
+    def _enumerate(self):
+        """读取所有根集线器，按 PCI 控制器分组并为端口命名（HSxx / SSxx）"""
+        controllers = {}
+        hubs = []
+        buses = set()
+        devices_dir = self._devices_dir()
+        for name in sorted(os.listdir(devices_dir), key=lambda n: (len(n), n)):
+            match = ROOT_HUB.fullmatch(name)
+            if not match:
+                continue
+            bus = int(match.group(1))
+            buses.add(bus)
+            hub = os.path.realpath(os.path.join(devices_dir, name))
+            speed = read_int(os.path.join(hub, 'speed'), 0)
+            if speed < 480:
+                # USB 1.1 伴随控制器在 macOS 中不需要映射
+                continue
+            pci_path = os.path.dirname(hub)
+            address = os.path.basename(pci_path)
+            if address not in controllers:
+                controllers[address] = self._controller_info(pci_path)
+            kind = 'usb3' if speed >= 5000 else 'usb2'
+            controllers[address]['buses'][bus] = kind
+            hubs.append((address, bus, kind, hub, read_int(os.path.join(hub, 'maxchild'), 0)))
+
+        ports = {}
+        bus_ports = {}
+        # macOS 中 USB 3 端口的地址排在所有 USB 2 端口之后
+        usb2_counts = {}
+        for address, _bus, kind, _hub, maxchild in hubs:
+            if kind == 'usb2':
+                usb2_counts[address] = usb2_counts.get(address, 0) + maxchild
+        numbers = {}
+        for address, bus, kind, hub, maxchild in hubs:
+            prefix = 'SS' if kind == 'usb3' else 'HS'
+            offset = usb2_counts.get(address, 0) if kind == 'usb3' else 0
+            for number in range(1, maxchild + 1):
+                index = numbers.get((address, prefix), 0) + 1
+                numbers[(address, prefix)] = index
+                port_dir = os.path.join(hub, f'{bus}-0:1.0', f'usb{bus}-port{number}')
+                name = f'{prefix}{index:02d}'
+                port_id = f'{address}/{name}'
+                peer = os.path.join(port_dir, 'peer')
+                ports[port_id] = {
+                    'id': port_id,
+                    'controller': address,
+                    'name': name,
+                    'type': kind,
+                    'bus': bus,
+                    'number': number,
+                    'address': offset + index,
+                    'connect_type': read_text(os.path.join(port_dir, 'connect_type'), 'unknown'),
+                    'acpi_path': read_text(os.path.join(port_dir, 'firmware_node', 'path')),
+                    'peer': os.path.basename(os.path.realpath(peer)) if os.path.exists(peer) else None,
+                    'companion': None
+                }
+                bus_ports[(bus, number)] = port_id
+
+        # 通过 peer 链接找到同一物理接口上的 USB 2 / USB 3 端口
+        by_dir = {f"usb{p['bus']}-port{p['number']}": port_id for port_id, p in ports.items()}
+        for port in ports.values():
+            if port['peer'] in by_dir:
+                port['companion'] = ports[by_dir[port['peer']]]['name']
+        return controllers, ports, bus_ports, buses
+
+    def scan(self):
+        """重新枚举控制器和端口，并登记当前已连接的设备"""
+        if not self.supported:
+            return self.get_map()
+        controllers, ports, bus_ports, buses = self._enumerate()
+        with self.lock:
+            self.controllers = controllers
+            self.ports = ports
+            self.bus_ports = bus_ports
+            self.buses = buses
+            self.connected = {}
+            devices_dir = self._devices_dir()
+            for name in os.listdir(devices_dir):
+                if DEVICE_NAME.fullmatch(name):
+                    devpath = os.path.relpath(os.path.realpath(os.path.join(devices_dir, name)), self.sysfs_root)
+                    self._device_added(name, '/' + devpath, {})
+        return self.get_map()
+
+    # ---- 热插拔事件 ----
+
+    def add_listener(self, callback):
+        """端口映射变化时回调 callback(update)：update['full'] 为真时是完整映射，否则只包含变化的端口"""
+        self.listeners.append(callback)
+
+    def start_watching(self):
+        """订阅内核 uevent（netlink），不可用时退回到对比设备目录"""
+        if self.watcher or not self.supported:
+            return
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, UEVENT_KERNEL_GROUP))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024 * 1024)
+            target, args = self._watch_netlink, (sock,)
+            self.event_source = 'netlink'
+        except (OSError, AttributeError) as e:
+            print(f"无法订阅内核热插拔事件，改为监视设备目录: {str(e)}")
+            target, args = self._watch_listing, (LISTING_INTERVAL,)
+            self.event_source = 'listing'
+        self.watcher = threading.Thread(target=target, args=args, daemon=True)
+        self.watcher.start()
+
+    def _watch_netlink(self, sock):
+        while True:
+            try:
+                event = parse_uevent(sock.recv(UEVENT_BUFFER_SIZE))
+            except OSError as e:
+                # 接收缓冲区溢出时丢失了事件，重新枚举一次
+                print(f"读取热插拔事件失败: {str(e)}")
+                self.scan()
+                self._notify(full=True)
+                continue
+            if event:
+                action, devpath, props = event
+                if props.get('SUBSYSTEM') == 'usb' and props.get('DEVTYPE') == 'usb_device':
+                    self.handle_event(action, devpath, props)
+
+    def _watch_listing(self, interval):
+        devices_dir = self._devices_dir()
+        try:
+            known = {name for name in os.listdir(devices_dir) if DEVICE_NAME.fullmatch(name)}
+        except OSError as e:
+            print(f"读取USB设备目录失败: {str(e)}")
+            known = set()
+        while True:
+            time.sleep(interval)
+            try:
+                current = {name for name in os.listdir(devices_dir) if DEVICE_NAME.fullmatch(name)}
+            except OSError:
+                continue
+            for name in sorted(current - known):
+                devpath = os.path.relpath(os.path.realpath(os.path.join(devices_dir, name)), self.sysfs_root)
+                self.handle_event('add', '/' + devpath, {})
+            for name in sorted(known - current):
+                self.handle_event('remove', f'/{name}', {})
+            known = current
+
+    def handle_event(self, action, devpath, props):
+        """处理一个 USB 设备的 add/remove 事件，只更新受影响的端口"""
+        name = os.path.basename(devpath.rstrip('/'))
+        match = DEVICE_NAME.fullmatch(name)
+        if not match:
+            return
+        with self.lock:
+            if action == 'add':
+                new_bus = int(match.group(1)) not in self.buses
+                port_id = None if new_bus else self._device_added(name, devpath, props)
+            elif action == 'remove':
+                new_bus = False
+                entry = self.connected.pop(name, None)
+                port_id = entry[0] if entry else None
+            else:
+                return
+        if new_bus:
+            # 新出现的控制器（如雷电扩展坞），重新枚举
+            self.scan()
+            self._notify(full=True)
+        elif port_id:
+            self._notify([port_id])
+
+    def _device_added(self, name, devpath, props):
+        match = DEVICE_NAME.fullmatch(name)
+        if not match:
+            return None
+        port_id = self.bus_ports.get((int(match.group(1)), int(match.group(2))))
+        if port_id is None:
+            return None
+        device_dir = os.path.join(self.sysfs_root, devpath.lstrip('/'))
+        vendor = read_int(os.path.join(device_dir, 'idVendor'), base=16)
+        product_id = read_int(os.path.join(device_dir, 'idProduct'), base=16)
+        if vendor is None and props.get('PRODUCT'):
+            # 设备目录读取失败时使用事件中的 PRODUCT=vid/pid/bcd
+            fields = props['PRODUCT'].split('/')
+            try:
+                vendor, product_id = int(fields[0], 16), int(fields[1], 16)
+            except (IndexError, ValueError):
+                pass
+        device = {
+            'name': name,
+            'vid': f'{vendor:04x}' if vendor is not None else None,
+            'pid': f'{product_id:04x}' if product_id is not None else None,
+            'product': read_text(os.path.join(device_dir, 'product')),
+            'manufacturer': read_text(os.path.join(device_dir, 'manufacturer')),
+            'speed': read_int(os.path.join(device_dir, 'speed')),
+            'behind_hub': bool(match.group(3))
+        }
+        self.connected[name] = (port_id, device)
+        self._remember(port_id, device)
+        return port_id
+
+    def _remember(self, port_id, device):
+        """记录端口上出现过的设备；首次发现设备的端口默认启用"""
+        key = (device['vid'], device['pid'])
+        with self.store.edit() as data:
+            settings = data['ports'].setdefault(port_id, {})
+            seen = [d for d in settings.get('seen', []) if (d.get('vid'), d.get('pid')) != key]
+            seen.insert(0, {
+                'vid': device['vid'],
+                'pid': device['pid'],
+                'product': device['product'],
+                'speed': device['speed']
+            })
+            settings['seen'] = seen[:MAX_SEEN_DEVICES]
+
+    def _notify(self, port_ids=None, full=False):
+        if not self.listeners:
+            return
+        if full:
+            update = dict(self.get_map(), full=True)
+        else:
+            data = self.store.get()
+            with self.lock:
+                port_ids = [p for p in port_ids if p in self.ports]
+                ports = [self._port_view(p, data) for p in port_ids]
+                controllers = {self.ports[p]['controller'] for p in port_ids}
+                counts = dict.fromkeys(controllers, 0)
+                for port_id, port in self.ports.items():
+                    if port['controller'] in controllers and self._enabled(port_id, data):
+                        counts[port['controller']] += 1
+                for address, count in counts.items():
+                    self.port_warnings[address] = self._warning(address, count)
+                warnings = [w for w in self.port_warnings.values() if w]
+            update = {'full': False, 'ports': ports, 'warnings': warnings}
+        for callback in self.listeners:
+            try:
+                callback(update)
+            except Exception as e:
+                print(f"推送USB端口变化失败: {str(e)}")
+
+    # ---- 映射结果 ----
+
+    @staticmethod
+    def _default_connector(port):
+        if port['connect_type'] == 'hardwired':
+            return 255
+        if port['type'] == 'usb3' or port['companion']:
+            return 3
+        return 0
+
+    def _port_view(self, port_id, data):
+        port = self.ports[port_id]
+        settings = data['ports'].get(port_id, {})
+        seen = settings.get('seen', [])
+        return dict(
+            port,
+            devices=[device for pid, device in self.connected.values() if pid == port_id],
+            seen=seen,
+            enabled=self._enabled(port_id, data),
+            connector=settings.get('connector', self._default_connector(port))
+        )
+
+    @staticmethod
+    def _enabled(port_id, data):
+        """未设置时出现过设备的端口默认启用"""
+        settings = data['ports'].get(port_id, {})
+        return settings.get('enabled', bool(settings.get('seen')))
+
+    def get_map(self):
+        data = self.store.get()
+        with self.lock:
+            ports = [self._port_view(port_id, data) for port_id in self.ports]
+            controllers = [dict(c, buses=sorted(c['buses'])) for c in self.controllers.values()]
+            counts = dict.fromkeys(self.controllers, 0)
+            for port in ports:
+                if port['enabled']:
+                    counts[port['controller']] = counts.get(port['controller'], 0) + 1
+            self.port_warnings = {address: self._warning(address, count) for address, count in counts.items()}
+            warnings = [w for w in self.port_warnings.values() if w]
+        return {
+            'supported': self.supported,
+            'event_source': self.event_source,
+            'controllers': controllers,
+            'ports': ports,
+            'connectors': USB_CONNECTORS,
+            'warnings': warnings
+        }
+
+    def warnings(self):
+        return self.get_map()['warnings']
+
+    @staticmethod
+    def _warning(address, count):
+        if count > MAX_PORTS:
+            return f"控制器 {address} 启用了 {count} 个端口，超过 macOS 的 {MAX_PORTS} 个端口限制"
+        return None
+
+    def update_ports(self, changes):
+        """修改端口设置：changes 为 {端口ID: {'enabled': bool, 'connector': int}}；
+        接口类型同时应用到同一物理接口上的另一个端口"""
+        with self.lock:
+            for port_id, change in changes.items():
+                if port_id not in self.ports:
+                    raise ValueError(f"端口不存在: {port_id}")
+                if 'connector' in change and int(change['connector']) not in USB_CONNECTORS:
+                    raise ValueError(f"无效的接口类型: {change['connector']}")
+            changed = set()
+            with self.store.edit() as data:
+                for port_id, change in changes.items():
+                    settings = data['ports'].setdefault(port_id, {})
+                    if 'enabled' in change:
+                        settings['enabled'] = bool(change['enabled'])
+                    changed.add(port_id)
+                    if 'connector' in change:
+                        port = self.ports[port_id]
+                        targets = [port_id]
+                        if port['companion']:
+                            targets.append(f"{port['controller']}/{port['companion']}")
+                        for target in targets:
+                            data['ports'].setdefault(target, {})['connector'] = int(change['connector'])
+                            changed.add(target)
+        self._notify(sorted(changed))
+        return self.get_map()
+
+    def build_info_plist(self):
+        """生成无代码 USBPorts.kext 的 Info.plist：每个控制器一个 IOKitPersonality，只包含启用的端口，
+        不限定机型（不写 model），任何 SMBIOS 都生效"""
+        mapping = self.get_map()
+        by_controller = {}
+        for port in mapping['ports']:
+            if port['enabled']:
+                by_controller.setdefault(port['controller'], []).append(port)
+
+        personalities = {}
+        for controller in mapping['controllers']:
+            ports = by_controller.get(controller['address'])
+            if not ports or not controller['provider_class'] or controller['vendor'] is None:
+                continue
+            prefix = 'XHC' if controller['provider_class'] == 'AppleUSBXHCIPCI' else 'EHC'
+            key = f"{prefix}-{controller['vendor']:04x}_{controller['device']:04x}"
+            personalities[key] = {
+                'CFBundleIdentifier': 'com.apple.driver.AppleUSBHostMergeProperties',
+                'IOClass': 'AppleUSBHostMergeProperties',
+                'IOProviderClass': controller['provider_class'],
+                'IOPCIPrimaryMatch': f"0x{controller['device']:04x}{controller['vendor']:04x}",
+                'IOProviderMergeProperties': {
+                    'port-count': port_data(max(p['address'] for p in ports)),
+                    'ports': {
+                        p['name']: {'UsbConnector': p['connector'], 'port': port_data(p['address'])}
+                        for p in sorted(ports, key=lambda p: p['address'])
+                    }
+                }
+            }
+
+        if not personalities:
+            raise ValueError("没有启用的端口，请先插拔设备或手动启用端口")
+        return plistlib.dumps({
+            'CFBundleDevelopmentRegion': 'English',
+            'CFBundleIdentifier': 'com.simpletoolkit.USBPorts',
+            'CFBundleInfoDictionaryVersion': '6.0',
+            'CFBundleName': 'USBPorts',
+            'CFBundlePackageType': 'KEXT',
+            'CFBundleShortVersionString': '1.0',
+            'CFBundleSignature': '????',
+            'CFBundleVersion': '1.0',
+            'IOKitPersonalities': personalities,
+            'OSBundleRequired': 'Root'
+        }, sort_keys=True)
+
+    def export(self, save_path):
+        """把 USBPorts.kext 打包为 zip 保存到 save_path，返回 (路径, 警告列表)"""
+        info = self.build_info_plist()
+        tmp_path = f"{save_path}.tmp"
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('USBPorts.kext/Contents/Info.plist', info)
+        os.replace(tmp_path, save_path)
+        return save_path, self.warnings()
+
+    def flush(self):
+        return self.store.flush()